@@ -9,6 +9,9 @@ from .env import (
     supabase,
     whisper_model,
     openai_client,  # Add this
+    async_client,
+    async_claude,
+    async_openai_client,
     GROQ_API_KEY,
     CLAUDE_API_KEY,
     OPENAI_API_KEY,
@@ -23,6 +26,9 @@ __all__ = [
     "supabase",
     "whisper_model",
     "openai_client",  # Add this
+    "async_client",
+    "async_claude",
+    "async_openai_client",
     "GROQ_API_KEY",
     "CLAUDE_API_KEY",
     "OPENAI_API_KEY",
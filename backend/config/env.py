@@ -4,8 +4,8 @@ Loads environment variables and initializes API clients
 """
 import os
 from dotenv import load_dotenv
-from groq import Groq
-from anthropic import Anthropic
+from groq import Groq, AsyncGroq
+from anthropic import Anthropic, AsyncAnthropic
 from supabase import create_client, Client
 import openai
 import whisper
@@ -30,6 +30,11 @@ client = Groq(api_key=GROQ_API_KEY)
 claude = Anthropic(api_key=CLAUDE_API_KEY)
 openai_client = openai.OpenAI(api_key=OPENAI_API_KEY) if OPENAI_API_KEY else None
 
+# Async clients (used by services/llm_providers.py so streaming never blocks the event loop)
+async_client = AsyncGroq(api_key=GROQ_API_KEY)
+async_claude = AsyncAnthropic(api_key=CLAUDE_API_KEY)
+async_openai_client = openai.AsyncOpenAI(api_key=OPENAI_API_KEY) if OPENAI_API_KEY else None
+
 # Whisper model for transcription
 whisper_model = whisper.load_model("base")  # or "small" / "medium" / "large"
 
@@ -84,4 +89,7 @@ __all__ = [
     "SUPABASE_URL",
     "SUPABASE_KEY",
     "openai_client",
+    "async_client",        # Async Groq client
+    "async_claude",        # Async Claude client
+    "async_openai_client", # Async OpenAI client
 ]
\ No newline at end of file
@@ -1,10 +1,16 @@
 # glow_state.py
-from pydantic import BaseModel, Field
-from typing import List, Optional, Dict, Any
+from pydantic import BaseModel, ConfigDict, Field
+from typing import Callable, List, Optional, Dict, Any
 from datetime import datetime
 
 
-class SystemState(BaseModel):
+class FrozenModel(BaseModel):
+    # Snapshots are shared between readers: assigning a field raises, and
+    # list/dict fields must be replaced (via the store), never mutated in place
+    model_config = ConfigDict(frozen=True)
+
+
+class SystemState(FrozenModel):
     cpu_usage: float = 0.0         # 0–1
     ram_usage: float = 0.0         # 0–1
     disk_free_gb: float = 0.0
@@ -25,7 +31,7 @@ class SystemState(BaseModel):
     active_ports: List[Dict[str, Any]] = Field(default_factory=list)
 
 
-class RuntimeState(BaseModel):
+class RuntimeState(FrozenModel):
     backend_running: bool = True
     ollama_running: bool = False
     plex_running: bool = False
@@ -39,7 +45,7 @@ class RuntimeState(BaseModel):
     tokens_today: int = 0
 
 
-class DeviceState(BaseModel):
+class DeviceState(FrozenModel):
     frontmost_app: Optional[str] = None
     frontmost_window: Optional[str] = None
     selected_text: Optional[str] = None
@@ -54,19 +60,19 @@ class DeviceState(BaseModel):
     audio_output_volume: Optional[float] = None
 
 
-class EnvironmentState(BaseModel):
+class EnvironmentState(FrozenModel):
     now: datetime = Field(default_factory=datetime.utcnow)
     timezone: str = "America/Chicago"
     # weather, etc later if you want
 
 
-class MemoryState(BaseModel):
+class MemoryState(FrozenModel):
     last_ingested_file: Optional[str] = None
     last_memory_added: Optional[str] = None
     memory_count: int = 0
 
 
-class TaskInfo(BaseModel):
+class TaskInfo(FrozenModel):
     id: str
     type: str                   # "rip_disc", "embed_file", etc
     status: str                 # "pending", "running", "done", "error"
@@ -76,18 +82,27 @@ class TaskInfo(BaseModel):
     finished_at: Optional[datetime] = None
 
 
-class TasksState(BaseModel):
+class TasksState(FrozenModel):
     active: List[TaskInfo] = Field(default_factory=list)
     recent: List[TaskInfo] = Field(default_factory=list)
 
 
-class NotificationsState(BaseModel):
+class NotificationsState(FrozenModel):
     disc_inserted: bool = False
     disc_path: Optional[str] = None
     timestamp: Optional[str] = None
 
 
-class GlowState(BaseModel):
+class ProbeInfo(FrozenModel):
+    backend: str = ""           # "proc", "sysfs", "psutil", "socket", "osascript", ...
+    interval_s: float = 0.0     # current interval (grows while values are stable)
+    last_ms: float = 0.0
+    avg_ms: float = 0.0
+    runs: int = 0
+    errors: int = 0
+
+
+class GlowState(FrozenModel):
     system: SystemState = Field(default_factory=SystemState)
     runtime: RuntimeState = Field(default_factory=RuntimeState)
     device: DeviceState = Field(default_factory=DeviceState)
@@ -95,10 +110,13 @@ class GlowState(BaseModel):
     memory: MemoryState = Field(default_factory=MemoryState)
     tasks: TasksState = Field(default_factory=TasksState)
     notifications: NotificationsState = Field(default_factory=NotificationsState)
+    probes: Dict[str, ProbeInfo] = Field(default_factory=dict)  # watcher probe cost
 
     # For future custom fields
     extra: Dict[str, Any] = Field(default_factory=dict)
 
+    # Bumped by the store on every change
+    version: int = 0
 
 
 
@@ -106,16 +124,48 @@ class GlowState(BaseModel):
 import threading
 
 class GlowStateStore:
+    """
+    Holds the current GlowState snapshot. Snapshots are immutable, so readers get
+    the current one with no copy; every write builds a new snapshot under the
+    lock with version + 1.
+    """
+
     def __init__(self):
         self._state = GlowState()
         self._lock = threading.Lock()
+        self._listeners: List[Callable[[GlowState], None]] = []
 
-    def get_state(self) -> GlowState:
-        # Return a copy so nobody mutates it accidentally
-        with self._lock:
-            return self._state.copy(deep=True)
+    @property
+    def version(self) -> int:
+        return self._state.version
 
-    def update(self, **kwargs):
+    def get_state(self) -> GlowState:
+        # Frozen snapshot - safe to share, nothing can mutate it
+        return self._state
+
+    def _commit(self, new_state: GlowState) -> GlowState:
+        # Caller holds the lock
+        new_state = new_state.model_copy(update={"version": self._state.version + 1})
+        self._state = new_state
+        return new_state
+
+    def add_listener(self, listener: Callable[[GlowState], None]):
+        """Call listener(new_state) after every change (outside the lock, from the writer's thread)."""
+        self._listeners.append(listener)
+
+    def remove_listener(self, listener: Callable[[GlowState], None]):
+        if listener in self._listeners:
+            self._listeners.remove(listener)
+
+    def _notify(self, state: GlowState) -> GlowState:
+        for listener in list(self._listeners):
+            try:
+                listener(state)
+            except Exception as e:
+                print(f"⚠️ GlowState listener failed: {e}")
+        return state
+
+    def update(self, **kwargs) -> GlowState:
         """
         kwargs is like:
           system={...}, runtime={...}, device={...}
@@ -123,22 +173,63 @@ class GlowStateStore:
         """
         with self._lock:
             current = self._state
+            changes = {}
 
             for key, value in kwargs.items():
-                if hasattr(current, key):
+                if key in GlowState.model_fields and key != "version":
                     sub = getattr(current, key)
-                    if isinstance(value, dict):
+                    if isinstance(value, dict) and isinstance(sub, BaseModel):
                         # merge dict into submodel
-                        updated = sub.copy(update=value)
-                        setattr(current, key, updated)
+                        changes[key] = sub.model_copy(update=value)
                     else:
-                        setattr(current, key, value)
+                        changes[key] = value
+
+            if all(getattr(current, key) == value for key, value in changes.items()):
+                return current  # nothing changed; keep the version
+            new_state = self._commit(current.model_copy(update=changes))
+        return self._notify(new_state)
 
-            self._state = current
+    def apply(self, fn: Callable[[GlowState], Optional[GlowState]]) -> GlowState:
+        """
+        Atomic read-modify-write: fn gets the current snapshot and returns the new
+        one (or None for no change). Runs under the lock, so keep it short and
+        don't call back into the store from it. Exceptions leave the state untouched.
+        """
+        with self._lock:
+            new_state = fn(self._state)
+            if new_state is None or new_state is self._state:
+                return self._state
+            new_state = self._commit(new_state)
+        return self._notify(new_state)
 
-    def replace(self, new_state: GlowState):
+    def replace(self, new_state: GlowState) -> GlowState:
         with self._lock:
-            self._state = new_state
+            new_state = self._commit(new_state)
+        return self._notify(new_state)
+
+    # ---------------------------
+    # Tasks
+    # ---------------------------
+    def add_task(self, task: TaskInfo) -> GlowState:
+        return self.apply(lambda state: state.model_copy(update={
+            "tasks": state.tasks.model_copy(update={"active": state.tasks.active + [task]})
+        }))
+
+    def update_task(self, task_id: str, **changes) -> Optional[TaskInfo]:
+        """Update an active task's fields atomically. Returns the updated task, or None if not found."""
+        updated = None
+
+        def change(state: GlowState) -> Optional[GlowState]:
+            nonlocal updated
+            active = list(state.tasks.active)
+            for i, task in enumerate(active):
+                if task.id == task_id:
+                    updated = active[i] = task.model_copy(update=changes)
+                    return state.model_copy(update={"tasks": state.tasks.model_copy(update={"active": active})})
+            return None
+
+        self.apply(change)
+        return updated
 
 # Global instance
-glow_state_store = GlowStateStore()
\ No newline at end of file
+glow_state_store = GlowStateStore()
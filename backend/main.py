@@ -40,6 +40,7 @@ from routes import (
     consciousness_router,
     finance_router,
     knowledge_base_router,
+    metrics_router,
 )
 from routes import tasks as tasks_router
 from routes.chat import set_superpowers
@@ -91,12 +92,66 @@ async def startup_event():
     loop.create_task(system_watcher())
     loop.create_task(runtime_watcher())
     loop.create_task(device_watcher())
+
+    # Local memory vector index (loads from disk, then syncs with Supabase)
+    from services.memory_index import memory_index
+    memory_index.start()
+
+    # Write-behind chat message log (replays the journal, then flushes in batches)
+    from services.message_log import message_log
+    message_log.start()
+
+    # Filter-aware knowledge base index (periodic refresh from Supabase)
+    from services.kb_index import kb_index
+    kb_index.start()
+
+    # Semantic routing tier (embeds superpower intent examples in the background)
+    from services.semantic_router import semantic_router
+    semantic_router.start()
+
+    # GlowState change feed (snapshot + JSON-patch deltas to "glow_state" WebSocket subscribers)
+    from services.glow_state_feed import glow_state_feed
+    glow_state_feed.start(websocket_manager)
+
+    # System metric history (5s / 1m / 15m ring buffers behind /glow/metrics/history)
+    from services.metrics_history import metrics_history
+    metrics_history.start()
+
+    # Filename index behind FileOps search_files (loads from disk, then mtime-diff rescans)
+    from services.file_index import file_index
+    file_index.start()
+
+    # Copy/move engine progress on the "file_transfers" WebSocket channel
+    from services.file_transfer import file_transfers
+    file_transfers.start(websocket_manager)
     
     # Warm up router for instant routing
     from services.glow_router import _warm_router
     await _warm_router()
 
 
+@app.on_event("shutdown")
+async def shutdown_event():
+    # Drain queued chat messages before the DB pool goes away (leftovers stay in the journal)
+    from services.message_log import message_log
+    await message_log.stop()
+
+    # Close the pooled embedding client
+    from services.embeddings import embedding_service
+    await embedding_service.aclose()
+    if embedding_service.cache is not None:
+        embedding_service.cache.close()
+
+    # Persist the memory index so the next start is a memory-map, not a full pull
+    from services.memory_index import memory_index
+    if memory_index.dirty:
+        memory_index.save()
+
+    # Release the Supabase worker pool
+    from services.db import db
+    db.shutdown()
+
+
 
 
 
@@ -174,6 +229,7 @@ app.include_router(memory_router)
 app.include_router(consciousness_router)
 app.include_router(finance_router)
 app.include_router(knowledge_base_router)
+app.include_router(metrics_router)
 app.include_router(plex_router)
 app.include_router(mortal_drive_router)
 app.include_router(tasks_router.router)
@@ -605,6 +661,30 @@ async def websocket_endpoint(websocket: WebSocket, client_id: str):
                         "type": "download_registered", 
                         "session_id": session_id
                     })
+            elif message.get("type") == "subscribe":
+                # Channel subscriptions, e.g. {"type": "subscribe", "channel": "glow_state"}
+                channel = message.get("channel")
+                if channel == "glow_state":
+                    from services.glow_state_feed import glow_state_feed
+                    await glow_state_feed.subscribe(client_id)
+                elif channel:
+                    websocket_manager.subscribe(client_id, channel)
+            elif message.get("type") == "unsubscribe":
+                websocket_manager.unsubscribe(client_id, message.get("channel"))
+            elif message.get("type") == "file_search":
+                # Streamed file search: matches arrive as file_search_batch messages
+                from services.file_search_stream import file_search_streams
+                await file_search_streams.start(
+                    websocket_manager, client_id, message.get("search_id") or str(time.time()),
+                    message.get("query", ""), message.get("directories"),
+                )
+            elif message.get("type") == "file_search_cancel":
+                from services.file_search_stream import file_search_streams
+                file_search_streams.cancel(message.get("search_id"))
+            elif message.get("type") == "file_transfer_cancel":
+                # Stops a copy/move between chunks; its part files stay for a later resume
+                from services.file_transfer import file_transfers
+                file_transfers.cancel(message.get("transfer_id"))
             elif message.get("type") == "chat_message":
                 # Handle chat streaming request
                 from routes.chat import chat_with_assistant_stream
@@ -634,6 +714,9 @@ async def websocket_endpoint(websocket: WebSocket, client_id: str):
     except Exception as e:
         print(f"❌ WebSocket error: {e}")
         websocket_manager.disconnect(client_id)
+    finally:
+        from services.file_search_stream import file_search_streams
+        file_search_streams.cancel_client(client_id)
 
 # endregion
 
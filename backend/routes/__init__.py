@@ -8,6 +8,7 @@ from routes.memory import router as memory_router
 from routes.consciousness import router as consciousness_router
 from routes.finance import router as finance_router
 from routes.knowledge_base import router as knowledge_base_router
+from routes.metrics import router as metrics_router
 
 __all__ = [
     "chat_router",
@@ -17,4 +18,5 @@ __all__ = [
     "consciousness_router",
     "finance_router",
     "knowledge_base_router",
+    "metrics_router",
 ]
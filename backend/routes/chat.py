@@ -8,19 +8,27 @@ import asyncio
 from fastapi import APIRouter, Request, BackgroundTasks, File, UploadFile
 from fastapi.responses import JSONResponse
 from datetime import datetime
+from typing import Optional
 
-from config import supabase, whisper_model, client, claude, openai_client
+from config import whisper_model, openai_client
+from services.db import db
+from services.message_log import message_log
+from services.thread_cache import thread_cache
 from services.memory import (
     get_or_create_thread,
     log_message_to_db,
     get_thread_messages_for_context,
     embed_text_ollama,
-    select_memories_for_context
+    search_memories
 )
 from services.intent_detection import detect_user_intent
 from services.persona import build_persona_prompt, log_to_memory
 from services.consciousness_tracker import analyze_and_save_state
 from services.glow_router import route_message, execute_tool, set_superpowers as set_router_superpowers
+from services.chat_pipeline import ChatPipeline, get_stage_budgets
+from services.llm_providers import complete_chat, stream_chat, sampling_params, resolve_chat_model
+from services.context_budget import pack_context
+from services.metrics import metrics
 
 router = APIRouter()
 
@@ -40,17 +48,241 @@ def set_websocket_manager(ws_manager):
     websocket_manager = ws_manager
 
 
+CRISIS_KEYWORDS = [
+    'suicide', 'kill myself', 'end it all', 'self-harm', 'want to die',
+    'hurt myself', 'end my life', 'no reason to live', 'better off dead'
+]
+
+CRISIS_SUMMARY_TIMEOUT = 3.0  # seconds to summarize crisis resources before sending them unsummarized
+
+CRISIS_INSTRUCTIONS = """
+    🚨 CRITICAL - CRISIS RESPONSE PROTOCOL:
+    The user may be in crisis. You MUST:
+    1. Immediately acknowledge their pain with compassion
+    2. Provide crisis resources PROMINENTLY (988, Crisis Text Line, 911)
+    3. Encourage professional help NOW
+    4. Stay supportive and validating
+    5. Do NOT attempt therapy - connect them to professionals
+    """
+
+
+async def _gather_chat_context(
+    data: dict,
+    *,
+    user_input: str,
+    user_id: str,
+    thread_id: str,
+    user_message_id,
+    deep_memory: bool,
+    use_memory_rag: bool,
+    notion_connected: bool,
+    superpowers,
+) -> dict:
+    """
+    Run the independent pre-LLM stages concurrently, each within its budget:
+    consciousness analysis, history, memory RAG, Notion deep memory, knowledge base.
+    Missed stages fall back to empty defaults; KB summarization that runs out of
+    time falls back to plain truncation (reported as "partial").
+    """
+    from services.knowledge_base import search_knowledge_base, get_crisis_resources, format_knowledge_blocks
+
+    pipeline = ChatPipeline(get_stage_budgets(data.get("stageBudgets")))
+    is_crisis = any(keyword in user_input.lower() for keyword in CRISIS_KEYWORDS)
+
+    # Analysis only; the DB save runs in the background (it may wait on the message log flush)
+    pipeline.add(
+        "consciousness",
+        lambda stage: analyze_and_save_state(
+            message_text=user_input,
+            user_id=user_id,
+            thread_id=thread_id,
+            message_id=user_message_id,
+            context="user_message"
+        ),
+        cancel_on_timeout=False,
+    )
+
+    pipeline.add(
+        "history",
+        lambda stage: get_thread_messages_for_context(thread_id, limit=20, exclude_id=user_message_id),
+        default=[],
+    )
+
+    async def memory_stage(stage):
+        query_embedding = await embed_text_ollama(user_input)
+        selected, _, _ = await search_memories(query_embedding, deep_memory=deep_memory, limit=15)
+        return selected
+
+    if use_memory_rag:
+        pipeline.add("memory", memory_stage, default=[])
+    else:
+        pipeline.skip("memory", default=[])
+
+    async def notion_stage(stage):
+        notion_results = await superpowers["Notion Deep Memory"].run("search_notion", query=user_input)
+        if notion_results and "No matching" not in str(notion_results):
+            return f"\n\n## 📚 Notion Deep Memory\n{notion_results}"
+        return ""
+
+    if deep_memory and notion_connected and superpowers and "Notion Deep Memory" in superpowers:
+        pipeline.add("notion", notion_stage, default="")
+    else:
+        pipeline.skip("notion", default="")
+
+    async def knowledge_stage(stage):
+        entries = await search_knowledge_base(query=user_input, limit=3)
+        sources = [
+            {
+                "title": entry.get("title"),
+                "category": entry.get("category"),
+                "similarity": entry.get("similarity", 0),
+                "type": entry.get("content_type")
+            }
+            for entry in entries
+        ]
+        if not entries:
+            return [], []
+        try:
+            # Leave a little room inside the budget for the no-summarization fallback
+            blocks = await asyncio.wait_for(
+                format_knowledge_blocks(entries, max_tokens=1500, use_summarization=True),
+                timeout=max(0.0, stage.remaining() - 0.1),
+            )
+        except asyncio.TimeoutError:
+            stage.mark_partial()
+            blocks = await format_knowledge_blocks(entries, max_tokens=1500, use_summarization=False)
+        return blocks, sources
+
+    crisis_task = None
+    if is_crisis:
+        # Crisis resources are never subject to the context deadline (and never come back empty)
+        print("🚨 CRISIS DETECTED - Fetching crisis resources")
+        crisis_task = asyncio.create_task(get_crisis_resources())
+        pipeline.skip("knowledge", default=([], []))
+    elif data.get("useKnowledgeBase", True):
+        pipeline.add("knowledge", knowledge_stage, default=([], []))
+    else:
+        pipeline.skip("knowledge", default=([], []))
+
+    results = await pipeline.run()
+    knowledge_blocks, kb_sources = results["knowledge"]
+    if crisis_task is not None:
+        entries = await crisis_task
+        try:
+            # Summarize for up to CRISIS_SUMMARY_TIMEOUT; unsummarized blocks otherwise
+            knowledge_blocks = await asyncio.wait_for(
+                format_knowledge_blocks(entries, max_tokens=2000, use_summarization=True),
+                timeout=CRISIS_SUMMARY_TIMEOUT,
+            )
+        except asyncio.TimeoutError:
+            knowledge_blocks = await format_knowledge_blocks(entries, max_tokens=2000, use_summarization=False)
+        kb_sources = [
+            {"title": resource.get("title"), "category": resource.get("category"), "type": "crisis_resource"}
+            for resource in entries
+        ]
+    print(f"⏱️ Chat context stages: {pipeline.report}")
+
+    return {
+        "consciousness_state": results["consciousness"],
+        "history_messages": results["history"] or [],
+        "selected_memories": results["memory"] or [],
+        "notion_block": results["notion"] or "",
+        "knowledge_blocks": knowledge_blocks or [],
+        "kb_sources": kb_sources,
+        "is_crisis": is_crisis,
+        "pipeline": {"stages": pipeline.report, "made_deadline": pipeline.made_deadline()},
+    }
+
+
+def _memory_payload(memories: list) -> list:
+    """Selected memories in the shape the frontend renders"""
+    return [
+        {
+            "id": m.get("id", f"memory-{i}"),
+            "name": m.get("name", "Unknown Memory"),
+            "content": m.get("content", ""),
+            "similarity": m.get("similarity", 0.0),
+            "importance": m.get("importance", 5),
+            "created_at": m.get("created_at", datetime.now().isoformat()),
+            "metadata": m.get("metadata", {}),
+            "is_multi_part": m.get("_is_multi_part", False)
+        }
+        for i, m in enumerate(memories)
+    ]
+
+
+def _pack_chat_context(chat_context: dict, selected_model: str, base_messages: list, limit_scale: float = 1.0) -> dict:
+    """
+    Fit the gathered memories, KB blocks, Notion results and history into the model's
+    prompt budget (services.context_budget). Adds "combined_block" (memories + Notion + KB).
+    """
+    provider, model = resolve_chat_model(selected_model)
+    plan = pack_context(
+        provider,
+        model,
+        base_messages,
+        memories=chat_context["selected_memories"],
+        knowledge_blocks=chat_context["knowledge_blocks"],
+        notion_block=chat_context["notion_block"],
+        history=chat_context["history_messages"],
+        is_crisis=chat_context["is_crisis"],
+        limit_scale=limit_scale,
+    )
+    combined_block = plan["memory_block"] + plan["notion_block"]
+    if plan["knowledge_context"]:
+        combined_block += f"\n\n{plan['knowledge_context']}"
+    plan["combined_block"] = combined_block
+    budget = plan["budget"]
+    print(f"🧮 Context budget ({budget['tokenizer']}): {budget['segments']} → {budget['total']}/{budget['limit']} tokens")
+    return plan
+
+
+ACTIVE_MODEL_NAMES = {
+    "Groq": "llama-3.1-8b-instant",
+    "Groq-LLaMA3-70B": "llama-3.3-70b-versatile",
+    "Claude": "claude-3.5-sonnet-20240620",
+    "GPT-4o": "gpt-4o-2024-11-20",
+}
+
+
+def _publish_runtime(selected_model: str, persona_name: Optional[str]):
+    """Push the active model + persona to GlowState (a no-op when neither changed)."""
+    from glowos.glow_state import glow_state_store
+
+    runtime = {"active_model": ACTIVE_MODEL_NAMES.get(selected_model, selected_model)}
+    if persona_name:
+        runtime["persona"] = persona_name
+    glow_state_store.update(runtime=runtime)
+
+
+async def _route_timed(user_input: str, glow_state) -> dict:
+    with metrics.timer("chat.route"):
+        return await route_message(user_input, glow_state)
+
+
+async def _prefetch_chat_context(thread_id: str, user_input: str, use_memory_rag: bool):
+    """
+    Warm what the chat-path stages read first while routing decides: the thread's
+    history ring buffer and the message embedding. Both services share in-flight
+    work, so the history and memory stages pick these up instead of starting over.
+    """
+    jobs = [thread_cache.get(thread_id, 0)]
+    if use_memory_rag:
+        jobs.append(embed_text_ollama(user_input))
+    await asyncio.gather(*jobs, return_exceptions=True)
+
+
 @router.get("/chat-history/{thread_id}", response_class=JSONResponse)
-async def get_chat_history(thread_id: str):
-    """Get chat history WITHOUT embeddings to reduce token usage"""
+async def get_chat_history(thread_id: str, limit: Optional[int] = None):
+    """Get chat history WITHOUT embeddings to reduce token usage (`limit` = most recent page only)"""
     try:
-        messages = supabase.table("chat_messages")\
-            .select("id, thread_id, role, content, metadata, created_at")\
-            .eq("thread_id", thread_id)\
-            .order("created_at", ascending=True)\
-            .execute()
-        data = getattr(messages, "data", [])
-        return data
+        if thread_cache.covers(thread_id, limit):
+            return await thread_cache.get(thread_id, limit)
+        rows = await db.fetch_thread_messages(thread_id)
+        # Include messages still waiting on the write-behind log
+        seen = {row.get("id") for row in rows}
+        rows += [m for m in message_log.pending_for_thread(thread_id) if m["id"] not in seen]
+        return rows[-limit:] if limit else rows
     except Exception as e:
         print("❌ Failed to fetch chat history:", e)
         return []
@@ -60,11 +292,10 @@ async def get_chat_history(thread_id: str):
 async def get_token_usage(user_id: str):
     """Returns total token usage per model for a given user"""
     try:
-        resp = supabase.table("token_usage")\
-            .select("model_name, tokens_used")\
-            .eq("user_id", user_id)\
-            .execute()
-        return getattr(resp, "data", [])
+        return await db.data(
+            db.table("token_usage").select("model_name, tokens_used").eq("user_id", user_id),
+            "token_usage"
+        )
     except Exception as e:
         return {"error": str(e)}
 
@@ -136,42 +367,41 @@ async def chat_with_assistant(request: Request, background_tasks: BackgroundTask
     if not user_input:
         return JSONResponse(status_code=400, content={"error": "Message is required."})
 
-    if not thread_id:
-        thread_id = await get_or_create_thread(user_id)
+    import time
+    request_start = time.time()
 
-    # Update GlowState with current model immediately
+    # Update GlowState with current model + persona immediately
     from glowos.glow_state import glow_state_store
-    model_map = {
-        "Groq": "llama-3.1-8b-instant",
-        "Groq-LLaMA3-70B": "llama-3.3-70b-versatile",
-        "Claude": "claude-3.5-sonnet-20240620",
-        "GPT-4o": "gpt-4o-2024-11-20",
-    }
-    active_model = model_map.get(selected_model, selected_model)
-    glow_state_store.update(runtime={"active_model": active_model})
+    _publish_runtime(selected_model, data.get("name"))
+
+    # ============================================================
+    # 🚀 ROUTER FIRST - Always-on intent detection
+    # Routing, user-message logging and the chat-context prefetch run concurrently
+    # ============================================================
+    current_state = glow_state_store.get_state()
+    route_task = asyncio.ensure_future(_route_timed(user_input, current_state))
+
+    if not thread_id:
+        try:
+            thread_id = await get_or_create_thread(user_id)
+        except BaseException:
+            route_task.cancel()  # don't leave the router (and any tool it starts) running orphaned
+            raise
 
     # Log user message with model in metadata
-    user_message_result = await log_message_to_db(
+    user_log_task = asyncio.ensure_future(log_message_to_db(
         thread_id, 
         "user", 
         user_input,
         metadata={"model": selected_model, "persona_name": data.get("name")}
-    )
-    user_message_id = None
-    if user_message_result and isinstance(user_message_result, dict):
-        user_message_id = user_message_result.get("id")
-    elif isinstance(user_message_result, list) and len(user_message_result) > 0:
-        user_message_id = user_message_result[0].get("id")
-    
-    # ============================================================
-    # 🚀 ROUTER FIRST - Always-on intent detection
-    # ============================================================
-    import time
-    request_start = time.time()
-    
-    current_state = glow_state_store.get_state()
-    
-    route_result = await route_message(user_input, current_state)
+    ))
+    prefetch_task = asyncio.ensure_future(_prefetch_chat_context(thread_id, user_input, use_memory_rag))
+
+    route_result = await route_task
+    # Queued on the write-behind log, so this only waits for the enqueue (keeps replies ordered after it)
+    user_message_result = await user_log_task
+    user_message_id = user_message_result.get("id") if user_message_result else None
+
     mode = route_result.get("mode", "chat")
     tool_name = route_result.get("tool_name")
     arguments = route_result.get("arguments", {})
@@ -179,6 +409,7 @@ async def chat_with_assistant(request: Request, background_tasks: BackgroundTask
     
     # Handle tool execution
     if mode == "tool" and tool_name and superpower_name:
+        prefetch_task.cancel()
         tool_exec_start = time.time()
         
         # Check for fallback reason (tool not available)
@@ -227,6 +458,7 @@ async def chat_with_assistant(request: Request, background_tasks: BackgroundTask
         
         # Execute tool
         try:
+            metrics.observe("chat.time_to_tool_start", (time.time() - request_start) * 1000)
             result = await execute_tool(tool_name, arguments, superpower_name, current_state)
             tool_exec_time = (time.time() - tool_exec_start) * 1000
             
@@ -346,333 +578,83 @@ async def chat_with_assistant(request: Request, background_tasks: BackgroundTask
     # ============================================================
     chat_path_start = time.time()
     
-    # Token limits per model (Groq limits)
-    GROQ_TOKEN_LIMITS = {
-        "llama-3.1-8b-instant": 8192,
-        "llama-3.3-70b-versatile": 12000,
-    }
-    
-    def estimate_tokens(text: str) -> int:
-        """Rough token estimation: ~4 chars per token"""
-        return len(text) // 4
-    
-    def truncate_memories(memories: list, max_tokens: int) -> tuple:
-        """Truncate memories to fit token budget"""
-        if not memories:
-            return [], ""
-        
-        memory_strings = []
-        total_tokens = 0
-        
-        for m in memories:
-            memory_text = f"• ({round(m.get('similarity', 0.0) or 0.0, 3)}) {m.get('name', 'Memory')}: {m.get('content', '')}"
-            mem_tokens = estimate_tokens(memory_text)
-            
-            if total_tokens + mem_tokens > max_tokens:
-                # Truncate this memory to fit
-                remaining = max_tokens - total_tokens - 50  # Reserve for header
-                if remaining > 100:
-                    content = m.get('content', '')
-                    truncated_content = content[:remaining * 4] + "..."
-                    memory_text = f"• ({round(m.get('similarity', 0.0) or 0.0, 3)}) {m.get('name', 'Memory')}: {truncated_content}"
-                    memory_strings.append(memory_text)
-                break
-            
-            memory_strings.append(memory_text)
-            total_tokens += mem_tokens
-        
-        memory_block = f"## 🧠 Relevant Memories\n" + "\n".join(memory_strings) if memory_strings else ""
-        return memories[:len(memory_strings)], memory_block
-    
-    def truncate_history(history: list, max_tokens: int) -> list:
-        """Truncate conversation history to fit token budget"""
-        if not history:
-            return []
-        
-        total_tokens = 0
-        truncated_history = []
-        
-        # Process in reverse (most recent first)
-        for msg in reversed(history):
-            content = msg.get('content', '')
-            msg_tokens = estimate_tokens(content) + 10  # +10 for role/metadata overhead
-            
-            if total_tokens + msg_tokens > max_tokens:
-                # Truncate this message
-                remaining = max_tokens - total_tokens - 20
-                if remaining > 50:
-                    truncated_content = content[:remaining * 4] + "..."
-                    truncated_msg = {**msg, 'content': truncated_content}
-                    truncated_history.insert(0, truncated_msg)
-                break
-            
-            truncated_history.insert(0, msg)
-            total_tokens += msg_tokens
-        
-        return truncated_history
-    
-    # Analyze consciousness state (background)
-    try:
-        consciousness_state = await analyze_and_save_state(
-            message_text=user_input,
-            user_id=user_id,
-            thread_id=thread_id,
-            message_id=user_message_id,
-            context="user_message"
-        )
-    except Exception as e:
-        consciousness_state = None
-    
-    # Fetch chat history (will be truncated later if needed)
-    history_messages = await get_thread_messages_for_context(thread_id, limit=20)
-    
-    # Memory Retrieval (RAG) - only for chat
-    memory_block = ""
-    selected_memories = []
-    
-    if use_memory_rag:
-        query_embedding = await embed_text_ollama(user_input)
-        match_count = 200 if not deep_memory else 60
-        
-        memory_resp = supabase.rpc(
-            "match_memories",
-            {"query_embedding": query_embedding, "match_count": match_count}
-        ).execute()
-
-        all_memories = getattr(memory_resp, "data", []) or []
-        selected_memories, total_candidates, usable_candidates = select_memories_for_context(
-            all_memories,
-            deep_memory=deep_memory,
-            limit=15
-        )
-    
-    # Determine token budget based on model
-    GROQ_MODEL_MAP = {
-        "Groq": "llama-3.1-8b-instant",
-        "Groq-LLaMA3-70B": "llama-3.3-70b-versatile",
-    }
-    model_name = GROQ_MODEL_MAP.get(selected_model, "llama-3.1-8b-instant")
-    token_limit = GROQ_TOKEN_LIMITS.get(model_name, 8000)
-    reserved_tokens = 2000
-    available_tokens = token_limit - reserved_tokens
-    
-    memory_data = []
-    if selected_memories:
-        # Allocate tokens: 40% memories, 30% KB, 30% history
-        memory_budget = int(available_tokens * 0.4)
-        selected_memories, memory_block = truncate_memories(selected_memories, memory_budget)
-        
-        memory_data = [
-            {
-                "id": m.get("id", f"memory-{i}"),
-                "name": m.get("name", "Unknown Memory"),
-                "content": m.get("content", ""),
-                "similarity": m.get("similarity", 0.0),
-                "importance": m.get("importance", 5),
-                "created_at": m.get("created_at", datetime.now().isoformat()),
-                "metadata": m.get("metadata", {}),
-                "is_multi_part": m.get("_is_multi_part", False)
-            }
-            for i, m in enumerate(selected_memories)
-        ]
-
-    # Deep Memory - Notion Search (if enabled)
-    notion_connected = data.get("notionConnected", False)
-    if deep_memory and notion_connected:
-        from services.superpower_loader import SUPERPOWERS
-        if SUPERPOWERS and "Notion Deep Memory" in SUPERPOWERS:
-            try:
-                notion_power = SUPERPOWERS["Notion Deep Memory"]
-                notion_results = await notion_power.run("search_notion", query=user_input)
-                if notion_results and "No matching" not in str(notion_results):
-                    memory_block += f"\n\n## 📚 Notion Deep Memory\n{notion_results}"
-            except Exception:
-                pass
-    # ============================================================
-    # KNOWLEDGE BASE INTEGRATION - Runs alongside memory
-    # ============================================================
-    knowledge_context = ""
-    kb_sources = []
-    use_kb = data.get("useKnowledgeBase", True)
-    
-    # Check for crisis keywords
-    crisis_keywords = [
-        'suicide', 'kill myself', 'end it all', 'self-harm', 'want to die',
-        'hurt myself', 'end my life', 'no reason to live', 'better off dead'
-    ]
-    is_crisis = any(keyword in user_input.lower() for keyword in crisis_keywords)
-    
-    if is_crisis:
-        print("🚨 CRISIS DETECTED - Fetching crisis resources")
-        from services.knowledge_base import get_crisis_resources, format_knowledge_for_context
-        crisis_resources = await get_crisis_resources()
-        # Crisis resources are critical - use more tokens but still summarize intelligently
-        knowledge_context = await format_knowledge_for_context(
-            crisis_resources, 
-            max_tokens=2000,
-            use_summarization=True
-        )
-        kb_sources = [
-            {
-                "title": resource.get("title"),
-                "category": resource.get("category"),
-                "type": "crisis_resource"
-            }
-            for resource in crisis_resources
-        ]
-    elif use_kb:
-        from services.knowledge_base import search_knowledge_base, format_knowledge_for_context
-        knowledge_entries = await search_knowledge_base(query=user_input, limit=3)
-        
-        if knowledge_entries:
-            knowledge_context = await format_knowledge_for_context(
-                knowledge_entries, 
-                max_tokens=1500,
-                use_summarization=True
-            )
-            kb_sources = [
-                {
-                    "title": entry.get("title"),
-                    "category": entry.get("category"),
-                    "similarity": entry.get("similarity", 0),
-                    "type": entry.get("content_type")
-                }
-                for entry in knowledge_entries
-            ]
+    # Consciousness, history, memory, Notion and KB run concurrently with per-stage budgets
+    from services.superpower_loader import SUPERPOWERS as LOADED_SUPERPOWERS
+    chat_context = await _gather_chat_context(
+        data,
+        user_input=user_input,
+        user_id=user_id,
+        thread_id=thread_id,
+        user_message_id=user_message_id,
+        deep_memory=deep_memory,
+        use_memory_rag=use_memory_rag,
+        notion_connected=data.get("notionConnected", False),
+        superpowers=LOADED_SUPERPOWERS,
+    )
+    consciousness_state = chat_context["consciousness_state"]
+    kb_sources = chat_context["kb_sources"]
+    is_crisis = chat_context["is_crisis"]
     # ============================================================
     # 5. Default LLM Response
     # ============================================================
     try:
-        # Combine memory + knowledge base into one block
-        combined_block = memory_block
-        kb_budget = int(available_tokens * 0.3)
-        
-        if knowledge_context:
-            kb_tokens = estimate_tokens(knowledge_context)
-            if kb_tokens > kb_budget:
-                kb_chars = kb_budget * 4
-                knowledge_context = knowledge_context[:kb_chars] + "\n[... knowledge base truncated ...]"
-            combined_block += f"\n\n{knowledge_context}"
-        
-        # Truncate history if needed
-        history_budget = int(available_tokens * 0.3)
-        history_tokens = sum(estimate_tokens(msg.get('content', '')) for msg in history_messages)
-        if history_tokens > history_budget:
-            history_messages = truncate_history(history_messages, history_budget)
-        
-        # Estimate total tokens and truncate if needed
-        system_est = estimate_tokens(system_prompt)
-        combined_est = estimate_tokens(combined_block)
-        history_est = sum(estimate_tokens(msg.get('content', '')) for msg in history_messages)
-        user_est = estimate_tokens(user_input)
-        total_est = system_est + combined_est + history_est + user_est + 500
-        
-        if total_est > token_limit:
-            remaining = token_limit - system_est - combined_est - user_est - 1000
-            if remaining > 500:
-                history_messages = truncate_history(history_messages, remaining)
-        
-        # Add crisis handling to system prompt if needed
-        crisis_instructions = ""
-        if is_crisis:
-            crisis_instructions = """
-    🚨 CRITICAL - CRISIS RESPONSE PROTOCOL:
-    The user may be in crisis. You MUST:
-    1. Immediately acknowledge their pain with compassion
-    2. Provide crisis resources PROMINENTLY (988, Crisis Text Line, 911)
-    3. Encourage professional help NOW
-    4. Stay supportive and validating
-    5. Do NOT attempt therapy - connect them to professionals
-    """
-
         # Get current GlowState
         from glowos.glow_state import glow_state_store
         current_state = glow_state_store.get_state()
         glow_state_dict = current_state.dict()  # Convert Pydantic model to dict
 
-        # Build messages using persona fields + knowledge base
-        messages = build_persona_prompt(
-            system_prompt + crisis_instructions if is_crisis else system_prompt,
-            session_priming,
-            tone_rules,
-            chat_style,
-            mirroring_method,
-            style_guide,
-            values_and_philosophy,
-            combined_block,
-            history_messages,
-            user_input,
-            glow_state=glow_state_dict
-        )
+        def build_messages(context_block: str, history: list) -> list:
+            # Build messages using persona fields + knowledge base
+            return build_persona_prompt(
+                system_prompt + CRISIS_INSTRUCTIONS if is_crisis else system_prompt,
+                session_priming,
+                tone_rules,
+                chat_style,
+                mirroring_method,
+                style_guide,
+                values_and_philosophy,
+                context_block,
+                history,
+                user_input,
+                glow_state=glow_state_dict
+            )
+
+        # Pack memories + KB + Notion + history into the model's token budget in one pass
+        plan = _pack_chat_context(chat_context, selected_model, build_messages("", []))
+        memory_data = _memory_payload(plan["memories"])
+        messages = build_messages(plan["combined_block"], plan["history"])
 
         # Claude
         if selected_model == "Claude":
-            response = claude.messages.create(
-                model="claude-3.5-sonnet-20240620",
+            reply = await complete_chat(
+                "claude",
+                "claude-3.5-sonnet-20240620",
+                messages,
                 max_tokens=1024,
-                temperature=0.7,
-                messages=messages
+                temperature=0.7
             )
-            reply = response.content[0].text.strip()
 
         # OpenAI GPT-4o
         elif selected_model == "GPT-4o":
-            response = openai_client.chat.completions.create(
-                model="gpt-4o-2024-11-20",
-                messages=messages,
-                temperature=chat_style.get("temperature", 0.7),
-                top_p=chat_style.get("top_p", 1.0),
-                presence_penalty=chat_style.get("presence_penalty", 0.0),
-                frequency_penalty=chat_style.get("frequency_penalty", 0.0)
-            )
-            reply = response.choices[0].message.content.strip()
+            reply = await complete_chat("openai", "gpt-4o-2024-11-20", messages, **sampling_params(chat_style))
 
         # Groq models (fallback)
         else:
-            model_name = GROQ_MODEL_MAP.get(selected_model, "llama-3.1-8b-instant")
+            _, model_name = resolve_chat_model(selected_model)
 
             try:
-                response = client.chat.completions.create(
-                    model=model_name,
-                    messages=messages,
-                    temperature=chat_style.get("temperature", 0.7),
-                    top_p=chat_style.get("top_p", 1.0),
-                    presence_penalty=chat_style.get("presence_penalty", 0.0),
-                    frequency_penalty=chat_style.get("frequency_penalty", 0.0)
-                )
-                reply = response.choices[0].message.content.strip()
+                reply = await complete_chat("groq", model_name, messages, **sampling_params(chat_style))
             except Exception as groq_error:
                 error_str = str(groq_error)
                 if "413" in error_str or "token" in error_str.lower() or "TPM" in error_str:
                     print(f"⚠️  Token limit error, retrying with reduced context...")
-                    # Aggressively reduce context and retry once
-                    history_messages = truncate_history(history_messages, 1000)
-                    combined_block = memory_block[:500] if memory_block else ""
-                    
-                    messages = build_persona_prompt(
-                        system_prompt + crisis_instructions if is_crisis else system_prompt,
-                        session_priming,
-                        tone_rules,
-                        chat_style,
-                        mirroring_method,
-                        style_guide,
-                        values_and_philosophy,
-                        combined_block,
-                        history_messages,
-                        user_input,
-                        glow_state=glow_state_dict
-                    )
+                    # Repack into half the budget and retry once
+                    plan = _pack_chat_context(chat_context, selected_model, build_messages("", []), limit_scale=0.5)
+                    memory_data = _memory_payload(plan["memories"])
+                    messages = build_messages(plan["combined_block"], plan["history"])
                     
                     try:
-                        response = client.chat.completions.create(
-                            model=model_name,
-                            messages=messages,
-                            temperature=chat_style.get("temperature", 0.7),
-                            top_p=chat_style.get("top_p", 1.0),
-                            presence_penalty=chat_style.get("presence_penalty", 0.0),
-                            frequency_penalty=chat_style.get("frequency_penalty", 0.0)
-                        )
-                        reply = response.choices[0].message.content.strip()
+                        reply = await complete_chat("groq", model_name, messages, **sampling_params(chat_style))
                         print(f"✅ Retry successful with reduced context")
                     except Exception as retry_error:
                         raise Exception(f"Token limit exceeded even after reduction. Please use a smaller model or reduce context. Original: {error_str}")
@@ -685,13 +667,7 @@ async def chat_with_assistant(request: Request, background_tasks: BackgroundTask
             reply,
             metadata={"model": selected_model}
         )
-        assistant_message_id = None
-        if assistant_message_result:
-            try:
-                if hasattr(assistant_message_result, 'data') and assistant_message_result.data:
-                    assistant_message_id = assistant_message_result.data[0].get("id") if isinstance(assistant_message_result.data, list) else assistant_message_result.data.get("id")
-            except:
-                pass
+        assistant_message_id = assistant_message_result.get("id") if assistant_message_result else None
 
         # Return response with memories AND knowledge base sources
         chat_path_time = (time.time() - chat_path_start) * 1000
@@ -705,6 +681,8 @@ async def chat_with_assistant(request: Request, background_tasks: BackgroundTask
             "kb_count": len(kb_sources),
             "is_crisis": is_crisis,
             "consciousness_state": consciousness_state if 'consciousness_state' in locals() else None,
+            "pipeline": chat_context["pipeline"],
+            "context_budget": plan["budget"],
             "token_usage": {
                 "prompt_tokens": prompt_tokens if 'prompt_tokens' in locals() else 0,
                 "completion_tokens": completion_tokens if 'completion_tokens' in locals() else 0,
@@ -747,21 +725,9 @@ async def generate_chat_title(request: Request):
 
     try:
         if openai_client:
-            response = openai_client.chat.completions.create(
-                model="gpt-4o-mini",
-                messages=messages,
-                temperature=0.2,
-                max_tokens=32,
-            )
-            title = response.choices[0].message.content.strip()
+            title = await complete_chat("openai", "gpt-4o-mini", messages, temperature=0.2, max_tokens=32)
         else:
-            response = client.chat.completions.create(
-                model="llama-3.1-8b-instant",
-                messages=messages,
-                temperature=0.2,
-                max_tokens=32,
-            )
-            title = response.choices[0].message.content.strip()
+            title = await complete_chat("groq", "llama-3.1-8b-instant", messages, temperature=0.2, max_tokens=32)
     except Exception as error:
         print(f"❌ Failed to generate chat title: {error}")
         return JSONResponse(
@@ -804,38 +770,39 @@ async def chat_with_assistant_stream(data: dict, client_id: str):
             await websocket_manager.send_chat_chunk(client_id, "❌ Error: Message is required.", True)
             return
         
-        if not thread_id:
-            thread_id = await get_or_create_thread(user_id)
+        import time
+        request_start = time.time()
         
         # Update GlowState
         from glowos.glow_state import glow_state_store
-        model_map = {
-            "Groq": "llama-3.1-8b-instant",
-            "Groq-LLaMA3-70B": "llama-3.3-70b-versatile",
-            "Claude": "claude-3.5-sonnet-20240620",
-            "GPT-4o": "gpt-4o-2024-11-20",
-        }
-        active_model = model_map.get(selected_model, selected_model)
-        glow_state_store.update(runtime={"active_model": active_model})
-        
-        # Log user message
-        user_message_result = await log_message_to_db(
-            thread_id, "user", user_input,
-            metadata={"model": selected_model, "persona_name": data.get("name")}
-        )
-        user_message_id = None
-        if user_message_result and isinstance(user_message_result, dict):
-            user_message_id = user_message_result.get("id")
-        elif isinstance(user_message_result, list) and len(user_message_result) > 0:
-            user_message_id = user_message_result[0].get("id")
+        _publish_runtime(selected_model, data.get("name"))
         
         # ============================================================
         # 2. ROUTER - Intent detection & tool execution
+        # Routing, user-message logging and the chat-context prefetch run concurrently
         # ============================================================
-        import time
-        request_start = time.time()
         current_state = glow_state_store.get_state()
-        route_result = await route_message(user_input, current_state)
+        route_task = asyncio.ensure_future(_route_timed(user_input, current_state))
+        
+        if not thread_id:
+            try:
+                thread_id = await get_or_create_thread(user_id)
+            except BaseException:
+                route_task.cancel()  # don't leave the router (and any tool it starts) running orphaned
+                raise
+        
+        # Log user message
+        user_log_task = asyncio.ensure_future(log_message_to_db(
+            thread_id, "user", user_input,
+            metadata={"model": selected_model, "persona_name": data.get("name")}
+        ))
+        prefetch_task = asyncio.ensure_future(_prefetch_chat_context(thread_id, user_input, use_memory_rag))
+        
+        route_result = await route_task
+        # Queued on the write-behind log, so this only waits for the enqueue (keeps replies ordered after it)
+        user_message_result = await user_log_task
+        user_message_id = user_message_result.get("id") if user_message_result else None
+        
         mode = route_result.get("mode", "chat")
         tool_name = route_result.get("tool_name")
         arguments = route_result.get("arguments", {})
@@ -843,6 +810,7 @@ async def chat_with_assistant_stream(data: dict, client_id: str):
         
         # Handle tool execution (send complete response, no streaming)
         if mode == "tool" and tool_name and superpower_name:
+            prefetch_task.cancel()
             if route_result.get("fallback_reason"):
                 response_text = route_result["fallback_reason"]
                 await log_message_to_db(thread_id, "assistant", response_text)
@@ -901,6 +869,7 @@ async def chat_with_assistant_stream(data: dict, client_id: str):
                     arguments["details"] = f"{pattern_match.group(1)} - {pattern_match.group(2)}"
             
             try:
+                metrics.observe("chat.time_to_tool_start", (time.time() - request_start) * 1000)
                 result = await execute_tool(tool_name, arguments, superpower_name, current_state)
                 if isinstance(result, dict) and result.get("type") == "plex_video":
                     response_text = result.get("message", "Video ready to play")
@@ -1022,291 +991,91 @@ async def chat_with_assistant_stream(data: dict, client_id: str):
         # ============================================================
         # 3. CHAT PATH - Full logic with memory, KB, etc.
         # ============================================================
-        GROQ_TOKEN_LIMITS = {
-            "llama-3.1-8b-instant": 8192,
-            "llama-3.3-70b-versatile": 12000,
-        }
-        
-        def estimate_tokens(text: str) -> int:
-            return len(text) // 4
-        
-        def truncate_memories(memories: list, max_tokens: int) -> tuple:
-            if not memories:
-                return [], ""
-            memory_strings = []
-            total_tokens = 0
-            for m in memories:
-                memory_text = f"• ({round(m.get('similarity', 0.0) or 0.0, 3)}) {m.get('name', 'Memory')}: {m.get('content', '')}"
-                mem_tokens = estimate_tokens(memory_text)
-                if total_tokens + mem_tokens > max_tokens:
-                    remaining = max_tokens - total_tokens - 50
-                    if remaining > 100:
-                        content = m.get('content', '')
-                        truncated_content = content[:remaining * 4] + "..."
-                        memory_text = f"• ({round(m.get('similarity', 0.0) or 0.0, 3)}) {m.get('name', 'Memory')}: {truncated_content}"
-                        memory_strings.append(memory_text)
-                    break
-                memory_strings.append(memory_text)
-                total_tokens += mem_tokens
-            memory_block = f"## 🧠 Relevant Memories\n" + "\n".join(memory_strings) if memory_strings else ""
-            return memories[:len(memory_strings)], memory_block
-        
-        def truncate_history(history: list, max_tokens: int) -> list:
-            if not history:
-                return []
-            total_tokens = 0
-            truncated_history = []
-            for msg in reversed(history):
-                content = msg.get('content', '')
-                msg_tokens = estimate_tokens(content) + 10
-                if total_tokens + msg_tokens > max_tokens:
-                    remaining = max_tokens - total_tokens - 20
-                    if remaining > 50:
-                        truncated_content = content[:remaining * 4] + "..."
-                        truncated_msg = {**msg, 'content': truncated_content}
-                        truncated_history.insert(0, truncated_msg)
-                    break
-                truncated_history.insert(0, msg)
-                total_tokens += msg_tokens
-            return truncated_history
-        
-        # Analyze consciousness state
-        try:
-            consciousness_state = await analyze_and_save_state(
-                message_text=user_input,
-                user_id=user_id,
-                thread_id=thread_id,
-                message_id=user_message_id,
-                context="user_message"
-            )
-        except Exception:
-            consciousness_state = None
-        
-        # Fetch chat history
-        history_messages = await get_thread_messages_for_context(thread_id, limit=20)
-        
-        # Memory Retrieval (RAG)
-        memory_block = ""
-        selected_memories = []
-        if use_memory_rag:
-            query_embedding = await embed_text_ollama(user_input)
-            match_count = 200 if not deep_memory else 60
-            memory_resp = supabase.rpc(
-                "match_memories",
-                {"query_embedding": query_embedding, "match_count": match_count}
-            ).execute()
-            all_memories = getattr(memory_resp, "data", []) or []
-            selected_memories, total_candidates, usable_candidates = select_memories_for_context(
-                all_memories, deep_memory=deep_memory, limit=15
-            )
-        
-        GROQ_MODEL_MAP = {
-            "Groq": "llama-3.1-8b-instant",
-            "Groq-LLaMA3-70B": "llama-3.3-70b-versatile",
-        }
-        model_name = GROQ_MODEL_MAP.get(selected_model, "llama-3.1-8b-instant")
-        token_limit = GROQ_TOKEN_LIMITS.get(model_name, 8000)
-        reserved_tokens = 2000
-        available_tokens = token_limit - reserved_tokens
-        
-        memory_data = []
-        if selected_memories:
-            memory_budget = int(available_tokens * 0.4)
-            selected_memories, memory_block = truncate_memories(selected_memories, memory_budget)
-            memory_data = [
-                {
-                    "id": m.get("id", f"memory-{i}"),
-                    "name": m.get("name", "Unknown Memory"),
-                    "content": m.get("content", ""),
-                    "similarity": m.get("similarity", 0.0),
-                    "importance": m.get("importance", 5),
-                    "created_at": m.get("created_at", datetime.now().isoformat()),
-                    "metadata": m.get("metadata", {}),
-                    "is_multi_part": m.get("_is_multi_part", False)
-                }
-                for i, m in enumerate(selected_memories)
-            ]
-        
-        # Deep Memory - Notion Search
-        if deep_memory and notion_connected:
-            if SUPERPOWERS and "Notion Deep Memory" in SUPERPOWERS:
-                try:
-                    notion_power = SUPERPOWERS["Notion Deep Memory"]
-                    notion_results = await notion_power.run("search_notion", query=user_input)
-                    if notion_results and "No matching" not in str(notion_results):
-                        memory_block += f"\n\n## 📚 Notion Deep Memory\n{notion_results}"
-                except Exception:
-                    pass
-        
-        # Knowledge Base Integration
-        knowledge_context = ""
-        kb_sources = []
-        use_kb = data.get("useKnowledgeBase", True)
-        crisis_keywords = [
-            'suicide', 'kill myself', 'end it all', 'self-harm', 'want to die',
-            'hurt myself', 'end my life', 'no reason to live', 'better off dead'
-        ]
-        is_crisis = any(keyword in user_input.lower() for keyword in crisis_keywords)
-        
-        if is_crisis:
-            from services.knowledge_base import get_crisis_resources, format_knowledge_for_context
-            crisis_resources = await get_crisis_resources()
-            knowledge_context = await format_knowledge_for_context(
-                crisis_resources, max_tokens=2000, use_summarization=True
-            )
-            kb_sources = [
-                {"title": resource.get("title"), "category": resource.get("category"), "type": "crisis_resource"}
-                for resource in crisis_resources
-            ]
-        elif use_kb:
-            from services.knowledge_base import search_knowledge_base, format_knowledge_for_context
-            knowledge_entries = await search_knowledge_base(query=user_input, limit=3)
-            if knowledge_entries:
-                knowledge_context = await format_knowledge_for_context(
-                    knowledge_entries, max_tokens=1500, use_summarization=True
-                )
-                kb_sources = [
-                    {
-                        "title": entry.get("title"),
-                        "category": entry.get("category"),
-                        "similarity": entry.get("similarity", 0),
-                        "type": entry.get("content_type")
-                    }
-                    for entry in knowledge_entries
-                ]
-        
-        # Combine memory + knowledge base
-        combined_block = memory_block
-        kb_budget = int(available_tokens * 0.3)
-        if knowledge_context:
-            kb_tokens = estimate_tokens(knowledge_context)
-            if kb_tokens > kb_budget:
-                kb_chars = kb_budget * 4
-                knowledge_context = knowledge_context[:kb_chars] + "\n[... knowledge base truncated ...]"
-            combined_block += f"\n\n{knowledge_context}"
-        
-        # Truncate history
-        history_budget = int(available_tokens * 0.3)
-        history_tokens = sum(estimate_tokens(msg.get('content', '')) for msg in history_messages)
-        if history_tokens > history_budget:
-            history_messages = truncate_history(history_messages, history_budget)
-        
-        # Crisis instructions
-        crisis_instructions = ""
-        if is_crisis:
-            crisis_instructions = """
-    🚨 CRITICAL - CRISIS RESPONSE PROTOCOL:
-    The user may be in crisis. You MUST:
-    1. Immediately acknowledge their pain with compassion
-    2. Provide crisis resources PROMINENTLY (988, Crisis Text Line, 911)
-    3. Encourage professional help NOW
-    4. Stay supportive and validating
-    5. Do NOT attempt therapy - connect them to professionals
-    """
+        # Consciousness, history, memory, Notion and KB run concurrently with per-stage budgets
+        chat_context = await _gather_chat_context(
+            data,
+            user_input=user_input,
+            user_id=user_id,
+            thread_id=thread_id,
+            user_message_id=user_message_id,
+            deep_memory=deep_memory,
+            use_memory_rag=use_memory_rag,
+            notion_connected=notion_connected,
+            superpowers=SUPERPOWERS,
+        )
+        consciousness_state = chat_context["consciousness_state"]
+        kb_sources = chat_context["kb_sources"]
+        is_crisis = chat_context["is_crisis"]
         
         # Build messages
         system_prompt = data.get("system_prompt", "You are a helpful assistant.")
+        chat_style = data.get("chat_style", {}) or {}
         current_state = glow_state_store.get_state()
         glow_state_dict = current_state.dict()
-        messages = build_persona_prompt(
-            system_prompt + crisis_instructions if is_crisis else system_prompt,
-            data.get("session_priming", ""),
-            data.get("tone_rules", ""),
-            data.get("chat_style", {}) or {},
-            data.get("mirroring_method", ""),
-            data.get("style_guide", ""),
-            data.get("guiding_principles", ""),
-            combined_block,
-            history_messages,
-            user_input,
-            glow_state=glow_state_dict
-        )
+        
+        def build_messages(context_block: str, history: list) -> list:
+            return build_persona_prompt(
+                system_prompt + CRISIS_INSTRUCTIONS if is_crisis else system_prompt,
+                data.get("session_priming", ""),
+                data.get("tone_rules", ""),
+                chat_style,
+                data.get("mirroring_method", ""),
+                data.get("style_guide", ""),
+                data.get("guiding_principles", ""),
+                context_block,
+                history,
+                user_input,
+                glow_state=glow_state_dict
+            )
+        
+        # Pack memories + KB + Notion + history into the model's token budget in one pass
+        plan = _pack_chat_context(chat_context, selected_model, build_messages("", []))
+        memory_data = _memory_payload(plan["memories"])
+        messages = build_messages(plan["combined_block"], plan["history"])
         
         # Stream response based on model
         full_reply = ""
-        chat_style = data.get("chat_style", {}) or {}
         
         if selected_model == "Claude":
-            with claude.messages.stream(
-                model="claude-3.5-sonnet-20240620",
+            async with stream_chat(
+                "claude",
+                "claude-3.5-sonnet-20240620",
+                messages,
                 max_tokens=1024,
-                temperature=0.7,
-                messages=messages
+                temperature=0.7
             ) as stream:
-                for text in stream.text_stream:
+                async for text in stream:
                     if is_cancelled():
                         return
                     full_reply += text
                     await websocket_manager.send_chat_chunk(client_id, text, False)
         elif selected_model == "GPT-4o":
-            response = openai_client.chat.completions.create(
-                model="gpt-4o-2024-11-20",
-                messages=messages,
-                stream=True,
-                temperature=chat_style.get("temperature", 0.7),
-                top_p=chat_style.get("top_p", 1.0),
-                presence_penalty=chat_style.get("presence_penalty", 0.0),
-                frequency_penalty=chat_style.get("frequency_penalty", 0.0)
-            )
-            for chunk in response:
-                if is_cancelled():
-                    return
-                if chunk.choices[0].delta.content:
-                    content = chunk.choices[0].delta.content
+            async with stream_chat("openai", "gpt-4o-2024-11-20", messages, **sampling_params(chat_style)) as stream:
+                async for content in stream:
+                    if is_cancelled():
+                        return
                     full_reply += content
                     await websocket_manager.send_chat_chunk(client_id, content, False)
         else:
-            model_name = GROQ_MODEL_MAP.get(selected_model, "llama-3.1-8b-instant")
+            _, model_name = resolve_chat_model(selected_model)
             try:
-                response = client.chat.completions.create(
-                    model=model_name,
-                    messages=messages,
-                    stream=True,
-                    temperature=chat_style.get("temperature", 0.7),
-                    top_p=chat_style.get("top_p", 1.0),
-                    presence_penalty=chat_style.get("presence_penalty", 0.0),
-                    frequency_penalty=chat_style.get("frequency_penalty", 0.0)
-                )
-                for chunk in response:
-                    if is_cancelled():
-                        return
-                    if chunk.choices[0].delta.content:
-                        content = chunk.choices[0].delta.content
+                async with stream_chat("groq", model_name, messages, **sampling_params(chat_style)) as stream:
+                    async for content in stream:
+                        if is_cancelled():
+                            return
                         full_reply += content
                         await websocket_manager.send_chat_chunk(client_id, content, False)
             except Exception as groq_error:
                 error_str = str(groq_error)
                 if "413" in error_str or "token" in error_str.lower() or "TPM" in error_str:
-                    # Retry with reduced context
-                    history_messages = truncate_history(history_messages, 1000)
-                    combined_block = memory_block[:500] if memory_block else ""
-                    messages = build_persona_prompt(
-                        system_prompt + crisis_instructions if is_crisis else system_prompt,
-                        data.get("session_priming", ""),
-                        data.get("tone_rules", ""),
-                        chat_style,
-                        data.get("mirroring_method", ""),
-                        data.get("style_guide", ""),
-                        data.get("guiding_principles", ""),
-                        combined_block,
-                        history_messages,
-                        user_input,
-                        glow_state=glow_state_dict
-                    )
-                    response = client.chat.completions.create(
-                        model=model_name,
-                        messages=messages,
-                        stream=True,
-                        temperature=chat_style.get("temperature", 0.7),
-                        top_p=chat_style.get("top_p", 1.0),
-                        presence_penalty=chat_style.get("presence_penalty", 0.0),
-                        frequency_penalty=chat_style.get("frequency_penalty", 0.0)
-                    )
-                    for chunk in response:
-                        if is_cancelled():
-                            return
-                        if chunk.choices[0].delta.content:
-                            content = chunk.choices[0].delta.content
+                    # Repack into half the budget and retry
+                    plan = _pack_chat_context(chat_context, selected_model, build_messages("", []), limit_scale=0.5)
+                    memory_data = _memory_payload(plan["memories"])
+                    messages = build_messages(plan["combined_block"], plan["history"])
+                    async with stream_chat("groq", model_name, messages, **sampling_params(chat_style)) as stream:
+                        async for content in stream:
+                            if is_cancelled():
+                                return
                             full_reply += content
                             await websocket_manager.send_chat_chunk(client_id, content, False)
         
@@ -1324,7 +1093,9 @@ async def chat_with_assistant_stream(data: dict, client_id: str):
             "knowledge_base": kb_sources,
             "kb_count": len(kb_sources),
             "is_crisis": is_crisis,
-            "consciousness_state": consciousness_state if consciousness_state else None
+            "consciousness_state": consciousness_state if consciousness_state else None,
+            "pipeline": chat_context["pipeline"],
+            "context_budget": plan["budget"]
         })
         
         # Send final chunk with done flag (if not cancelled)
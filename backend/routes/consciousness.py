@@ -10,7 +10,7 @@ from typing import Optional, List, Dict
 from pydantic import BaseModel
 
 from services.consciousness_tracker import analyze_and_save_state, analyze_consciousness_state
-from config.env import supabase
+from services.db import db
 
 router = APIRouter(prefix="/api/consciousness", tags=["consciousness"])
 
@@ -94,7 +94,7 @@ async def get_user_states(
     Get consciousness states for a user
     """
     try:
-        query = supabase.table("consciousness_states")\
+        query = db.table("consciousness_states")\
             .select("*")\
             .eq("user_id", user_id)\
             .order("timestamp", desc=True)\
@@ -106,8 +106,7 @@ async def get_user_states(
         if state_type and state_type in ['chaos', 'glow', 'neutral']:
             query = query.eq("state_type", state_type)
         
-        result = query.execute()
-        states = getattr(result, "data", [])
+        states = await db.data(query, "consciousness_states")
         
         return JSONResponse(content={
             "success": True,
@@ -134,15 +133,16 @@ async def get_statistics(
         start_time = (datetime.now() - timedelta(days=days)).isoformat()
         
         # Use the SQL function we created
-        result = supabase.rpc(
-            "get_consciousness_statistics",
-            {
-                "p_user_id": user_id,
-                "p_start_time": start_time
-            }
-        ).execute()
-        
-        stats = getattr(result, "data", [])
+        stats = await db.data(
+            db.rpc(
+                "get_consciousness_statistics",
+                {
+                    "p_user_id": user_id,
+                    "p_start_time": start_time
+                }
+            ),
+            "consciousness_statistics"
+        )
         
         if stats and len(stats) > 0:
             return JSONResponse(content={
@@ -177,14 +177,14 @@ async def get_current_state(user_id: str):
     Get the most recent consciousness state for a user
     """
     try:
-        result = supabase.table("consciousness_states")\
-            .select("*")\
-            .eq("user_id", user_id)\
-            .order("timestamp", desc=True)\
-            .limit(1)\
-            .execute()
-        
-        states = getattr(result, "data", [])
+        states = await db.data(
+            db.table("consciousness_states")
+            .select("*")
+            .eq("user_id", user_id)
+            .order("timestamp", desc=True)
+            .limit(1),
+            "consciousness_current"
+        )
         
         if states and len(states) > 0:
             return JSONResponse(content={
@@ -219,14 +219,14 @@ async def get_timeline(
         start_time = (datetime.now() - timedelta(days=days)).isoformat()
         
         # Get all states in the time range
-        result = supabase.table("consciousness_states")\
-            .select("*")\
-            .eq("user_id", user_id)\
-            .gte("timestamp", start_time)\
-            .order("timestamp", desc=False)\
-            .execute()
-        
-        states = getattr(result, "data", [])
+        states = await db.data(
+            db.table("consciousness_states")
+            .select("*")
+            .eq("user_id", user_id)
+            .gte("timestamp", start_time)
+            .order("timestamp", desc=False),
+            "consciousness_timeline"
+        )
         
         # Group by interval
         timeline_data = []
@@ -3,13 +3,14 @@
 """
 from __future__ import annotations
 
+import asyncio
 from datetime import datetime
 from decimal import Decimal, ROUND_HALF_UP
 from typing import Dict, List, Optional
 
 from fastapi import APIRouter, HTTPException, Query, Body
 
-from config import supabase
+from services.db import db
 
 router = APIRouter(prefix="/api/finance", tags=["finance"])
 
@@ -135,7 +136,7 @@ def _build_ai_insights(
 
 
 @router.get("/overview")
-def get_finance_overview(
+async def get_finance_overview(
     user_id: str = Query(..., description="Supabase user ID"),
     month: Optional[int] = None,
     year: Optional[int] = None,
@@ -149,48 +150,44 @@ def get_finance_overview(
     target_month = bounds["start"].month
     target_year = bounds["start"].year
 
-    budget_resp = (
-        supabase.table("finance_budgets")
-        .select("*")
-        .eq("user_id", user_id)
-        .eq("month", target_month)
-        .eq("year", target_year)
-        .limit(1)
-        .execute()
+    # The four reads are independent, so run them concurrently
+    budget_rows, transactions, bills, goals = await asyncio.gather(
+        db.data(
+            db.table("finance_budgets")
+            .select("*")
+            .eq("user_id", user_id)
+            .eq("month", target_month)
+            .eq("year", target_year)
+            .limit(1),
+            "finance_budgets",
+        ),
+        db.data(
+            db.table("finance_transactions")
+            .select("*")
+            .eq("user_id", user_id)
+            .gte("transaction_date", period_start)
+            .lt("transaction_date", period_end)
+            .order("transaction_date", desc=True),
+            "finance_transactions",
+        ),
+        db.data(
+            db.table("finance_bills")
+            .select("*")
+            .eq("user_id", user_id)
+            .gte("due_date", datetime.utcnow().date().isoformat())
+            .order("due_date", ascending=True),
+            "finance_bills",
+        ),
+        db.data(
+            db.table("finance_goals")
+            .select("*")
+            .eq("user_id", user_id)
+            .order("created_at", ascending=True),
+            "finance_goals",
+        ),
     )
-    budget_rows = getattr(budget_resp, "data", []) or []
     budget = budget_rows[0] if budget_rows else None
 
-    tx_resp = (
-        supabase.table("finance_transactions")
-        .select("*")
-        .eq("user_id", user_id)
-        .gte("transaction_date", period_start)
-        .lt("transaction_date", period_end)
-        .order("transaction_date", desc=True)
-        .execute()
-    )
-    transactions = getattr(tx_resp, "data", []) or []
-
-    bills_resp = (
-        supabase.table("finance_bills")
-        .select("*")
-        .eq("user_id", user_id)
-        .gte("due_date", datetime.utcnow().date().isoformat())
-        .order("due_date", ascending=True)
-        .execute()
-    )
-    bills = getattr(bills_resp, "data", []) or []
-
-    goals_resp = (
-        supabase.table("finance_goals")
-        .select("*")
-        .eq("user_id", user_id)
-        .order("created_at", ascending=True)
-        .execute()
-    )
-    goals = getattr(goals_resp, "data", []) or []
-
     tx_summary = _summarize_transactions(transactions)
 
     for bill in bills:
@@ -223,19 +220,19 @@ def get_finance_overview(
 
 
 @router.post("/overview")
-def get_finance_overview_post(payload: dict = Body(...)):
+async def get_finance_overview_post(payload: dict = Body(...)):
     user_id = payload.get("user_id")
     month = payload.get("month")
     year = payload.get("year")
     if not user_id:
         raise HTTPException(status_code=400, detail="user_id is required")
-    return get_finance_overview(user_id=user_id, month=month, year=year)
+    return await get_finance_overview(user_id=user_id, month=month, year=year)
 
 
 
 
 @router.post("/budget")
-def upsert_budget(payload: dict):
+async def upsert_budget(payload: dict):
     user_id = payload.get("user_id")
     amount = float(payload.get("amount", 0))
     month = payload.get("month")
@@ -260,10 +257,10 @@ def upsert_budget(payload: dict):
         key = _category_column(name)
         row[key] = value
 
-    result = (
-        supabase.table("finance_budgets")
-        .upsert(row, on_conflict="user_id,month,year")
-        .execute()
+    result = await db.execute(
+        db.table("finance_budgets")
+        .upsert(row, on_conflict="user_id,month,year"),
+        "finance_budgets",
     )
     return {"status": "success", "data": row, "supabase": getattr(result, "data", [])}
 
@@ -282,7 +279,7 @@ def _validate_category(category: str, kind: str) -> None:
 
 
 @router.post("/transactions")
-def create_transaction(payload: dict):
+async def create_transaction(payload: dict):
     user_id = payload.get("user_id")
     amount = float(payload.get("amount", 0))
     category = payload.get("category")
@@ -305,25 +302,25 @@ def create_transaction(payload: dict):
         "transaction_date": transaction_date,
         "notes": notes,
     }
-    result = supabase.table("finance_transactions").insert(row).execute()
+    result = await db.execute(db.table("finance_transactions").insert(row), "finance_transactions_insert")
     return {"status": "success", "data": getattr(result, "data", row)}
 
 
 @router.get("/transactions")
-def list_transactions(user_id: str = Query(...), limit: int = 50):
-    resp = (
-        supabase.table("finance_transactions")
+async def list_transactions(user_id: str = Query(...), limit: int = 50):
+    resp = await db.execute(
+        db.table("finance_transactions")
         .select("*")
         .eq("user_id", user_id)
         .order("transaction_date", desc=True)
-        .limit(limit)
-        .execute()
+        .limit(limit),
+        "finance_transactions",
     )
     return getattr(resp, "data", [])
 
 
 @router.post("/bills")
-def create_bill(payload: dict):
+async def create_bill(payload: dict):
     user_id = payload.get("user_id")
     name = payload.get("name")
     amount = float(payload.get("amount", 0))
@@ -344,24 +341,24 @@ def create_bill(payload: dict):
         "autopay_source": autopay_source,
         "status": status,
     }
-    result = supabase.table("finance_bills").insert(row).execute()
+    result = await db.execute(db.table("finance_bills").insert(row), "finance_bills_insert")
     return {"status": "success", "data": getattr(result, "data", row)}
 
 
 @router.get("/bills")
-def list_bills(user_id: str = Query(...)):
-    resp = (
-        supabase.table("finance_bills")
+async def list_bills(user_id: str = Query(...)):
+    resp = await db.execute(
+        db.table("finance_bills")
         .select("*")
         .eq("user_id", user_id)
-        .order("due_date", ascending=True)
-        .execute()
+        .order("due_date", ascending=True),
+        "finance_bills",
     )
     return getattr(resp, "data", [])
 
 
 @router.post("/goals")
-def create_goal(payload: dict):
+async def create_goal(payload: dict):
     user_id = payload.get("user_id")
     name = payload.get("name")
     target = payload.get("target_amount")
@@ -378,12 +375,12 @@ def create_goal(payload: dict):
         "current_amount": float(current),
         "color": color or "#22c55e",
     }
-    result = supabase.table("finance_goals").insert(row).execute()
+    result = await db.execute(db.table("finance_goals").insert(row), "finance_goals_insert")
     return {"status": "success", "data": getattr(result, "data", row)}
 
 
 @router.patch("/goals/{goal_id}")
-def update_goal(goal_id: str, payload: dict):
+async def update_goal(goal_id: str, payload: dict):
     current_amount = payload.get("current_amount")
     name = payload.get("name")
     target = payload.get("target_amount")
@@ -402,22 +399,22 @@ def update_goal(goal_id: str, payload: dict):
     if not update_fields:
         raise HTTPException(status_code=400, detail="No fields to update")
 
-    resp = (
-        supabase.table("finance_goals")
+    resp = await db.execute(
+        db.table("finance_goals")
         .update(update_fields)
-        .eq("id", goal_id)
-        .execute()
+        .eq("id", goal_id),
+        "finance_goals",
     )
     return {"status": "success", "data": getattr(resp, "data", [])}
 
 
 @router.get("/goals")
-def list_goals(user_id: str = Query(...)):
-    resp = (
-        supabase.table("finance_goals")
+async def list_goals(user_id: str = Query(...)):
+    resp = await db.execute(
+        db.table("finance_goals")
         .select("*")
         .eq("user_id", user_id)
-        .order("created_at", ascending=True)
-        .execute()
+        .order("created_at", ascending=True),
+        "finance_goals",
     )
     return getattr(resp, "data", [])
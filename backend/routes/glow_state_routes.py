@@ -1,7 +1,8 @@
 # routes/glow_state_routes.py
 print("🔧 [GlowState] Loading glow_state_routes.py module...")
 
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Request, Response
+from fastapi.responses import JSONResponse
 print("🔧 [GlowState] FastAPI imported successfully")
 
 try:
@@ -14,6 +15,11 @@ except Exception as e:
     raise
 
 import traceback
+import uuid
+from typing import Optional
+
+# Versions restart at 0 with the process, so ETags carry a per-boot prefix
+_BOOT_ID = uuid.uuid4().hex[:8]
 
 print("🔧 [GlowState] Creating APIRouter with prefix='/glow'...")
 router = APIRouter(prefix="/glow", tags=["glow"])
@@ -21,13 +27,19 @@ print(f"✅ [GlowState] Router created: {router}")
 print(f"✅ [GlowState] Router prefix: {router.prefix}")
 
 @router.get("/state", response_model=GlowState)
-async def get_glow_state():
-    """Get the current GlowState from the store."""
-    print(f"🌐 [GlowState] GET /glow/state endpoint called")
+async def get_glow_state(request: Request):
+    """
+    Get the current GlowState from the store.
+    ETag is the state version; send If-None-Match to get a 304 when nothing changed.
+    """
     try:
         state = glow_state_store.get_state()
-        print(f"✅ [GlowState] Returning state: system.cpu={state.system.cpu_usage:.2%}, runtime.backend={state.runtime.backend_running}")
-        return state
+        etag = f'"{_BOOT_ID}-{state.version}"'
+        headers = {"ETag": etag, "Cache-Control": "no-cache"}
+        if etag in (request.headers.get("if-none-match") or ""):
+            return Response(status_code=304, headers=headers)
+        print(f"✅ [GlowState] Returning state v{state.version}: system.cpu={state.system.cpu_usage:.2%}, runtime.backend={state.runtime.backend_running}")
+        return JSONResponse(content=state.model_dump(mode="json"), headers=headers)
     except Exception as e:
         error_msg = f"❌ [GlowState] Error getting state: {str(e)}"
         print(error_msg)
@@ -43,6 +55,35 @@ async def clear_notifications():
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@router.get("/metrics/history")
+async def get_metrics_history(
+    metrics: Optional[str] = None,
+    window: float = 3600,
+    points: int = 120,
+    resolution: Optional[str] = None,
+):
+    """
+    Downsampled system metric history (min/max/avg per bin) for the last `window` seconds.
+    metrics: comma-separated SystemState fields (default: all tracked); resolution: raw / 1m / 15m (default: auto)
+    """
+    from services.metrics_history import metrics_history
+
+    if window <= 0 or points <= 0:
+        raise HTTPException(status_code=400, detail="window and points must be positive")
+    if resolution and resolution not in metrics_history.rings:
+        raise HTTPException(status_code=400, detail=f"resolution must be one of {list(metrics_history.rings)}")
+    names = [m.strip() for m in metrics.split(",") if m.strip()] if metrics else None
+    try:
+        return metrics_history.query(names, window=window, points=min(points, 2000), resolution=resolution)
+    except KeyError as e:
+        raise HTTPException(status_code=400, detail=str(e.args[0]))
+
+@router.get("/feed/stats")
+async def get_glow_state_feed_stats():
+    """GlowState WebSocket change feed: subscribers, patches sent, versions coalesced"""
+    from services.glow_state_feed import glow_state_feed
+    return glow_state_feed.get_stats()
+
 print(f"✅ [GlowState] Route /state registered. Total routes in router: {len(router.routes)}")
 for route in router.routes:
     if hasattr(route, 'path') and hasattr(route, 'methods'):
@@ -6,9 +6,12 @@ from fastapi import APIRouter, Request
 from fastapi.responses import JSONResponse
 from datetime import datetime
 from services.knowledge_base import embed_text_ollama
+from services.kb_index import kb_index
+from services.db import db
 from config import supabase, whisper_model
 from utils.file_ingestion import extract_text_from_file, chunk_text
 import os
+import asyncio
 
 router = APIRouter(prefix="/api", tags=["knowledge_base"])
 
@@ -30,7 +33,7 @@ async def ingest_file_to_knowledge_base(entry_meta: dict, supabase, embed_text_o
     if file_path and not file_path.startswith('/'):
         try:
             print(f"🔽 Downloading file from Supabase storage: {file_path}")
-            response = supabase.storage.from_("file-stores").download(file_path)
+            response = await db.call(supabase.storage.from_("file-stores").download, file_path, name="storage_download")
             temp_file_path = f"/tmp/{file_name}"
             with open(temp_file_path, "wb") as f:
                 f.write(response)
@@ -71,13 +74,14 @@ async def ingest_file_to_knowledge_base(entry_meta: dict, supabase, embed_text_o
             "multi_part_tag": "no",
         })
 
-    for i, chunk in enumerate(chunks):
+    # Queue every chunk at once so the embedding service can batch them
+    print(f"🧠 Creating embeddings for {total_chunks} chunk(s)")
+    embeddings = await asyncio.gather(*(embed_text_ollama(chunk) for chunk in chunks))
+
+    for i, (chunk, embedding) in enumerate(zip(chunks, embeddings)):
         # For multi-part files, append part number to title
         chunk_title = f"{title} - Part {i+1}" if is_multi_part else title
-        
-        print(f"🧠 Creating embedding for chunk {i+1}/{len(chunks)}")
-        embedding = await embed_text_ollama(chunk)
-        
+
         if not embedding:
             print(f"⚠️ Failed to generate embedding for chunk {i+1}, skipping...")
             continue
@@ -105,7 +109,8 @@ async def ingest_file_to_knowledge_base(entry_meta: dict, supabase, embed_text_o
             "file_path": original_file_path if original_file_path else None,
         }
 
-        res = supabase.table("knowledge_base").insert(entry_to_insert).execute()
+        res = await db.insert_knowledge_entry(entry_to_insert)
+        kb_index.add_rows(getattr(res, "data", None) or [], [embedding])
         results.append(res)
 
     # Clean up temporary file if we created one
@@ -165,7 +170,8 @@ async def api_add_knowledge_base(request: Request):
                 "metadata": entry.get("metadata", {}),
             }
             
-            result = supabase.table("knowledge_base").insert(entry_to_insert).execute()
+            result = await db.insert_knowledge_entry(entry_to_insert)
+            kb_index.add_rows(getattr(result, "data", None) or [], [embedding])
             return {"status": "success", "rows": 1, "result": result.data}
     except Exception as e:
         print(f"❌ Knowledge base add error: {e}")
@@ -176,16 +182,18 @@ async def api_add_knowledge_base(request: Request):
 async def get_knowledge_base(request: Request):
     """Get all knowledge base entries"""
     try:
-        response = supabase.table("knowledge_base")\
-            .select("*")\
-            .eq("is_active", True)\
-            .order("created_at", ascending=False)\
-            .execute()
+        entries = await db.data(
+            db.table("knowledge_base")
+            .select("*")
+            .eq("is_active", True)
+            .order("created_at", ascending=False),
+            "knowledge_base_list"
+        )
         
         return {
             "status": "success",
-            "entries": response.data if response.data else [],
-            "count": len(response.data) if response.data else 0
+            "entries": entries,
+            "count": len(entries)
         }
     except Exception as e:
         print(f"❌ Knowledge base get error: {e}")
@@ -5,7 +5,7 @@
 from fastapi import APIRouter, Request
 from fastapi.responses import JSONResponse
 from datetime import datetime
-from services.memory import embed_text_ollama, add_memory, select_memories_for_context
+from services.memory import embed_text_ollama, add_memory, search_memories
 from config import supabase, whisper_model
 from utils.file_ingestion import ingest_file_to_memories
 
@@ -46,19 +46,11 @@ async def retrieve_memories(request: Request):
         
         query_embedding = await embed_text_ollama(user_input)
         match_count = data.get("match_count")
-        if not isinstance(match_count, int):
-            match_count = 200 if not deep_memory else 60
-        
-        memory_resp = supabase.rpc(
-            "match_memories",
-            {"query_embedding": query_embedding, "match_count": match_count}
-        ).execute()
-        
-        memories = getattr(memory_resp, "data", []) or []
-        selected_memories, total_candidates, usable_candidates = select_memories_for_context(
-            memories,
+        selected_memories, total_candidates, usable_candidates = await search_memories(
+            query_embedding,
             deep_memory=deep_memory,
-            limit=15
+            limit=15,
+            match_count=match_count
         )
         
         memory_data = [
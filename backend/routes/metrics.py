@@ -0,0 +1,92 @@
+# ============================================
+# 📈 Metrics Routes
+# ============================================
+# Read-only counters from the backend's hot-path services
+
+from fastapi import APIRouter
+from fastapi.responses import JSONResponse
+from services.embeddings import embedding_service
+from services.memory_index import memory_index
+from services.kb_index import kb_index
+from services.file_index import file_index
+from services.file_search_stream import file_search_streams
+from services.file_transfer import file_transfers
+from services.metrics import metrics
+from services.message_log import message_log
+from services.thread_cache import thread_cache
+from services.context_budget import token_counter
+from services.glow_router import get_router_stats
+
+router = APIRouter(prefix="/api/metrics", tags=["metrics"])
+
+
+@router.get("/embeddings", response_class=JSONResponse)
+async def get_embedding_metrics():
+    """Embedding service batching stats + cache hit/miss/eviction counters"""
+    return embedding_service.get_stats()
+
+
+@router.get("/memory-index", response_class=JSONResponse)
+async def get_memory_index_metrics():
+    """Local memory vector index size, sync state and search latency"""
+    return memory_index.get_stats()
+
+
+@router.get("/kb-index", response_class=JSONResponse)
+async def get_kb_index_metrics():
+    """Knowledge base index size, bitmap counts and per-filter pruning totals"""
+    return kb_index.get_stats()
+
+
+@router.get("/file-index", response_class=JSONResponse)
+async def get_file_index_metrics():
+    """Filename index size, build/rescan times and staleness"""
+    return file_index.get_stats()
+
+
+@router.get("/file-search", response_class=JSONResponse)
+async def get_file_search_metrics():
+    """Streamed file searches: active crawls, index-answered vs crawled, batches and matches sent"""
+    return file_search_streams.get_stats()
+
+
+@router.get("/file-transfers", response_class=JSONResponse)
+async def get_file_transfer_metrics():
+    """Copy/move engine: active transfers, bytes per copy method, resumes and checksum results"""
+    return file_transfers.get_stats()
+
+
+@router.get("/db", response_class=JSONResponse)
+async def get_db_metrics():
+    """Per-query Supabase latency (count, errors, avg/p50/p95/max ms)"""
+    return metrics.snapshot(prefix="db.")
+
+
+@router.get("/message-log", response_class=JSONResponse)
+async def get_message_log_metrics():
+    """Write-behind chat message queue depth, batch sizes, flush latency and retries"""
+    return message_log.get_stats()
+
+
+@router.get("/thread-cache", response_class=JSONResponse)
+async def get_thread_cache_metrics():
+    """Per-thread history ring buffers: cached threads/messages, bytes vs cap, hits and evictions"""
+    return thread_cache.get_stats()
+
+
+@router.get("/tokens", response_class=JSONResponse)
+async def get_token_counter_metrics():
+    """Tokenizer availability and per-item token count cache hit rate"""
+    return token_counter.get_stats()
+
+
+@router.get("/router", response_class=JSONResponse)
+async def get_router_metrics():
+    """GlowRouter fast-path automaton size, decision cache hit rate and match latency"""
+    return get_router_stats()
+
+
+@router.get("/chat", response_class=JSONResponse)
+async def get_chat_metrics():
+    """Chat turn latency: routing decision and time-to-tool-start (count, errors, avg/p50/p95/max ms)"""
+    return metrics.snapshot(prefix="chat.")
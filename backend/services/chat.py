@@ -1,4 +1,4 @@
-from config.env import client
+from services.llm_providers import complete_chat
 from services.knowledge_base import search_knowledge_base, format_knowledge_for_context, get_crisis_resources
 import re
 
@@ -155,14 +155,13 @@ Your role is to provide immediate support and CONNECTION TO PROFESSIONAL HELP.
     # Generate Response
     # ============================================================
     try:
-        groq_response = client.chat.completions.create(
-            model="llama-3.1-8b-instant",
-            messages=messages,
+        reply = await complete_chat(
+            "groq",
+            "llama-3.1-8b-instant",
+            messages,
             temperature=0.7,
             max_tokens=1024
         )
-        
-        reply = groq_response.choices[0].message.content.strip()
         print(f"🤖 GROQ REPLY: {reply[:100]}...")
         
         return reply
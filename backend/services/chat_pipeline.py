@@ -0,0 +1,132 @@
+"""
+⏱️ Chat Pipeline - Concurrent Context Stages with Deadlines
+Runs the independent pre-LLM stages of a chat turn (consciousness analysis,
+history, memory retrieval, Notion, knowledge base) at the same time, each
+with its own time budget. A stage that misses its budget is dropped (or
+hands back a partial result) instead of holding up the first token.
+"""
+import asyncio
+import os
+import time
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+# Default per-stage budgets in milliseconds (override with CHAT_BUDGET_<STAGE>_MS)
+DEFAULT_STAGE_BUDGETS_MS = {
+    "consciousness": 1000,
+    "history": 1500,
+    "memory": 2000,
+    "notion": 2500,
+    "knowledge": 3000,
+}
+
+
+def get_stage_budgets(overrides: Optional[Dict[str, Any]] = None) -> Dict[str, float]:
+    """Budgets from defaults → env → per-request overrides (e.g. data["stageBudgets"])."""
+    budgets = {}
+    for name, default in DEFAULT_STAGE_BUDGETS_MS.items():
+        budgets[name] = float(os.getenv(f"CHAT_BUDGET_{name.upper()}_MS", default))
+    for name, value in (overrides or {}).items():
+        try:
+            budgets[name] = float(value)
+        except (TypeError, ValueError):
+            pass
+    return budgets
+
+
+class Stage:
+    """Handle passed to each stage function: knows its deadline and can flag a partial result."""
+
+    def __init__(self, name: str, budget_ms: float, started: float):
+        self.name = name
+        self.budget_ms = budget_ms
+        self.deadline = started + budget_ms / 1000.0
+        self.partial = False
+
+    def remaining(self) -> float:
+        """Seconds left before this stage's deadline (never negative)."""
+        return max(0.0, self.deadline - time.perf_counter())
+
+    def mark_partial(self):
+        self.partial = True
+
+
+class ChatPipeline:
+    """
+    Fan out stage functions concurrently and collect results by deadline.
+
+    Usage:
+        pipeline = ChatPipeline(get_stage_budgets(data.get("stageBudgets")))
+        pipeline.add("history", lambda stage: get_thread_messages_for_context(thread_id), default=[])
+        results = await pipeline.run()
+        pipeline.report  # → per-stage status/elapsed for response metadata
+    """
+
+    def __init__(self, budgets: Dict[str, float]):
+        self.budgets = budgets
+        self._stages: Dict[str, dict] = {}
+        self.report: Dict[str, dict] = {}
+
+    def add(
+        self,
+        name: str,
+        fn: Callable[[Stage], Awaitable[Any]],
+        *,
+        default: Any = None,
+        cancel_on_timeout: bool = True,
+    ):
+        """
+        Register a stage. `default` is used if it times out or fails.
+        cancel_on_timeout=False lets side-effecting stages (DB writes) finish in the background.
+        """
+        self._stages[name] = {"fn": fn, "default": default, "cancel": cancel_on_timeout}
+
+    def skip(self, name: str, default: Any = None):
+        """Record a stage that doesn't apply to this turn (kept in the report for visibility)."""
+        self._stages[name] = {"fn": None, "default": default, "cancel": True}
+
+    async def _run_stage(self, name: str, spec: dict, started: float):
+        if spec["fn"] is None:
+            self.report[name] = {"status": "skipped", "elapsed_ms": 0.0}
+            return spec["default"]
+
+        stage = Stage(name, self.budgets.get(name, 2000.0), started)
+        task = asyncio.ensure_future(spec["fn"](stage))
+        status, value = "ok", spec["default"]
+        try:
+            value = await asyncio.wait_for(
+                task if spec["cancel"] else asyncio.shield(task),
+                timeout=stage.budget_ms / 1000.0,
+            )
+            if stage.partial:
+                status = "partial"
+        except asyncio.TimeoutError:
+            status = "timeout"
+            print(f"⏱️ Chat stage '{name}' missed its {stage.budget_ms:.0f}ms budget")
+        except Exception as e:
+            status = "error"
+            print(f"⚠️ Chat stage '{name}' failed: {e}")
+
+        self.report[name] = {
+            "status": status,
+            "elapsed_ms": round((time.perf_counter() - started) * 1000, 1),
+            "budget_ms": stage.budget_ms,
+        }
+        return value
+
+    async def run(self) -> Dict[str, Any]:
+        started = time.perf_counter()
+        names = list(self._stages.keys())
+        values = await asyncio.gather(*(self._run_stage(n, self._stages[n], started) for n in names))
+        self.report["_total"] = {"elapsed_ms": round((time.perf_counter() - started) * 1000, 1)}
+        return dict(zip(names, values))
+
+    def made_deadline(self) -> Dict[str, bool]:
+        """Compact view for response metadata: stage → produced a (full or partial) result in time."""
+        return {
+            name: info["status"] in ("ok", "partial")
+            for name, info in self.report.items()
+            if not name.startswith("_") and info["status"] != "skipped"
+        }
+
+
+__all__ = ["ChatPipeline", "Stage", "get_stage_budgets", "DEFAULT_STAGE_BUDGETS_MS"]
@@ -3,10 +3,14 @@
 Analyzes messages to detect Chaos vs Glow states based on The Glow philosophy
 """
 
+import asyncio
 import re
 from typing import Dict, List, Tuple, Optional
 from datetime import datetime
-from config.env import supabase
+from services.db import db
+
+# Background saves in flight (held so they aren't garbage collected mid-write)
+_pending_saves: set = set()
 
 
 # Chaos indicators - patterns that suggest egoic mind, fear, control, survival-based patterns
@@ -267,12 +271,17 @@ async def save_consciousness_state(
         if thread_id:
             state_record["thread_id"] = thread_id
         if message_id:
-            state_record["message_id"] = message_id
+            # message_id references chat_messages(id); the message may still be queued on the write-behind log
+            from services.message_log import message_log
+            if await message_log.wait_for(message_id):
+                state_record["message_id"] = message_id
+            else:
+                print(f"⚠️ Message {message_id} not persisted yet, saving consciousness state without it")
         
-        result = supabase.table("consciousness_states").insert(state_record).execute()
+        rows = await db.insert_consciousness_state(state_record)
         
-        if result.data and len(result.data) > 0:
-            return result.data[0]["id"]
+        if rows:
+            return rows[0]["id"]
         else:
             print(f"⚠️ No data returned from consciousness_states insert")
             return None
@@ -291,18 +300,20 @@ async def analyze_and_save_state(
 ) -> Dict:
     """
     Analyze message and save state in one call
-    Returns the analysis result with the saved state_id
+    Returns the analysis right away; the save runs in the background, since it
+    may wait for the message to be flushed from the write-behind log
     """
     # Analyze the message
     state_data = await analyze_consciousness_state(
         message_text, user_id, thread_id, message_id, context
     )
     
-    # Save to database
-    state_id = await save_consciousness_state(
-        user_id, state_data, thread_id, message_id, context
-    )
+    # Save to database without holding up the caller
+    task = asyncio.ensure_future(save_consciousness_state(
+        user_id, dict(state_data), thread_id, message_id, context
+    ))
+    _pending_saves.add(task)
+    task.add_done_callback(_pending_saves.discard)
     
-    state_data["state_id"] = state_id
     return state_data
 
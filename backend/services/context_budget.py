@@ -0,0 +1,372 @@
+"""
+🧮 Context Budget - Token Counting & Prompt Packing
+Chat context used to be sized with a `len(text) // 4` guess and split
+40/30/30 between memories, knowledge base and history, which regularly
+overflowed Groq's limits (413 / TPM errors → retry with a rebuilt prompt).
+
+- count_tokens(): real BPE counts per provider family via tiktoken (cached
+  per message / memory id), with a conservative heuristic if it's missing
+- pack_context(): fits memories, KB entries, Notion and history into the
+  model's prompt budget in one pass with a priority-weighted group knapsack
+  (each item may go in whole, truncated, or not at all; history is always
+  a most-recent suffix), and reports the per-segment token breakdown
+"""
+import hashlib
+import math
+import os
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+try:
+    import tiktoken
+    TIKTOKEN_AVAILABLE = True
+except ImportError:
+    tiktoken = None
+    TIKTOKEN_AVAILABLE = False
+
+# Provider family → tiktoken encoding. Llama 3 uses a tiktoken-derived 128k vocab that
+# tracks cl100k closely; Claude has no local tokenizer, so it gets cl100k plus a margin.
+PROVIDER_ENCODINGS = {
+    "openai": "o200k_base",
+    "groq": "cl100k_base",
+    "claude": "cl100k_base",
+}
+PROVIDER_SAFETY = {"openai": 1.0, "groq": 1.05, "claude": 1.15}
+HEURISTIC_CHARS_PER_TOKEN = 3.5  # used without tiktoken; deliberately pessimistic vs the old /4
+
+# Prompt token budget per model. Groq limits are per-request TPM caps on our tier, not the
+# model window; Claude/GPT-4o are capped to keep per-turn cost in line with the Groq path.
+PROMPT_TOKEN_LIMITS = {
+    "llama-3.1-8b-instant": int(os.getenv("CONTEXT_LIMIT_GROQ_8B", "8192")),
+    "llama-3.3-70b-versatile": int(os.getenv("CONTEXT_LIMIT_GROQ_70B", "12000")),
+    "claude-3.5-sonnet-20240620": int(os.getenv("CONTEXT_LIMIT_CLAUDE", "16000")),
+    "gpt-4o-2024-11-20": int(os.getenv("CONTEXT_LIMIT_GPT4O", "16000")),
+}
+DEFAULT_PROMPT_TOKEN_LIMIT = 8000
+RESERVED_OUTPUT_TOKENS = int(os.getenv("CONTEXT_RESERVED_OUTPUT_TOKENS", "1500"))
+TOKEN_COUNT_CACHE_SIZE = int(os.getenv("TOKEN_COUNT_CACHE_SIZE", "20000"))
+
+# Relative value of one "unit" of each segment; crisis turns boost the knowledge base
+SEGMENT_PRIORITIES = {"history": 1.0, "knowledge": 0.9, "memories": 0.8, "notion": 0.6}
+CRISIS_KNOWLEDGE_PRIORITY = 3.0
+HISTORY_RECENCY_DECAY = 0.9  # each older message is worth 10% less; the last exchange counts double
+
+MESSAGE_OVERHEAD_TOKENS = 4  # role + separators per chat message
+MEMORY_HEADER = "## 🧠 Relevant Memories\n"
+KNOWLEDGE_HEADER = "=== RELEVANT KNOWLEDGE BASE INFORMATION ===\n"
+TRUNCATION_MARK = "..."
+_KNAPSACK_BUCKETS = 512  # DP resolution; costs are rounded up to budget/512 tokens
+
+
+# ============================================
+# Token counting
+# ============================================
+
+class TokenCounter:
+    """tiktoken encoders per provider + an LRU of counts keyed on (provider, item id, content hash)."""
+
+    def __init__(self, cache_size: int = TOKEN_COUNT_CACHE_SIZE):
+        self.cache_size = max(1, cache_size)
+        self._encoders: Dict[str, Any] = {}
+        self._failed: set = set()
+        self._cache: "OrderedDict[Tuple[str, str, str], int]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats = {"hits": 0, "misses": 0}
+
+    def encoding_name(self, provider: str) -> str:
+        encoder = self._encoder(provider)
+        return encoder.name if encoder is not None else "heuristic"
+
+    def _encoder(self, provider: str):
+        name = PROVIDER_ENCODINGS.get(provider, "cl100k_base")
+        if not TIKTOKEN_AVAILABLE or name in self._failed:
+            return None
+        encoder = self._encoders.get(name)
+        if encoder is None:
+            try:
+                encoder = tiktoken.get_encoding(name)
+            except Exception as e:
+                # First use downloads the BPE file; offline installs fall back to the heuristic
+                print(f"⚠️ tiktoken encoding {name} unavailable, using heuristic counts: {e}")
+                self._failed.add(name)
+                return None
+            self._encoders[name] = encoder
+        return encoder
+
+    def _raw_count(self, text: str, provider: str) -> int:
+        encoder = self._encoder(provider)
+        if encoder is not None:
+            tokens = len(encoder.encode(text, disallowed_special=()))
+        else:
+            tokens = len(text) / HEURISTIC_CHARS_PER_TOKEN
+        return int(math.ceil(tokens * PROVIDER_SAFETY.get(provider, 1.0)))
+
+    def count(self, text: Optional[str], provider: str = "groq", item_id: Optional[str] = None) -> int:
+        """Tokens in `text` for a provider family. `item_id` enables the per-item count cache."""
+        if not text:
+            return 0
+        if item_id is None:
+            return self._raw_count(text, provider)
+        key = (provider, str(item_id), hashlib.blake2b(text.encode("utf-8"), digest_size=8).hexdigest())
+        with self._lock:
+            cached = self._cache.get(key)
+            if cached is not None:
+                self._cache.move_to_end(key)
+                self.stats["hits"] += 1
+                return cached
+        tokens = self._raw_count(text, provider)
+        with self._lock:
+            self.stats["misses"] += 1
+            self._cache[key] = tokens
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        return tokens
+
+    def truncate(self, text: str, max_tokens: int, provider: str = "groq") -> str:
+        """Cut `text` to at most `max_tokens` (including the trailing "...")."""
+        if max_tokens <= 0 or not text:
+            return ""
+        if self.count(text, provider) <= max_tokens:
+            return text
+        budget = max_tokens - self.count(TRUNCATION_MARK, provider)
+        safety = PROVIDER_SAFETY.get(provider, 1.0)
+        encoder = self._encoder(provider)
+        if encoder is not None:
+            tokens = encoder.encode(text, disallowed_special=())
+            cut = encoder.decode(tokens[:max(0, int(budget / safety))])
+        else:
+            cut = text[:max(0, int(budget / safety * HEURISTIC_CHARS_PER_TOKEN))]
+        return cut + TRUNCATION_MARK if cut else ""
+
+    def get_stats(self) -> dict:
+        lookups = self.stats["hits"] + self.stats["misses"]
+        return {
+            "tiktoken": TIKTOKEN_AVAILABLE,
+            "encoders": sorted(self._encoders),
+            "cached_counts": len(self._cache),
+            "hit_rate": round(self.stats["hits"] / lookups, 3) if lookups else 0.0,
+            **self.stats,
+        }
+
+
+token_counter = TokenCounter()
+
+
+def count_tokens(text: Optional[str], provider: str = "groq", item_id: Optional[str] = None) -> int:
+    return token_counter.count(text, provider, item_id)
+
+
+def count_message_tokens(messages: List[Dict[str, Any]], provider: str = "groq") -> int:
+    """Prompt tokens for a chat message list (content + per-message framing)."""
+    return sum(
+        count_tokens(m.get("content") or "", provider, m.get("id")) + MESSAGE_OVERHEAD_TOKENS
+        for m in messages
+    ) + 3  # reply priming
+
+
+def prompt_token_limit(model: str) -> int:
+    return PROMPT_TOKEN_LIMITS.get(model, DEFAULT_PROMPT_TOKEN_LIMIT)
+
+
+# ============================================
+# Packing
+# ============================================
+
+def format_memory_line(memory: Dict[str, Any], content: Optional[str] = None) -> str:
+    content = memory.get("content", "") if content is None else content
+    return f"• ({round(memory.get('similarity', 0.0) or 0.0, 3)}) {memory.get('name', 'Memory')}: {content}"
+
+
+def _knapsack(groups: List[List[Tuple[int, float]]], budget: int) -> List[int]:
+    """
+    Group knapsack: each group is a list of (cost, value) options, at most one picked per group.
+    Returns the chosen option index per group (-1 = none) maximizing total value within budget.
+    """
+    if budget <= 0 or not groups:
+        return [-1] * len(groups)
+    unit = max(1, math.ceil(budget / _KNAPSACK_BUCKETS))
+    capacity = budget // unit
+    best = [0.0] * (capacity + 1)
+    picks: List[List[int]] = []
+    for options in groups:
+        scaled = [(math.ceil(cost / unit), value) for cost, value in options]
+        new_best = best[:]
+        choice = [-1] * (capacity + 1)
+        for index, (cost, value) in enumerate(scaled):
+            if cost > capacity or value <= 0:
+                continue
+            for c in range(cost, capacity + 1):
+                candidate = best[c - cost] + value
+                if candidate > new_best[c]:
+                    new_best[c] = candidate
+                    choice[c] = index
+        picks.append(choice)
+        best = new_best
+
+    # Walk back from the best reachable capacity
+    c = max(range(capacity + 1), key=lambda i: best[i])
+    chosen = [-1] * len(groups)
+    for g in range(len(groups) - 1, -1, -1):
+        index = picks[g][c]
+        chosen[g] = index
+        if index >= 0:
+            c -= math.ceil(groups[g][index][0] / unit)
+    return chosen
+
+
+def _truncated_option(text: str, tokens: int, provider: str, keep: float = 0.4, floor: int = 60):
+    """A shortened variant of an item (or None if it's already short)."""
+    target = max(floor, int(tokens * keep))
+    if tokens <= target + floor:
+        return None
+    short = token_counter.truncate(text, target, provider)
+    return (short, count_tokens(short, provider)) if short else None
+
+
+def pack_context(
+    provider: str,
+    model: str,
+    base_messages: List[Dict[str, Any]],
+    *,
+    memories: Optional[List[Dict[str, Any]]] = None,
+    knowledge_blocks: Optional[List[Dict[str, Any]]] = None,
+    notion_block: str = "",
+    history: Optional[List[Dict[str, Any]]] = None,
+    is_crisis: bool = False,
+    reserved_output: int = RESERVED_OUTPUT_TOKENS,
+    limit_scale: float = 1.0,
+) -> Dict[str, Any]:
+    """
+    Fit context into the prompt budget for `model`.
+
+    base_messages is the prompt with no context block and no history (system + user turn);
+    its cost is fixed. Returns the chosen pieces plus a "budget" report:
+        {"memories", "memory_block", "knowledge_context", "notion_block", "history", "budget"}
+    """
+    memories = memories or []
+    knowledge_blocks = knowledge_blocks or []
+    history = history or []
+
+    limit = int(prompt_token_limit(model) * limit_scale)
+    fixed = count_message_tokens(base_messages, provider)
+    headers = count_tokens(MEMORY_HEADER, provider) + count_tokens(KNOWLEDGE_HEADER, provider) + 8
+    budget = max(0, limit - reserved_output - fixed - headers)
+
+    priorities = dict(SEGMENT_PRIORITIES)
+    if is_crisis:
+        priorities["knowledge"] = CRISIS_KNOWLEDGE_PRIORITY
+
+    groups: List[List[Tuple[int, float]]] = []
+    layout: List[Tuple[str, Any, List[Any]]] = []  # (segment, item, option payloads)
+
+    for memory in memories:
+        line = format_memory_line(memory)
+        tokens = count_tokens(line, provider, memory.get("id")) + 1
+        importance = float(memory.get("importance") or 5) / 5.0
+        value = priorities["memories"] * (0.5 + float(memory.get("similarity") or 0.0)) * importance * 100
+        options, payloads = [(tokens, value)], [line]
+        short = _truncated_option(memory.get("content", ""), tokens, provider)
+        if short:
+            payloads.append(format_memory_line(memory, short[0]))
+            options.append((count_tokens(payloads[-1], provider) + 1, value * 0.5))
+        groups.append(options)
+        layout.append(("memories", memory, payloads))
+
+    for block in knowledge_blocks:
+        text = block.get("text", "")
+        tokens = count_tokens(text, provider, block.get("id"))
+        value = priorities["knowledge"] * (0.5 + float(block.get("similarity") or 0.5)) * 100
+        options, payloads = [(tokens, value)], [text]
+        short = _truncated_option(text, tokens, provider)
+        if short:
+            payloads.append(short[0] + "\n---\n")
+            options.append((short[1] + 3, value * 0.5))
+        groups.append(options)
+        layout.append(("knowledge", block, payloads))
+
+    if notion_block:
+        tokens = count_tokens(notion_block, provider)
+        value = priorities["notion"] * 100
+        options, payloads = [(tokens, value)], [notion_block]
+        short = _truncated_option(notion_block, tokens, provider)
+        if short:
+            payloads.append(short[0])
+            options.append((short[1], value * 0.5))
+        groups.append(options)
+        layout.append(("notion", None, payloads))
+
+    if history:
+        # Option k = keep the k most recent messages; recent turns are worth more
+        options, payloads, cost, value = [], [], 0, 0.0
+        for age, message in enumerate(reversed(history)):
+            cost += count_tokens(message.get("content") or "", provider, message.get("id")) + MESSAGE_OVERHEAD_TOKENS
+            value += priorities["history"] * 100 * (HISTORY_RECENCY_DECAY ** age) * (2.0 if age < 2 else 1.0)
+            options.append((cost, value))
+            payloads.append(age + 1)
+        groups.append(options)
+        layout.append(("history", None, payloads))
+
+    chosen = _knapsack(groups, budget)
+
+    picked_memories, memory_lines, kb_texts, notion_text, kept_history = [], [], [], "", []
+    segments = {"memories": 0, "knowledge": 0, "notion": 0, "history": 0}
+    truncated = 0
+    for (segment, item, payloads), options, index in zip(layout, groups, chosen):
+        if index < 0:
+            continue
+        segments[segment] += options[index][0]
+        truncated += 1 if index > 0 and segment != "history" else 0
+        if segment == "memories":
+            picked_memories.append(item)
+            memory_lines.append(payloads[index])
+        elif segment == "knowledge":
+            kb_texts.append(payloads[index])
+        elif segment == "notion":
+            notion_text = payloads[index]
+        else:
+            kept_history = history[-payloads[index]:]
+
+    memory_block = MEMORY_HEADER + "\n".join(memory_lines) if memory_lines else ""
+    knowledge_context = KNOWLEDGE_HEADER + "".join(kb_texts) if kb_texts else ""
+    if memory_block:
+        segments["memories"] += count_tokens(MEMORY_HEADER, provider)
+    if knowledge_context:
+        segments["knowledge"] += count_tokens(KNOWLEDGE_HEADER, provider)
+
+    total = fixed + sum(segments.values())
+    return {
+        "memories": picked_memories,
+        "memory_block": memory_block,
+        "knowledge_context": knowledge_context,
+        "notion_block": notion_text,
+        "history": kept_history,
+        "budget": {
+            "model": model,
+            "tokenizer": token_counter.encoding_name(provider),
+            "limit": limit,
+            "reserved_output": reserved_output,
+            "segments": {"base": fixed, **segments},
+            "total": total,
+            "dropped": {
+                "memories": len(memories) - len(picked_memories),
+                "knowledge": len(knowledge_blocks) - len(kb_texts),
+                "notion": 1 if notion_block and not notion_text else 0,
+                "history": len(history) - len(kept_history),
+            },
+            "truncated": truncated,
+        },
+    }
+
+
+__all__ = [
+    "TokenCounter",
+    "token_counter",
+    "count_tokens",
+    "count_message_tokens",
+    "prompt_token_limit",
+    "pack_context",
+    "format_memory_line",
+    "KNOWLEDGE_HEADER",
+    "PROMPT_TOKEN_LIMITS",
+]
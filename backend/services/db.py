@@ -0,0 +1,175 @@
+"""
+🗄️ DB - Non-Blocking Supabase Repository
+supabase-py is synchronous, so every `.execute()` is a blocking PostgREST
+round trip. This module runs them on a bounded worker pool (sharing the
+client's pooled httpx session) and awaits the result, so handlers and
+watchers never stall the event loop. Every query is timed into
+services.metrics under "db.<name>".
+
+- execute(builder, name): run any query/RPC builder off the loop
+- Typed helpers for the hot queries (chat history, vector RPCs, inserts)
+"""
+import asyncio
+import functools
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional
+
+from config import supabase
+from services.metrics import metrics
+
+# Upper bound on concurrent PostgREST calls (also caps threads used for DB I/O)
+DB_MAX_WORKERS = int(os.getenv("DB_MAX_WORKERS", "8"))
+
+
+class Database:
+    """Async facade over the shared Supabase client."""
+
+    def __init__(self, client=supabase, max_workers: int = DB_MAX_WORKERS):
+        self.client = client
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="supabase")
+
+    # ---------------------------
+    # Core
+    # ---------------------------
+    async def call(self, fn: Callable[..., Any], *args, name: str = "call") -> Any:
+        """Run any blocking Supabase call (e.g. storage download) on the DB pool, timed as db.<name>."""
+        loop = asyncio.get_running_loop()
+        started = time.perf_counter()
+        error = False
+        try:
+            return await loop.run_in_executor(self._executor, functools.partial(fn, *args))
+        except Exception:
+            error = True
+            raise
+        finally:
+            metrics.observe(f"db.{name}", (time.perf_counter() - started) * 1000, error)
+
+    async def execute(self, builder: Any, name: str = "query") -> Any:
+        """Run `builder.execute()` on the DB pool and record its latency as db.<name>."""
+        return await self.call(builder.execute, name=name)
+
+    async def data(self, builder: Any, name: str = "query") -> List[Dict[str, Any]]:
+        """execute() and return `.data` as a list (empty on no rows)."""
+        resp = await self.execute(builder, name)
+        return getattr(resp, "data", None) or []
+
+    async def data_paged(self, make_builder: Callable[[int, int], Any], name: str = "query",
+                         page_size: int = 1000) -> List[Dict[str, Any]]:
+        """Fetch every row of a large select; make_builder(start, end) returns the ranged builder."""
+        rows, start = [], 0
+        while True:
+            page = await self.data(make_builder(start, start + page_size - 1), name)
+            rows.extend(page)
+            if len(page) < page_size:
+                return rows
+            start += page_size
+
+    def table(self, name: str):
+        return self.client.table(name)
+
+    def rpc(self, fn: str, params: Optional[dict] = None):
+        return self.client.rpc(fn, params or {})
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False)
+
+    # ---------------------------
+    # Chat hot path
+    # ---------------------------
+    async def fetch_thread_messages(self, thread_id: str, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Messages for a thread, oldest first, without embeddings."""
+        query = self.table("chat_messages") \
+            .select("id, thread_id, role, content, metadata, created_at") \
+            .eq("thread_id", thread_id) \
+            .order("created_at", desc=False)
+        if limit:
+            query = query.limit(limit)
+        return await self.data(query, "fetch_thread_messages")
+
+    async def fetch_recent_thread_messages(self, thread_id: str, limit: int) -> List[Dict[str, Any]]:
+        """The newest `limit` messages for a thread, returned oldest first, without embeddings."""
+        rows = await self.data(
+            self.table("chat_messages")
+            .select("id, thread_id, role, content, metadata, created_at")
+            .eq("thread_id", thread_id)
+            .order("created_at", desc=True)
+            .limit(limit),
+            "fetch_recent_thread_messages",
+        )
+        return rows[::-1]
+
+    async def latest_thread(self, user_id: str) -> Optional[Dict[str, Any]]:
+        rows = await self.data(
+            self.table("chat_threads").select("*").eq("user_id", user_id).order("created_at", desc=True).limit(1),
+            "latest_thread",
+        )
+        return rows[0] if rows else None
+
+    async def create_thread(self, row: Dict[str, Any]) -> Dict[str, Any]:
+        rows = await self.data(self.table("chat_threads").insert(row), "create_thread")
+        return rows[0]
+
+    async def insert_chat_message_with_vector(
+        self,
+        thread_id: str,
+        role: str,
+        content: str,
+        embedding_str: str,
+        metadata: Optional[dict] = None,
+    ) -> Any:
+        return await self.execute(
+            self.rpc("insert_chat_message_with_vector", {
+                "p_thread_id": thread_id,
+                "p_role": role,
+                "p_content": content,
+                "p_metadata": metadata or {},
+                "p_embedding": embedding_str,
+            }),
+            "insert_chat_message_with_vector",
+        )
+
+    async def insert_chat_messages_with_vectors(self, rows: List[Dict[str, Any]]) -> Any:
+        """Bulk insert (id, thread_id, role, content, metadata, created_at, embedding); existing ids are skipped."""
+        return await self.execute(
+            self.rpc("insert_chat_messages_with_vectors", {"p_messages": rows}),
+            "insert_chat_messages_with_vectors",
+        )
+
+    async def match_memories(self, query_embedding: List[float], match_count: int) -> List[Dict[str, Any]]:
+        return await self.data(
+            self.rpc("match_memories", {"query_embedding": query_embedding, "match_count": match_count}),
+            "match_memories",
+        )
+
+    async def match_knowledge_base(self, query_embedding: List[float], threshold: float, count: int) -> List[Dict[str, Any]]:
+        return await self.data(
+            self.rpc("match_knowledge_base", {
+                "query_embedding": query_embedding,
+                "match_threshold": threshold,
+                "match_count": count,
+            }),
+            "match_knowledge_base",
+        )
+
+    # ---------------------------
+    # Inserts
+    # ---------------------------
+    async def insert_memory(self, row: Dict[str, Any]) -> Any:
+        return await self.execute(self.table("memories").insert(row), "insert_memory")
+
+    async def insert_knowledge_entry(self, row: Dict[str, Any]) -> Any:
+        return await self.execute(self.table("knowledge_base").insert(row), "insert_knowledge_entry")
+
+    async def insert_consciousness_state(self, row: Dict[str, Any]) -> List[Dict[str, Any]]:
+        return await self.data(self.table("consciousness_states").insert(row), "insert_consciousness_state")
+
+    async def insert_token_usage(self, row: Dict[str, Any]) -> Any:
+        return await self.execute(self.table("token_usage").insert(row), "insert_token_usage")
+
+
+# Global instance
+db = Database()
+
+__all__ = ["Database", "db", "DB_MAX_WORKERS"]
@@ -0,0 +1,163 @@
+"""
+🗄️ Embedding Cache - Content-Addressed Vector Store
+Bounded in-memory LRU in front of a local SQLite store, keyed on
+(model, normalized text hash). Vectors are kept as float32, the same
+precision pgvector stores them at.
+"""
+import hashlib
+import os
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+from array import array
+from collections import OrderedDict
+from typing import List, Optional
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+EMBED_CACHE_PATH = os.getenv("EMBED_CACHE_PATH", os.path.join(BACKEND_DIR, ".cache", "embeddings.sqlite3"))
+EMBED_CACHE_MAX_ENTRIES = int(os.getenv("EMBED_CACHE_MAX_ENTRIES", "5000"))
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_text(text: str) -> str:
+    """Canonical form used for hashing: NFC, trimmed, whitespace runs collapsed."""
+    return _WHITESPACE.sub(" ", unicodedata.normalize("NFC", text or "")).strip()
+
+
+def make_cache_key(model: str, text: str) -> str:
+    digest = hashlib.sha256()
+    digest.update(model.encode("utf-8"))
+    digest.update(b"\x00")
+    digest.update(normalize_text(text).encode("utf-8"))
+    return digest.hexdigest()
+
+
+class EmbeddingCache:
+    """
+    Two-tier embedding cache.
+
+    - Memory tier: OrderedDict LRU of float32 arrays, bounded by entry count
+    - Disk tier: SQLite table that survives restarts (optional, path=None disables)
+    - Counters: hits, disk_hits, misses, evictions, writes
+    """
+
+    def __init__(self, path: Optional[str] = EMBED_CACHE_PATH, max_entries: int = EMBED_CACHE_MAX_ENTRIES):
+        self.path = path
+        self.max_entries = max(1, max_entries)
+        self._lru: "OrderedDict[str, array]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._db: Optional[sqlite3.Connection] = None
+        self._db_failed = False
+        self.stats = {"hits": 0, "disk_hits": 0, "misses": 0, "evictions": 0, "writes": 0}
+
+    # ---------------------------
+    # Disk tier
+    # ---------------------------
+    def _get_db(self) -> Optional[sqlite3.Connection]:
+        if self._db is not None or self._db_failed or not self.path:
+            return self._db
+        try:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            db = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute("PRAGMA synchronous=NORMAL")
+            db.execute(
+                "CREATE TABLE IF NOT EXISTS embeddings ("
+                " key TEXT PRIMARY KEY,"
+                " model TEXT NOT NULL,"
+                " dim INTEGER NOT NULL,"
+                " vec BLOB NOT NULL,"
+                " created_at REAL NOT NULL)"
+            )
+            self._db = db
+        except Exception as e:
+            print(f"⚠️ Embedding cache disk tier disabled: {e}")
+            self._db_failed = True
+        return self._db
+
+    # ---------------------------
+    # Memory tier
+    # ---------------------------
+    def _remember(self, key: str, vec: array):
+        self._lru[key] = vec
+        self._lru.move_to_end(key)
+        while len(self._lru) > self.max_entries:
+            self._lru.popitem(last=False)
+            self.stats["evictions"] += 1
+
+    # ---------------------------
+    # Public API
+    # ---------------------------
+    def get(self, model: str, text: str) -> Optional[List[float]]:
+        return self.get_by_key(make_cache_key(model, text))
+
+    def get_by_key(self, key: str) -> Optional[List[float]]:
+        with self._lock:
+            vec = self._lru.get(key)
+            if vec is not None:
+                self._lru.move_to_end(key)
+                self.stats["hits"] += 1
+                return vec.tolist()
+
+            db = self._get_db()
+            if db is not None:
+                try:
+                    row = db.execute("SELECT vec FROM embeddings WHERE key = ?", (key,)).fetchone()
+                except Exception as e:
+                    print(f"⚠️ Embedding cache read failed: {e}")
+                    row = None
+                if row is not None:
+                    vec = array("f")
+                    vec.frombytes(row[0])
+                    self._remember(key, vec)
+                    self.stats["disk_hits"] += 1
+                    return vec.tolist()
+
+            self.stats["misses"] += 1
+            return None
+
+    def put(self, model: str, text: str, embedding: List[float]):
+        self.put_by_key(make_cache_key(model, text), model, embedding)
+
+    def put_by_key(self, key: str, model: str, embedding: List[float]):
+        if not embedding:
+            return
+        vec = array("f", embedding)
+        with self._lock:
+            self._remember(key, vec)
+            db = self._get_db()
+            if db is not None:
+                try:
+                    db.execute(
+                        "INSERT OR REPLACE INTO embeddings (key, model, dim, vec, created_at) VALUES (?, ?, ?, ?, ?)",
+                        (key, model, len(vec), vec.tobytes(), time.time()),
+                    )
+                    self.stats["writes"] += 1
+                except Exception as e:
+                    print(f"⚠️ Embedding cache write failed: {e}")
+
+    def clear_memory(self):
+        with self._lock:
+            self._lru.clear()
+
+    def get_stats(self) -> dict:
+        with self._lock:
+            stats = dict(self.stats)
+            lookups = stats["hits"] + stats["disk_hits"] + stats["misses"]
+            stats["hit_rate"] = round((stats["hits"] + stats["disk_hits"]) / lookups, 4) if lookups else 0.0
+            stats["memory_entries"] = len(self._lru)
+            stats["max_entries"] = self.max_entries
+            stats["disk_path"] = self.path if self._db is not None else None
+            return stats
+
+    def close(self):
+        with self._lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
+
+
+__all__ = ["EmbeddingCache", "normalize_text", "make_cache_key"]
@@ -0,0 +1,198 @@
+"""
+🧬 Embedding Service - Shared Ollama Embedding Client
+One pooled HTTP client for every /api/embed call, plus a micro-batcher that
+merges concurrent requests arriving within a few milliseconds into a single
+batch request and hands each caller back its own vector.
+"""
+import asyncio
+import os
+from typing import Dict, List, Optional, Tuple
+
+import httpx
+
+from services.embedding_cache import EmbeddingCache, make_cache_key
+
+OLLAMA_URL = os.getenv("OLLAMA_URL", "http://localhost:11434")
+DEFAULT_EMBED_MODEL = "nomic-embed-text"
+
+# How long the batcher waits for more requests before sending a batch
+EMBED_BATCH_WINDOW_MS = float(os.getenv("EMBED_BATCH_WINDOW_MS", "5"))
+# Upper bound on texts per /api/embed request
+EMBED_MAX_BATCH = int(os.getenv("EMBED_MAX_BATCH", "64"))
+
+
+class EmbeddingService:
+    """
+    Process-wide embedding client.
+
+    Features:
+    - Persistent httpx connection pool (no TCP handshake per message)
+    - Micro-batching: concurrent embed() calls for the same model are
+      coalesced into one /api/embed request using the batch `input` form
+    - Content-addressed cache: text the process has already embedded is
+      answered from the LRU/SQLite cache, and concurrent requests for the
+      same text share one in-flight future
+    """
+
+    def __init__(
+        self,
+        base_url: str = OLLAMA_URL,
+        batch_window_ms: float = EMBED_BATCH_WINDOW_MS,
+        max_batch_size: int = EMBED_MAX_BATCH,
+        cache: Optional[EmbeddingCache] = None,
+    ):
+        self.base_url = base_url
+        self.batch_window = batch_window_ms / 1000.0
+        self.max_batch_size = max(1, max_batch_size)
+        self.cache = cache
+
+        self._client: Optional[httpx.AsyncClient] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._pending: Dict[str, List[Tuple[str, str, asyncio.Future]]] = {}
+        self._flush_handles: Dict[str, asyncio.TimerHandle] = {}
+        self._inflight: set = set()
+        self._by_key: Dict[str, asyncio.Future] = {}
+
+        self.stats = {"requests": 0, "batches": 0, "texts_sent": 0, "errors": 0}
+
+    # ---------------------------
+    # Connection management
+    # ---------------------------
+    def _ensure_loop(self) -> asyncio.AbstractEventLoop:
+        """Bind to the running loop; reset pooled state if the loop changed (e.g. asyncio.run in scripts)."""
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            self._loop = loop
+            self._client = None
+            self._pending = {}
+            self._flush_handles = {}
+            self._inflight = set()
+            self._by_key = {}
+        return loop
+
+    def _get_client(self) -> httpx.AsyncClient:
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(
+                base_url=self.base_url,
+                timeout=httpx.Timeout(30.0, connect=5.0),
+                limits=httpx.Limits(max_connections=8, max_keepalive_connections=8, keepalive_expiry=60.0),
+            )
+        return self._client
+
+    async def aclose(self):
+        """Flush anything queued and close the pooled client."""
+        if self._loop is not None and self._loop is asyncio.get_running_loop():
+            for model in list(self._pending.keys()):
+                self._flush(model)
+            if self._inflight:
+                await asyncio.gather(*self._inflight, return_exceptions=True)
+        if self._client is not None and not self._client.is_closed:
+            await self._client.aclose()
+        self._client = None
+
+    # ---------------------------
+    # Public API
+    # ---------------------------
+    async def embed(self, text: str, model: str = DEFAULT_EMBED_MODEL) -> Optional[List[float]]:
+        """Embed one text. Returns None if Ollama fails (same contract as the old helpers)."""
+        loop = self._ensure_loop()
+        self.stats["requests"] += 1
+        key = make_cache_key(model, text)
+
+        if self.cache is not None:
+            cached = self.cache.get_by_key(key)
+            if cached is not None:
+                return cached
+
+        # Same text already on its way to Ollama → share that request
+        future = self._by_key.get(key)
+        if future is not None:
+            return await asyncio.shield(future)
+
+        future = loop.create_future()
+        self._by_key[key] = future
+        queue = self._pending.setdefault(model, [])
+        queue.append((text, key, future))
+
+        if len(queue) >= self.max_batch_size:
+            self._flush(model)
+        elif model not in self._flush_handles:
+            self._flush_handles[model] = loop.call_later(self.batch_window, self._flush, model)
+
+        return await asyncio.shield(future)
+
+    async def embed_many(self, texts: List[str], model: str = DEFAULT_EMBED_MODEL) -> List[Optional[List[float]]]:
+        """Embed many texts; they are queued together so they go out as full batches."""
+        if not texts:
+            return []
+        return list(await asyncio.gather(*(self.embed(t, model) for t in texts)))
+
+    # ---------------------------
+    # Batching internals
+    # ---------------------------
+    def _flush(self, model: str):
+        handle = self._flush_handles.pop(model, None)
+        if handle is not None:
+            handle.cancel()
+
+        queue = self._pending.pop(model, [])
+        while queue:
+            batch, queue = queue[:self.max_batch_size], queue[self.max_batch_size:]
+            task = asyncio.ensure_future(self._send_batch(model, batch))
+            self._inflight.add(task)
+            task.add_done_callback(self._inflight.discard)
+
+    async def _send_batch(self, model: str, batch: List[Tuple[str, str, asyncio.Future]]):
+        # Keys are unique per batch (duplicates share a future in embed())
+        texts = [text for text, _, _ in batch]
+        embeddings: List[Optional[List[float]]] = [None] * len(texts)
+        try:
+            resp = await self._get_client().post(
+                "/api/embed",
+                json={"model": model, "input": texts},
+            )
+            resp.raise_for_status()
+            data = resp.json()
+            returned = data.get("embeddings") or []
+            if len(returned) != len(texts):
+                print(f"❌ Ollama returned {len(returned)} embeddings for {len(texts)} inputs")
+                self.stats["errors"] += 1
+            else:
+                embeddings = returned
+            self.stats["batches"] += 1
+            self.stats["texts_sent"] += len(texts)
+        except Exception as e:
+            self.stats["errors"] += 1
+            print(f"❌ Ollama embedding error: {e}")
+
+        for (text, key, future), embedding in zip(batch, embeddings):
+            if embedding and self.cache is not None:
+                self.cache.put_by_key(key, model, embedding)
+            if self._by_key.get(key) is future:
+                del self._by_key[key]
+            if not future.done():
+                future.set_result(embedding)
+
+    def get_stats(self) -> dict:
+        stats = dict(self.stats)
+        stats["avg_batch_size"] = round(stats["texts_sent"] / stats["batches"], 2) if stats["batches"] else 0.0
+        if self.cache is not None:
+            stats["cache"] = self.cache.get_stats()
+        return stats
+
+
+# Global instance
+embedding_service = EmbeddingService(cache=EmbeddingCache())
+
+
+async def embed_text(text: str, model: str = DEFAULT_EMBED_MODEL) -> Optional[List[float]]:
+    """Embed a single text through the shared service."""
+    return await embedding_service.embed(text, model)
+
+
+async def embed_texts(texts: List[str], model: str = DEFAULT_EMBED_MODEL) -> List[Optional[List[float]]]:
+    """Embed a list of texts through the shared service (batched)."""
+    return await embedding_service.embed_many(texts, model)
+
+
+__all__ = ["EmbeddingService", "embedding_service", "embed_text", "embed_texts", "DEFAULT_EMBED_MODEL"]
@@ -0,0 +1,709 @@
+"""
+🗂️ File Index - Persistent Trigram Filename Index for FileOps search
+FileOps.search_files used to os.walk "/", /Users and /Volumes (10 levels deep)
+on every query, which takes minutes on NAS-backed volumes. This index crawls
+the configured roots once (scandir fanned out over a thread pool), keeps every
+name with its parent directory, size and mtime in flat buffers, and answers
+substring / fuzzy name queries from a trigram posting list.
+
+- Storage: names and normalized search keys live in two byte blobs with offset
+  arrays; parent/size/mtime/kind in typed arrays; directories as a path table.
+  Removed entries are tombstoned until the next rebuild compacts them
+- Postings: sorted trigram codes -> CSR offsets -> entry ids (int32), built
+  vectorized from the key blob. Entries added since the last build form a
+  small delta that is scanned directly
+- Freshness: every FILE_INDEX_RESCAN_SECONDS each known directory is stat'ed
+  and only directories whose mtime moved are re-listed (mtime-diff rescan);
+  FileOps calls touch() after its own writes so those show up within a second
+- Persistence: arrays + postings saved to FILE_INDEX_DIR, so restarts load in
+  well under a second instead of re-crawling
+"""
+import array
+import asyncio
+import bisect
+import math
+import os
+import re
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+import numpy as np
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+FILE_INDEX_DIR = os.getenv("FILE_INDEX_DIR", os.path.join(BACKEND_DIR, ".cache", "file_index"))
+FILE_INDEX_RESCAN_SECONDS = float(os.getenv("FILE_INDEX_RESCAN_SECONDS", "900"))
+FILE_INDEX_WORKERS = int(os.getenv("FILE_INDEX_WORKERS", "8"))
+FILE_INDEX_MAX_DEPTH = int(os.getenv("FILE_INDEX_MAX_DEPTH", "10"))  # same depth limit the os.walk search used
+FILE_INDEX_DELTA_MAX = int(os.getenv("FILE_INDEX_DELTA_MAX", "20000"))  # unposted entries before a rebuild
+FILE_INDEX_MAX_CANDIDATES = 20000  # cap on the unranked paths only (short-token scans, fuzzy fallback)
+FILE_INDEX_FUZZY_MIN = 0.6  # share of query trigrams a fuzzy match must contain
+
+# Roots: os.pathsep-separated list; defaults to the user/volume roots search_files looked in
+DEFAULT_ROOTS = ["/Users", "/Volumes", os.path.expanduser("~"), "/media", "/mnt"]
+FILE_INDEX_EXCLUDE = {
+    name for name in os.getenv(
+        "FILE_INDEX_EXCLUDE",
+        ".git,node_modules,__pycache__,.Trash,.Trashes,.Spotlight-V100,.fseventsd,.DocumentRevisions-V100",
+    ).split(",") if name
+}
+
+_SEPARATORS = re.compile(r"[\s._\-]+")
+
+
+def normalize_name(name: str) -> str:
+    """Search key: lowercase, with runs of separators (space . _ -) folded to one space."""
+    return _SEPARATORS.sub(" ", name.lower()).strip()
+
+
+def _encode(text: str) -> bytes:
+    return text.encode("utf-8", "surrogateescape")
+
+
+def trigram_codes(data: bytes) -> np.ndarray:
+    """Unique 24-bit byte-trigram codes of `data`."""
+    if len(data) < 3:
+        return np.zeros(0, dtype=np.uint32)
+    b = np.frombuffer(data, dtype=np.uint8).astype(np.uint32)
+    return np.unique((b[:-2] << 16) | (b[1:-1] << 8) | b[2:])
+
+
+def configured_roots() -> List[str]:
+    env = os.getenv("FILE_INDEX_ROOTS")
+    candidates = env.split(os.pathsep) if env else DEFAULT_ROOTS
+    roots: List[str] = []
+    for path in candidates:
+        path = os.path.abspath(os.path.expanduser(path.strip())) if path.strip() else ""
+        if path and os.path.isdir(path) and path not in roots:
+            roots.append(path)
+    # Drop roots nested inside another root (~ under /Users)
+    return [r for r in roots if not any(r != o and r.startswith(o.rstrip("/") + "/") for o in roots)]
+
+
+def _list_dir(path: str) -> Tuple[float, List[Tuple[str, bool, int, float]]]:
+    """(dir mtime, [(name, is_dir, size, mtime)]) without following symlinks."""
+    dir_mtime = os.stat(path).st_mtime
+    listing = []
+    with os.scandir(path) as it:
+        for entry in it:
+            if entry.name in FILE_INDEX_EXCLUDE:
+                continue
+            try:
+                is_dir = entry.is_dir(follow_symlinks=False)
+                st = entry.stat(follow_symlinks=False)
+            except OSError:
+                continue
+            listing.append((entry.name, is_dir, 0 if is_dir else st.st_size, st.st_mtime))
+    return dir_mtime, listing
+
+
+def _dir_mtime(path: str) -> Optional[float]:
+    try:
+        return os.stat(path).st_mtime
+    except OSError:
+        return None
+
+
+class FileIndex:
+    """
+    Filename index over FILE_INDEX_ROOTS.
+
+    Entries (ids are append-only; compacted on rebuild):
+    - _name/_name_off: original names (fs-encoded bytes), offsets with sentinel
+    - _key/_key_off: normalize_name() bytes, each followed by b"\\0"
+    - _parent (dir id), _size, _mtime, _is_dir, _alive
+    Directories:
+    - _dirs (path), _dir_mtime, _dir_depth, _dir_entry (entry id, -1 for roots),
+      _dir_alive, _dir_children (entry ids)
+    Postings cover entry ids < _posted.
+    """
+
+    def __init__(self, directory: str = FILE_INDEX_DIR, roots: Optional[List[str]] = None):
+        self.directory = directory
+        self.roots = roots if roots is not None else configured_roots()
+        self._lock = threading.Lock()  # single writer (the runner); searches read under the lock
+        self._clear()
+        self._tri_keys = np.zeros(0, dtype=np.uint32)
+        self._tri_off = np.zeros(1, dtype=np.int64)
+        self._tri_ids = np.zeros(0, dtype=np.int32)
+        self._posted = 0
+        self.ready = False
+        self.dirty = False
+        self.built_at: Optional[float] = None
+        self.last_sync: Optional[float] = None
+        self._touched: Set[str] = set()
+        self._touch_event: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self.stats = {
+            "searches": 0, "search_ms_total": 0.0, "crawl_ms": None, "rebuild_ms": None,
+            "sync_ms": None, "synced_dirs": 0, "listed_dirs": 0, "touches": 0,
+        }
+
+    def _clear(self):
+        self._name = bytearray()
+        self._name_off = array.array("q", [0])
+        self._key = bytearray()
+        self._key_off = array.array("q", [0])
+        self._parent = array.array("i")
+        self._size = array.array("q")
+        self._mtime = array.array("d")
+        self._is_dir = bytearray()
+        self._alive = bytearray()
+        self._dead = 0
+        self._dirs: List[str] = []
+        self._dir_ids: Dict[str, int] = {}
+        self._dir_mtime = array.array("d")
+        self._dir_depth = array.array("i")
+        self._dir_entry = array.array("q")
+        self._dir_alive = bytearray()
+        self._dir_children: List[List[int]] = []
+        self._dir_of: Dict[int, int] = {}  # entry id -> dir id, for indexed subdirectories
+
+    # ---------------------------
+    # Entry / directory storage
+    # ---------------------------
+    def _entry_name(self, i: int) -> str:
+        return os.fsdecode(bytes(self._name[self._name_off[i]:self._name_off[i + 1]]))
+
+    def _entry_key(self, i: int) -> bytes:
+        return bytes(self._key[self._key_off[i]:self._key_off[i + 1] - 1])
+
+    def _entry_path(self, i: int) -> str:
+        return os.path.join(self._dirs[self._parent[i]], self._entry_name(i))
+
+    def _add_entry(self, name: str, parent: int, is_dir: bool, size: int, mtime: float) -> int:
+        i = len(self._parent)
+        self._name += os.fsencode(name)
+        self._name_off.append(len(self._name))
+        self._key += _encode(normalize_name(name)) + b"\0"
+        self._key_off.append(len(self._key))
+        self._parent.append(parent)
+        self._size.append(size)
+        self._mtime.append(mtime)
+        self._is_dir.append(1 if is_dir else 0)
+        self._alive.append(1)
+        return i
+
+    def _add_dir(self, path: str, depth: int, entry: int = -1) -> int:
+        d = len(self._dirs)
+        self._dirs.append(path)
+        self._dir_ids[path] = d
+        self._dir_mtime.append(-1.0)  # never listed
+        self._dir_depth.append(depth)
+        self._dir_entry.append(entry)
+        self._dir_alive.append(1)
+        self._dir_children.append([])
+        if entry >= 0:
+            self._dir_of[entry] = d
+        return d
+
+    def _remove_entry(self, i: int):
+        if not self._alive[i]:
+            return
+        self._alive[i] = 0
+        self._dead += 1
+        d = self._dir_of.pop(i, None)
+        if d is not None:
+            self._remove_dir(d)
+
+    def _remove_dir(self, d: int):
+        self._dir_alive[d] = 0
+        self._dir_ids.pop(self._dirs[d], None)
+        for child in self._dir_children[d]:
+            self._remove_entry(child)
+        self._dir_children[d] = []
+
+    def _apply_listing(self, d: int, dir_mtime: float, listing: List[Tuple[str, bool, int, float]]) -> List[int]:
+        """Diff a fresh listing of directory `d` into the index. Returns new subdirectories to crawl."""
+        old = {self._entry_name(i): i for i in self._dir_children[d]}
+        children, new_dirs = [], []
+        subdir_depth = self._dir_depth[d] + 1
+        for name, is_dir, size, mtime in listing:
+            i = old.pop(name, None)
+            if i is not None and bool(self._is_dir[i]) == is_dir:
+                if self._size[i] != size or self._mtime[i] != mtime:
+                    self._size[i] = size
+                    self._mtime[i] = mtime
+                children.append(i)
+                continue
+            if i is not None:
+                self._remove_entry(i)  # file <-> directory swap
+            i = self._add_entry(name, d, is_dir, size, mtime)
+            children.append(i)
+            if is_dir and subdir_depth <= FILE_INDEX_MAX_DEPTH:
+                new_dirs.append(self._add_dir(os.path.join(self._dirs[d], name), subdir_depth, entry=i))
+        for i in old.values():
+            self._remove_entry(i)
+        self._dir_children[d] = children
+        self._dir_mtime[d] = dir_mtime
+        self.dirty = True
+        return new_dirs
+
+    # ---------------------------
+    # Crawl / rescan
+    # ---------------------------
+    def _resolve_touched(self, paths: Iterable[str]) -> Set[int]:
+        """Known directories to re-list for changed paths: the path itself and its parent (or nearest indexed ancestor)."""
+        dirs: Set[int] = set()
+        for path in paths:
+            path = os.path.abspath(path)
+            if path in self._dir_ids:
+                dirs.add(self._dir_ids[path])
+            parent = os.path.dirname(path)
+            while parent not in self._dir_ids and parent != os.path.dirname(parent):
+                parent = os.path.dirname(parent)
+            if parent in self._dir_ids:
+                dirs.add(self._dir_ids[parent])
+        return dirs
+
+    def sync(self, full: bool = False, touched: Optional[Iterable[str]] = None) -> int:
+        """
+        Bring the index up to date (blocking; run in a thread).
+        - touched: re-list just the directories around these paths
+        - otherwise stat every known directory and re-list those whose mtime moved (all of them if full)
+        Returns the number of directories listed.
+        """
+        started = time.perf_counter()
+        listed = 0
+        with ThreadPoolExecutor(max_workers=FILE_INDEX_WORKERS, thread_name_prefix="file-index") as pool:
+            with self._lock:
+                for root in self.roots:
+                    if root not in self._dir_ids:
+                        self._add_dir(root, 0)
+                if touched is not None:
+                    to_list = sorted(self._resolve_touched(touched))
+                    checked = len(to_list)
+                else:
+                    to_list = [d for d in range(len(self._dirs)) if self._dir_alive[d]]
+                    checked = len(to_list)
+                paths = [self._dirs[d] for d in to_list]
+
+            if touched is None and not full:
+                # mtime-diff: only directories whose entry list changed get re-listed
+                mtimes = list(pool.map(_dir_mtime, paths, chunksize=256))
+                changed = []
+                with self._lock:
+                    for d, mtime in zip(to_list, mtimes):
+                        if not self._dir_alive[d]:
+                            continue
+                        if mtime is None and self._dir_entry[d] >= 0:
+                            self._remove_entry(self._dir_entry[d])
+                            self.dirty = True
+                        elif mtime is not None and mtime != self._dir_mtime[d]:
+                            changed.append(d)
+                to_list = changed
+
+            pending = {pool.submit(_list_dir, self._dirs[d]): d for d in to_list}
+            while pending:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    d = pending.pop(future)
+                    try:
+                        dir_mtime, listing = future.result()
+                    except FileNotFoundError:
+                        with self._lock:
+                            if self._dir_alive[d] and self._dir_entry[d] >= 0:
+                                self._remove_entry(self._dir_entry[d])
+                                self.dirty = True
+                        continue
+                    except OSError:
+                        continue  # unreadable: keep whatever we had
+                    listed += 1
+                    with self._lock:
+                        if not self._dir_alive[d]:
+                            continue
+                        new_dirs = self._apply_listing(d, dir_mtime, listing)
+                    for nd in new_dirs:
+                        pending[pool.submit(_list_dir, self._dirs[nd])] = nd
+
+        self.last_sync = time.time()
+        self.stats["sync_ms"] = round((time.perf_counter() - started) * 1000, 1)
+        self.stats["synced_dirs"] = checked
+        self.stats["listed_dirs"] = listed
+        if full:
+            self.stats["crawl_ms"] = self.stats["sync_ms"]
+        return listed
+
+    # ---------------------------
+    # Rebuild (compaction + postings)
+    # ---------------------------
+    def _export(self) -> Dict[str, np.ndarray]:
+        """Live entries/directories as compact numpy arrays (ids renumbered)."""
+        n = len(self._parent)
+        alive = np.frombuffer(bytes(self._alive), dtype=np.uint8).astype(bool)
+        keep = np.flatnonzero(alive)
+        remap = np.full(n + 1, -1, dtype=np.int64)  # remap[-1] stays -1 for roots
+        remap[keep] = np.arange(len(keep))
+
+        dir_alive = np.frombuffer(bytes(self._dir_alive), dtype=np.uint8).astype(bool)
+        dir_keep = np.flatnonzero(dir_alive)
+        dir_remap = np.full(len(self._dirs), -1, dtype=np.int64)
+        dir_remap[dir_keep] = np.arange(len(dir_keep))
+
+        def blob(data: bytearray, offsets: array.array):
+            off = np.array(offsets, dtype=np.int64)
+            lengths = np.diff(off)
+            values = np.frombuffer(bytes(data), dtype=np.uint8)[np.repeat(alive, lengths)]
+            return values, np.concatenate([[0], np.cumsum(lengths[keep])]).astype(np.int64)
+
+        name, name_off = blob(self._name, self._name_off)
+        key, key_off = blob(self._key, self._key_off)
+        return {
+            "name": name,
+            "name_off": name_off,
+            "key": key,
+            "key_off": key_off,
+            "parent": dir_remap[np.array(self._parent, dtype=np.int64)[keep]].astype(np.int32),
+            "size": np.array(self._size, dtype=np.int64)[keep],
+            "mtime": np.array(self._mtime, dtype=np.float64)[keep],
+            "is_dir": np.frombuffer(bytes(self._is_dir), dtype=np.uint8)[keep],
+            "dirs": np.frombuffer(b"\0".join(os.fsencode(self._dirs[d]) for d in dir_keep), dtype=np.uint8),
+            "dir_mtime": np.array(self._dir_mtime, dtype=np.float64)[dir_keep],
+            "dir_depth": np.array(self._dir_depth, dtype=np.int32)[dir_keep],
+            "dir_entry": remap[np.array(self._dir_entry, dtype=np.int64)[dir_keep]],
+        }
+
+    def _import(self, arrays: Dict[str, np.ndarray]):
+        """Replace the Python-side storage with exported arrays."""
+        self._clear()
+        self._name = bytearray(arrays["name"].tobytes())
+        self._name_off = array.array("q", arrays["name_off"].astype(np.int64).tobytes())
+        self._key = bytearray(arrays["key"].tobytes())
+        self._key_off = array.array("q", arrays["key_off"].astype(np.int64).tobytes())
+        parent = arrays["parent"].astype(np.int32)
+        self._parent = array.array("i", parent.tobytes())
+        self._size = array.array("q", arrays["size"].astype(np.int64).tobytes())
+        self._mtime = array.array("d", arrays["mtime"].astype(np.float64).tobytes())
+        self._is_dir = bytearray(arrays["is_dir"].astype(np.uint8).tobytes())
+        self._alive = bytearray(b"\1" * len(parent))
+
+        raw_dirs = arrays["dirs"].tobytes()
+        self._dirs = [os.fsdecode(p) for p in raw_dirs.split(b"\0")] if len(arrays["dir_mtime"]) else []
+        self._dir_ids = {path: d for d, path in enumerate(self._dirs)}
+        self._dir_mtime = array.array("d", arrays["dir_mtime"].astype(np.float64).tobytes())
+        self._dir_depth = array.array("i", arrays["dir_depth"].astype(np.int32).tobytes())
+        dir_entry = arrays["dir_entry"].astype(np.int64)
+        self._dir_entry = array.array("q", dir_entry.tobytes())
+        self._dir_alive = bytearray(b"\1" * len(self._dirs))
+        self._dir_of = {int(e): d for d, e in enumerate(dir_entry.tolist()) if e >= 0}
+
+        order = np.argsort(parent, kind="stable")
+        bounds = np.searchsorted(parent[order], np.arange(len(self._dirs) + 1))
+        ids = order.tolist()
+        self._dir_children = [ids[bounds[d]:bounds[d + 1]] for d in range(len(self._dirs))]
+
+    @staticmethod
+    def _build_postings(key: np.ndarray, key_off: np.ndarray, chunk: int = 200_000):
+        """CSR postings (trigram codes, offsets, entry ids) over a key blob; trigrams never span the \\0 terminators."""
+        n = len(key_off) - 1
+        keys_parts, ids_parts = [], []
+        for lo in range(0, n, chunk):
+            hi = min(n, lo + chunk)
+            b = key[key_off[lo]:key_off[hi]].astype(np.uint32)
+            if len(b) < 3:
+                continue
+            codes = (b[:-2] << 16) | (b[1:-1] << 8) | b[2:]
+            pos = np.flatnonzero((b[:-2] != 0) & (b[1:-1] != 0) & (b[2:] != 0))
+            ids = np.searchsorted(key_off[lo:hi + 1] - key_off[lo], pos, side="right") - 1 + lo
+            # sort + adjacent dedupe (np.unique's hash path is far slower on large uint64 arrays)
+            pairs = np.sort((codes[pos].astype(np.uint64) << np.uint64(32)) | ids.astype(np.uint64))
+            pairs = pairs[np.concatenate(([True], pairs[1:] != pairs[:-1]))]
+            keys_parts.append((pairs >> np.uint64(32)).astype(np.uint32))
+            ids_parts.append((pairs & np.uint64(0xFFFFFFFF)).astype(np.int32))
+        if not keys_parts:
+            return np.zeros(0, dtype=np.uint32), np.zeros(1, dtype=np.int64), np.zeros(0, dtype=np.int32)
+        keys = np.concatenate(keys_parts)
+        ids = np.concatenate(ids_parts)
+        order = np.argsort(keys, kind="stable")  # chunks are in id order, so ids stay sorted per trigram
+        keys, ids = keys[order], ids[order]
+        starts = np.flatnonzero(np.concatenate(([True], keys[1:] != keys[:-1])))
+        return keys[starts], np.append(starts, len(keys)).astype(np.int64), ids
+
+    def rebuild(self, save: bool = True):
+        """Compact tombstones and re-post every entry; searches keep using the old copy until the swap."""
+        started = time.perf_counter()
+        with self._lock:
+            arrays = self._export()
+        postings = self._build_postings(arrays["key"], arrays["key_off"])
+        with self._lock:
+            self._import(arrays)
+            self._tri_keys, self._tri_off, self._tri_ids = postings
+            self._posted = len(self._parent)
+        self.stats["rebuild_ms"] = round((time.perf_counter() - started) * 1000, 1)
+        self.built_at = time.time()
+        if save:
+            self.save(arrays)
+        self.dirty = False
+
+    # ---------------------------
+    # Persistence
+    # ---------------------------
+    @property
+    def _path(self) -> str:
+        return os.path.join(self.directory, "file_index.npz")
+
+    def save(self, arrays: Optional[Dict[str, np.ndarray]] = None):
+        if arrays is None:
+            with self._lock:
+                arrays = self._export()
+        os.makedirs(self.directory, exist_ok=True)
+        tmp = self._path + ".tmp.npz"
+        np.savez(
+            tmp,
+            tri_keys=self._tri_keys, tri_off=self._tri_off, tri_ids=self._tri_ids,
+            roots=np.frombuffer(b"\0".join(os.fsencode(r) for r in self.roots), dtype=np.uint8),
+            meta=np.array([self.built_at or 0.0, self.last_sync or 0.0]),
+            **arrays,
+        )
+        os.replace(tmp, self._path)
+
+    def load(self) -> bool:
+        """Load the saved index. Returns False if nothing usable is on disk (or the roots changed)."""
+        try:
+            with np.load(self._path, allow_pickle=False) as data:
+                arrays = {name: data[name] for name in data.files}
+        except FileNotFoundError:
+            return False
+        except Exception as e:
+            print(f"⚠️ Failed to load file index: {e}")
+            return False
+        saved_roots = [os.fsdecode(r) for r in arrays.pop("roots").tobytes().split(b"\0") if r]
+        if saved_roots != self.roots:
+            print("🗂️ File index roots changed, re-crawling")
+            return False
+        built_at, last_sync = arrays.pop("meta").tolist()
+        postings = arrays.pop("tri_keys"), arrays.pop("tri_off"), arrays.pop("tri_ids")
+        with self._lock:
+            self._import(arrays)
+            self._tri_keys, self._tri_off, self._tri_ids = postings
+            self._posted = len(self._parent)
+        self.built_at, self.last_sync = built_at or None, last_sync or None
+        self.ready = True
+        print(f"🗂️ File index loaded: {len(self._parent)} entries in {len(self._dirs)} directories")
+        return True
+
+    # ---------------------------
+    # Search
+    # ---------------------------
+    def covers(self, path: str) -> bool:
+        """True if `path` lies under one of the indexed roots."""
+        path = os.path.abspath(path)
+        return any(path == r or path.startswith(r.rstrip("/") + "/") for r in self.roots)
+
+    def _postings(self, code: int) -> np.ndarray:
+        i = np.searchsorted(self._tri_keys, code)
+        if i < len(self._tri_keys) and self._tri_keys[i] == code:
+            return self._tri_ids[self._tri_off[i]:self._tri_off[i + 1]]
+        return self._tri_ids[:0]
+
+    def _scope_dirs(self, roots: List[str]) -> Optional[np.ndarray]:
+        """Bool mask over directory ids under one of `roots` (None = no scope)."""
+        if not roots:
+            return None
+        prefixes = tuple(r.rstrip("/") + "/" for r in roots)
+        return np.fromiter(
+            (path.startswith(prefixes) or path in roots for path in self._dirs), dtype=bool, count=len(self._dirs)
+        )
+
+    def _keep(self, ids: np.ndarray, scope: Optional[np.ndarray]) -> np.ndarray:
+        """Live ids whose parent directory is in scope (vectorized over the whole candidate set)."""
+        ids = np.asarray(ids, dtype=np.int64)
+        if not len(ids):
+            return ids
+        keep = np.frombuffer(self._alive, dtype=np.uint8)[ids].astype(bool)
+        if scope is not None:
+            keep &= scope[np.frombuffer(self._parent, dtype=np.int32)[ids]]
+        return ids[keep]
+
+    def _scan_ids(self, needle: bytes, lo: int, hi: int, limit: int, scope: Optional[np.ndarray] = None) -> List[int]:
+        """Live in-scope entries in [lo, hi) whose key contains `needle`, by scanning the key blob."""
+        found: List[int] = []
+        offsets = self._key_off
+        pos, end = offsets[lo], offsets[hi]
+        while len(found) < limit:
+            pos = self._key.find(needle, pos, end)
+            if pos < 0:
+                break
+            i = bisect.bisect_right(offsets, pos) - 1
+            if self._alive[i] and (scope is None or scope[self._parent[i]]):
+                found.append(i)
+            pos = offsets[i + 1]
+        return found
+
+    def _substring_candidates(self, tokens: List[bytes], scope: Optional[np.ndarray] = None) -> np.ndarray:
+        """
+        Live in-scope ids whose key may contain every token (trigram intersection over
+        posted ids + the unposted delta). Uncapped unless every token is too short for
+        trigrams, where the key blob is scanned for up to FILE_INDEX_MAX_CANDIDATES hits.
+        """
+        n = len(self._parent)
+        longest = max(tokens, key=len)
+        if len(longest) < 3:
+            return np.array(self._scan_ids(longest, 0, n, FILE_INDEX_MAX_CANDIDATES, scope), dtype=np.int64)
+        codes = np.unique(np.concatenate([trigram_codes(t) for t in tokens if len(t) >= 3]))
+        lists = sorted((self._postings(int(c)) for c in codes), key=len)
+        candidates = lists[0]
+        for ids in lists[1:]:
+            if not len(candidates):
+                break
+            candidates = np.intersect1d(candidates, ids, assume_unique=True)
+        delta = self._scan_ids(longest, self._posted, n, n, scope)
+        return np.concatenate([self._keep(candidates, scope), np.array(delta, dtype=np.int64)])
+
+    def _fuzzy_candidates(self, query_key: bytes, scope: Optional[np.ndarray] = None) -> List[Tuple[int, float]]:
+        """(id, share of query trigrams present) for live in-scope ids sharing at least FILE_INDEX_FUZZY_MIN of them."""
+        codes = trigram_codes(query_key)
+        if not len(codes):
+            return []
+        need = max(1, math.ceil(FILE_INDEX_FUZZY_MIN * len(codes)))
+        found: List[Tuple[int, float]] = []
+        lists = [self._postings(int(c)) for c in codes]
+        hits = np.concatenate(lists) if lists else np.zeros(0, dtype=np.int32)
+        if len(hits):
+            counts = np.bincount(hits)
+            ids = self._keep(np.flatnonzero(counts >= need), scope)
+            found.extend(zip(ids.tolist(), (counts[ids] / len(codes)).tolist()))
+        wanted = set(codes.tolist())
+        for i in range(self._posted, len(self._parent)):
+            if not self._alive[i] or (scope is not None and not scope[self._parent[i]]):
+                continue
+            shared = len(wanted.intersection(trigram_codes(self._entry_key(i)).tolist()))
+            if shared >= need:
+                found.append((i, shared / len(codes)))
+        found.sort(key=lambda item: -item[1])
+        return found[:FILE_INDEX_MAX_CANDIDATES]
+
+    def search(
+        self,
+        query: str,
+        limit: int = 50,
+        prefixes: Optional[List[str]] = None,
+        fuzzy: bool = True,
+        prefer: Optional[str] = None,
+    ) -> List[Dict[str, Any]]:
+        """
+        Entries whose name contains every word of `query` (separators ignored), best `limit` first.
+        Falls back to trigram-similarity (typo-tolerant) matches when there are fewer than `limit`.
+        prefixes: restrict to paths under these directories; prefer: "file" / "directory" ranking nudge.
+        """
+        from services.file_rank import file_ranker
+
+        started = time.perf_counter()
+        query_key = normalize_name(query)
+        tokens = [_encode(t) for t in query_key.split()]
+        if not tokens:
+            return []
+        query_bytes = _encode(query_key)
+        roots = [p.rstrip("/") or "/" for p in prefixes or []]
+
+        def candidates(ids: Iterable[int]):
+            for i in ids:
+                key = self._entry_key(i).decode("utf-8", "surrogateescape")
+                yield self._entry_name(i), self._entry_path(i), bool(self._is_dir[i]), self._mtime[i], i, key
+
+        with self._lock:
+            # Scope and liveness are applied to the full candidate set; only the ranker cuts it to `limit`
+            scope = self._scope_dirs(roots)
+            ids = [i for i in self._substring_candidates(tokens, scope).tolist() if all(t in self._entry_key(i) for t in tokens)]
+            if fuzzy and len(ids) < limit:
+                seen = set(ids)
+                ids += [i for i, _ in self._fuzzy_candidates(query_bytes, scope) if i not in seen]
+            ranked = []
+            for score, i in file_ranker.top_k(query_key, candidates(ids), k=limit, prefer=prefer):
+                is_dir = bool(self._is_dir[i])
+                ranked.append({
+                    "name": self._entry_name(i),
+                    "path": self._entry_path(i),
+                    "type": "directory" if is_dir else "file",
+                    "size": None if is_dir else self._size[i],
+                    "modified": self._mtime[i],
+                    "score": score,
+                })
+
+        self.stats["searches"] += 1
+        self.stats["search_ms_total"] += (time.perf_counter() - started) * 1000
+        return ranked
+
+    # ---------------------------
+    # Background maintenance
+    # ---------------------------
+    def touch(self, *paths: str):
+        """Note that paths were created/removed/renamed, so their directories get re-listed shortly."""
+        if self._touch_event is None:
+            return
+        self._touched.update(p for p in paths if p)
+        self.stats["touches"] += 1
+        self._touch_event.set()
+
+    async def _run(self):
+        if not await asyncio.to_thread(self.load):
+            try:
+                await asyncio.to_thread(self.sync, True)
+                await asyncio.to_thread(self.rebuild)
+                self.ready = True
+                print(f"🗂️ File index built: {len(self._parent)} entries in {self.stats['crawl_ms']}ms")
+            except Exception as e:
+                print(f"⚠️ File index initial crawl failed (search falls back to walking): {e}")
+        else:
+            self._touch_event.set()  # catch up on what changed while we were down
+            self._touched.clear()
+        while True:
+            touched: Set[str] = set()
+            try:
+                await asyncio.wait_for(self._touch_event.wait(), timeout=FILE_INDEX_RESCAN_SECONDS)
+                await asyncio.sleep(0.5)  # let a burst of FileOps writes settle
+                touched, self._touched = self._touched, set()
+            except asyncio.TimeoutError:
+                pass
+            self._touch_event.clear()
+            # No touched paths (timer, or the post-load catch-up) means a full mtime-diff rescan
+            rescan = not touched
+            try:
+                await asyncio.to_thread(self.sync, not self.ready, None if rescan else touched)
+                unposted = len(self._parent) - self._posted
+                if not self.ready or (self.dirty and (rescan or unposted > FILE_INDEX_DELTA_MAX)):
+                    await asyncio.to_thread(self.rebuild)
+                    self.ready = True
+            except Exception as e:
+                print(f"⚠️ File index sync failed: {e}")
+
+    def start(self):
+        """Load from disk (or crawl) and keep the index fresh in the background (call from app startup)."""
+        if self._task is None or self._task.done():
+            self._touch_event = asyncio.Event()
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    def get_stats(self) -> dict:
+        searches = self.stats["searches"]
+        entries = len(self._parent)
+        nbytes = (
+            len(self._name) + len(self._key) + len(self._is_dir) + len(self._alive)
+            + self._name_off.itemsize * len(self._name_off) + self._key_off.itemsize * len(self._key_off)
+            + self._parent.itemsize * entries + self._size.itemsize * entries + self._mtime.itemsize * entries
+            + self._tri_keys.nbytes + self._tri_off.nbytes + self._tri_ids.nbytes
+        )
+        return {
+            "ready": self.ready,
+            "roots": self.roots,
+            "entries": entries - self._dead,
+            "tombstones": self._dead,
+            "directories": sum(self._dir_alive),
+            "unposted": entries - self._posted,
+            "trigrams": len(self._tri_keys),
+            "postings": len(self._tri_ids),
+            "bytes": nbytes,
+            "built_at": self.built_at,
+            "last_sync": self.last_sync,
+            "staleness_s": round(time.time() - self.last_sync, 1) if self.last_sync else None,
+            "pending_touches": len(self._touched),
+            "searches": searches,
+            "avg_search_ms": round(self.stats["search_ms_total"] / searches, 3) if searches else 0.0,
+            **{k: v for k, v in self.stats.items() if k not in ("searches", "search_ms_total")},
+        }
+
+
+# Global instance
+file_index = FileIndex()
+
+__all__ = ["FileIndex", "file_index", "normalize_name", "trigram_codes", "configured_roots"]
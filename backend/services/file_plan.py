@@ -0,0 +1,355 @@
+"""
+🗂️ File Plan - Batch Rename/Move Planning with Dry Run
+bulk_rename and organize_files handled one file at a time: an exists() check
+per destination, collisions decided inline, and whatever order the loop ran in.
+A rename sequence that reuses its own names (S02E01→S02E02, S02E02→S02E03, ...)
+either overwrote a file or skipped it depending on that order. FilePlanner
+works out the whole operation in memory before touching anything:
+
+- one os.scandir per involved directory instead of a stat per file
+- a destination is taken if a file that stays put, or an earlier entry of the
+  plan, holds it; a file that is itself moving away frees its name
+- collisions are skipped, renamed ("name_1.ext", like upload_file) or
+  overwritten, per on_conflict
+- renames that wait on each other become chains (run from the free end) and
+  cycles (a→b, b→a: one member is parked under a temporary name first); a
+  cycle that fails part-way is rolled back, and a file still parked after a
+  failed rollback is reported as "parked" on its op
+- missing destination directories are created parents-first
+
+FilePlan.preview() is the dry run. execute_plan() creates directories, runs
+the chains on a thread pool grouped by source directory, hands cross-device
+moves to the transfer engine, and returns one summary.
+"""
+import asyncio
+import os
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Sequence, Set, Tuple
+
+PLAN_WORKERS = int(os.getenv("FILE_PLAN_WORKERS", "8"))
+CONFLICT_POLICIES = ("skip", "rename", "overwrite")
+PARK_PREFIX = ".glowplan-"
+
+
+class PlanOp:
+    """One requested source → destination, as resolved by the planner."""
+
+    __slots__ = ("source", "destination", "requested", "status", "reason", "cross_device", "parked")
+
+    def __init__(self, source: str, destination: str):
+        self.source = source
+        self.destination = destination
+        self.requested = destination
+        self.status = "planned"  # planned / skipped / done / failed
+        self.reason: Optional[str] = None
+        self.cross_device = False
+        self.parked: Optional[str] = None  # temporary name the file was left under if a cycle couldn't be undone
+
+    def as_dict(self) -> dict:
+        entry = {"source": self.source, "destination": self.destination, "status": self.status}
+        if self.destination != self.requested:
+            entry["requested"] = self.requested
+        if self.reason:
+            entry["reason"] = self.reason
+        if self.cross_device:
+            entry["cross_device"] = True
+        if self.parked:
+            entry["parked"] = self.parked
+        return entry
+
+
+# (source, destination, op, final): final is False for the step parking a cycle member
+Step = Tuple[str, str, PlanOp, bool]
+
+
+class FilePlan:
+    """A complete, ordered rename/move plan."""
+
+    def __init__(self, ops: List[PlanOp], on_conflict: str):
+        self.ops = ops
+        self.on_conflict = on_conflict
+        self.created_dirs: List[str] = []
+        # Renames that must run in order; independent of every other chain
+        self.chains: List[List[Step]] = []
+        self.transfers: List[PlanOp] = []  # cross-device moves, run by the transfer engine
+        self.cycles = 0
+        self.conflicts: List[dict] = []
+        self.plan_ms = 0.0
+
+    @property
+    def planned(self) -> List[PlanOp]:
+        return [op for op in self.ops if op.status != "skipped"]
+
+    def groups(self) -> Dict[str, List[int]]:
+        """Chain indexes keyed by the source directory of their first rename."""
+        groups: Dict[str, List[int]] = {}
+        for i, chain in enumerate(self.chains):
+            groups.setdefault(os.path.dirname(chain[0][0]), []).append(i)
+        return groups
+
+    def preview(self) -> dict:
+        """Dry-run view of the plan: nothing has been touched."""
+        return {
+            "dry_run": True,
+            "on_conflict": self.on_conflict,
+            "planned": len(self.planned),
+            "skipped": [op.as_dict() for op in self.ops if op.status == "skipped"],
+            "conflicts": self.conflicts,
+            "created_dirs": self.created_dirs,
+            "chains": len(self.chains),
+            "cycles": self.cycles,
+            "groups": len(self.groups()),
+            "cross_device": len(self.transfers),
+            "operations": [op.as_dict() for op in self.ops if op.status != "skipped"],
+            "plan_ms": self.plan_ms,
+        }
+
+
+class FilePlanner:
+    """Builds FilePlans from (source, destination) pairs against one snapshot of the involved directories."""
+
+    def __init__(self):
+        self._listings: Dict[str, Optional[Dict[str, bool]]] = {}  # dir -> {name: is_dir}, None if missing
+        self._devices: Dict[str, int] = {}
+
+    def _listing(self, directory: str) -> Optional[Dict[str, bool]]:
+        if directory not in self._listings:
+            try:
+                with os.scandir(directory) as it:
+                    self._listings[directory] = {e.name: e.is_dir(follow_symlinks=False) for e in it}
+            except OSError:
+                self._listings[directory] = None
+        return self._listings[directory]
+
+    def _exists(self, path: str) -> bool:
+        listing = self._listing(os.path.dirname(path))
+        return listing is not None and os.path.basename(path) in listing
+
+    def _device(self, directory: str) -> int:
+        """st_dev of a directory, or of its nearest existing ancestor."""
+        if directory not in self._devices:
+            try:
+                self._devices[directory] = os.stat(directory).st_dev
+            except OSError:
+                parent = os.path.dirname(directory)
+                self._devices[directory] = -1 if parent == directory else self._device(parent)
+        return self._devices[directory]
+
+    @staticmethod
+    def _numbered(path: str, n: int) -> str:
+        base, ext = os.path.splitext(path)
+        return f"{base}_{n}{ext}"
+
+    def plan(
+        self,
+        pairs: Sequence[Tuple[str, str]],
+        on_conflict: str = "skip",
+        create_dirs: bool = True,
+    ) -> FilePlan:
+        if on_conflict not in CONFLICT_POLICIES:
+            raise ValueError(f"on_conflict must be one of {', '.join(CONFLICT_POLICIES)}")
+        started = time.perf_counter()
+        ops = [PlanOp(os.path.abspath(s), os.path.abspath(d)) for s, d in pairs]
+        plan = FilePlan(ops, on_conflict)
+
+        # Requests that can't run no matter what else happens
+        seen: Set[str] = set()
+        for op in ops:
+            if op.source in seen:
+                op.status, op.reason = "skipped", "duplicate source"
+            elif not self._exists(op.source):
+                op.status, op.reason = "skipped", "source not found"
+            elif op.source == op.destination:
+                op.status, op.reason = "skipped", "unchanged"
+            elif op.destination.startswith(op.source + os.sep):
+                op.status, op.reason = "skipped", "destination is inside the source"
+            elif not create_dirs and self._listing(os.path.dirname(op.destination)) is None:
+                op.status, op.reason = "skipped", "destination directory does not exist"
+            seen.add(op.source)
+
+        # Destinations, given which sources actually leave. A skipped op keeps its
+        # source in place, which can take a name an earlier op was counting on:
+        # repeat until no skip frees up less than assumed.
+        staying: Set[str] = set()
+        while True:
+            vacated = {op.source for op in ops if op.status != "skipped" or op.reason == "conflict"} - staying
+            claimed: Set[str] = set()
+            conflicts: List[dict] = []
+            newly_staying: Set[str] = set()
+            for op in ops:
+                if op.status == "skipped" and op.reason != "conflict":
+                    continue
+                op.status, op.reason, op.destination = "planned", None, op.requested
+                held_by_plan = op.destination in claimed
+                if held_by_plan or (self._exists(op.destination) and op.destination not in vacated):
+                    if on_conflict == "rename":
+                        n = 1
+                        while self._taken(self._numbered(op.requested, n), claimed, vacated):
+                            n += 1
+                        op.destination = self._numbered(op.requested, n)
+                        conflicts.append({"source": op.source, "destination": op.requested, "resolved_to": op.destination})
+                    elif on_conflict == "overwrite" and not held_by_plan:
+                        conflicts.append({"source": op.source, "destination": op.requested, "resolved_to": "overwrite"})
+                    else:
+                        op.status, op.reason = "skipped", "conflict"
+                        conflicts.append({"source": op.source, "destination": op.requested, "resolved_to": "skip"})
+                        if op.source in vacated:
+                            newly_staying.add(op.source)
+                        continue
+                claimed.add(op.destination)
+            if not newly_staying - staying:
+                break
+            staying |= newly_staying
+        plan.conflicts = conflicts
+
+        self._order(plan)
+        plan.created_dirs = sorted({
+            d for d in (os.path.dirname(op.destination) for op in plan.planned) if self._listing(d) is None
+        })
+        plan.plan_ms = round((time.perf_counter() - started) * 1000, 1)
+        return plan
+
+    def _taken(self, path: str, claimed: Set[str], vacated: Set[str]) -> bool:
+        return path in claimed or (self._exists(path) and path not in vacated)
+
+    def _order(self, plan: FilePlan):
+        """Turn planned ops into independent chains (and split off cross-device moves)."""
+        planned = plan.planned
+        by_source = {op.source: op for op in planned}
+        waiter: Dict[str, PlanOp] = {}  # path -> op whose destination is that (currently occupied) path
+        for op in planned:
+            if op.destination in by_source:
+                waiter[op.destination] = op
+        done: Set[int] = set()
+
+        def follow(op: Optional[PlanOp], chain: List[Step], stop: Optional[PlanOp] = None):
+            while op is not None and op is not stop:
+                chain.append((op.source, op.destination, op, True))
+                done.add(id(op))
+                op = waiter.get(op.source)
+
+        for op in planned:
+            if op.destination not in by_source:
+                chain: List[Step] = []
+                follow(op, chain)
+                plan.chains.append(chain)
+        for op in planned:
+            if id(op) in done:
+                continue
+            # A cycle: park this op's source, run the rest from the freed name, then finish it
+            plan.cycles += 1
+            park = os.path.join(os.path.dirname(op.source), f"{PARK_PREFIX}{uuid.uuid4().hex[:8]}-{os.path.basename(op.source)}")
+            chain = [(op.source, park, op, False)]
+            done.add(id(op))
+            follow(waiter[op.source], chain, stop=op)
+            chain.append((park, op.destination, op, True))
+            plan.chains.append(chain)
+
+        # Cross-device moves can't be renames; only lone ones (nothing waiting on them) are allowed
+        kept = []
+        for chain in plan.chains:
+            members = [step[2] for step in chain if step[3]]
+            if all(self._device(os.path.dirname(op.source)) == self._device(os.path.dirname(op.destination)) for op in members):
+                kept.append(chain)
+            elif len(members) == 1:
+                members[0].cross_device = True
+                plan.transfers.append(members[0])
+            else:
+                for op in members:
+                    op.status, op.reason = "skipped", "cross-device move inside a rename chain"
+        plan.chains = kept
+
+
+def plan_operations(pairs: Sequence[Tuple[str, str]], on_conflict: str = "skip", create_dirs: bool = True) -> FilePlan:
+    """Blocking: plan renames/moves of `pairs` (run in a thread for large batches)."""
+    return FilePlanner().plan(pairs, on_conflict=on_conflict, create_dirs=create_dirs)
+
+
+def _undo_cycle(chain: List[Step], failed: int, cause: PlanOp):
+    """Reverse the steps of a cycle that ran before `failed`, so no file is left parked.
+
+    If an undo fails too, the rest stay where they are and the parked path is reported on its op.
+    """
+    for source, destination, op, final in reversed(chain[:failed]):
+        try:
+            os.rename(destination, source)
+        except OSError as e:
+            parked_op = chain[0][2]
+            parked_op.status, parked_op.parked = "failed", chain[0][1]
+            parked_op.reason = f"left at {chain[0][1]}: rollback failed ({e})"
+            if op is not parked_op:
+                op.status, op.reason = "failed", f"left at {destination}: rollback failed ({e})"
+            return
+        if final:
+            op.status, op.reason = "failed", f"rolled back: {cause.source} failed"
+
+
+def _run_chain(chain: List[Step]):
+    """Run one chain in order; a failed step stops everything after it (those steps depend on it).
+
+    A cycle is all or nothing: if any member fails, the members already renamed are moved back.
+    """
+    cycle = not chain[0][3]
+    for i, (source, destination, op, final) in enumerate(chain):
+        try:
+            os.rename(source, destination)
+        except OSError as e:
+            op.status, op.reason = "failed", str(e)
+            for _, _, later, _ in chain[i + 1:]:
+                if later.status == "planned":
+                    later.status, later.reason = "failed", f"not run: {op.source} failed"
+            if cycle and i:
+                _undo_cycle(chain, i, op)
+            return
+        if final:
+            op.status = "done"
+
+
+def _run_renames(plan: FilePlan, workers: int):
+    for directory in plan.created_dirs:
+        os.makedirs(directory, exist_ok=True)
+    groups = list(plan.groups().values())
+    if len(groups) <= 1 or workers <= 1:
+        for indexes in groups:
+            for i in indexes:
+                _run_chain(plan.chains[i])
+        return
+    with ThreadPoolExecutor(max_workers=min(workers, len(groups)), thread_name_prefix="file-plan") as pool:
+        list(pool.map(lambda indexes: [_run_chain(plan.chains[i]) for i in indexes], groups))
+
+
+async def execute_plan(plan: FilePlan, workers: int = PLAN_WORKERS, task_id: Optional[str] = None) -> dict:
+    """Run a plan and summarize it: renames in parallel per source directory, then cross-device moves."""
+    started = time.perf_counter()
+    await asyncio.to_thread(_run_renames, plan, workers)
+    if plan.transfers:
+        from services.file_transfer import file_transfers
+        result = await file_transfers.run(
+            "move", [(op.source, op.destination) for op in plan.transfers],
+            task_id=task_id, label=f"move {len(plan.transfers)} file(s) across devices",
+        )
+        for op, item in zip(plan.transfers, result["items"]):
+            op.status, op.reason = ("done", None) if item["status"] == "done" else ("failed", item["error"] or item["status"])
+    ops = plan.ops
+    return {
+        "success": not any(op.status == "failed" for op in ops),
+        "dry_run": False,
+        "planned": len(plan.planned),
+        "done": sum(1 for op in ops if op.status == "done"),
+        "renamed": sum(1 for op in ops if op.status == "done" and not op.cross_device),
+        "moved_cross_device": sum(1 for op in plan.transfers if op.status == "done"),
+        "failed": [op.as_dict() for op in ops if op.status == "failed"],
+        "skipped": [op.as_dict() for op in ops if op.status == "skipped"],
+        "conflicts": plan.conflicts,
+        "created_dirs": plan.created_dirs,
+        "chains": len(plan.chains),
+        "cycles": plan.cycles,
+        "operations": [op.as_dict() for op in ops if op.status != "skipped"],
+        "plan_ms": plan.plan_ms,
+        "execute_ms": round((time.perf_counter() - started) * 1000, 1),
+    }
+
+
+__all__ = ["FilePlanner", "FilePlan", "PlanOp", "plan_operations", "execute_plan", "CONFLICT_POLICIES"]
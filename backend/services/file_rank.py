@@ -0,0 +1,320 @@
+"""
+🏅 File Rank - Relevance Ranking for File Search Results
+search_files scored matches with three fixed buckets, checked the prefix
+bucket before the exact-match bucket (so exact matches never came first) and
+sorted every match before keeping 20. FileRanker scores each candidate from:
+
+- match quality: exact name / exact stem / prefix / contiguous phrase, plus the
+  share of query words present (and present as whole words)
+- edit distance between the query and the name's stem (typo tolerance)
+- path depth: shallow paths win ties over deeply nested copies
+- recency: exponential decay on mtime
+- file type: extension named in the query, a preferred kind, junk files
+  (._*, .DS_Store, *.part, *~) pushed down
+
+top_k() keeps a bounded heap of k results, so ranking n candidates is
+O(n log k), and it skips the edit-distance pass for candidates whose other
+features can't reach the current k-th score. Ordering is deterministic:
+score desc, then path asc (`now` is a parameter for reproducible recency).
+`python -m services.file_rank` checks top_k against a full sort and times both
+on a 1M-path corpus (about 3s vs 8-15s here).
+"""
+import heapq
+import math
+import time
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from services.file_index import normalize_name
+
+RANK_WEIGHTS = {
+    "exact": 100.0,
+    "exact_stem": 90.0,
+    "prefix": 60.0,
+    "phrase": 40.0,
+    "word_boundary": 10.0,
+    "token_overlap": 30.0,
+    "whole_words": 10.0,
+    "edit": 25.0,
+    "depth": 1.5,  # per level below RANK_SHALLOW_DEPTH
+    "depth_cap": 15.0,
+    "recency": 10.0,
+    "extension": 8.0,
+    "kind": 5.0,
+    "junk": 20.0,
+}
+RANK_SHALLOW_DEPTH = 3
+RANK_RECENCY_DAYS = 30.0
+JUNK_PREFIXES = ("._", "~$")
+JUNK_NAMES = {".ds_store", "thumbs.db", "desktop.ini"}
+JUNK_EXTENSIONS = {"tmp", "part", "crdownload", "partial", "swp", "lock"}
+
+
+def bounded_edit_distance(a: str, b: str, max_distance: int) -> int:
+    """
+    Levenshtein distance capped at max_distance + 1.
+    Bit-parallel (Myers / Hyyrö): one pass over `b` with `a` as a bitmask, so a
+    comparison is O(len(b)) integer ops instead of an O(len(a) * len(b)) table.
+    """
+    if abs(len(a) - len(b)) > max_distance:
+        return max_distance + 1
+    m = len(a)
+    if not m:
+        return min(len(b), max_distance + 1)
+    peq: Dict[str, int] = {}
+    for i, c in enumerate(a):
+        peq[c] = peq.get(c, 0) | (1 << i)
+    mask = (1 << m) - 1
+    high = 1 << (m - 1)
+    pv, mv, score = mask, 0, m
+    for c in b:
+        eq = peq.get(c, 0)
+        xv = eq | mv
+        xh = (((eq & pv) + pv) ^ pv) | eq
+        ph = (mv | ~(xh | pv)) & mask
+        mh = pv & xh
+        if ph & high:
+            score += 1
+        elif mh & high:
+            score -= 1
+        ph = ((ph << 1) | 1) & mask
+        mh = (mh << 1) & mask
+        pv = (mh | ~(xv | ph)) & mask
+        mv = ph & xv
+    return min(score, max_distance + 1)
+
+
+class _Desc(str):
+    """Reverses string order inside the min-heap, so the root is the worst (lowest score, then largest path)."""
+
+    def __lt__(self, other):
+        return str.__gt__(self, other)
+
+    def __gt__(self, other):
+        return str.__lt__(self, other)
+
+
+class RankQuery:
+    """A query normalized once for scoring many candidates."""
+
+    def __init__(self, query: str):
+        self.text = normalize_name(query)
+        self.tokens = self.text.split()
+        self.extensions = {t for t in self.tokens if len(t) <= 5}  # "report pdf" -> pdf may be an extension
+        self.max_edits = max(1, len(self.text) // 3)
+        self.chars = frozenset(self.text)
+
+
+class FileRanker:
+    """Scores file search candidates and selects the top k."""
+
+    def __init__(self, weights: Optional[Dict[str, float]] = None):
+        self.w = {**RANK_WEIGHTS, **(weights or {})}
+
+    def _match_score(self, q: RankQuery, key: str, stem: str) -> float:
+        """How well the name matches the query words (the only term that can be large)."""
+        w = self.w
+        if key == q.text:
+            score = w["exact"]
+        elif stem == q.text:
+            score = w["exact_stem"]
+        elif key.startswith(q.text):
+            score = w["prefix"]
+        else:
+            at = key.find(q.text)
+            score = 0.0 if at < 0 else w["phrase"] + (w["word_boundary"] if key[at - 1] == " " else 0.0)
+        present = 0
+        for t in q.tokens:
+            if t in key:
+                present += 1
+        if present:
+            score += w["token_overlap"] * present / len(q.tokens)
+            words = key.split()
+            score += w["whole_words"] * sum(1 for t in q.tokens if t in words) / len(q.tokens)
+        return score
+
+    def _context_score(
+        self, q: RankQuery, name: str, ext: str, path: str, is_dir: bool, mtime: float,
+        now: float, prefer: Optional[str],
+    ) -> float:
+        """Depth, recency and file-type adjustments."""
+        w = self.w
+        score = 0.0
+        depth = path.count("/") - 1
+        if depth > RANK_SHALLOW_DEPTH:
+            score -= min(w["depth_cap"], w["depth"] * (depth - RANK_SHALLOW_DEPTH))
+        if mtime:
+            score += w["recency"] * math.exp(-max(0.0, now - mtime) / (RANK_RECENCY_DAYS * 86400))
+        if ext and ext in q.extensions:
+            score += w["extension"]
+        if prefer and prefer == ("directory" if is_dir else "file"):
+            score += w["kind"]
+        lower = name.lower()
+        if lower.startswith(JUNK_PREFIXES) or lower in JUNK_NAMES or lower.endswith("~") or ext in JUNK_EXTENSIONS:
+            score -= w["junk"]
+        return score
+
+    @staticmethod
+    def _split_ext(name: str, key: str, is_dir: bool) -> Tuple[str, str]:
+        """(lowercase extension, key without it)"""
+        if is_dir:
+            return "", key
+        base, dot, ext = name.rpartition(".")
+        if not dot or not base:
+            return "", key
+        ext = ext.lower()
+        return ext, (key[:-len(ext)].rstrip() if key.endswith(ext) else key)
+
+    @staticmethod
+    def _editable(q: RankQuery, stem: str) -> bool:
+        """Cheap test for whether the stem can be within max_edits of the query."""
+        # Every distinct query character missing from the stem costs at least one edit
+        return abs(len(stem) - len(q.text)) <= q.max_edits and len(q.chars.difference(stem)) <= q.max_edits
+
+    def _edit_score(self, q: RankQuery, stem: str) -> float:
+        if not self._editable(q, stem):
+            return 0.0
+        d = bounded_edit_distance(q.text, stem, q.max_edits)
+        return 0.0 if d > q.max_edits else self.w["edit"] * (1 - d / (q.max_edits + 1))
+
+    def score(
+        self, query: str, name: str, path: str, is_dir: bool = False, mtime: float = 0.0,
+        now: Optional[float] = None, prefer: Optional[str] = None,
+    ) -> float:
+        q = RankQuery(query)
+        key = normalize_name(name)
+        ext, stem = self._split_ext(name, key, is_dir)
+        score = self._match_score(q, key, stem) + self._edit_score(q, stem)
+        score += self._context_score(q, name, ext, path, is_dir, mtime, time.time() if now is None else now, prefer)
+        return round(score, 3)
+
+    def top_k(
+        self,
+        query: str,
+        candidates: Iterable[Tuple[str, str, bool, float, Any]],
+        k: int = 20,
+        now: Optional[float] = None,
+        prefer: Optional[str] = None,
+    ) -> List[Tuple[float, Any]]:
+        """
+        candidates: (name, path, is_dir, mtime, payload) tuples → best k as (score, payload), best first.
+        A name's normalized key may be passed as a 6th element to skip re-normalizing it.
+        """
+        if k <= 0:
+            return []
+        q = RankQuery(query)
+        now = time.time() if now is None else now
+        w = self.w
+        heap: List[Tuple[float, _Desc, int, Any]] = []
+        for seq, candidate in enumerate(candidates):
+            name, path, is_dir, mtime, payload = candidate[:5]
+            key = candidate[5] if len(candidate) > 5 else normalize_name(name)
+            ext, stem = self._split_ext(name, key, is_dir)
+            score = self._match_score(q, key, stem)
+            editable = self._editable(q, stem)
+            full = len(heap) == k
+            if full:
+                # Most the remaining terms could add: skip before the costlier ones if that can't beat the k-th best
+                bound = score + w["recency"] + (w["edit"] if editable else 0.0)
+                if ext and ext in q.extensions:
+                    bound += w["extension"]
+                if prefer:
+                    bound += w["kind"]
+                if bound < heap[0][0]:
+                    continue
+            score += self._context_score(q, name, ext, path, is_dir, mtime, now, prefer)
+            if full and score + (w["edit"] if editable else 0.0) < heap[0][0]:
+                continue
+            if editable:
+                score += self._edit_score(q, stem)
+            entry = (round(score, 3), _Desc(path), seq, payload)
+            if not full:
+                heapq.heappush(heap, entry)
+            elif heap[0][:2] < entry[:2]:
+                heapq.heapreplace(heap, entry)
+        heap.sort(key=lambda e: (-e[0], str(e[1])))
+        return [(score, payload) for score, _, _, payload in heap]
+
+    def rank_matches(
+        self, query: str, matches: List[Dict[str, Any]], k: int = 20,
+        now: Optional[float] = None, prefer: Optional[str] = None,
+    ) -> List[Dict[str, Any]]:
+        """Top k of search_files-style match dicts, each with its "score" set."""
+        ranked = self.top_k(
+            query,
+            ((m["name"], m["path"], m.get("type") == "directory", m.get("modified") or 0.0, m) for m in matches),
+            k=k, now=now, prefer=prefer,
+        )
+        return [{**match, "score": score} for score, match in ranked]
+
+
+def _check(trials: int = 300):
+    """top_k must equal a full sort (score desc, path asc) whatever the input order, ties included."""
+    import random
+
+    random.seed(3)
+    now = 1_700_000_000.0
+    for trial in range(trials):
+        letters = random.sample("abcdefghijklmnopqrstuvwxyz", random.randint(1, 12))
+        candidates = [
+            (random.choice(["report.pdf", "report", "reprt.pdf", "notes.txt"]), f"/d/{c}", False,
+             random.choice([0.0, now - 86400]), f"/d/{c}")
+            for c in letters
+        ]
+        k = random.randint(1, len(candidates))
+        expected = sorted(
+            ((file_ranker.score("report", n, p, d, m, now=now), p) for n, p, d, m, _ in candidates),
+            key=lambda e: (-e[0], e[1]),
+        )[:k]
+        for order in (candidates, candidates[::-1], random.sample(candidates, len(candidates))):
+            got = file_ranker.top_k("report", order, k=k, now=now)
+            assert got == expected, f"trial {trial}: top_k {got} != sorted {expected}"
+    print(f"top_k matched a full sort in {trials} trials (3 input orders each)")
+
+
+def _benchmark(size: int = 1_000_000, k: int = 20):
+    """top_k against scoring and sorting every candidate, on a synthetic `size`-path corpus."""
+    import random
+
+    random.seed(11)
+    now = 1_700_000_000.0
+    words = ["report", "invoice", "photo", "vacation", "backup", "notes", "draft", "final", "season", "episode",
+             "diaries", "vampire", "budget", "scan", "resume", "movie", "album", "track", "config", "readme"]
+    exts = ["pdf", "jpg", "txt", "mkv", "mp3", "docx", "png", ""]
+    corpus = []
+    for i in range(size):
+        stem = "_".join(random.sample(words, random.randint(1, 3)))
+        ext = random.choice(exts)
+        name = f"{stem}_{i % 97}.{ext}" if ext else f"{stem}_{i % 97}"
+        path = "/" + "/".join(random.choices(words, k=random.randint(1, 8))) + "/" + name
+        corpus.append((name, path, not ext, now - random.random() * 400 * 86400, path, normalize_name(name)))
+
+    print(f"{size} candidates, k={k}")
+    print(f"{'query':>16} {'top_k s':>8} {'sort s':>8} {'same':>5}")
+    for query in ("photo", "vampire diaries", "report pdf", "vacaton"):
+        started = time.perf_counter()
+        fast = file_ranker.top_k(query, corpus, k=k, now=now)
+        fast_s = time.perf_counter() - started
+
+        started = time.perf_counter()
+        q = RankQuery(query)
+        scored = []
+        for name, path, is_dir, mtime, payload, key in corpus:
+            ext, stem = file_ranker._split_ext(name, key, is_dir)
+            score = file_ranker._match_score(q, key, stem) + file_ranker._edit_score(q, stem)
+            score += file_ranker._context_score(q, name, ext, path, is_dir, mtime, now, None)
+            scored.append((round(score, 3), path))
+        scored.sort(key=lambda e: (-e[0], e[1]))
+        sort_s = time.perf_counter() - started
+
+        same = [score for score, _ in fast] == [score for score, _ in scored[:k]]
+        print(f"{query:>16} {fast_s:>8.2f} {sort_s:>8.2f} {str(same):>5}")
+
+
+# Global instance
+file_ranker = FileRanker()
+
+__all__ = ["FileRanker", "file_ranker", "RankQuery", "bounded_edit_distance", "RANK_WEIGHTS"]
+
+if __name__ == "__main__":
+    _check()
+    _benchmark()
@@ -0,0 +1,259 @@
+"""
+🔎 File Search Stream - Parallel scandir Crawl with Incremental Results
+Searching outside the filename index used a single-threaded os.walk, an extra
+os.stat per match, and returned nothing until 50 matches had piled up or the
+walk finished. ParallelCrawler fans directories out over a thread pool with
+os.scandir, matches on the DirEntry name, and only stats matches (via the
+DirEntry's cached stat). Subdirectory checks use the d_type scandir already
+has, so non-matching entries cost no syscalls.
+
+- Global budgets: max depth, wall-clock time and result count
+- Cancellable between directories (client cancel, new search, disconnect)
+- FileSearchStreams pushes matches to a WebSocket client in batches every
+  FILE_SEARCH_BATCH_INTERVAL seconds while the crawl is still running
+- Parts of the search covered by the filename index (including indexed roots
+  below a requested directory, e.g. everything under "/") are answered from
+  the index first; the crawler skips them and only walks what's left
+
+Client messages (see main.py websocket_endpoint):
+  {"type": "file_search", "search_id": "...", "query": "...", "directories": ["/"]}
+  {"type": "file_search_cancel", "search_id": "..."}
+Server messages:
+  {"type": "file_search_batch", "search_id": "...", "matches": [...]}
+  {"type": "file_search_done", "search_id": "...", "count": n, "reason": "...", "elapsed_ms": ...}
+"""
+import asyncio
+import os
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+from services.file_index import file_index, normalize_name
+
+FILE_SEARCH_WORKERS = int(os.getenv("FILE_SEARCH_WORKERS", "8"))
+FILE_SEARCH_MAX_DEPTH = int(os.getenv("FILE_SEARCH_MAX_DEPTH", "10"))
+FILE_SEARCH_TIME_BUDGET = float(os.getenv("FILE_SEARCH_TIME_BUDGET", "30"))
+FILE_SEARCH_MAX_RESULTS = int(os.getenv("FILE_SEARCH_MAX_RESULTS", "500"))
+FILE_SEARCH_BATCH_INTERVAL = 0.25
+
+# Pseudo filesystems a crawl from "/" should never descend into
+SKIP_PATHS = {"/proc", "/sys", "/dev", "/run", "/private/var/vm", "/System/Volumes"}
+
+
+def name_matcher(query: str) -> Callable[[str], bool]:
+    """Match names containing every word of `query` (case and . _ - separators ignored, like the filename index)."""
+    tokens = normalize_name(query).split()
+    return lambda name: all(token in normalize_name(name) for token in tokens)
+
+
+class ParallelCrawler:
+    """Breadth-first os.scandir fan-out over a thread pool, bounded by depth, time and result budgets."""
+
+    def __init__(
+        self,
+        roots: List[str],
+        match: Callable[[str], bool],
+        max_depth: int = FILE_SEARCH_MAX_DEPTH,
+        time_budget: float = FILE_SEARCH_TIME_BUDGET,
+        max_results: int = FILE_SEARCH_MAX_RESULTS,
+        workers: int = FILE_SEARCH_WORKERS,
+        skip: Iterable[str] = (),
+    ):
+        self.roots = roots
+        self.match = match
+        self.max_depth = max_depth
+        self.time_budget = time_budget
+        self.max_results = max_results
+        self.workers = workers
+        self.skip = SKIP_PATHS | set(skip)  # subtrees not to descend into
+        self.cancelled = threading.Event()
+        self.reason: Optional[str] = None
+        self.count = 0
+        self.dirs_scanned = 0
+        self.elapsed_ms = 0.0
+        self._lock = threading.Lock()
+        self._batch: List[Dict[str, Any]] = []
+
+    def cancel(self):
+        self.cancelled.set()
+
+    def drain(self) -> List[Dict[str, Any]]:
+        """Matches found since the last drain."""
+        with self._lock:
+            batch, self._batch = self._batch, []
+        return batch
+
+    def _scan(self, path: str, depth: int) -> List[Tuple[str, int]]:
+        """Match one directory's entries; returns its subdirectories to crawl next."""
+        if self.cancelled.is_set():
+            return []
+        subdirs, found = [], []
+        try:
+            with os.scandir(path) as it:
+                for entry in it:
+                    try:
+                        is_dir = entry.is_dir(follow_symlinks=False)  # d_type from scandir, no syscall
+                    except OSError:
+                        continue
+                    if is_dir and depth < self.max_depth and entry.path not in self.skip:
+                        subdirs.append((entry.path, depth + 1))
+                    if not self.match(entry.name):
+                        continue
+                    try:
+                        st = entry.stat(follow_symlinks=False)  # cached on the DirEntry
+                    except OSError:
+                        continue
+                    found.append({
+                        "name": entry.name,
+                        "path": entry.path,
+                        "type": "directory" if is_dir else "file",
+                        "size": None if is_dir else st.st_size,
+                        "modified": st.st_mtime,
+                    })
+        except OSError:
+            return []  # unreadable / vanished directory
+        with self._lock:
+            self.dirs_scanned += 1
+            room = self.max_results - self.count
+            found = found[:max(0, room)]
+            self.count += len(found)
+            self._batch.extend(found)
+            if self.count >= self.max_results:
+                self.reason = self.reason or "result_limit"
+                self.cancelled.set()
+        return subdirs
+
+    def run(self) -> str:
+        """Crawl until done or a budget runs out (blocking; run in a thread). Returns the stop reason."""
+        started = time.monotonic()
+        deadline = started + self.time_budget
+        pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="file-search")
+        try:
+            pending = {pool.submit(self._scan, root, 0) for root in self.roots if os.path.isdir(root)}
+            while pending:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self.reason = self.reason or "time_budget"
+                    self.cancelled.set()
+                    break
+                if self.cancelled.is_set():
+                    break
+                done, pending = wait(pending, timeout=min(remaining, 0.5), return_when=FIRST_COMPLETED)
+                for future in done:
+                    if self.cancelled.is_set():
+                        break
+                    for subdir, depth in future.result():
+                        pending.add(pool.submit(self._scan, subdir, depth))
+        finally:
+            # Queued directories are dropped; in-flight scandirs finish on their own
+            pool.shutdown(wait=False, cancel_futures=True)
+        self.reason = self.reason or ("cancelled" if self.cancelled.is_set() else "done")
+        self.elapsed_ms = round((time.monotonic() - started) * 1000, 1)
+        return self.reason
+
+
+def crawl_search(query: str, directories: List[str], limit: int = 50, time_budget: float = FILE_SEARCH_TIME_BUDGET) -> List[Dict[str, Any]]:
+    """Blocking one-shot crawl: up to `limit` matches under `directories`."""
+    crawler = ParallelCrawler(directories, name_matcher(query), time_budget=time_budget, max_results=limit)
+    crawler.run()
+    return crawler.drain()
+
+
+def split_scope(directories: List[str]) -> Tuple[List[str], List[str], List[str]]:
+    """(index prefixes, directories to crawl, indexed roots the crawl must skip) for a search over `directories`."""
+    if not file_index.ready:
+        return [], directories, []
+    covered = [d for d in directories if file_index.covers(d)]
+    crawl = [d for d in directories if not file_index.covers(d)]
+    nested = [
+        r for r in file_index.roots
+        if any(r.startswith(os.path.abspath(d).rstrip("/") + "/") for d in crawl)
+    ]
+    return covered + nested, crawl, nested
+
+
+class FileSearchStreams:
+    """Runs one streaming search per WebSocket client and pushes its matches in batches."""
+
+    def __init__(self):
+        self._searches: Dict[str, Tuple[str, ParallelCrawler, asyncio.Task]] = {}  # search_id -> (client, crawler, task)
+        self.stats = {"searches": 0, "from_index": 0, "cancelled": 0, "batches": 0, "matches": 0}
+
+    async def start(self, manager, client_id: str, search_id: str, query: str, directories: Optional[List[str]] = None):
+        """Start streaming results for `query` to `client_id` (replacing that client's previous search)."""
+        self.cancel_client(client_id)
+        directories = [d for d in (directories or ["/"]) if d] or ["/"]
+        self.stats["searches"] += 1
+        indexed, crawl, skip = split_scope(directories)
+        crawler = ParallelCrawler(crawl, name_matcher(query), skip=skip)
+        task = asyncio.create_task(self._stream(manager, client_id, search_id, query, indexed, crawler))
+        self._searches[search_id] = (client_id, crawler, task)
+
+    async def _stream(self, manager, client_id: str, search_id: str, query: str, indexed: List[str], crawler: ParallelCrawler):
+        try:
+            from_index = 0
+            if indexed:
+                # Indexed roots answer in one batch
+                self.stats["from_index"] += 1
+                started = time.perf_counter()
+                matches = await asyncio.to_thread(file_index.search, query, FILE_SEARCH_MAX_RESULTS, indexed, False)
+                await self._send_batch(manager, client_id, search_id, matches)
+                from_index = len(matches)
+                if not crawler.roots or from_index >= FILE_SEARCH_MAX_RESULTS:
+                    await manager.send_message(client_id, {
+                        "type": "file_search_done", "search_id": search_id, "count": from_index,
+                        "reason": "index" if not crawler.roots else "result_limit",
+                        "elapsed_ms": round((time.perf_counter() - started) * 1000, 1),
+                    })
+                    return
+                crawler.max_results -= from_index
+
+            run = asyncio.create_task(asyncio.to_thread(crawler.run))
+            while not run.done():
+                await asyncio.wait({run}, timeout=FILE_SEARCH_BATCH_INTERVAL)
+                await self._send_batch(manager, client_id, search_id, crawler.drain())
+                if client_id not in manager.active_connections:
+                    crawler.cancel()
+            await run
+            await self._send_batch(manager, client_id, search_id, crawler.drain())
+            if crawler.reason == "cancelled":
+                self.stats["cancelled"] += 1
+            await manager.send_message(client_id, {
+                "type": "file_search_done", "search_id": search_id, "count": from_index + crawler.count,
+                "reason": crawler.reason, "elapsed_ms": crawler.elapsed_ms, "dirs_scanned": crawler.dirs_scanned,
+                "from_index": from_index,
+            })
+        except Exception as e:
+            print(f"⚠️ File search {search_id} failed: {e}")
+            await manager.send_message(client_id, {"type": "file_search_done", "search_id": search_id, "error": str(e)})
+        finally:
+            entry = self._searches.get(search_id)
+            if entry and entry[1] is crawler:
+                del self._searches[search_id]
+
+    async def _send_batch(self, manager, client_id: str, search_id: str, matches: List[Dict[str, Any]]):
+        if not matches:
+            return
+        self.stats["batches"] += 1
+        self.stats["matches"] += len(matches)
+        await manager.send_message(client_id, {"type": "file_search_batch", "search_id": search_id, "matches": matches})
+
+    def cancel(self, search_id: str):
+        entry = self._searches.get(search_id)
+        if entry:
+            entry[1].cancel()
+
+    def cancel_client(self, client_id: str):
+        for owner, crawler, _ in list(self._searches.values()):
+            if owner == client_id:
+                crawler.cancel()
+
+    def get_stats(self) -> dict:
+        return {"active": len(self._searches), **self.stats}
+
+
+# Global instance
+file_search_streams = FileSearchStreams()
+
+__all__ = ["ParallelCrawler", "FileSearchStreams", "file_search_streams", "crawl_search", "name_matcher", "split_scope"]
@@ -0,0 +1,507 @@
+"""
+🚚 File Transfer - Worker-Pool Copy/Move Engine with Progress
+FileOps copy/move/organize and the RipDisc Plex moves called shutil.move /
+shutil.copy2 straight from async handlers, so moving a multi-GB MKV to another
+volume blocked the event loop for the whole copy and reported nothing.
+TransferEngine runs every file on a thread pool instead:
+
+- same-device moves are a single os.rename
+- data is copied in TRANSFER_CHUNK pieces with os.copy_file_range (in-kernel,
+  a reflink on filesystems that support it), falling back to os.sendfile and
+  then to a pread/pwrite loop
+- copies are written to "<dest>.glowpart" with a "<dest>.glowpart.json" that
+  records the source's size and mtime; transferring the same unchanged source
+  again continues from the part file instead of starting over
+- optional BLAKE2b check of the copy against the source before the part file
+  is renamed into place (a move only removes the source after that)
+- at most TRANSFER_PER_DEVICE files copy at once per destination device, so a
+  batch onto one USB disk isn't split across competing writers
+
+Progress (aggregate plus the files that changed) is published every
+TRANSFER_PROGRESS_INTERVAL seconds on the "file_transfers" WebSocket channel,
+mirrored onto the GlowState task when a task_id is given, and passed to an
+optional callback.
+
+Client messages (see main.py websocket_endpoint):
+  {"type": "subscribe", "channel": "file_transfers"}
+  {"type": "file_transfer_cancel", "transfer_id": "..."}
+Server messages:
+  {"type": "file_transfer_progress", "transfer": {...}}
+  {"type": "file_transfer_done", "transfer": {...}}
+"""
+import asyncio
+import errno
+import hashlib
+import json
+import os
+import shutil
+import threading
+import time
+import uuid
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Sequence, Tuple
+
+TRANSFER_WORKERS = int(os.getenv("TRANSFER_WORKERS", "4"))
+TRANSFER_PER_DEVICE = int(os.getenv("TRANSFER_PER_DEVICE", "2"))
+TRANSFER_CHUNK = int(os.getenv("TRANSFER_CHUNK_MB", "8")) * 1024 * 1024
+TRANSFER_VERIFY = os.getenv("TRANSFER_VERIFY", "false").lower() in ("1", "true", "yes")
+TRANSFER_PROGRESS_INTERVAL = 0.25
+TRANSFER_CHANNEL = "file_transfers"
+PART_SUFFIX = ".glowpart"
+
+# copy_file_range / sendfile errors that mean "not supported for these files", not a failed copy
+_UNSUPPORTED = {errno.EXDEV, errno.ENOSYS, errno.EINVAL, errno.EOPNOTSUPP, errno.ENOTSOCK, errno.EBADF, errno.EPERM}
+_COPY_METHODS = ("copy_file_range", "sendfile", "buffered")
+
+
+class TransferCancelled(Exception):
+    pass
+
+
+class TransferFile:
+    """One file (or symlink) to copy, with its progress."""
+
+    def __init__(self, item: int, source: str, destination: str, size: int, link: Optional[str] = None):
+        self.item = item
+        self.source = source
+        self.destination = destination
+        self.size = size
+        self.link = link  # symlink target, recreated instead of copied
+        self.device = -1  # st_dev of the destination directory, set while planning
+        self.done = 0
+        self.status = "queued"  # queued / copying / verifying / done / error / cancelled
+        self.method: Optional[str] = None
+        self.resumed_from = 0
+        self.error: Optional[str] = None
+
+    def snapshot(self) -> dict:
+        return {
+            "source": self.source,
+            "destination": self.destination,
+            "size": self.size,
+            "done": self.done,
+            "status": self.status,
+            "method": self.method,
+            "resumed_from": self.resumed_from,
+            "error": self.error,
+        }
+
+
+class Transfer:
+    """A batch of (source, destination) pairs copied or moved together."""
+
+    def __init__(self, op: str, pairs: Sequence[Tuple[str, str]], verify: bool, task_id: Optional[str], label: Optional[str]):
+        self.id = str(uuid.uuid4())
+        self.op = op
+        self.verify = verify
+        self.task_id = task_id
+        self.label = label or f"{op} {len(pairs)} item(s)"
+        # source, destination, kind, status, error
+        self.items: List[Dict[str, Any]] = [
+            {"source": os.path.abspath(s), "destination": os.path.abspath(d), "status": "queued", "error": None}
+            for s, d in pairs
+        ]
+        self.files: List[TransferFile] = []
+        self.dirs: Dict[int, List[Tuple[str, str]]] = {}  # item -> (source dir, destination dir), for copystat
+        self.status = "planning"
+        self.error: Optional[str] = None
+        self.cancelled = threading.Event()
+        self.started = time.monotonic()
+        self.finished: Optional[float] = None
+        self._changed: set = set()
+        self._lock = threading.Lock()
+
+    def mark(self, f: "TransferFile"):
+        with self._lock:
+            self._changed.add(id(f))
+
+    def snapshot(self, files: str = "changed") -> dict:
+        """files: "all", "changed" (since the last changed snapshot, plus in-flight ones) or "none"."""
+        if files == "changed":
+            with self._lock:
+                changed, self._changed = self._changed, set()
+            listed = [f for f in self.files if id(f) in changed or f.status in ("copying", "verifying")]
+        else:
+            listed = self.files if files == "all" else []
+        bytes_total = sum(f.size for f in self.files)
+        bytes_done = sum(f.done for f in self.files)
+        elapsed = (self.finished or time.monotonic()) - self.started
+        copied = bytes_done - sum(f.resumed_from for f in self.files)
+        rate = copied / elapsed if elapsed > 0 else 0.0
+        return {
+            "id": self.id,
+            "op": self.op,
+            "label": self.label,
+            "status": self.status,
+            "items": len(self.items),
+            "files_total": len(self.files),
+            "files_done": sum(1 for f in self.files if f.status == "done"),
+            "files_failed": sum(1 for f in self.files if f.status == "error"),
+            "bytes_total": bytes_total,
+            "bytes_done": bytes_done,
+            "progress": round(bytes_done / bytes_total, 4) if bytes_total else (1.0 if self.finished else 0.0),
+            "rate_mb_per_sec": round(rate / 1e6, 2),
+            "eta_s": round((bytes_total - bytes_done) / rate, 1) if rate > 0 and not self.finished else None,
+            "elapsed_s": round(elapsed, 2),
+            "error": self.error,
+            "files": [f.snapshot() for f in listed],
+        }
+
+
+def _file_digest(path: str, cancelled: threading.Event) -> bytes:
+    h = hashlib.blake2b()
+    with open(path, "rb", buffering=0) as fh:
+        while True:
+            if cancelled.is_set():
+                raise TransferCancelled()
+            chunk = fh.read(TRANSFER_CHUNK)
+            if not chunk:
+                return h.digest()
+            h.update(chunk)
+
+
+class TransferEngine:
+    """Runs copy/move batches on a thread pool with per-device concurrency caps."""
+
+    def __init__(self, workers: int = TRANSFER_WORKERS, per_device: int = TRANSFER_PER_DEVICE):
+        self.workers = workers
+        self.per_device = per_device
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="file-transfer")
+        # Planning, same-device renames and cleanup never queue behind another transfer's copies
+        self._meta_pool = ThreadPoolExecutor(max_workers=2, thread_name_prefix="file-transfer-plan")
+        self._manager = None
+        self._device_slots: Dict[int, asyncio.Semaphore] = {}
+        self._active: Dict[str, Transfer] = {}
+        self._copy_method = _COPY_METHODS[0] if hasattr(os, "copy_file_range") else _COPY_METHODS[1]
+        self.stats = {
+            "transfers": 0, "files": 0, "renamed": 0, "errors": 0, "cancelled": 0,
+            "resumed": 0, "resumed_bytes": 0, "verified": 0, "verify_failures": 0,
+            "bytes": {method: 0 for method in _COPY_METHODS},
+        }
+        self._stats_lock = threading.Lock()
+
+    def _count(self, key: str, n: int = 1):
+        """Stats are bumped from worker threads; copied bytes are keyed by copy method."""
+        with self._stats_lock:
+            if key in self.stats["bytes"]:
+                self.stats["bytes"][key] += n
+            else:
+                self.stats[key] += n
+
+    # ---------------------------
+    # Planning (worker thread)
+    # ---------------------------
+    def _plan(self, transfer: Transfer):
+        """Expand items into files; moves that stay on one device are renamed right here."""
+        for i, item in enumerate(transfer.items):
+            source, destination = item["source"], item["destination"]
+            try:
+                if not os.path.lexists(source):
+                    raise FileNotFoundError(f"Source path does not exist: {source}")
+                tree = os.path.isdir(source) and not os.path.islink(source)
+                if os.path.isdir(destination) and (transfer.op == "move" or not tree):
+                    # Like shutil.move/copy2: an existing directory destination means "into it"
+                    destination = item["destination"] = os.path.join(destination, os.path.basename(source))
+                if tree and os.path.lexists(destination):
+                    raise FileExistsError(f"Destination already exists: {destination}")
+                if tree and destination.startswith(source + os.sep):
+                    raise ValueError(f"Cannot {transfer.op} a directory into itself: {destination}")
+                os.makedirs(os.path.dirname(destination) or ".", exist_ok=True)
+                if transfer.op == "move":
+                    try:
+                        os.rename(source, destination)
+                        item["status"] = "done"
+                        self._count("renamed")
+                        continue
+                    except OSError as e:
+                        if e.errno != errno.EXDEV:
+                            raise
+                item["kind"] = "directory" if tree else "file"
+                first = len(transfer.files)
+                if not tree:
+                    transfer.files.append(TransferFile(i, source, destination, os.path.getsize(source)))
+                else:
+                    self._plan_tree(transfer, i, source, destination)
+                # A whole item lands on one device
+                device = self._device(destination)
+                for f in transfer.files[first:]:
+                    f.device = device
+                item["status"] = "copying"
+            except Exception as e:
+                item["status"] = "error"
+                item["error"] = str(e)
+
+    def _plan_tree(self, transfer: Transfer, item: int, source: str, destination: str):
+        dirs = transfer.dirs.setdefault(item, [])
+        for root, subdirs, names in os.walk(source):
+            target = os.path.join(destination, os.path.relpath(root, source))
+            os.makedirs(target, exist_ok=True)
+            dirs.append((root, target))
+            for name in subdirs + names:
+                path = os.path.join(root, name)
+                if os.path.islink(path):
+                    transfer.files.append(TransferFile(item, path, os.path.join(target, name), 0, link=os.readlink(path)))
+                elif name in names:
+                    transfer.files.append(TransferFile(item, path, os.path.join(target, name), os.path.getsize(path)))
+
+    # ---------------------------
+    # Copying (worker thread)
+    # ---------------------------
+    def _copy_range(self, transfer: Transfer, f: TransferFile, src_fd: int, dst_fd: int, offset: int):
+        """Copy bytes [offset, size) at the same offsets, with the fastest method these files allow."""
+        method = self._copy_method
+        while offset < f.size:
+            if transfer.cancelled.is_set():
+                raise TransferCancelled()
+            count = min(TRANSFER_CHUNK, f.size - offset)
+            try:
+                if method == "copy_file_range":
+                    n = os.copy_file_range(src_fd, dst_fd, count, offset, offset)
+                elif method == "sendfile":
+                    os.lseek(dst_fd, offset, os.SEEK_SET)
+                    n = os.sendfile(dst_fd, src_fd, offset, count)
+                else:
+                    data = os.pread(src_fd, count, offset)
+                    n = len(data)
+                    view = memoryview(data)
+                    written = 0
+                    while written < n:
+                        written += os.pwrite(dst_fd, view[written:], offset + written)
+            except OSError as e:
+                if method == "buffered" or e.errno not in _UNSUPPORTED:
+                    raise
+                method = _COPY_METHODS[_COPY_METHODS.index(method) + 1]
+                continue
+            if n == 0:
+                raise OSError(errno.EIO, f"Source shrank during copy: {f.source}")
+            offset += n
+            f.done = offset
+            f.method = method
+            self._count(method, n)
+            transfer.mark(f)
+
+    def _copy_file(self, transfer: Transfer, f: TransferFile):
+        """Copy one file through its part file, resuming a matching earlier attempt."""
+        f.status = "copying"
+        transfer.mark(f)
+        if f.link is not None:
+            if os.path.lexists(f.destination):
+                os.unlink(f.destination)
+            os.symlink(f.link, f.destination)
+            f.status = "done"
+            return
+
+        st = os.stat(f.source)
+        f.size = st.st_size
+        part = f.destination + PART_SUFFIX
+        meta_path = part + ".json"
+        signature = {"source": f.source, "size": st.st_size, "mtime_ns": st.st_mtime_ns}
+        offset = 0
+        try:
+            with open(meta_path) as fh:
+                if json.load(fh) == signature:
+                    # Re-copy the last chunk: it may not have reached the disk before the interruption
+                    offset = max(0, min(os.path.getsize(part), st.st_size) - TRANSFER_CHUNK)
+        except (OSError, ValueError):
+            pass
+        with open(meta_path, "w") as fh:
+            json.dump(signature, fh)
+        if offset:
+            f.resumed_from = f.done = offset
+            self._count("resumed")
+            self._count("resumed_bytes", offset)
+
+        src_fd = os.open(f.source, os.O_RDONLY)
+        try:
+            dst_fd = os.open(part, os.O_WRONLY | os.O_CREAT, 0o644)
+            try:
+                os.ftruncate(dst_fd, offset)
+                self._copy_range(transfer, f, src_fd, dst_fd, offset)
+                if transfer.op == "move":
+                    os.fsync(dst_fd)  # the source is about to go away
+            finally:
+                os.close(dst_fd)
+        finally:
+            os.close(src_fd)
+        shutil.copystat(f.source, part)
+
+        if transfer.verify:
+            f.status = "verifying"
+            transfer.mark(f)
+            if _file_digest(f.source, transfer.cancelled) != _file_digest(part, transfer.cancelled):
+                self._count("verify_failures")
+                os.unlink(part)
+                os.unlink(meta_path)
+                raise OSError(errno.EIO, f"Checksum mismatch copying {f.source}")
+            self._count("verified")
+
+        os.replace(part, f.destination)
+        os.unlink(meta_path)
+        if transfer.op == "move" and transfer.items[f.item].get("kind") == "file":
+            os.unlink(f.source)
+        f.status = "done"
+
+    def _run_file(self, transfer: Transfer, f: TransferFile):
+        try:
+            self._copy_file(transfer, f)
+            self._count("files")
+        except TransferCancelled:
+            f.status = "cancelled"  # part file is kept so the next attempt resumes
+        except Exception as e:
+            f.status = "error"
+            f.error = str(e)
+            self._count("errors")
+        transfer.mark(f)
+
+    def _finish_items(self, transfer: Transfer):
+        """Directory metadata for copied trees; source removal for cross-device directory moves."""
+        failed: Dict[int, str] = {}
+        for f in transfer.files:
+            if f.status != "done":
+                failed.setdefault(f.item, f.error or f.status)
+        for i, item in enumerate(transfer.items):
+            if item["status"] != "copying":
+                continue
+            if i in failed:
+                item["status"], item["error"] = "error", failed[i]
+                continue
+            try:
+                for source_dir, target_dir in reversed(transfer.dirs.get(i, [])):
+                    shutil.copystat(source_dir, target_dir)
+                if transfer.op == "move" and item.get("kind") == "directory":
+                    shutil.rmtree(item["source"])
+                item["status"] = "done"
+            except Exception as e:
+                item["status"], item["error"] = "error", str(e)
+
+    @staticmethod
+    def _device(path: str) -> int:
+        try:
+            return os.stat(os.path.dirname(path)).st_dev
+        except OSError:
+            return -1
+
+    # ---------------------------
+    # Scheduling (event loop)
+    # ---------------------------
+
+    async def _worker(self, transfer: Transfer, queue: deque):
+        loop = asyncio.get_running_loop()
+        while queue:
+            f = queue.popleft()
+            if transfer.cancelled.is_set():
+                f.status = "cancelled"
+                continue
+            slot = self._device_slots.setdefault(f.device, asyncio.Semaphore(self.per_device))
+            async with slot:
+                await loop.run_in_executor(self._pool, self._run_file, transfer, f)
+
+    async def _report(self, transfer: Transfer, message_type: str, on_progress):
+        snapshot = transfer.snapshot("all" if message_type == "file_transfer_done" else "changed")
+        if self._manager is not None:
+            try:
+                await self._manager.publish(TRANSFER_CHANNEL, {"type": message_type, "transfer": snapshot})
+            except Exception as e:
+                print(f"⚠️ Failed to publish transfer progress: {e}")
+        if transfer.task_id:
+            try:
+                from glowos.glow_state import glow_state_store
+                glow_state_store.update_task(
+                    transfer.task_id, progress=snapshot["progress"],
+                    message=f"{transfer.label}: {snapshot['files_done']}/{snapshot['files_total']} files, "
+                            f"{snapshot['bytes_done'] / 1e9:.2f}/{snapshot['bytes_total'] / 1e9:.2f} GB",
+                )
+            except Exception as e:
+                print(f"⚠️ Failed to update GlowState task: {e}")
+        if on_progress:
+            try:
+                await on_progress(snapshot)
+            except Exception as e:
+                print(f"⚠️ Transfer progress callback failed: {e}")
+
+    async def run(
+        self,
+        op: str,
+        pairs: Sequence[Tuple[str, str]],
+        verify: Optional[bool] = None,
+        task_id: Optional[str] = None,
+        label: Optional[str] = None,
+        on_progress: Optional[Callable[[dict], Awaitable[None]]] = None,
+    ) -> dict:
+        """
+        Copy or move every (source, destination) pair; returns when all are finished.
+        → {"success", "transfer_id", "items": [{"source", "destination", "status", "error"}], ...final snapshot}
+        """
+        if op not in ("copy", "move"):
+            raise ValueError(f"Unknown transfer op: {op}")
+        transfer = Transfer(op, pairs, TRANSFER_VERIFY if verify is None else verify, task_id, label)
+        self._active[transfer.id] = transfer
+        self.stats["transfers"] += 1
+        loop = asyncio.get_running_loop()
+        try:
+            await loop.run_in_executor(self._meta_pool, self._plan, transfer)
+            transfer.status = "running"
+            queue = deque(transfer.files)
+            workers = [asyncio.create_task(self._worker(transfer, queue)) for _ in range(min(self.workers, len(queue)))]
+            while workers and not all(w.done() for w in workers):
+                await asyncio.wait(workers, timeout=TRANSFER_PROGRESS_INTERVAL)
+                await self._report(transfer, "file_transfer_progress", on_progress)
+            await asyncio.gather(*workers)
+            await loop.run_in_executor(self._meta_pool, self._finish_items, transfer)
+            if transfer.cancelled.is_set():
+                transfer.status = "cancelled"
+                self.stats["cancelled"] += 1
+            else:
+                transfer.status = "error" if any(item["status"] == "error" for item in transfer.items) else "done"
+        except Exception as e:
+            transfer.status = "error"
+            transfer.error = str(e)
+            transfer.cancelled.set()  # stop workers still copying
+        finally:
+            transfer.finished = time.monotonic()
+            del self._active[transfer.id]
+        errors = [f"{item['source']}: {item['error']}" for item in transfer.items if item["status"] == "error"]
+        transfer.error = transfer.error or ("; ".join(errors) if errors else None)
+        await self._report(transfer, "file_transfer_done", on_progress)
+        final = transfer.snapshot("none")
+        return {
+            "success": transfer.status == "done",
+            "transfer_id": transfer.id,
+            **{k: v for k, v in final.items() if k not in ("id", "files", "error")},
+            "items": transfer.items,
+            "errors": errors,
+        }
+
+    def start(self, manager):
+        """Publish progress through the app's WebSocketManager (call from app startup)."""
+        self._manager = manager
+
+    async def copy(self, source: str, destination: str, **kwargs) -> dict:
+        return await self.run("copy", [(source, destination)], **kwargs)
+
+    async def move(self, source: str, destination: str, **kwargs) -> dict:
+        return await self.run("move", [(source, destination)], **kwargs)
+
+    def cancel(self, transfer_id: str) -> bool:
+        transfer = self._active.get(transfer_id)
+        if transfer:
+            transfer.cancelled.set()
+        return transfer is not None
+
+    def get_stats(self) -> dict:
+        return {
+            "active": [t.snapshot("none") for t in self._active.values()],
+            "workers": self.workers,
+            "per_device": self.per_device,
+            "chunk_mb": TRANSFER_CHUNK // (1024 * 1024),
+            "verify_default": TRANSFER_VERIFY,
+            "copy_method": self._copy_method,
+            **self.stats,
+        }
+
+
+# Global instance
+file_transfers = TransferEngine()
+
+__all__ = ["TransferEngine", "Transfer", "TransferFile", "file_transfers", "TRANSFER_CHANNEL"]
@@ -2,8 +2,12 @@
 🚀 GlowRouter - Optimized for ChatGPT-level speed (<100ms)
 Uses Groq + minimal RouterPacket + strict JSON output
 """
-from typing import Dict, Optional, Any
-from config import client as groq_client
+from types import MappingProxyType
+from typing import Dict, Optional, Any, Mapping, NamedTuple, Tuple
+from services.llm_providers import complete_chat
+from services.router_matcher import ToolMatcher, extract_url, extract_file_query
+from services.semantic_router import semantic_router
+from services.embeddings import embed_text
 import json
 import asyncio
 from datetime import datetime
@@ -12,7 +16,7 @@ import time
 
 SUPERPOWERS = None
 _ROUTER_WARMED = False
-_TOOL_CACHE = {}  # Cache tool lookups
+_TIER_COUNTS = {"fast_path": 0, "semantic": 0, "llm": 0, "llm_error": 0}  # which tier resolved each message
 
 # Core tools only (5-7 max for speed)
 CORE_TOOLS = [
@@ -45,17 +49,69 @@ TOOL_PATTERNS = {
     "play_video": ["play", "watch", "stream", "show me"],
 }
 
+# Argument extraction per tool; a tool whose extractor returns None falls through to the next match
+TOOL_EXTRACTORS = {
+    "download": extract_url,
+    "download_video": extract_url,
+    "download_audio": extract_url,
+    "search_files": extract_file_query,
+}
+
+# All TOOL_PATTERNS compiled into one automaton + LRU decision cache
+_FAST_MATCHER = ToolMatcher(TOOL_PATTERNS, TOOL_EXTRACTORS)
+
+class RouterCatalog(NamedTuple):
+    """
+    Everything per-message routing needs from the superpower set, built once in
+    set_superpowers() and swapped in as a whole. Read-only: tuples + mapping proxies.
+    """
+    version: int
+    superpowers: Mapping[str, Any]   # superpower name → instance
+    intents: Mapping[str, str]       # intent → superpower name (first superpower wins)
+    tools: Tuple[Mapping[str, str], ...]  # core tools shown to the LLM router
+    tools_text: str                  # "name: desc" lines for the LLM prompt
+
+
+def _build_catalog(superpowers: Optional[dict], version: int) -> RouterCatalog:
+    intents: Dict[str, str] = {}
+    tools = []
+    for power_name, power in (superpowers or {}).items():
+        intent_map = getattr(power, 'intent_map', None) or {}
+        for intent, desc in intent_map.items():
+            if intent in intents:
+                continue
+            intents[intent] = power_name
+            # Core tools only (7 max) keep the LLM router prompt tiny
+            if intent in CORE_TOOLS and len(tools) < 7:
+                tools.append(MappingProxyType({
+                    "name": intent,
+                    "superpower": power.name,
+                    "desc": desc[:60]
+                }))
+    return RouterCatalog(
+        version=version,
+        superpowers=MappingProxyType(dict(superpowers or {})),
+        intents=MappingProxyType(intents),
+        tools=tuple(tools),
+        tools_text="\n".join(f'{t["name"]}: {t["desc"]}' for t in tools),
+    )
+
+
+_CATALOG = _build_catalog(None, 0)
+
+
+def get_catalog() -> RouterCatalog:
+    """Current routing catalog (grab once per message so all lookups see one version)."""
+    return _CATALOG
+
+
 def set_superpowers(superpowers: dict):
-    global SUPERPOWERS, _TOOL_CACHE
+    global SUPERPOWERS, _CATALOG
     SUPERPOWERS = superpowers
-    # Build tool cache for fast lookups
-    _TOOL_CACHE = {}
-    if superpowers:
-        for power_name, power in superpowers.items():
-            if hasattr(power, 'intent_map'):
-                for intent in power.intent_map.keys():
-                    if intent not in _TOOL_CACHE:
-                        _TOOL_CACHE[intent] = power_name
+    # Build the whole catalog first, then swap it in with a single assignment
+    _CATALOG = _build_catalog(superpowers, _CATALOG.version + 1)
+    # Intent centroids for the semantic tier (built at startup / rebuilt when superpowers change)
+    semantic_router.configure(superpowers or {}, CORE_TOOLS, TOOL_PATTERNS)
 
 
 async def _warm_router():
@@ -65,10 +121,10 @@ async def _warm_router():
         return
     
     try:
-        await asyncio.to_thread(
-            groq_client.chat.completions.create,
-            model="llama-3.1-8b-instant",
-            messages=[{"role": "user", "content": "test"}],
+        await complete_chat(
+            "groq",
+            "llama-3.1-8b-instant",
+            [{"role": "user", "content": "test"}],
             max_tokens=10,
             temperature=0
         )
@@ -85,34 +141,9 @@ def _truncate_message(message: str, max_tokens: int = 40) -> str:
     return " ".join(words[:max_tokens]) + "..."
 
 
-def _filter_core_tools() -> list:
-    """Return only core tools (5-7 max) for speed"""
-    if not SUPERPOWERS:
-        return []
-    
-    core_list = []
-    seen_intents = set()
-    
-    for power_name, power in SUPERPOWERS.items():
-        if hasattr(power, 'intent_map'):
-            for intent, desc in power.intent_map.items():
-                if intent in CORE_TOOLS and intent not in seen_intents:
-                    core_list.append({
-                        "name": intent,
-                        "superpower": power.name,
-                        "desc": desc[:60]
-                    })
-                    seen_intents.add(intent)
-                    if len(core_list) >= 7:
-                        break
-        if len(core_list) >= 7:
-            break
-    
-    return core_list
-
-
-def _build_router_packet(user_message: str, glow_state: Any) -> Dict:
-    """Build TINY RouterPacket (250-500 tokens max)"""
+def _build_router_packet(user_message: str, glow_state: Any, catalog: Optional[RouterCatalog] = None) -> Dict:
+    """Build TINY RouterPacket (250-500 tokens max); tool list + prompt text come from the catalog"""
+    catalog = catalog or _CATALOG
     truncated_msg = _truncate_message(user_message, max_tokens=40)
     
     state_snapshot = {
@@ -120,12 +151,12 @@ def _build_router_packet(user_message: str, glow_state: Any) -> Dict:
         "tasks": len([t for t in glow_state.tasks.active if t.status == "running"]) > 0
     }
     
-    tools = _filter_core_tools()
-    
     return {
         "msg": truncated_msg,
         "state": state_snapshot,
-        "tools": tools
+        "tools": catalog.tools,
+        "tools_text": catalog.tools_text,
+        "catalog_version": catalog.version
     }
 
 
@@ -134,76 +165,20 @@ async def _call_router_model(packet: Dict) -> Dict:
     import re
     model_start = time.time()
     
-    tools_text = "\n".join([
-        f'{t["name"]}: {t["desc"]}'
-        for t in packet["tools"]
-    ])
-    
     # Fast pattern matching first (handles 90% of cases)
-    msg_lower = packet["msg"].lower().strip()
+    decision = _FAST_MATCHER.match(packet["msg"])
+    if decision:
+        _TIER_COUNTS["fast_path"] += 1
+        return decision
+    
+    # Local semantic tier: nearest intent centroid; only ambiguous messages reach the LLM
+    if semantic_router.ready:
+        decision = semantic_router.decision(packet["msg"], await embed_text(packet["msg"]))
+        if decision:
+            _TIER_COUNTS["semantic"] += 1
+            return decision
     
-    for tool_name, patterns in TOOL_PATTERNS.items():
-        if any(p in msg_lower for p in patterns):
-            # Extract URL for download tools
-            if tool_name in ("download", "download_video", "download_audio"):
-                url_match = re.search(r'https?://[^\s]+', packet["msg"])
-                if url_match:
-                    return {
-                        "mode": "tool",
-                        "tool_name": tool_name,
-                        "arguments": {"url": url_match.group(0)}
-                    }
-            # Extract query and location for file search
-            elif tool_name == "search_files":
-                # Extract the search query and location hint
-                # Pattern: "look for X on desktop" or "find X folder"
-                # First try to match with location hint
-                query_match = re.search(r'(?:look for|find|search for|show me|where is)\s+(.+?)(?:\s+on\s+(?:my\s+)?(\w+))(?:\s+folder)?\s*$', msg_lower)
-                if query_match:
-                    query = query_match.group(1).strip()
-                    location_hint = query_match.group(2) if query_match.group(2) else None
-                else:
-                    # Try without location hint
-                    query_match = re.search(r'(?:look for|find|search for|show me|where is)\s+(.+?)(?:\s+folder)?\s*$', msg_lower)
-                    if query_match:
-                        query = query_match.group(1).strip()
-                        location_hint = None
-                    else:
-                        # Fallback: extract everything after the pattern
-                        query = None
-                        for pattern in patterns:
-                            if pattern in msg_lower:
-                                idx = msg_lower.find(pattern)
-                                query = packet["msg"][idx + len(pattern):].strip()
-                                # Try to extract location hint - look for "on my X" or "on X"
-                                location_match = re.search(r'\s+on\s+(?:my\s+)?(\w+)', query, re.IGNORECASE)
-                                if location_match:
-                                    location_hint = location_match.group(1)
-                                    query = re.sub(r'\s+on\s+(?:my\s+)?\w+', '', query, flags=re.IGNORECASE)
-                                else:
-                                    location_hint = None
-                                break
-                
-                if query:
-                    # Remove "folder" from query if present
-                    query = re.sub(r'\s+folder\s*$', '', query, flags=re.IGNORECASE).strip()
-                    # Remove common words like "the", "my", "a", "an" from the start
-                    query = re.sub(r'^(the|my|a|an)\s+', '', query, flags=re.IGNORECASE).strip()
-                    if query:
-                        return {
-                            "mode": "tool",
-                            "tool_name": "search_files",
-                            "arguments": {
-                                "query": query,
-                                "location_hint": location_hint
-                            }
-                        }
-            else:
-                return {
-                    "mode": "tool",
-                    "tool_name": tool_name,
-                    "arguments": {}
-                }
+    tools_text = packet["tools_text"]
     
     # LLM fallback for ambiguous cases (use better model for accuracy)
     prompt = f"""Route user message to tool or chat.
@@ -225,23 +200,24 @@ Message: {packet["msg"]}"""
     try:
         try:
             # Use mistral-small for better accuracy while keeping speed
-            response = groq_client.chat.completions.create(
-                model="mistral-small-latest",
-                messages=[{"role": "user", "content": prompt}],
+            content = await complete_chat(
+                "groq",
+                "mistral-small-latest",
+                [{"role": "user", "content": prompt}],
                 max_tokens=100,
                 temperature=0,
                 response_format={"type": "json_object"}
             )
         except (TypeError, Exception):
-            response = groq_client.chat.completions.create(
-                model="mistral-small-latest",
-                messages=[{"role": "user", "content": prompt + "\n\nReturn ONLY valid JSON, no other text."}],
+            content = await complete_chat(
+                "groq",
+                "mistral-small-latest",
+                [{"role": "user", "content": prompt + "\n\nReturn ONLY valid JSON, no other text."}],
                 max_tokens=100,
                 temperature=0
             )
         
         model_time = (time.time() - model_start) * 1000
-        content = response.choices[0].message.content.strip()
         
         if content.startswith("```"):
             content = content.split("```")[1]
@@ -262,26 +238,45 @@ Message: {packet["msg"]}"""
             if url_match:
                 result["arguments"] = {"url": url_match.group(0)}
         
+        _TIER_COUNTS["llm"] += 1
         return {
             "mode": mode,
             "tool_name": tool_name,
             "arguments": result.get("arguments") or {}
         }
     except Exception as e:
+        _TIER_COUNTS["llm_error"] += 1
         return {"mode": "chat", "tool_name": None, "arguments": {}}
 
 
-def _validate_tool(tool_name: str, glow_state: Any) -> tuple:
+def get_router_stats() -> dict:
+    """Per-tier resolution counts/fractions plus fast-path matcher and semantic router stats"""
+    routed = sum(_TIER_COUNTS.values())
+    return {
+        "routed": routed,
+        "tiers": dict(_TIER_COUNTS),
+        "tier_fractions": {
+            tier: round(count / routed, 3) if routed else 0.0
+            for tier, count in _TIER_COUNTS.items()
+        },
+        "catalog": {"version": _CATALOG.version, "intents": len(_CATALOG.intents), "core_tools": len(_CATALOG.tools)},
+        "fast_path": _FAST_MATCHER.get_stats(),
+        "semantic": semantic_router.get_stats(),
+    }
+
+
+def _validate_tool(tool_name: str, glow_state: Any, catalog: Optional[RouterCatalog] = None) -> tuple:
     """Validate tool can run given current GlowState"""
-    if not tool_name or not SUPERPOWERS:
+    catalog = catalog or _CATALOG
+    if not tool_name or not catalog.superpowers:
         return False, None
     
-    # Fast cache lookup
-    superpower_name = _TOOL_CACHE.get(tool_name)
+    # Fast catalog lookup
+    superpower_name = catalog.intents.get(tool_name)
     if not superpower_name:
         return False, None
     
-    superpower = SUPERPOWERS.get(superpower_name)
+    superpower = catalog.superpowers.get(superpower_name)
     if not superpower or not hasattr(superpower, 'intent_map') or tool_name not in superpower.intent_map:
         return False, None
     
@@ -307,14 +302,15 @@ async def route_message(user_message: str, glow_state: Any = None) -> Dict:
         from glowos.glow_state import glow_state_store
         glow_state = glow_state_store.get_state()
     
-    packet = _build_router_packet(user_message, glow_state)
+    catalog = _CATALOG  # one catalog version for the whole decision
+    packet = _build_router_packet(user_message, glow_state, catalog)
     router_output = await _call_router_model(packet)
     mode = router_output.get("mode", "chat")
     tool_name = router_output.get("tool_name")
     arguments = router_output.get("arguments", {})
     
     if mode == "tool" and tool_name:
-        can_run, error_msg = _validate_tool(tool_name, glow_state)
+        can_run, error_msg = _validate_tool(tool_name, glow_state, catalog)
         
         if not can_run:
             return {
@@ -325,8 +321,7 @@ async def route_message(user_message: str, glow_state: Any = None) -> Dict:
                 "fallback_reason": error_msg or "Tool not available"
             }
         
-        # Use cache for fast lookup
-        superpower_name = _TOOL_CACHE.get(tool_name)
+        superpower_name = catalog.intents.get(tool_name)
         
         return {
             "mode": "tool",
@@ -357,8 +352,8 @@ async def execute_tool(
         from glowos.glow_state import glow_state_store
         glow_state = glow_state_store.get_state()
     
-    # Fast lookup using cache
-    superpower = SUPERPOWERS.get(superpower_name) if superpower_name else None
+    # Fast lookup using the routing catalog
+    superpower = _CATALOG.superpowers.get(superpower_name) if superpower_name else None
     
     if not superpower or not hasattr(superpower, 'intent_map') or tool_name not in superpower.intent_map:
         tool_time = (time.time() - tool_start) * 1000
@@ -376,25 +371,19 @@ async def execute_tool(
         started_at=datetime.utcnow()
     )
     
-    current_state = glow_state_store.get_state()
-    current_state.tasks.active.append(task)
-    glow_state_store.replace(current_state)
+    glow_state_store.add_task(task)
     
     # Pass task_id to tools that support progress updates (like rip_disc)
     if tool_name == "rip_disc" and "session_id" not in arguments:
         arguments["session_id"] = task_id
+    # File transfers report byte progress onto the task
+    if tool_name in ("move_file", "copy_file", "organize_files", "upload_file", "bulk_rename", "batch_move") and "task_id" not in arguments:
+        arguments["task_id"] = task_id
     
     try:
         result = await superpower.run(tool_name, **arguments)
         
-        current_state = glow_state_store.get_state()
-        for t in current_state.tasks.active:
-            if t.id == task_id:
-                t.status = "done"
-                t.progress = 1.0
-                t.finished_at = datetime.utcnow()
-                break
-        glow_state_store.replace(current_state)
+        glow_state_store.update_task(task_id, status="done", progress=1.0, finished_at=datetime.utcnow())
         
         tool_time = (time.time() - tool_start) * 1000
         print(f"✅ Tool execution complete: {tool_time:.1f}ms")
@@ -402,14 +391,7 @@ async def execute_tool(
         return result
         
     except Exception as e:
-        current_state = glow_state_store.get_state()
-        for t in current_state.tasks.active:
-            if t.id == task_id:
-                t.status = "error"
-                t.message = str(e)
-                t.finished_at = datetime.utcnow()
-                break
-        glow_state_store.replace(current_state)
+        glow_state_store.update_task(task_id, status="error", message=str(e), finished_at=datetime.utcnow())
         
         tool_time = (time.time() - tool_start) * 1000
         print(f"❌ Tool execution error ({tool_time:.1f}ms): {e}")
@@ -0,0 +1,151 @@
+"""
+📡 GlowState Feed - Change Stream over WebSocket
+The frontend used to poll /glow/state and get the whole serialized GlowState
+every time, even though most fields only change every 5–10s. Clients can now
+subscribe to the "glow_state" channel on the WebSocketManager: they get one
+full snapshot, then RFC 6902 JSON-patch deltas as the store's version moves.
+
+- Writes are coalesced: at most GLOW_STATE_FEED_MAX_HZ patches per second,
+  each covering every version since the previous one
+- All subscribers share one base version (a new subscriber's snapshot is the
+  last published state), so each patch is computed and serialized once
+- Watcher ticks that rewrite the same values send nothing
+- Lists are diffed as a whole (one "replace" op); they're short and usually
+  change wholesale (running_apps, downloads_recent, tasks)
+
+Messages:
+  {"type": "glow_state_snapshot", "version": n, "state": {...}}
+  {"type": "glow_state_patch", "from_version": m, "version": n, "ops": [...]}
+"""
+import asyncio
+import os
+import time
+from typing import Any, Dict, List, Optional
+
+GLOW_STATE_FEED_MAX_HZ = float(os.getenv("GLOW_STATE_FEED_MAX_HZ", "2"))
+GLOW_STATE_CHANNEL = "glow_state"
+
+
+def _pointer(path: str, key: str) -> str:
+    return f"{path}/{str(key).replace('~', '~0').replace('/', '~1')}"
+
+
+def json_patch(old: Any, new: Any, path: str = "") -> List[Dict[str, Any]]:
+    """Minimal RFC 6902 ops turning `old` into `new` (objects diffed by key, everything else replaced)."""
+    if isinstance(old, dict) and isinstance(new, dict):
+        ops: List[Dict[str, Any]] = []
+        for key in old:
+            if key not in new:
+                ops.append({"op": "remove", "path": _pointer(path, key)})
+        for key, value in new.items():
+            if key not in old:
+                ops.append({"op": "add", "path": _pointer(path, key), "value": value})
+            elif old[key] != value:
+                ops.extend(json_patch(old[key], value, _pointer(path, key)))
+        return ops
+    if old == new and type(old) is type(new):
+        return []
+    return [{"op": "replace", "path": path, "value": new}]
+
+
+class GlowStateFeed:
+    """Publishes GlowState snapshots + coalesced JSON-patch deltas to "glow_state" subscribers."""
+
+    def __init__(self, max_hz: float = GLOW_STATE_FEED_MAX_HZ):
+        self.min_interval = 1.0 / max_hz if max_hz > 0 else 0.0
+        self._manager = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._changed: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self._base: Optional[Dict[str, Any]] = None  # last published state (JSON form)
+        self._base_version = -1
+        self.stats = {"snapshots": 0, "patches": 0, "ops": 0, "coalesced_versions": 0}
+
+    def _on_change(self, state):
+        # Store writes can come from any thread
+        if self._loop is not None and self._changed is not None and not self._loop.is_closed():
+            self._loop.call_soon_threadsafe(self._changed.set)
+
+    def start(self, manager):
+        """Hook into the store and start publishing (call from app startup)."""
+        from glowos.glow_state import glow_state_store
+
+        self._manager = manager
+        if self._task is not None and not self._task.done():
+            return
+        self._loop = asyncio.get_running_loop()
+        self._changed = asyncio.Event()
+        glow_state_store.add_listener(self._on_change)
+        self._task = self._loop.create_task(self._run())
+
+    def _current(self):
+        from glowos.glow_state import glow_state_store
+
+        state = glow_state_store.get_state()
+        # version travels on the message, so writes that change nothing diff to no ops
+        return state.version, state.model_dump(mode="json", exclude={"version"})
+
+    async def subscribe(self, client_id: str):
+        """Subscribe a client and send it the snapshot the next patch will apply to."""
+        if self._base is None:
+            self._base_version, self._base = self._current()
+        self._manager.subscribe(client_id, GLOW_STATE_CHANNEL)
+        self.stats["snapshots"] += 1
+        await self._manager.send_message(client_id, {
+            "type": "glow_state_snapshot",
+            "version": self._base_version,
+            "state": self._base,
+        })
+
+    def unsubscribe(self, client_id: str):
+        self._manager.unsubscribe(client_id, GLOW_STATE_CHANNEL)
+
+    async def _publish(self):
+        version, state = self._current()
+        if self._base is None or version == self._base_version:
+            return
+        if not self._manager.get_subscribers(GLOW_STATE_CHANNEL):
+            # Nobody listening: the next subscriber gets a fresh snapshot instead
+            self._base, self._base_version = None, -1
+            return
+        ops = json_patch(self._base, state)
+        if not ops:
+            return  # nothing visible changed; clients stay on their current version
+        from_version = self._base_version
+        # Move the base before sending, so anyone subscribing mid-publish gets the new snapshot
+        self._base, self._base_version = state, version
+        self.stats["patches"] += 1
+        self.stats["ops"] += len(ops)
+        self.stats["coalesced_versions"] += version - from_version - 1
+        await self._manager.publish(GLOW_STATE_CHANNEL, {
+            "type": "glow_state_patch",
+            "from_version": from_version,
+            "version": version,
+            "ops": ops,
+        })
+
+    async def _run(self):
+        while True:
+            await self._changed.wait()
+            self._changed.clear()
+            started = time.monotonic()
+            try:
+                await self._publish()
+            except Exception as e:
+                print(f"⚠️ GlowState feed publish failed: {e}")
+            # Coalesce: changes landing during the wait go out together in the next patch
+            await asyncio.sleep(max(0.0, self.min_interval - (time.monotonic() - started)))
+
+    def get_stats(self) -> dict:
+        return {
+            "max_hz": round(1.0 / self.min_interval, 2) if self.min_interval else None,
+            "subscribers": len(self._manager.get_subscribers(GLOW_STATE_CHANNEL)) if self._manager else 0,
+            "base_version": self._base_version,
+            **self.stats,
+        }
+
+
+# Global instance
+glow_state_feed = GlowStateFeed()
+
+__all__ = ["GlowStateFeed", "glow_state_feed", "json_patch", "GLOW_STATE_CHANNEL"]
@@ -0,0 +1,279 @@
+"""
+📇 Knowledge Base Index - Filter-Aware Local Retrieval
+Mirrors the active `knowledge_base` rows in memory with one bitmap per
+(field, value) for category, subcategory, content_type, tags and
+access_level. Filters are intersected *before* vector scoring, so a filtered
+query always scores only rows that can be returned and yields up to `limit`
+results in one pass (the RPC path fetched limit*2 and filtered afterwards).
+"""
+import asyncio
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from services.memory_index import parse_vector, unit_vector, top_k_indices
+
+KB_INDEX_REFRESH_SECONDS = 300
+KB_MATCH_THRESHOLD = 0.5  # same threshold the match_knowledge_base RPC was called with
+
+# Fields that get posting bitmaps (tags is multi-valued)
+BITMAP_FIELDS = ("category", "subcategory", "content_type", "access_level", "user_id")
+RETURN_FIELDS = (
+    "id", "title", "content", "category", "subcategory", "content_type", "tags",
+    "access_level", "user_id", "metadata", "created_at",
+)
+
+
+class KnowledgeBaseIndex:
+    """
+    In-memory KB retrieval engine.
+
+    - _matrix: float32 unit vectors, one row per active entry (add_rows grows
+      it with spare capacity, so rows past len(self.rows) are unused)
+    - _bitmaps[field][value]: bool array marking rows with that value
+    - _tag_bitmaps[tag]: bool array marking rows carrying that tag
+    """
+
+    def __init__(self, refresh_seconds: float = KB_INDEX_REFRESH_SECONDS):
+        self.refresh_seconds = refresh_seconds
+        self.rows: List[Dict[str, Any]] = []
+        self.dim: Optional[int] = None
+        self._matrix = np.zeros((0, 0), dtype=np.float32)
+        self._bitmaps: Dict[str, Dict[str, np.ndarray]] = {}
+        self._tag_bitmaps: Dict[str, np.ndarray] = {}
+        self.ready = False
+        self.last_refresh: Optional[float] = None
+        self.last_report: Optional[dict] = None
+        self._task: Optional[asyncio.Task] = None
+        self.stats = {"searches": 0, "search_ms_total": 0.0, "pruned": {}}
+
+    # ---------------------------
+    # Build
+    # ---------------------------
+    def build(self, rows: List[Dict[str, Any]]):
+        """Replace the index contents with `rows` (inactive / unembedded rows are skipped)."""
+        kept, vectors = [], []
+        for row in rows or []:
+            if row.get("is_active") is False:
+                continue
+            vec = parse_vector(row.get("embedding"))
+            if vec is None:
+                continue
+            if vectors and vec.shape[0] != vectors[0].shape[0]:
+                print(f"⚠️ KB entry {row.get('id')} has dim {vec.shape[0]}, expected {vectors[0].shape[0]}; skipped")
+                continue
+            kept.append({field: row.get(field) for field in RETURN_FIELDS})
+            vectors.append(unit_vector(vec))
+
+        n = len(kept)
+        bitmaps: Dict[str, Dict[str, np.ndarray]] = {field: {} for field in BITMAP_FIELDS}
+        tag_bitmaps: Dict[str, np.ndarray] = {}
+        for i, row in enumerate(kept):
+            self._set_bits(bitmaps, tag_bitmaps, row, i, n)
+
+        # Swap in one go so searches never see a half-built index
+        self.rows = kept
+        self.dim = vectors[0].shape[0] if vectors else self.dim
+        self._matrix = np.vstack(vectors).astype(np.float32) if vectors else np.zeros((0, self.dim or 0), dtype=np.float32)
+        self._bitmaps = bitmaps
+        self._tag_bitmaps = tag_bitmaps
+        self.ready = True
+        self.last_refresh = time.time()
+
+    @staticmethod
+    def _set_bits(bitmaps: Dict[str, Dict[str, np.ndarray]], tag_bitmaps: Dict[str, np.ndarray], row: Dict[str, Any], i: int, size: int):
+        """Mark row `i` in the bitmaps for its field values and tags (new bitmaps get `size` slots)."""
+        for field in BITMAP_FIELDS:
+            value = row.get(field)
+            if value is None:
+                continue
+            bitmap = bitmaps[field].get(str(value))
+            if bitmap is None:
+                bitmap = bitmaps[field][str(value)] = np.zeros(size, dtype=bool)
+            bitmap[i] = True
+        for tag in row.get("tags") or []:
+            bitmap = tag_bitmaps.get(tag)
+            if bitmap is None:
+                bitmap = tag_bitmaps[tag] = np.zeros(size, dtype=bool)
+            bitmap[i] = True
+
+    def _reserve(self, size: int):
+        """Make room for `size` rows, doubling the matrix and bitmaps so appends stay amortized O(1)."""
+        capacity = self._matrix.shape[0]
+        if size <= capacity and self._matrix.shape[1] == self.dim:
+            return
+        capacity = max(size, 2 * capacity, 64)
+        n = len(self.rows)
+        matrix = np.zeros((capacity, self.dim), dtype=np.float32)
+        if n:
+            matrix[:n] = self._matrix[:n]
+        self._matrix = matrix
+        for bitmaps in [*self._bitmaps.values(), self._tag_bitmaps]:
+            for key, bitmap in bitmaps.items():
+                grown = np.zeros(capacity, dtype=bool)
+                grown[:n] = bitmap[:n]
+                bitmaps[key] = grown
+
+    def add_rows(self, rows: List[Dict[str, Any]], embeddings: Optional[List[Any]] = None):
+        """Append freshly inserted entries without waiting for the next refresh (no rebuild)."""
+        if not self.ready:
+            return
+        kept, vectors = [], []
+        for i, row in enumerate(rows or []):
+            if row.get("is_active") is False:
+                continue
+            vec = parse_vector(embeddings[i] if embeddings is not None else row.get("embedding"))
+            if vec is None:
+                continue
+            dim = self.dim if self.dim is not None else (vectors[0].shape[0] if vectors else vec.shape[0])
+            if vec.shape[0] != dim:
+                print(f"⚠️ KB entry {row.get('id')} has dim {vec.shape[0]}, expected {dim}; skipped")
+                continue
+            kept.append({field: row.get(field) for field in RETURN_FIELDS})
+            vectors.append(unit_vector(vec))
+        if not kept:
+            return
+
+        n = len(self.rows)
+        self.dim = vectors[0].shape[0]
+        self._reserve(n + len(kept))
+        self._matrix[n:n + len(kept)] = np.vstack(vectors)
+        for offset, row in enumerate(kept):
+            self._set_bits(self._bitmaps, self._tag_bitmaps, row, n + offset, self._matrix.shape[0])
+        self.rows.extend(kept)
+
+    # ---------------------------
+    # Search
+    # ---------------------------
+    def _any_of(self, bitmaps: Dict[str, np.ndarray], values: List[str]) -> np.ndarray:
+        n = len(self.rows)
+        mask = np.zeros(n, dtype=bool)
+        for value in values:
+            bitmap = bitmaps.get(str(value))
+            if bitmap is not None:
+                mask |= bitmap[:n]
+        return mask
+
+    def search(
+        self,
+        query_embedding: Any,
+        *,
+        limit: int = 5,
+        category: Optional[str] = None,
+        subcategory: Optional[str] = None,
+        content_type: Optional[str] = None,
+        tags: Optional[List[str]] = None,
+        user_id: Optional[str] = None,
+        threshold: float = KB_MATCH_THRESHOLD,
+    ) -> Optional[Tuple[List[Dict[str, Any]], dict]]:
+        """
+        Filter, then score. Returns (results, report) or None when the index
+        can't answer (not ready / dimension mismatch).
+
+        report = {"candidates", "pruned": {filter: rows removed}, "scored", "above_threshold", "returned"}
+        """
+        if not self.ready:
+            return None
+        query = parse_vector(query_embedding)
+        if query is None or (self.rows and query.shape[0] != self.dim):
+            return None
+
+        started = time.perf_counter()
+        n = len(self.rows)
+        mask = np.ones(n, dtype=bool)
+        pruned: Dict[str, int] = {}
+
+        def apply(name: str, bitmap: np.ndarray):
+            nonlocal mask
+            before = int(mask.sum())
+            mask &= bitmap
+            pruned[name] = before - int(mask.sum())
+
+        if category:
+            apply("category", self._any_of(self._bitmaps["category"], [category]))
+        if subcategory:
+            apply("subcategory", self._any_of(self._bitmaps["subcategory"], [subcategory]))
+        if content_type:
+            apply("content_type", self._any_of(self._bitmaps["content_type"], [content_type]))
+        if tags:
+            apply("tags", self._any_of(self._tag_bitmaps, tags))
+        # Access: public entries, plus the user's own entries when a user is given
+        access = self._any_of(self._bitmaps["access_level"], ["public"])
+        if user_id:
+            access |= self._any_of(self._bitmaps["user_id"], [user_id])
+        apply("access_level", access)
+
+        candidates = np.flatnonzero(mask)
+        results: List[Dict[str, Any]] = []
+        above = 0
+        if candidates.size:
+            scores = self._matrix[candidates] @ unit_vector(query)
+            passing = scores > threshold
+            above = int(passing.sum())
+            candidates, scores = candidates[passing], scores[passing]
+            for j in top_k_indices(scores, limit):
+                results.append(dict(self.rows[candidates[j]], similarity=float(scores[j])))
+
+        report = {
+            "candidates": n,
+            "pruned": pruned,
+            "scored": int(mask.sum()),
+            "above_threshold": above,
+            "returned": len(results),
+        }
+        self.last_report = report
+        self.stats["searches"] += 1
+        self.stats["search_ms_total"] += (time.perf_counter() - started) * 1000
+        for name, count in pruned.items():
+            self.stats["pruned"][name] = self.stats["pruned"].get(name, 0) + count
+        return results, report
+
+    # ---------------------------
+    # Supabase sync
+    # ---------------------------
+    async def _fetch_active(self) -> List[Dict[str, Any]]:
+        from services.db import db
+        return await db.data_paged(
+            lambda start, end: db.table("knowledge_base").select("*").eq("is_active", True).range(start, end),
+            "kb_index_refresh",
+        )
+
+    async def refresh(self):
+        rows = await self._fetch_active()
+        self.build(rows)
+        print(f"📇 KB index refreshed: {len(self.rows)} entries, {len(self._tag_bitmaps)} tags")
+
+    async def _run(self):
+        while True:
+            try:
+                await self.refresh()
+            except Exception as e:
+                print(f"⚠️ KB index refresh failed (RPC fallback stays active): {e}")
+            await asyncio.sleep(self.refresh_seconds)
+
+    def start(self):
+        """Build now and refresh periodically (call from app startup)."""
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    def get_stats(self) -> dict:
+        searches = self.stats["searches"]
+        return {
+            "ready": self.ready,
+            "entries": len(self.rows),
+            "dim": self.dim,
+            "bitmaps": {field: len(values) for field, values in self._bitmaps.items()},
+            "tags": len(self._tag_bitmaps),
+            "last_refresh": self.last_refresh,
+            "searches": searches,
+            "avg_search_ms": round(self.stats["search_ms_total"] / searches, 3) if searches else 0.0,
+            "pruned_total": dict(self.stats["pruned"]),
+            "last_report": self.last_report,
+        }
+
+
+# Global instance
+kb_index = KnowledgeBaseIndex()
+
+__all__ = ["KnowledgeBaseIndex", "kb_index", "KB_MATCH_THRESHOLD"]
@@ -3,34 +3,21 @@
 Handles evidence-based therapeutic knowledge retrieval and formatting
 """
 from typing import List, Optional, Dict, Any
-import httpx
 import re
 
 # Import from your existing config
-from config import supabase, client as groq_client
+from services.db import db
+from services.llm_providers import complete_chat
+from services.embeddings import embed_text, DEFAULT_EMBED_MODEL
+from services.kb_index import kb_index, KB_MATCH_THRESHOLD
+from services.context_budget import count_tokens, KNOWLEDGE_HEADER
 
-async def embed_text_ollama(text: str, model: str = "nomic-embed-text"):
-    """Generate embedding using Ollama (same as memories)"""
-    try:
-        async with httpx.AsyncClient() as client:
-            resp = await client.post(
-                "http://localhost:11434/api/embed",
-                json={"model": model, "input": [text]},
-                timeout=30.0
-            )
-            resp.raise_for_status()
-            data = resp.json()
-            
-            if "embeddings" in data and data["embeddings"]:
-                embedding = data["embeddings"][0]
-                print(f"🔍 KB Embedding length: {len(embedding)}")
-                return embedding  # This is a list/array
-            else:
-                print(f"❌ No embeddings returned from Ollama: {data}")
-                return None
-    except Exception as e:
-        print(f"❌ Ollama embedding error: {e}")
-        return None
+async def embed_text_ollama(text: str, model: str = DEFAULT_EMBED_MODEL):
+    """Generate embedding using the shared Ollama embedding service (same as memories)"""
+    embedding = await embed_text(text, model)
+    if embedding is None:
+        print("❌ No embeddings returned from Ollama")
+    return embedding
 
 
 async def search_knowledge_base(
@@ -39,7 +26,8 @@ async def search_knowledge_base(
     content_type: Optional[str] = None,
     tags: Optional[List[str]] = None,
     limit: int = 5,
-    user_id: Optional[str] = None
+    user_id: Optional[str] = None,
+    subcategory: Optional[str] = None
 ) -> List[Dict[str, Any]]:
     """
     Search knowledge base using semantic similarity with Ollama embeddings
@@ -51,6 +39,7 @@ async def search_knowledge_base(
         tags: Filter by tags
         limit: Number of results to return
         user_id: User ID for personalized results
+        subcategory: Filter by subcategory
     
     Returns:
         List of relevant knowledge base entries with similarity scores
@@ -65,18 +54,30 @@ async def search_knowledge_base(
         
         print(f"🔍 KB Search: Generated embedding with {len(query_embedding)} dimensions")
         
+        # Local index: filters are intersected before scoring, so this is one exact pass
+        local = kb_index.search(
+            query_embedding,
+            limit=limit,
+            category=category,
+            subcategory=subcategory,
+            content_type=content_type,
+            tags=tags,
+            user_id=user_id,
+        )
+        if local is not None:
+            final_results, report = local
+            print(f"🔍 KB index: {report['scored']}/{report['candidates']} candidates after filters "
+                  f"(pruned {report['pruned']}), {report['above_threshold']} above threshold")
+            print(f"✅ Knowledge base search returning {len(final_results)} results")
+            return final_results
+        
+        # Fallback until the index is ready: RPC, then filter in Python
         # Call the RPC function (same pattern as match_memories)
-        response = supabase.rpc(
-            'match_knowledge_base',
-            {
-                'query_embedding': query_embedding,
-                'match_threshold': 0.5,  # Lower threshold for better recall
-                'match_count': limit * 2  # Get more, filter later
-            }
-        ).execute()
-        
-        # Get the data
-        results = response.data if response.data else []
+        results = await db.match_knowledge_base(
+            query_embedding,
+            KB_MATCH_THRESHOLD,  # Lower threshold for better recall
+            limit * 2  # Get more, filter later
+        )
         
         print(f"🔍 KB search returned {len(results)} raw results")
         
@@ -85,6 +86,9 @@ async def search_knowledge_base(
             results = [r for r in results if r.get('category') == category]
             print(f"🔍 After category filter: {len(results)} results")
         
+        if subcategory:
+            results = [r for r in results if r.get('subcategory') == subcategory]
+        
         if content_type:
             results = [r for r in results if r.get('content_type') == content_type]
             print(f"🔍 After content_type filter: {len(results)} results")
@@ -124,7 +128,7 @@ async def get_knowledge_by_category(
 ) -> List[Dict[str, Any]]:
     """Get all knowledge entries for a specific category"""
     try:
-        query = supabase.table('knowledge_base')\
+        query = db.table('knowledge_base')\
             .select('*')\
             .eq('category', category)\
             .eq('is_active', True)\
@@ -133,31 +137,50 @@ async def get_knowledge_by_category(
         if subcategory:
             query = query.eq('subcategory', subcategory)
         
-        response = query.execute()
-        return response.data if response.data else []
+        return await db.data(query, "knowledge_by_category")
         
     except Exception as e:
         print(f"❌ Error fetching knowledge by category: {e}")
         return []
 
 
+# Always available when the knowledge base can't be reached (or has no crisis entries)
+CRISIS_FALLBACK_RESOURCES = [
+    {
+        "id": "crisis-fallback-988",
+        "title": "988 Suicide & Crisis Lifeline",
+        "category": "crisis-skills",
+        "content": "Call or text 988 (US) any time, 24/7, to reach a trained crisis counselor. "
+                   "Chat is available at 988lifeline.org. If someone is in immediate danger, call 911.",
+    },
+    {
+        "id": "crisis-fallback-text-line",
+        "title": "Crisis Text Line",
+        "category": "crisis-skills",
+        "content": "Text HOME to 741741 (US) to connect with a trained crisis counselor, free and 24/7.",
+    },
+]
+
+
 async def get_crisis_resources() -> List[Dict[str, Any]]:
-    """Get crisis intervention resources - PRIORITY"""
+    """Get crisis intervention resources - PRIORITY (falls back to CRISIS_FALLBACK_RESOURCES, never empty)"""
     try:
-        response = supabase.table('knowledge_base')\
-            .select('*')\
-            .or_('category.eq.crisis-skills,tags.cs.{CRITICAL}')\
-            .eq('is_active', True)\
-            .execute()
+        resources = await db.data(
+            db.table('knowledge_base')
+            .select('*')
+            .or_('category.eq.crisis-skills,tags.cs.{CRITICAL}')
+            .eq('is_active', True),
+            "crisis_resources"
+        )
         
-        print(f"✅ Crisis resources retrieved: {len(response.data) if response.data else 0} entries")
-        return response.data if response.data else []
+        print(f"✅ Crisis resources retrieved: {len(resources)} entries")
+        return resources or list(CRISIS_FALLBACK_RESOURCES)
         
     except Exception as e:
         print(f"❌ Error fetching crisis resources: {e}")
         import traceback
         traceback.print_exc()
-        return []
+        return list(CRISIS_FALLBACK_RESOURCES)
 
 
 async def summarize_knowledge_entry(entry: Dict[str, Any], target_length: int = 300) -> str:
@@ -207,9 +230,10 @@ Content to summarize:
 Provide a concise summary that preserves all numerical data and key information:"""
 
         # Use Groq for fast summarization
-        response = groq_client.chat.completions.create(
-            model="llama-3.1-8b-instant",
-            messages=[
+        summary = await complete_chat(
+            "groq",
+            "llama-3.1-8b-instant",
+            [
                 {"role": "system", "content": "You are a precise summarization assistant that preserves all numerical data and key information exactly."},
                 {"role": "user", "content": summarize_prompt}
             ],
@@ -217,8 +241,6 @@ Provide a concise summary that preserves all numerical data and key information:
             max_tokens=400
         )
         
-        summary = response.choices[0].message.content.strip()
-        
         # Verify numbers were preserved (basic check)
         original_numbers = set(re.findall(r'\b\d+[.,]?\d*\b', content))
         summary_numbers = set(re.findall(r'\b\d+[.,]?\d*\b', summary))
@@ -265,73 +287,72 @@ def truncate_text_smart(text: str, max_chars: int) -> str:
     return text[:break_point] + truncation_indicator
 
 
-async def format_knowledge_for_context(
+async def format_knowledge_blocks(
     knowledge_entries: List[Dict[str, Any]],
-    max_tokens: int = 2000,  # Reduced default to be more conservative
-    use_summarization: bool = True  # Enable AI summarization
-) -> str:
+    max_tokens: int = 2000,
+    use_summarization: bool = True
+) -> List[Dict[str, Any]]:
     """
-    Format knowledge base entries for inclusion in AI context with intelligent truncation.
-    
+    Format knowledge base entries into per-entry context blocks within a token budget.
+
     Args:
         knowledge_entries: List of knowledge base entries (should be sorted by relevance)
-        max_tokens: Maximum tokens to include (rough estimate: 4 chars = 1 token)
-    
+        max_tokens: Maximum tokens across all blocks (counted with the real tokenizer)
+
     Returns:
-        Formatted string for AI context
+        [{"id", "title", "similarity", "text"}] in relevance order; each text ends with a "---" separator
     """
     if not knowledge_entries:
-        return ""
-    
-    # Reserve tokens for header and structure
-    header = "=== RELEVANT KNOWLEDGE BASE INFORMATION ===\n"
-    max_chars = max_tokens * 4  # Rough estimate: 4 chars per token
-    reserved_chars = len(header) + 200  # Reserve for separators and metadata
-    available_chars = max_chars - reserved_chars
-    
+        return []
+
+    # Reserve tokens for the context header and separators
+    available_tokens = max_tokens - count_tokens(KNOWLEDGE_HEADER) - 50
+
     # Sort by similarity if available (higher = more relevant)
     sorted_entries = sorted(
         knowledge_entries,
         key=lambda x: x.get('similarity', 0),
         reverse=True
     )
-    
-    context_parts = [header]
-    current_length = len(header)
-    
+
+    blocks = []
+    used_tokens = 0
+
     # Allocate tokens per entry based on relevance
     # Higher similarity entries get more tokens
     num_entries = len(sorted_entries)
-    base_allocation = available_chars // max(num_entries, 1)
+    base_allocation = available_tokens // max(num_entries, 1)
     max_per_entry = base_allocation * 2  # Cap individual entries
-    
-    for i, entry in enumerate(sorted_entries):
+
+    for entry in sorted_entries:
         similarity = entry.get('similarity', 0.5)
-        
-        # Allocate more tokens for higher similarity entries
+
         # Scale from 0.5x to 2x base allocation based on similarity
         similarity_multiplier = 0.5 + (similarity * 1.5)  # Range: 0.5 to 2.0
-        entry_max_chars = min(
+        entry_max_tokens = min(
             int(base_allocation * similarity_multiplier),
             max_per_entry
         )
-        
+
         # Build entry header
         entry_header = f"\n## {entry['title']}\n"
-        
+
         if entry.get('category'):
             entry_header += f"Category: {entry['category']}"
             if entry.get('subcategory'):
                 entry_header += f" > {entry['subcategory']}"
             entry_header += "\n"
-        
+
         # Summarize or truncate content intelligently
         content = entry.get('content', '')
-        header_length = len(entry_header) + 50  # Reserve for metadata
-        content_max = max(entry_max_chars - header_length, 100)  # At least 100 chars
-        
+        content_tokens = count_tokens(content, item_id=entry.get('id'))
+        content_max_tokens = max(entry_max_tokens - count_tokens(entry_header) - 20, 25)
+        # truncate_text_smart works in chars; scale by this entry's own chars/token ratio
+        chars_per_token = len(content) / content_tokens if content_tokens else 4
+        content_max = max(int(content_max_tokens * chars_per_token), 100)  # At least 100 chars
+
         # Use AI summarization if enabled and content is long enough to benefit
-        if use_summarization and len(content) > content_max * 1.5:
+        if use_summarization and content_tokens > content_max_tokens * 1.5:
             try:
                 summarized_content = await summarize_knowledge_entry(entry, content_max)
                 truncated_content = summarized_content
@@ -340,9 +361,9 @@ async def format_knowledge_for_context(
                 truncated_content = truncate_text_smart(content, content_max)
         else:
             truncated_content = truncate_text_smart(content, content_max)
-        
+
         entry_text = entry_header + f"\n{truncated_content}\n"
-        
+
         # Add metadata if available
         if entry.get('metadata'):
             metadata = entry['metadata']
@@ -355,25 +376,56 @@ async def format_knowledge_for_context(
                 metadata_text += f"\nEvidence Level: {metadata['evidence_level']}"
             if metadata_text:
                 entry_text += metadata_text + "\n"
-        
+
         entry_text += "\n---\n"
-        
+        entry_tokens = count_tokens(entry_text)
+
         # Check if adding this entry would exceed max tokens
-        if current_length + len(entry_text) > max_chars:
-            # Try to fit at least a summary
-            remaining_chars = max_chars - current_length - 100
-            if remaining_chars > 200:
-                # Add a truncated version
-                entry_text = entry_header + f"\n{truncate_text_smart(content, remaining_chars)}\n---\n"
-                context_parts.append(entry_text)
+        if used_tokens + entry_tokens > available_tokens:
+            # Try to fit at least a truncated version
+            remaining_tokens = available_tokens - used_tokens - count_tokens(entry_header) - 10
+            if remaining_tokens > 50:
+                entry_text = entry_header + f"\n{truncate_text_smart(content, int(remaining_tokens * chars_per_token))}\n---\n"
+                blocks.append({
+                    "id": entry.get('id'),
+                    "title": entry.get('title'),
+                    "similarity": similarity,
+                    "text": entry_text,
+                })
             break
-        
-        context_parts.append(entry_text)
-        current_length += len(entry_text)
-    
-    result = "".join(context_parts)
-    estimated_tokens = len(result) // 4
-    print(f"📚 Formatted knowledge context: {len(result)} chars (~{estimated_tokens} tokens), {len(context_parts)-1} entries")
+
+        blocks.append({
+            "id": entry.get('id'),
+            "title": entry.get('title'),
+            "similarity": similarity,
+            "text": entry_text,
+        })
+        used_tokens += entry_tokens
+
+    return blocks
+
+
+async def format_knowledge_for_context(
+    knowledge_entries: List[Dict[str, Any]],
+    max_tokens: int = 2000,  # Reduced default to be more conservative
+    use_summarization: bool = True  # Enable AI summarization
+) -> str:
+    """
+    Format knowledge base entries for inclusion in AI context with intelligent truncation.
+
+    Args:
+        knowledge_entries: List of knowledge base entries (should be sorted by relevance)
+        max_tokens: Maximum tokens to include
+
+    Returns:
+        Formatted string for AI context
+    """
+    blocks = await format_knowledge_blocks(knowledge_entries, max_tokens, use_summarization)
+    if not blocks:
+        return ""
+
+    result = KNOWLEDGE_HEADER + "".join(block["text"] for block in blocks)
+    print(f"📚 Formatted knowledge context: {len(result)} chars ({count_tokens(result)} tokens), {len(blocks)} entries")
     return result
 
 
@@ -413,6 +465,7 @@ __all__ = [
     'search_knowledge_base',
     'get_knowledge_by_category',
     'get_crisis_resources',
+    'format_knowledge_blocks',
     'format_knowledge_for_context',
     'summarize_knowledge_entry',
     'test_knowledge_base'
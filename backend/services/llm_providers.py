@@ -0,0 +1,145 @@
+"""
+🤖 LLM Providers - Async Completion & Streaming Layer
+One place that talks to Groq, Claude and OpenAI through their async clients,
+so a streaming reply never blocks the event loop (other WebSockets, watchers
+and HTTP requests keep running while tokens flow). The SDK clients share
+their HTTP connection pools process-wide.
+"""
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+
+from config import async_client, async_claude, async_openai_client
+
+# Frontend model name → (provider, model id)
+CHAT_MODELS: Dict[str, Tuple[str, str]] = {
+    "Groq": ("groq", "llama-3.1-8b-instant"),
+    "Groq-LLaMA3-70B": ("groq", "llama-3.3-70b-versatile"),
+    "Claude": ("claude", "claude-3.5-sonnet-20240620"),
+    "GPT-4o": ("openai", "gpt-4o-2024-11-20"),
+}
+DEFAULT_CHAT_MODEL = "Groq"
+
+
+def resolve_chat_model(selected_model: str) -> Tuple[str, str]:
+    """Map the UI model name to (provider, model id); unknown names fall back to Groq 8B."""
+    return CHAT_MODELS.get(selected_model, CHAT_MODELS[DEFAULT_CHAT_MODEL])
+
+
+def _get_client(provider: str):
+    if provider == "groq":
+        return async_client
+    if provider == "claude":
+        return async_claude
+    if provider == "openai":
+        if async_openai_client is None:
+            raise RuntimeError("OpenAI client is not configured (OPENAI_API_KEY missing)")
+        return async_openai_client
+    raise ValueError(f"Unknown LLM provider: {provider}")
+
+
+def _claude_params(params: Dict[str, Any]) -> Dict[str, Any]:
+    """Claude takes max_tokens (required) + temperature; OpenAI-style sampling knobs are dropped."""
+    return {
+        "max_tokens": params.get("max_tokens") or 1024,
+        "temperature": params.get("temperature", 0.7),
+    }
+
+
+async def complete_chat(provider: str, model: str, messages: List[Dict[str, Any]], **params) -> str:
+    """Single non-streaming completion; returns the stripped reply text."""
+    llm = _get_client(provider)
+    if provider == "claude":
+        response = await llm.messages.create(model=model, messages=messages, **_claude_params(params))
+        return response.content[0].text.strip()
+
+    response = await llm.chat.completions.create(model=model, messages=messages, **params)
+    return (response.choices[0].message.content or "").strip()
+
+
+class ChatStream:
+    """
+    Async token stream from any provider.
+
+    Use as an async context manager so leaving early (user cancelled, task
+    cancelled, error) closes the upstream HTTP stream instead of letting the
+    provider keep generating:
+
+        async with stream_chat("groq", model, messages, temperature=0.7) as stream:
+            async for text in stream:
+                ...
+    """
+
+    def __init__(self, provider: str, model: str, messages: List[Dict[str, Any]], params: Dict[str, Any]):
+        self.provider = provider
+        self.model = model
+        self.messages = messages
+        self.params = params
+        self._response = None
+        self._manager = None
+
+    async def __aenter__(self) -> "ChatStream":
+        llm = _get_client(self.provider)
+        if self.provider == "claude":
+            self._manager = llm.messages.stream(
+                model=self.model, messages=self.messages, **_claude_params(self.params)
+            )
+            self._response = await self._manager.__aenter__()
+        else:
+            self._response = await llm.chat.completions.create(
+                model=self.model, messages=self.messages, stream=True, **self.params
+            )
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.aclose(exc_type, exc, tb)
+        return False
+
+    def __aiter__(self) -> AsyncIterator[str]:
+        return self._iterate()
+
+    async def _iterate(self) -> AsyncIterator[str]:
+        if self.provider == "claude":
+            async for text in self._response.text_stream:
+                if text:
+                    yield text
+            return
+        async for chunk in self._response:
+            if chunk.choices and chunk.choices[0].delta.content:
+                yield chunk.choices[0].delta.content
+
+    async def aclose(self, exc_type=None, exc=None, tb=None):
+        try:
+            if self._manager is not None:
+                await self._manager.__aexit__(exc_type, exc, tb)
+            elif self._response is not None and hasattr(self._response, "close"):
+                await self._response.close()
+        except Exception as e:
+            print(f"⚠️ Failed to close {self.provider} stream: {e}")
+        finally:
+            self._manager = None
+            self._response = None
+
+
+def stream_chat(provider: str, model: str, messages: List[Dict[str, Any]], **params) -> ChatStream:
+    """Open a token stream (see ChatStream)."""
+    return ChatStream(provider, model, messages, params)
+
+
+def sampling_params(chat_style: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    """Persona chat_style → OpenAI/Groq sampling kwargs (same defaults the chat routes used)."""
+    chat_style = chat_style or {}
+    return {
+        "temperature": chat_style.get("temperature", 0.7),
+        "top_p": chat_style.get("top_p", 1.0),
+        "presence_penalty": chat_style.get("presence_penalty", 0.0),
+        "frequency_penalty": chat_style.get("frequency_penalty", 0.0),
+    }
+
+
+__all__ = [
+    "CHAT_MODELS",
+    "resolve_chat_model",
+    "complete_chat",
+    "stream_chat",
+    "ChatStream",
+    "sampling_params",
+]
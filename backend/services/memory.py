@@ -1,5 +1,8 @@
-from config.env import supabase
-import httpx
+from services.db import db
+from services.embeddings import embed_text, DEFAULT_EMBED_MODEL
+from services.memory_index import memory_index
+from services.message_log import message_log
+from services.thread_cache import thread_cache
 import asyncio
 import json
 from datetime import datetime
@@ -40,50 +43,31 @@ async def get_or_create_thread(user_id: str, thread_title: str = None):
     Returns an existing thread for the user or creates a new one.
     """
     # Try to get an existing thread (e.g., the most recent)
-    res = supabase.table("chat_threads")\
-        .select("*")\
-        .eq("user_id", user_id)\
-        .order("created_at", desc=True)\
-        .limit(1)\
-        .execute()
-    
-    threads = getattr(res, "data", [])
-    if threads:
-        return threads[0]["id"]
+    thread = await db.latest_thread(user_id)
+    if thread:
+        return thread["id"]
 
     # If no thread exists, create one
     data = {
         "user_id": user_id,
         "title": thread_title or "New Chat Thread"
     }
-    new_thread = supabase.table("chat_threads").insert(data).execute()
-    return new_thread.data[0]["id"]
+    new_thread = await db.create_thread(data)
+    return new_thread["id"]
 
 async def log_message_to_db(thread_id, role, content, metadata=None):
-    embedding = await embed_text_ollama(content)
-    
-    print(f"🔍 About to store embedding type: {type(embedding)}")
-    print(f"🔍 Embedding length: {len(embedding) if embedding else 'None'}")
-    
+    """
+    Queue a chat message on the write-behind log and return {"id": ...} right away.
+    Embedding + insert happen in batches in the background (services.message_log).
+    """
     try:
-        # Convert Python list to PostgreSQL vector format
-        embedding_str = '[' + ','.join(map(str, embedding)) + ']'
-        
-        # Use raw SQL to properly insert the vector
-        result = supabase.rpc(
-            'insert_chat_message_with_vector',
-            {
-                'p_thread_id': thread_id,
-                'p_role': role,
-                'p_content': content,
-                'p_metadata': metadata or {},
-                'p_embedding': embedding_str
-            }
-        ).execute()
-        
-        print(f"🔍 Vector inserted via RPC")
-        return result
-        
+        message = message_log.enqueue(thread_id, role, content, metadata)
+        thread_cache.append(message)
+        # No background flusher (scripts, tests): write through so nothing is left behind
+        if not message_log.running:
+            await message_log.flush()
+        return {"id": message["id"], "thread_id": thread_id, "created_at": message["created_at"]}
+
     except Exception as e:
         print("❌ Failed to log message to Supabase:", e)
         return None
@@ -99,7 +83,9 @@ async def add_memory(memory):
         "importance": int(memory.get("importance", 5)),
         "metadata": metadata
     }
-    return supabase.table("memories").insert(memory_to_insert).execute()
+    result = await db.insert_memory(memory_to_insert)
+    memory_index.add_rows(getattr(result, "data", None) or [], [embedding])
+    return result
 
 
 async def log_token_usage(
@@ -121,7 +107,7 @@ async def log_token_usage(
             "thread_id": thread_id,
             "created_at": datetime.utcnow().isoformat()
         }
-        supabase.table("token_usage").insert(record).execute()
+        await db.insert_token_usage(record)
         print(f"✅ Logged {tokens_used} tokens for user {user_id} on model {model_name}")
     except Exception as e:
         print(f"❌ Failed to log token usage: {e}")
@@ -131,55 +117,34 @@ async def log_token_usage(
 
 # endregion
 
-async def embed_text_ollama(text: str, model: str = "nomic-embed-text"):
-    try:
-        async with httpx.AsyncClient() as client:
-            resp = await client.post(
-                "http://localhost:11434/api/embed",
-                json={"model": model, "input": [text]},
-                timeout=30.0
-            )
-            resp.raise_for_status()
-            data = resp.json()
-            
-            # Add debug logging
-            print(f"🔍 Ollama response type: {type(data.get('embeddings', []))}")
-            print(f"🔍 First embedding type: {type(data.get('embeddings', [[]])[0])}")
-            
-            if "embeddings" in data and data["embeddings"]:
-                embedding = data["embeddings"][0]
-                print(f"🔍 Embedding length: {len(embedding)}")
-                print(f"🔍 First 5 values: {embedding[:5]}")
-                return embedding  # This should be a list/array
-            else:
-                print(f"❌ No embeddings returned: {data}")
-                return None
-    except Exception as e:
-        print(f"❌ Error: {e}")
-        return None
+async def embed_text_ollama(text: str, model: str = DEFAULT_EMBED_MODEL):
+    """Embed text through the shared, pooled + micro-batched embedding service."""
+    embedding = await embed_text(text, model)
+    if embedding is None:
+        print("❌ No embedding returned from Ollama")
+    return embedding
 
-async def get_thread_messages_for_context(thread_id: str, limit: int = 50):
-    """Fetch messages for chat context WITHOUT embeddings"""
+async def get_thread_messages_for_context(thread_id: str, limit: int = 50, exclude_id: Optional[str] = None):
+    """
+    Most recent messages for chat context WITHOUT embeddings (served from the thread cache).
+    exclude_id: the current turn's user message, which the prompt builder appends itself.
+    """
     try:
-        print(f"🔍 Fetching messages for thread_id: {thread_id}")
-        
-        history_resp = supabase.table("chat_messages") \
-            .select("id, thread_id, role, content, metadata, created_at") \
-            .eq("thread_id", thread_id) \
-            .order("created_at", desc=False) \
-            .limit(limit) \
-            .execute()
-
-        print(f"🔍 Raw response data: {history_resp}")
-        
+        fetch = limit + 1 if exclude_id else limit
+        if thread_cache.covers(thread_id, fetch):
+            rows = await thread_cache.get(thread_id, fetch)
+        else:
+            rows = await db.fetch_recent_thread_messages(thread_id, fetch)
+
         history_messages = [
-            {"role": m["role"], "content": m["content"]}
-            for m in getattr(history_resp, "data", [])
-        ]
-        
-        print(f"🔍 Found {len(history_messages)} history messages")
+            {"id": m.get("id"), "role": m["role"], "content": m["content"]}
+            for m in rows
+            if not exclude_id or str(m.get("id")) != str(exclude_id)
+        ][-limit:]
+
+        print(f"🔍 Found {len(history_messages)} history messages for thread {thread_id}")
         return history_messages
-        
+
     except Exception as e:
         print("❌ Supabase chat_messages fetch failed:", str(e))
         return []
@@ -244,6 +209,25 @@ def select_memories_for_context(records: list[dict], *, deep_memory: bool, limit
     return selected[:limit], len(normalized), usable
 
 
+async def search_memories(query_embedding, *, deep_memory: bool, limit: int = 15,
+                          match_count: Optional[int] = None, user_id: Optional[str] = None):
+    """
+    Top memories for a query embedding → (selected, total_candidates, usable_candidates).
+    Served from the local memory index; falls back to the match_memories RPC until it is ready.
+    """
+    local = memory_index.search(
+        query_embedding, k=limit, exclude_multi_part=not deep_memory, user_id=user_id
+    )
+    if local is not None:
+        rows, total, usable = local
+        return [normalize_memory_record(r) for r in rows], total, usable
+
+    if not isinstance(match_count, int):
+        match_count = 200 if not deep_memory else 60
+    memories = await db.match_memories(query_embedding, match_count)
+    return select_memories_for_context(memories, deep_memory=deep_memory, limit=limit)
+
+
 async def main():
     text = "Hello world, this is a test embedding."
     emb = await embed_text_ollama(text)
@@ -0,0 +1,465 @@
+"""
+🧭 Memory Index - Local Vector Index mirroring the `memories` table
+Keeps every memory embedding in a float32 matrix that is memory-mapped from
+disk at startup, so top-k retrieval is a local matrix-vector product instead
+of a `match_memories` RPC that ships 200 rows over the wire.
+
+- Flat (exact) cosine search for small tables, IVF (k-means partitions,
+  probe the closest lists) once the table grows past MEMORY_INDEX_IVF_MIN_ROWS
+- Filters (multi-part flag, user_id) are applied as masks during the search
+- Kept in sync by add_rows() on insert, periodic delta pulls and a periodic
+  reconcile that picks up edits/deletes made from the frontend
+"""
+import asyncio
+import json
+import os
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MEMORY_INDEX_DIR = os.getenv("MEMORY_INDEX_DIR", os.path.join(BACKEND_DIR, ".cache", "memory_index"))
+MEMORY_INDEX_SYNC_SECONDS = float(os.getenv("MEMORY_INDEX_SYNC_SECONDS", "60"))
+MEMORY_INDEX_RECONCILE_EVERY = int(os.getenv("MEMORY_INDEX_RECONCILE_EVERY", "10"))  # sync cycles
+MEMORY_INDEX_IVF_MIN_ROWS = int(os.getenv("MEMORY_INDEX_IVF_MIN_ROWS", "20000"))
+
+# Columns kept alongside each vector (what match_memories returns, minus the embedding)
+ROW_FIELDS = ("id", "name", "content", "importance", "created_at", "metadata", "user_id")
+PAGE_SIZE = 1000
+
+
+def parse_vector(value: Any) -> Optional[np.ndarray]:
+    """Accept a list or a pgvector string ("[0.1,0.2,...]") and return a float32 vector."""
+    if value is None:
+        return None
+    if isinstance(value, str):
+        try:
+            value = json.loads(value)
+        except Exception:
+            return None
+    try:
+        vec = np.asarray(value, dtype=np.float32)
+    except Exception:
+        return None
+    if vec.ndim != 1 or vec.size == 0:
+        return None
+    return vec
+
+
+def unit_vector(vec: np.ndarray) -> np.ndarray:
+    norm = float(np.linalg.norm(vec))
+    return vec / norm if norm > 0 else vec
+
+
+def top_k_indices(scores: np.ndarray, k: int) -> np.ndarray:
+    """Indices of the k highest scores, best first (argpartition, no full sort)."""
+    if k <= 0 or scores.size == 0:
+        return np.empty(0, dtype=np.int64)
+    if k < scores.size:
+        part = np.argpartition(-scores, k - 1)[:k]
+    else:
+        part = np.arange(scores.size)
+    return part[np.argsort(-scores[part], kind="stable")]
+
+
+class MemoryIndex:
+    """
+    In-process vector index over memory embeddings.
+
+    Storage layout (MEMORY_INDEX_DIR):
+    - vectors.f32: row-major float32 matrix of unit vectors (memory-mapped on load)
+    - rows.json:   dim, watermark and the row metadata aligned with the matrix
+    """
+
+    def __init__(self, directory: str = MEMORY_INDEX_DIR, ivf_min_rows: int = MEMORY_INDEX_IVF_MIN_ROWS):
+        self.directory = directory
+        self.ivf_min_rows = ivf_min_rows
+
+        self.dim: Optional[int] = None
+        self.rows: List[Dict[str, Any]] = []
+        self._ids: Dict[str, int] = {}
+        self._matrix: Optional[np.ndarray] = None  # memmap after load, RAM buffer after first add
+        self._alive = np.zeros(0, dtype=bool)
+        self._multi = np.zeros(0, dtype=bool)
+        self._user_codes = np.zeros(0, dtype=np.int32)
+        self._user_map: Dict[str, int] = {}
+        self._count = 0
+
+        # IVF partitions (only built for large tables)
+        self._centroids: Optional[np.ndarray] = None
+        self._lists: List[np.ndarray] = []
+        self._ivf_rows = 0  # rows covered by the partitions; later rows are scanned flat
+
+        self.ready = False
+        self.dirty = False
+        self.watermark: Optional[str] = None
+        self.last_sync: Optional[float] = None
+        self._task: Optional[asyncio.Task] = None
+        self.stats = {"searches": 0, "search_ms_total": 0.0, "delta_rows": 0, "reconciles": 0}
+
+    # ---------------------------
+    # Persistence
+    # ---------------------------
+    @property
+    def _vectors_path(self) -> str:
+        return os.path.join(self.directory, "vectors.f32")
+
+    @property
+    def _rows_path(self) -> str:
+        return os.path.join(self.directory, "rows.json")
+
+    def load(self) -> bool:
+        """Memory-map the saved matrix. Returns False if nothing usable is on disk."""
+        try:
+            with open(self._rows_path, "r", encoding="utf-8") as f:
+                meta = json.load(f)
+            rows = meta.get("rows", [])
+            dim = meta.get("dim")
+            if not rows or not dim:
+                return False
+            expected = len(rows) * dim * 4
+            if os.path.getsize(self._vectors_path) != expected:
+                print("⚠️ Memory index on disk is inconsistent, rebuilding from Supabase")
+                return False
+            matrix = np.memmap(self._vectors_path, dtype=np.float32, mode="r", shape=(len(rows), dim))
+        except FileNotFoundError:
+            return False
+        except Exception as e:
+            print(f"⚠️ Failed to load memory index: {e}")
+            return False
+
+        self._reset(dim)
+        self._matrix = matrix
+        self.watermark = meta.get("watermark")
+        for row in rows:
+            self._append_meta(row)
+        self._build_ivf()
+        self.ready = True
+        print(f"🧭 Memory index loaded: {self._count} vectors (dim {dim})")
+        return True
+
+    def save(self):
+        """Compact live rows and atomically replace the on-disk files."""
+        if self.dim is None or self._matrix is None:
+            return
+        os.makedirs(self.directory, exist_ok=True)
+        live = np.flatnonzero(self._alive[:self._count])
+        matrix = np.ascontiguousarray(self._matrix[live], dtype=np.float32)
+        rows = [self.rows[i] for i in live]
+
+        tmp_vectors = self._vectors_path + ".tmp"
+        tmp_rows = self._rows_path + ".tmp"
+        matrix.tofile(tmp_vectors)
+        with open(tmp_rows, "w", encoding="utf-8") as f:
+            json.dump({"dim": self.dim, "watermark": self.watermark, "rows": rows}, f)
+        os.replace(tmp_vectors, self._vectors_path)
+        os.replace(tmp_rows, self._rows_path)
+        self.dirty = False
+
+    # ---------------------------
+    # Row storage
+    # ---------------------------
+    def _reset(self, dim: int):
+        self.dim = dim
+        self.rows = []
+        self._ids = {}
+        self._matrix = np.zeros((0, dim), dtype=np.float32)
+        self._alive = np.zeros(0, dtype=bool)
+        self._multi = np.zeros(0, dtype=bool)
+        self._user_codes = np.zeros(0, dtype=np.int32)
+        self._user_map = {}
+        self._count = 0
+        self._centroids = None
+        self._lists = []
+        self._ivf_rows = 0
+
+    def _grow(self, extra: int):
+        """Make room for `extra` rows (amortized doubling; copies a memmap into RAM once)."""
+        needed = self._count + extra
+        capacity = self._matrix.shape[0] if isinstance(self._matrix, np.ndarray) and not isinstance(self._matrix, np.memmap) else 0
+        if needed <= capacity:
+            return
+        new_capacity = max(needed, capacity * 2, 64)
+        matrix = np.zeros((new_capacity, self.dim), dtype=np.float32)
+        matrix[:self._count] = self._matrix[:self._count]
+        self._matrix = matrix
+        for name in ("_alive", "_multi", "_user_codes"):
+            old = getattr(self, name)
+            arr = np.zeros(new_capacity, dtype=old.dtype)
+            arr[:self._count] = old[:self._count]
+            setattr(self, name, arr)
+
+    def _append_meta(self, row: Dict[str, Any]):
+        """Register row metadata for the next matrix slot (matrix already holds the vector)."""
+        from services.memory import normalize_memory_record
+
+        idx = self._count
+        if self._alive.shape[0] <= idx:
+            size = max(idx + 1, self._alive.shape[0] * 2, 64)
+            for name in ("_alive", "_multi", "_user_codes"):
+                old = getattr(self, name)
+                arr = np.zeros(size, dtype=old.dtype)
+                arr[:old.shape[0]] = old
+                setattr(self, name, arr)
+        self.rows.append(row)
+        self._ids[str(row["id"])] = idx
+        self._alive[idx] = True
+        self._multi[idx] = normalize_memory_record(row)["_is_multi_part"]
+        self._user_codes[idx] = self._user_code(row.get("user_id"))
+        self._count += 1
+
+    def _user_code(self, user_id: Any) -> int:
+        if not user_id:
+            return 0
+        key = str(user_id)
+        if key not in self._user_map:
+            self._user_map[key] = len(self._user_map) + 1
+        return self._user_map[key]
+
+    def add_rows(self, rows: List[Dict[str, Any]], embeddings: Optional[List[Any]] = None) -> int:
+        """Insert/replace rows. Embeddings come from `embeddings` or the row's `embedding` column."""
+        added = 0
+        for i, row in enumerate(rows or []):
+            if not row or not row.get("id"):
+                continue
+            vec = parse_vector(embeddings[i] if embeddings is not None else row.get("embedding"))
+            if vec is None:
+                continue
+            if self.dim is None:
+                self._reset(vec.shape[0])
+            if vec.shape[0] != self.dim:
+                print(f"⚠️ Memory {row['id']} has dim {vec.shape[0]}, index uses {self.dim}; skipped")
+                continue
+
+            slim = {field: row.get(field) for field in ROW_FIELDS}
+            existing = self._ids.get(str(row["id"]))
+            if existing is not None:
+                self._alive[existing] = False
+
+            self._grow(1)
+            self._matrix[self._count] = unit_vector(vec)
+            self._append_meta(slim)
+            added += 1
+
+            created_at = row.get("created_at")
+            if created_at and (self.watermark is None or str(created_at) > self.watermark):
+                self.watermark = str(created_at)
+
+        if added:
+            self.dirty = True
+            self.ready = True
+            # Re-partition once the unpartitioned tail gets large
+            if self._count >= self.ivf_min_rows and self._count - self._ivf_rows > max(1000, self._ivf_rows // 10):
+                self._build_ivf()
+        return added
+
+    def remove_ids(self, ids: List[str]) -> int:
+        removed = 0
+        for memory_id in ids:
+            idx = self._ids.pop(str(memory_id), None)
+            if idx is not None and self._alive[idx]:
+                self._alive[idx] = False
+                removed += 1
+        if removed:
+            self.dirty = True
+        return removed
+
+    # ---------------------------
+    # IVF partitions
+    # ---------------------------
+    def _build_ivf(self, iterations: int = 8):
+        n = self._count
+        if n < self.ivf_min_rows:
+            self._centroids, self._lists, self._ivf_rows = None, [], 0
+            return
+        started = time.time()
+        data = self._matrix[:n]
+        nlist = int(np.sqrt(n))
+        rng = np.random.default_rng(0)
+        sample = data[rng.choice(n, size=min(n, nlist * 64), replace=False)]
+        centroids = sample[rng.choice(sample.shape[0], size=nlist, replace=False)].copy()
+
+        # Spherical k-means on a sample
+        for _ in range(iterations):
+            assign = np.argmax(sample @ centroids.T, axis=1)
+            for c in range(nlist):
+                members = sample[assign == c]
+                if members.shape[0]:
+                    centroids[c] = unit_vector(members.sum(axis=0))
+
+        assign = np.empty(n, dtype=np.int32)
+        for start in range(0, n, 8192):
+            assign[start:start + 8192] = np.argmax(data[start:start + 8192] @ centroids.T, axis=1)
+        order = np.argsort(assign, kind="stable")
+        bounds = np.searchsorted(assign[order], np.arange(nlist + 1))
+        self._lists = [order[bounds[c]:bounds[c + 1]] for c in range(nlist)]
+        self._centroids = centroids
+        self._ivf_rows = n
+        print(f"🧭 Memory index IVF built: {nlist} lists over {n} vectors ({(time.time() - started) * 1000:.0f}ms)")
+
+    # ---------------------------
+    # Search
+    # ---------------------------
+    def search(
+        self,
+        query_embedding: Any,
+        k: int = 15,
+        *,
+        exclude_multi_part: bool = False,
+        user_id: Optional[str] = None,
+        nprobe: int = 8,
+    ) -> Optional[Tuple[List[Dict[str, Any]], int, int]]:
+        """
+        Top-k cosine search with filters applied inside the scan.
+
+        Returns (rows, total_candidates, usable_candidates), or None when the
+        index can't answer (not ready / dimension mismatch) so callers fall back.
+        """
+        if not self.ready or self.dim is None:
+            return None
+        query = parse_vector(query_embedding)
+        if query is None or query.shape[0] != self.dim:
+            return None
+
+        started = time.perf_counter()
+        n = self._count
+        query = unit_vector(query)
+        mask = self._alive[:n].copy()
+        total = int(mask.sum())
+        if exclude_multi_part:
+            mask &= ~self._multi[:n]
+        if user_id:
+            code = self._user_map.get(str(user_id))
+            if code is None:
+                return [], total, 0
+            mask &= self._user_codes[:n] == code
+        usable = int(mask.sum())
+        if usable == 0:
+            return [], total, 0
+
+        if self._centroids is not None and usable > k * 4:
+            probes = top_k_indices(self._centroids @ query, min(nprobe, len(self._lists)))
+            candidates = np.concatenate([self._lists[c] for c in probes] + [np.arange(self._ivf_rows, n)])
+            candidates = candidates[mask[candidates]]
+            if candidates.shape[0] < k:
+                candidates = np.flatnonzero(mask)
+            scores = self._matrix[candidates] @ query
+            best = candidates[top_k_indices(scores, k)]
+            best_scores = self._matrix[best] @ query
+        else:
+            scores = self._matrix[:n] @ query
+            scores[~mask] = -np.inf
+            best = top_k_indices(scores, min(k, usable))
+            best_scores = scores[best]
+
+        results = [dict(self.rows[i], similarity=float(s)) for i, s in zip(best, best_scores)]
+        self.stats["searches"] += 1
+        self.stats["search_ms_total"] += (time.perf_counter() - started) * 1000
+        return results, total, usable
+
+    # ---------------------------
+    # Supabase sync
+    # ---------------------------
+    async def _fetch_all(self) -> List[Dict[str, Any]]:
+        from services.db import db
+        return await db.data_paged(
+            lambda start, end: db.table("memories").select("*").order("created_at").range(start, end),
+            "memory_index_full", PAGE_SIZE,
+        )
+
+    async def _fetch_since(self, watermark: str) -> List[Dict[str, Any]]:
+        from services.db import db
+        return await db.data(
+            db.table("memories").select("*").gt("created_at", watermark).order("created_at"),
+            "memory_index_delta",
+        )
+
+    async def _fetch_current_rows(self) -> List[Dict[str, Any]]:
+        from services.db import db
+        return await db.data_paged(
+            lambda start, end: db.table("memories").select("id, name, content, importance, metadata").range(start, end),
+            "memory_index_reconcile", PAGE_SIZE,
+        )
+
+    async def sync(self, full: bool = False):
+        """Pull rows created since the watermark (or everything on a cold start)."""
+        if full or self.watermark is None:
+            rows = await self._fetch_all()
+            if self.dim is not None:
+                self._reset(self.dim)
+            self.add_rows(rows)
+            self._build_ivf()
+            self.ready = True
+            print(f"🧭 Memory index built from Supabase: {self._count} vectors")
+        else:
+            rows = await self._fetch_since(self.watermark)
+            fresh = [r for r in rows if str(r.get("id")) not in self._ids]
+            self.stats["delta_rows"] += self.add_rows(fresh)
+        self.last_sync = time.time()
+
+    async def reconcile(self):
+        """Drop deleted memories and refresh fields edited elsewhere (metadata, name, content)."""
+        from services.memory import normalize_memory_record
+
+        known_before = set(self._ids)  # rows added while fetching must not look deleted
+        current = await self._fetch_current_rows()
+        seen = set()
+        for row in current:
+            memory_id = str(row.get("id"))
+            seen.add(memory_id)
+            idx = self._ids.get(memory_id)
+            if idx is None:
+                continue
+            stored = self.rows[idx]
+            if any(stored.get(f) != row.get(f) for f in ("name", "content", "importance", "metadata")):
+                self.rows[idx] = {**stored, **row}
+                self._multi[idx] = normalize_memory_record(self.rows[idx])["_is_multi_part"]
+                self.dirty = True
+        self.remove_ids([memory_id for memory_id in known_before if memory_id not in seen])
+        self.stats["reconciles"] += 1
+
+    async def _run(self):
+        if not self.load():
+            try:
+                await self.sync(full=True)
+            except Exception as e:
+                print(f"⚠️ Memory index initial build failed (RPC fallback stays active): {e}")
+        cycle = 0
+        while True:
+            await asyncio.sleep(MEMORY_INDEX_SYNC_SECONDS)
+            cycle += 1
+            try:
+                await self.sync(full=not self.ready)
+                if cycle % MEMORY_INDEX_RECONCILE_EVERY == 0:
+                    await self.reconcile()
+                if self.dirty:
+                    await asyncio.to_thread(self.save)
+            except Exception as e:
+                print(f"⚠️ Memory index sync failed: {e}")
+
+    def start(self):
+        """Load from disk and keep syncing in the background (call from app startup)."""
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    def get_stats(self) -> dict:
+        searches = self.stats["searches"]
+        return {
+            "ready": self.ready,
+            "vectors": int(self._alive[:self._count].sum()) if self._count else 0,
+            "dim": self.dim,
+            "ivf_lists": len(self._lists),
+            "watermark": self.watermark,
+            "last_sync": self.last_sync,
+            "searches": searches,
+            "avg_search_ms": round(self.stats["search_ms_total"] / searches, 3) if searches else 0.0,
+            "delta_rows": self.stats["delta_rows"],
+            "reconciles": self.stats["reconciles"],
+        }
+
+
+# Global instance
+memory_index = MemoryIndex()
+
+__all__ = ["MemoryIndex", "memory_index", "parse_vector", "unit_vector", "top_k_indices"]
@@ -0,0 +1,368 @@
+"""
+📝 Message Log - Write-Behind Chat Message Persistence
+Chat turns used to await an embedding + `insert_chat_message_with_vector`
+RPC twice per turn (user message before routing, assistant reply before the
+final chunk). Messages are now queued with a client-generated UUID and
+returned immediately; a background flusher embeds them in batches and writes
+them with one `insert_chat_messages_with_vectors` RPC per batch.
+
+- Every queued message is appended to a local JSONL journal first, so a crash
+  or restart replays whatever had not been flushed yet
+- Failed batches are retried with exponential backoff; the RPC ignores ids
+  that already exist, so a retry after an ambiguous failure can't duplicate
+- After MESSAGE_LOG_MAX_ATTEMPTS failures the batch is written row by row and
+  rows that still fail go to a dead-letter JSONL file, so one bad row can't
+  stop every later message from being saved
+- If the bulk RPC isn't deployed, rows fall back to the single-row
+  `insert_chat_message_with_vector` RPC
+- wait_for(id) lets writers with a foreign key on chat_messages.id (e.g.
+  consciousness_states.message_id) wait until the row exists
+"""
+import asyncio
+import json
+import os
+import time
+import uuid
+from collections import OrderedDict
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MESSAGE_JOURNAL_PATH = os.getenv(
+    "MESSAGE_JOURNAL_PATH", os.path.join(BACKEND_DIR, ".cache", "message_journal.jsonl")
+)
+MESSAGE_LOG_FLUSH_MS = float(os.getenv("MESSAGE_LOG_FLUSH_MS", "250"))  # max time a message waits for a batch
+MESSAGE_LOG_BATCH_SIZE = int(os.getenv("MESSAGE_LOG_BATCH_SIZE", "50"))
+MESSAGE_LOG_MAX_BACKOFF = float(os.getenv("MESSAGE_LOG_MAX_BACKOFF", "60"))  # seconds
+MESSAGE_LOG_EMBED_ATTEMPTS = int(os.getenv("MESSAGE_LOG_EMBED_ATTEMPTS", "5"))  # failed flushes before storing without a vector
+MESSAGE_LOG_MAX_ATTEMPTS = int(os.getenv("MESSAGE_LOG_MAX_ATTEMPTS", "8"))  # failed flushes before isolating bad rows
+MESSAGE_DEADLETTER_PATH = os.getenv(
+    "MESSAGE_DEADLETTER_PATH", os.path.join(BACKEND_DIR, ".cache", "message_deadletter.jsonl")
+)
+
+
+def _missing_rpc(error: Exception, fn: str) -> bool:
+    """PostgREST's "function not found" (PGRST202), e.g. a migration that was never applied."""
+    text = str(error)
+    return "PGRST202" in text or (fn in text and ("Could not find the function" in text or "does not exist" in text))
+
+
+def vector_literal(embedding: List[float]) -> str:
+    """Python list → pgvector text format ("[0.1,0.2,...]")."""
+    return "[" + ",".join(map(str, embedding)) + "]"
+
+
+class MessageLog:
+    """
+    Write-behind queue for chat_messages.
+
+    Journal format (one JSON object per line):
+    - {"op": "put", "message": {...}}  queued message
+    - {"op": "done", "ids": [...]}     messages confirmed in Supabase
+    The journal is truncated whenever the queue drains.
+    """
+
+    def __init__(
+        self,
+        journal_path: str = MESSAGE_JOURNAL_PATH,
+        flush_ms: float = MESSAGE_LOG_FLUSH_MS,
+        batch_size: int = MESSAGE_LOG_BATCH_SIZE,
+        deadletter_path: str = MESSAGE_DEADLETTER_PATH,
+    ):
+        self.journal_path = journal_path
+        self.deadletter_path = deadletter_path
+        self.flush_ms = flush_ms
+        self.batch_size = batch_size
+
+        self._pending: Dict[str, Dict[str, Any]] = {}  # insertion-ordered: oldest first
+        self._embeddings: Dict[str, List[float]] = {}  # kept across retries, never journaled
+        self._waiters: Dict[str, List[asyncio.Future]] = {}
+        self._journal = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self._failures = 0
+        self._bulk_rpc = True  # False once insert_chat_messages_with_vectors turns out to be missing
+        self._unpersisted: "OrderedDict[str, None]" = OrderedDict()  # recent ids that left the queue without their row
+        self.stats = {
+            "queued": 0, "flushed": 0, "batches": 0, "retries": 0, "replayed": 0,
+            "dead_lettered": 0, "single_row_inserts": 0, "flush_ms_total": 0.0, "last_error": None,
+        }
+
+    # ---------------------------
+    # Journal
+    # ---------------------------
+    def _open_journal(self):
+        if self._journal is None:
+            os.makedirs(os.path.dirname(self.journal_path), exist_ok=True)
+            self._journal = open(self.journal_path, "a", encoding="utf-8")
+        return self._journal
+
+    def _journal_write(self, entry: dict):
+        try:
+            journal = self._open_journal()
+            journal.write(json.dumps(entry, default=str) + "\n")
+            journal.flush()
+        except Exception as e:
+            print(f"⚠️ Message journal write failed: {e}")
+
+    def _journal_truncate(self):
+        try:
+            journal = self._open_journal()
+            journal.seek(0)
+            journal.truncate()
+        except Exception as e:
+            print(f"⚠️ Message journal truncate failed: {e}")
+
+    def replay(self) -> int:
+        """Re-queue journaled messages that never got a "done" entry."""
+        pending: Dict[str, Dict[str, Any]] = {}
+        try:
+            with open(self.journal_path, "r", encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        continue  # torn last line from a crash mid-write
+                    if entry.get("op") == "put":
+                        message = entry["message"]
+                        pending[message["id"]] = message
+                    elif entry.get("op") == "done":
+                        for message_id in entry.get("ids", []):
+                            pending.pop(message_id, None)
+        except FileNotFoundError:
+            return 0
+        except Exception as e:
+            print(f"⚠️ Failed to replay message journal: {e}")
+            return 0
+
+        for message_id, message in pending.items():
+            self._pending.setdefault(message_id, message)
+        self.stats["replayed"] += len(pending)
+        if pending:
+            print(f"📝 Replaying {len(pending)} unflushed chat messages from journal")
+        return len(pending)
+
+    # ---------------------------
+    # Queue
+    # ---------------------------
+    def enqueue(self, thread_id: str, role: str, content: str, metadata: Optional[dict] = None) -> Dict[str, Any]:
+        """Queue a message and return its row (with id + created_at) without touching the network."""
+        message = {
+            "id": str(uuid.uuid4()),
+            "thread_id": thread_id,
+            "role": role,
+            "content": content,
+            "metadata": metadata or {},
+            "created_at": datetime.now(timezone.utc).isoformat(),
+        }
+        self._journal_write({"op": "put", "message": message})
+        self._pending[message["id"]] = message
+        self.stats["queued"] += 1
+        if self._wakeup is not None and len(self._pending) >= self.batch_size:
+            self._wakeup.set()
+        return message
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def is_pending(self, message_id: Optional[str]) -> bool:
+        return bool(message_id) and str(message_id) in self._pending
+
+    def pending_for_thread(self, thread_id: str) -> List[Dict[str, Any]]:
+        """Queued (not yet persisted) messages for a thread, oldest first."""
+        return [dict(m) for m in self._pending.values() if m["thread_id"] == thread_id]
+
+    async def wait_for(self, message_id: Optional[str], timeout: float = 30.0) -> bool:
+        """Wait until a queued message is in Supabase. True if it's persisted (or was never queued here), False if dead-lettered."""
+        if not self.is_pending(message_id):
+            return str(message_id) not in self._unpersisted
+        future = asyncio.get_running_loop().create_future()
+        self._waiters.setdefault(str(message_id), []).append(future)
+        if self._wakeup is not None:
+            self._wakeup.set()
+        try:
+            return await asyncio.wait_for(asyncio.shield(future), timeout)
+        except asyncio.TimeoutError:
+            return False
+
+    # ---------------------------
+    # Flushing
+    # ---------------------------
+    async def _write_batch(self, batch: List[Dict[str, Any]]):
+        from services.db import db
+        from services.embeddings import embed_texts
+
+        missing = [m for m in batch if m["id"] not in self._embeddings and (m["content"] or "").strip()]
+        if missing:
+            vectors = await embed_texts([m["content"] for m in missing])
+            for message, vector in zip(missing, vectors):
+                if vector is not None:
+                    self._embeddings[message["id"]] = vector
+                elif self._failures < MESSAGE_LOG_EMBED_ATTEMPTS:
+                    raise RuntimeError(f"no embedding returned for message {message['id']}")
+                # Embedding keeps failing: store the message without a vector rather than block the queue
+
+        rows = []
+        for m in batch:
+            vector = self._embeddings.get(m["id"])
+            rows.append(dict(m, embedding=vector_literal(vector) if vector is not None else None))
+        if self._bulk_rpc:
+            try:
+                await db.insert_chat_messages_with_vectors(rows)
+                return
+            except Exception as e:
+                if not _missing_rpc(e, "insert_chat_messages_with_vectors"):
+                    raise
+                self._bulk_rpc = False
+                print("⚠️ insert_chat_messages_with_vectors RPC not found; falling back to single-row inserts")
+
+        # Single-row RPC: mark each row as it lands so a retry can't duplicate it. The server assigns
+        # its own id, so waiters get False - nothing can reference our client id.
+        for m, row in zip(batch, rows):
+            await db.insert_chat_message_with_vector(m["thread_id"], m["role"], m["content"], row["embedding"], m["metadata"])
+            self.stats["single_row_inserts"] += 1
+            self._mark_flushed([m], persisted=False)
+
+    def _mark_flushed(self, batch: List[Dict[str, Any]], persisted: bool = True):
+        ids = [m["id"] for m in batch]
+        for message_id in ids:
+            self._pending.pop(message_id, None)
+            self._embeddings.pop(message_id, None)
+            for future in self._waiters.pop(message_id, []):
+                if not future.done():
+                    future.set_result(persisted)
+            if not persisted:
+                self._unpersisted[message_id] = None
+                if len(self._unpersisted) > 1024:
+                    self._unpersisted.popitem(last=False)
+        if self._pending:
+            self._journal_write({"op": "done", "ids": ids})
+        else:
+            self._journal_truncate()
+
+    async def flush_once(self) -> int:
+        """Write the oldest batch. Returns rows written; raises on failure (rows stay queued)."""
+        batch = list(self._pending.values())[:self.batch_size]
+        if not batch:
+            return 0
+        started = time.perf_counter()
+        await self._write_batch(batch)
+        self._mark_flushed(batch)
+        self.stats["flushed"] += len(batch)
+        self.stats["batches"] += 1
+        self.stats["flush_ms_total"] += (time.perf_counter() - started) * 1000
+        return len(batch)
+
+    def _dead_letter(self, message: Dict[str, Any], error: Exception):
+        """Move a row that keeps failing out of the queue (kept in the dead-letter file for manual replay)."""
+        try:
+            os.makedirs(os.path.dirname(self.deadletter_path), exist_ok=True)
+            with open(self.deadletter_path, "a", encoding="utf-8") as f:
+                f.write(json.dumps({
+                    "message": message,
+                    "error": str(error),
+                    "failed_at": datetime.now(timezone.utc).isoformat(),
+                }, default=str) + "\n")
+        except Exception as e:
+            print(f"⚠️ Message dead-letter write failed: {e}")
+        self._mark_flushed([message], persisted=False)
+        self.stats["dead_lettered"] += 1
+        print(f"❌ Chat message {message['id']} dead-lettered after {MESSAGE_LOG_MAX_ATTEMPTS} failed flushes: {error}")
+
+    async def _isolate_failures(self):
+        """Write the stuck batch one row at a time; rows that still fail are dead-lettered."""
+        for message in list(self._pending.values())[:self.batch_size]:
+            try:
+                await self._write_batch([message])
+                self._mark_flushed([message])
+                self.stats["flushed"] += 1
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self._dead_letter(message, e)
+
+    async def flush(self, timeout: float = 10.0) -> bool:
+        """Drain the queue (call on shutdown). True if everything was written."""
+        deadline = time.monotonic() + timeout
+        while self._pending and time.monotonic() < deadline:
+            try:
+                await asyncio.wait_for(self.flush_once(), max(0.1, deadline - time.monotonic()))
+            except Exception as e:
+                print(f"⚠️ Message log flush failed, {len(self._pending)} left in journal: {e}")
+                return False
+        return not self._pending
+
+    def _backoff_seconds(self) -> float:
+        return min(MESSAGE_LOG_MAX_BACKOFF, 0.5 * (2 ** min(self._failures, 10)))
+
+    async def _run(self):
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), self.flush_ms / 1000)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+
+            while self._pending:
+                try:
+                    await self.flush_once()
+                    self._failures = 0
+                except asyncio.CancelledError:
+                    raise
+                except Exception as e:
+                    self._failures += 1
+                    self.stats["retries"] += 1
+                    self.stats["last_error"] = str(e)
+                    if self._failures >= MESSAGE_LOG_MAX_ATTEMPTS:
+                        await self._isolate_failures()
+                        self._failures = 0
+                        continue
+                    delay = self._backoff_seconds()
+                    print(f"⚠️ Message log flush failed ({len(self._pending)} queued), retrying in {delay:.1f}s: {e}")
+                    await asyncio.sleep(delay)
+
+    def start(self):
+        """Replay the journal and start the background flusher (call from app startup)."""
+        if self._task is None or self._task.done():
+            self._wakeup = asyncio.Event()
+            self.replay()
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self, timeout: float = 10.0):
+        """Stop the flusher, drain what we can and close the journal (unflushed rows replay next start)."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except (asyncio.CancelledError, Exception):
+                pass
+            self._task = None
+        await self.flush(timeout)
+        if self._journal is not None:
+            self._journal.close()
+            self._journal = None
+
+    def get_stats(self) -> dict:
+        batches = self.stats["batches"]
+        return {
+            "running": self.running,
+            "pending": len(self._pending),
+            "queued": self.stats["queued"],
+            "flushed": self.stats["flushed"],
+            "batches": batches,
+            "avg_batch_size": round(self.stats["flushed"] / batches, 2) if batches else 0.0,
+            "avg_flush_ms": round(self.stats["flush_ms_total"] / batches, 2) if batches else 0.0,
+            "retries": self.stats["retries"],
+            "replayed": self.stats["replayed"],
+            "dead_lettered": self.stats["dead_lettered"],
+            "bulk_rpc": self._bulk_rpc,
+            "single_row_inserts": self.stats["single_row_inserts"],
+            "last_error": self.stats["last_error"],
+        }
+
+
+# Global instance
+message_log = MessageLog()
+
+__all__ = ["MessageLog", "message_log", "vector_literal"]
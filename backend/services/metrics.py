@@ -0,0 +1,92 @@
+"""
+📏 Metrics - In-Process Latency Recorder
+Tiny per-name latency/error counters for hot paths (DB queries, routing,
+chat stages). Keeps a bounded window of recent samples per name so p50/p95
+can be reported without unbounded memory.
+"""
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Deque, Dict, Optional
+
+METRICS_WINDOW = 512  # recent samples kept per name for percentiles
+
+
+class LatencyStats:
+    """Counters + recent-sample window for one metric name."""
+
+    __slots__ = ("count", "errors", "total_ms", "max_ms", "recent")
+
+    def __init__(self, window: int = METRICS_WINDOW):
+        self.count = 0
+        self.errors = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self.recent: Deque[float] = deque(maxlen=window)
+
+    def observe(self, ms: float, error: bool = False):
+        self.count += 1
+        self.total_ms += ms
+        self.max_ms = max(self.max_ms, ms)
+        self.recent.append(ms)
+        if error:
+            self.errors += 1
+
+    def snapshot(self) -> dict:
+        samples = sorted(self.recent)
+
+        def pct(p: float) -> float:
+            if not samples:
+                return 0.0
+            return round(samples[min(len(samples) - 1, int(p * len(samples)))], 2)
+
+        return {
+            "count": self.count,
+            "errors": self.errors,
+            "avg_ms": round(self.total_ms / self.count, 2) if self.count else 0.0,
+            "p50_ms": pct(0.50),
+            "p95_ms": pct(0.95),
+            "max_ms": round(self.max_ms, 2),
+        }
+
+
+class MetricsRegistry:
+    """Named latency metrics, e.g. metrics.observe("db.match_memories", 12.3)."""
+
+    def __init__(self):
+        self._stats: Dict[str, LatencyStats] = {}
+
+    def observe(self, name: str, ms: float, error: bool = False):
+        stats = self._stats.get(name)
+        if stats is None:
+            stats = self._stats[name] = LatencyStats()
+        stats.observe(ms, error)
+
+    @contextmanager
+    def timer(self, name: str):
+        """with metrics.timer("router.decision"): ...  (records errors if the block raises)"""
+        started = time.perf_counter()
+        error = False
+        try:
+            yield
+        except BaseException:
+            error = True
+            raise
+        finally:
+            self.observe(name, (time.perf_counter() - started) * 1000, error)
+
+    def snapshot(self, prefix: Optional[str] = None) -> Dict[str, dict]:
+        return {
+            name: stats.snapshot()
+            for name, stats in sorted(self._stats.items())
+            if prefix is None or name.startswith(prefix)
+        }
+
+    def reset(self):
+        self._stats.clear()
+
+
+# Global instance
+metrics = MetricsRegistry()
+
+__all__ = ["MetricsRegistry", "LatencyStats", "metrics"]
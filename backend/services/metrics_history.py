@@ -0,0 +1,219 @@
+"""
+📉 Metrics History - Fixed-Memory Time Series for System Metrics
+system_watcher overwrites SystemState every few seconds, so there was no
+history to correlate chat latency spikes with host load. A sampler now reads
+the current SystemState every HISTORY_SAMPLE_INTERVAL seconds into NumPy ring
+buffers at three resolutions:
+
+- raw: 5s buckets × 720 (1 hour)
+- 1m:  1-minute buckets × 1440 (24 hours)
+- 15m: 15-minute buckets × 672 (7 days)
+
+Each resolution is one (capacity × metrics) array per aggregate (min, max,
+sum, count), so memory is fixed at startup and recording a sample is a few
+array writes. query() picks the finest resolution that covers the window and
+downsamples to the requested number of points with vectorized min/max/avg,
+only materializing Python values for the output points.
+"""
+import asyncio
+import math
+import os
+import time
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+
+HISTORY_SAMPLE_INTERVAL = float(os.getenv("HISTORY_SAMPLE_INTERVAL", "5"))
+
+# (name, bucket seconds, buckets kept)
+HISTORY_RESOLUTIONS = [
+    ("raw", 5, 720),
+    ("1m", 60, 1440),
+    ("15m", 900, 672),
+]
+
+SYSTEM_METRICS = [
+    "cpu_usage",
+    "ram_usage",
+    "disk_used_gb",
+    "disk_read_mb_per_sec",
+    "disk_write_mb_per_sec",
+    "network_sent_mb_per_sec",
+    "network_recv_mb_per_sec",
+    "cpu_temp_c",
+    "battery_percent",
+]
+
+
+class RollupRing:
+    """Ring of time buckets; each slot holds min/max/sum/count for every metric."""
+
+    def __init__(self, step: int, capacity: int, metrics: int):
+        self.step = step
+        self.capacity = capacity
+        self.bucket = np.full(capacity, -1, dtype=np.int64)  # absolute bucket number held by each slot
+        self.min = np.full((capacity, metrics), np.nan)
+        self.max = np.full((capacity, metrics), np.nan)
+        self.sum = np.zeros((capacity, metrics))
+        self.count = np.zeros((capacity, metrics), dtype=np.int32)
+
+    @property
+    def span(self) -> int:
+        return self.step * self.capacity
+
+    def add(self, timestamp: float, values: np.ndarray):
+        """values: one float per metric, NaN where the metric had no reading."""
+        bucket = int(timestamp // self.step)
+        slot = bucket % self.capacity
+        if self.bucket[slot] != bucket:
+            # Slot belongs to an older lap of the ring: start it over
+            self.bucket[slot] = bucket
+            self.min[slot] = np.nan
+            self.max[slot] = np.nan
+            self.sum[slot] = 0.0
+            self.count[slot] = 0
+        present = ~np.isnan(values)
+        self.min[slot] = np.fmin(self.min[slot], values)
+        self.max[slot] = np.fmax(self.max[slot], values)
+        self.sum[slot, present] += values[present]
+        self.count[slot, present] += 1
+
+    def window(self, start: float, end: float) -> np.ndarray:
+        """Slots whose buckets fall in [start, end), oldest first."""
+        times = self.bucket * self.step
+        slots = np.nonzero((self.bucket >= 0) & (times >= start) & (times < end))[0]
+        return slots[np.argsort(self.bucket[slots])]
+
+
+class MetricsHistory:
+    """Multi-resolution history for a fixed list of metrics."""
+
+    def __init__(self, metrics: Sequence[str] = SYSTEM_METRICS, resolutions=HISTORY_RESOLUTIONS):
+        self.metrics = list(metrics)
+        self._columns = {name: i for i, name in enumerate(self.metrics)}
+        self.rings = {name: RollupRing(step, capacity, len(self.metrics)) for name, step, capacity in resolutions}
+        self._task: Optional[asyncio.Task] = None
+        self.samples = 0
+
+    def record(self, values: Dict[str, Optional[float]], timestamp: Optional[float] = None):
+        timestamp = time.time() if timestamp is None else timestamp
+        row = np.array(
+            [np.nan if values.get(name) is None else float(values[name]) for name in self.metrics]
+        )
+        for ring in self.rings.values():
+            ring.add(timestamp, row)
+        self.samples += 1
+
+    def resolution_for(self, window: float) -> str:
+        """Finest resolution whose ring covers the whole window (coarsest if none does)."""
+        for name, ring in self.rings.items():
+            if ring.span >= window:
+                return name
+        return list(self.rings)[-1]
+
+    def query(
+        self,
+        metrics: Optional[List[str]] = None,
+        window: float = 3600,
+        points: int = 120,
+        end: Optional[float] = None,
+        resolution: Optional[str] = None,
+    ) -> dict:
+        """
+        Downsampled series for the last `window` seconds (ending at `end`, default now):
+        → {"resolution", "step_s", "start", "end", "t": [...], "series": {metric: {"min", "max", "avg"}}}
+        Empty bins are null.
+        """
+        metrics = metrics or self.metrics
+        unknown = [m for m in metrics if m not in self._columns]
+        if unknown:
+            raise KeyError(f"Unknown metrics: {', '.join(unknown)}")
+        resolution = resolution or self.resolution_for(window)
+        ring = self.rings[resolution]
+
+        end = time.time() if end is None else end
+        start = end - window
+        # No point in more bins than buckets
+        points = max(1, min(points, math.ceil(window / ring.step)))
+        columns = [self._columns[m] for m in metrics]
+
+        slots = ring.window(start, end)
+        bins = ((ring.bucket[slots] * ring.step - start) * points // window).astype(np.int64)
+        bins = np.clip(bins, 0, points - 1)
+
+        shape = (points, len(columns))
+        mins = np.full(shape, np.inf)
+        maxs = np.full(shape, -np.inf)
+        sums = np.zeros(shape)
+        counts = np.zeros(shape, dtype=np.int64)
+        if len(slots):
+            np.minimum.at(mins, bins, np.nan_to_num(ring.min[slots][:, columns], nan=np.inf))
+            np.maximum.at(maxs, bins, np.nan_to_num(ring.max[slots][:, columns], nan=-np.inf))
+            np.add.at(sums, bins, ring.sum[slots][:, columns])
+            np.add.at(counts, bins, ring.count[slots][:, columns])
+
+        empty = counts == 0
+        with np.errstate(invalid="ignore", divide="ignore"):
+            avgs = sums / counts
+        mins[empty] = np.nan
+        maxs[empty] = np.nan
+        avgs[empty] = np.nan
+
+        def column(values: np.ndarray, i: int) -> list:
+            return [None if v != v else round(v, 4) for v in values[:, i].tolist()]
+
+        bin_width = window / points
+        return {
+            "resolution": resolution,
+            "step_s": ring.step,
+            "start": start,
+            "end": end,
+            "t": (start + bin_width * np.arange(points)).round(3).tolist(),
+            "series": {
+                metric: {"min": column(mins, i), "max": column(maxs, i), "avg": column(avgs, i)}
+                for i, metric in enumerate(metrics)
+            },
+        }
+
+    # ---------------------------
+    # Sampler
+    # ---------------------------
+    def sample(self):
+        from glowos.glow_state import glow_state_store
+
+        system = glow_state_store.get_state().system
+        self.record({name: getattr(system, name, None) for name in self.metrics})
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(HISTORY_SAMPLE_INTERVAL)
+            try:
+                self.sample()
+            except Exception as e:
+                print(f"⚠️ Metrics history sample failed: {e}")
+
+    def start(self):
+        """Sample SystemState in the background (call from app startup)."""
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    def get_stats(self) -> dict:
+        return {
+            "metrics": self.metrics,
+            "samples": self.samples,
+            "sample_interval_s": HISTORY_SAMPLE_INTERVAL,
+            "resolutions": {
+                name: {"step_s": ring.step, "buckets": ring.capacity, "span_s": ring.span}
+                for name, ring in self.rings.items()
+            },
+            "bytes": sum(
+                ring.bucket.nbytes + ring.min.nbytes + ring.max.nbytes + ring.sum.nbytes + ring.count.nbytes
+                for ring in self.rings.values()
+            ),
+        }
+
+
+# Global instance
+metrics_history = MetricsHistory()
+
+__all__ = ["MetricsHistory", "RollupRing", "metrics_history", "SYSTEM_METRICS", "HISTORY_RESOLUTIONS"]
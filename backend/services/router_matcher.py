@@ -0,0 +1,272 @@
+"""
+⚡ Router Matcher - Compiled Fast Path for GlowRouter
+The router used to loop over every tool's phrase list with
+`any(p in msg_lower ...)` and compile its argument regexes per message.
+All phrases are now compiled into one Aho-Corasick automaton: a single pass
+over the message yields every tool with a matching phrase (as a bitmask in
+priority order), then that tool's precompiled argument extractor runs.
+
+- Same semantics as the old loop: plain substring matches, first tool in
+  TOOL_PATTERNS order wins, and a tool whose extractor finds nothing (e.g.
+  "download" without a URL) falls through to the next matching tool
+- Decisions are memoized in an LRU keyed on the whitespace-normalized message
+  (case is kept, URLs are case-sensitive)
+"""
+import re
+import time
+import unicodedata
+from collections import OrderedDict, deque
+from typing import Callable, Dict, List, Optional
+
+ROUTER_DECISION_CACHE_SIZE = 2048
+
+# Extractor: (original message, lowercased message, tool phrases) → arguments, or None to fall through
+Extractor = Callable[[str, str, List[str]], Optional[dict]]
+
+_WHITESPACE = re.compile(r"\s+")
+_URL = re.compile(r"https?://[^\s]+")
+_FILE_QUERY_WITH_LOCATION = re.compile(
+    r"(?:look for|find|search for|show me|where is)\s+(.+?)(?:\s+on\s+(?:my\s+)?(\w+))(?:\s+folder)?\s*$"
+)
+_FILE_QUERY = re.compile(r"(?:look for|find|search for|show me|where is)\s+(.+?)(?:\s+folder)?\s*$")
+_LOCATION_HINT = re.compile(r"\s+on\s+(?:my\s+)?(\w+)", re.IGNORECASE)
+_TRAILING_FOLDER = re.compile(r"\s+folder\s*$", re.IGNORECASE)
+_LEADING_ARTICLE = re.compile(r"^(the|my|a|an)\s+", re.IGNORECASE)
+
+
+def normalize_message(message: str) -> str:
+    """Cache key form: NFC, trimmed, whitespace runs collapsed (case preserved)."""
+    return _WHITESPACE.sub(" ", unicodedata.normalize("NFC", message or "")).strip()
+
+
+# ============================================
+# Argument extractors
+# ============================================
+
+def extract_url(message: str, msg_lower: str, patterns: List[str]) -> Optional[dict]:
+    url_match = _URL.search(message)
+    return {"url": url_match.group(0)} if url_match else None
+
+
+def extract_file_query(message: str, msg_lower: str, patterns: List[str]) -> Optional[dict]:
+    """ "look for X on desktop" / "find X folder" → {"query", "location_hint"} """
+    location_hint = None
+    query_match = _FILE_QUERY_WITH_LOCATION.search(msg_lower)
+    if query_match:
+        query = query_match.group(1).strip()
+        location_hint = query_match.group(2) or None
+    else:
+        query_match = _FILE_QUERY.search(msg_lower)
+        if query_match:
+            query = query_match.group(1).strip()
+        else:
+            # Fallback: everything after the first matching phrase
+            query = None
+            for pattern in patterns:
+                idx = msg_lower.find(pattern)
+                if idx >= 0:
+                    query = message[idx + len(pattern):].strip()
+                    location_match = _LOCATION_HINT.search(query)
+                    if location_match:
+                        location_hint = location_match.group(1)
+                        query = _LOCATION_HINT.sub("", query)
+                    break
+
+    if not query:
+        return None
+    query = _TRAILING_FOLDER.sub("", query).strip()
+    query = _LEADING_ARTICLE.sub("", query).strip()
+    if not query:
+        return None
+    return {"query": query, "location_hint": location_hint}
+
+
+def no_arguments(message: str, msg_lower: str, patterns: List[str]) -> Optional[dict]:
+    return {}
+
+
+# ============================================
+# Aho-Corasick automaton
+# ============================================
+
+class PhraseAutomaton:
+    """
+    Multi-phrase substring matcher. Each phrase carries a bitmask of tool indices;
+    scan() returns the OR of the masks of every phrase found in the text.
+    """
+
+    def __init__(self, phrase_masks: Dict[str, int]):
+        self._goto: List[Dict[str, int]] = [{}]
+        self._out: List[int] = [0]
+        for phrase, mask in phrase_masks.items():
+            state = 0
+            for ch in phrase:
+                nxt = self._goto[state].get(ch)
+                if nxt is None:
+                    nxt = len(self._goto)
+                    self._goto[state][ch] = nxt
+                    self._goto.append({})
+                    self._out.append(0)
+                state = nxt
+            self._out[state] |= mask
+
+        # Breadth-first failure links; outputs are merged along them so scan() never follows chains
+        self._fail = [0] * len(self._goto)
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for ch, nxt in self._goto[state].items():
+                queue.append(nxt)
+                fail = self._fail[state]
+                while fail and ch not in self._goto[fail]:
+                    fail = self._fail[fail]
+                self._fail[nxt] = self._goto[fail].get(ch, 0)
+                self._out[nxt] |= self._out[self._fail[nxt]]
+
+    @property
+    def states(self) -> int:
+        return len(self._goto)
+
+    def scan(self, text: str) -> int:
+        goto, fail, out = self._goto, self._fail, self._out
+        state, found = 0, 0
+        for ch in text:
+            while state and ch not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(ch, 0)
+            found |= out[state]
+        return found
+
+
+# ============================================
+# Tool matcher
+# ============================================
+
+class ToolMatcher:
+    """
+    Compiled fast path: match(message) → {"mode": "tool", "tool_name", "arguments"} or None.
+
+    patterns: {tool_name: [phrases]} in priority order (dict order)
+    extractors: {tool_name: Extractor}; tools without one get no arguments
+    """
+
+    def __init__(
+        self,
+        patterns: Dict[str, List[str]],
+        extractors: Optional[Dict[str, Extractor]] = None,
+        cache_size: int = ROUTER_DECISION_CACHE_SIZE,
+    ):
+        self.tools = list(patterns)
+        self.patterns = {tool: [p.lower() for p in phrases] for tool, phrases in patterns.items()}
+        self.extractors = [(extractors or {}).get(tool, no_arguments) for tool in self.tools]
+
+        # A phrase listed under several tools is reported for all of them
+        phrase_masks: Dict[str, int] = {}
+        for index, tool in enumerate(self.tools):
+            for phrase in self.patterns[tool]:
+                phrase_masks[phrase] = phrase_masks.get(phrase, 0) | (1 << index)
+        self._automaton = PhraseAutomaton(phrase_masks)
+
+        self.cache_size = max(1, cache_size)
+        self._cache: "OrderedDict[str, Optional[dict]]" = OrderedDict()
+        self.stats = {"hits": 0, "misses": 0, "matched": 0, "match_us_total": 0.0}
+
+    def _decide(self, message: str) -> Optional[dict]:
+        msg_lower = message.lower().strip()
+        mask = self._automaton.scan(msg_lower)
+        while mask:
+            low = mask & -mask
+            index = low.bit_length() - 1
+            mask ^= low
+            tool = self.tools[index]
+            arguments = self.extractors[index](message, msg_lower, self.patterns[tool])
+            if arguments is not None:
+                return {"mode": "tool", "tool_name": tool, "arguments": arguments}
+        return None
+
+    def match(self, message: str) -> Optional[dict]:
+        """Route decision for a message from the fast path, or None if nothing matched."""
+        key = normalize_message(message)
+        if key in self._cache:
+            self._cache.move_to_end(key)
+            self.stats["hits"] += 1
+            decision = self._cache[key]
+        else:
+            started = time.perf_counter()
+            decision = self._decide(message)
+            self.stats["match_us_total"] += (time.perf_counter() - started) * 1e6
+            self.stats["misses"] += 1
+            self._cache[key] = decision
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        if decision is None:
+            return None
+        self.stats["matched"] += 1
+        return {**decision, "arguments": dict(decision["arguments"])}
+
+    def get_stats(self) -> dict:
+        lookups = self.stats["hits"] + self.stats["misses"]
+        return {
+            "tools": len(self.tools),
+            "phrases": sum(len(p) for p in self.patterns.values()),
+            "automaton_states": self._automaton.states,
+            "cached_decisions": len(self._cache),
+            "cache_hit_rate": round(self.stats["hits"] / lookups, 3) if lookups else 0.0,
+            "avg_match_us": round(self.stats["match_us_total"] / self.stats["misses"], 2) if self.stats["misses"] else 0.0,
+            "hits": self.stats["hits"],
+            "misses": self.stats["misses"],
+            "matched": self.stats["matched"],
+        }
+
+
+def _benchmark():
+    """Compare the automaton against the old per-tool `any(p in msg ...)` loop as phrase counts grow."""
+    import random
+    import string
+
+    random.seed(7)
+    words = ["".join(random.choices(string.ascii_lowercase, k=random.randint(3, 8))) for _ in range(4000)]
+    messages = [" ".join(random.choices(words, k=random.randint(4, 40))) for _ in range(500)]
+
+    print(f"{'phrases':>8} {'tools':>6} {'states':>7} {'loop µs':>9} {'automaton µs':>13} {'cached µs':>10}")
+    for phrase_count in (50, 100, 250, 500, 1000, 2000):
+        tools = max(1, phrase_count // 8)
+        patterns = {
+            f"tool_{t}": [" ".join(random.choices(words, k=random.randint(1, 2))) for _ in range(8)]
+            for t in range(tools)
+        }
+        matcher = ToolMatcher(patterns, cache_size=len(messages) + 1)
+
+        started = time.perf_counter()
+        for message in messages:
+            msg_lower = message.lower().strip()
+            for phrases in patterns.values():
+                if any(p in msg_lower for p in phrases):
+                    break
+        loop_us = (time.perf_counter() - started) * 1e6 / len(messages)
+
+        started = time.perf_counter()
+        for message in messages:
+            matcher.match(message)
+        cold_us = (time.perf_counter() - started) * 1e6 / len(messages)
+
+        started = time.perf_counter()
+        for message in messages:
+            matcher.match(message)
+        warm_us = (time.perf_counter() - started) * 1e6 / len(messages)
+
+        print(f"{phrase_count:>8} {tools:>6} {matcher.get_stats()['automaton_states']:>7} "
+              f"{loop_us:>9.1f} {cold_us:>13.1f} {warm_us:>10.1f}")
+
+
+if __name__ == "__main__":
+    _benchmark()
+
+__all__ = [
+    "ToolMatcher",
+    "PhraseAutomaton",
+    "normalize_message",
+    "extract_url",
+    "extract_file_query",
+    "no_arguments",
+]
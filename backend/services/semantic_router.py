@@ -0,0 +1,227 @@
+"""
+🧲 Semantic Router - Local Embedding Tier for GlowRouter
+Messages the fast-path matcher can't place used to go straight to a Groq
+JSON completion (hundreds of ms per ambiguous chat message). This tier
+embeds example utterances for every superpower intent (plus a "chat"
+class) once, averages them into one unit centroid per intent, and
+classifies a message by cosine similarity to the nearest centroid.
+
+- Confident "chat" → chat, confident routable intent → tool; anything below
+  SEMANTIC_ROUTER_MIN_SIMILARITY or within SEMANTIC_ROUTER_MARGIN of the
+  runner-up is ambiguous and falls through to the LLM
+- Only ROUTABLE intents (the ones the LLM tier may pick) can be returned as a
+  tool; the other intents still get centroids so they don't get confused with them
+- A confident tool intent is only answered here when its arguments can be
+  filled from the message (URL for downloads, the message for QUERY_INTENTS,
+  the extracted file query for search_files); everything else — side effects
+  like rip_disc or file_ops, or arguments only the LLM can extract — still
+  goes to the LLM tier
+- Superpowers may define `intent_examples = {intent: [utterances]}`; otherwise
+  the intent name, its description and its fast-path phrases are used
+"""
+import asyncio
+import os
+import time
+from typing import Any, Dict, Iterable, List, Optional
+
+import numpy as np
+
+SEMANTIC_ROUTER_MIN_SIMILARITY = float(os.getenv("SEMANTIC_ROUTER_MIN_SIMILARITY", "0.62"))
+SEMANTIC_ROUTER_MARGIN = float(os.getenv("SEMANTIC_ROUTER_MARGIN", "0.04"))
+
+CHAT_INTENT = "__chat__"
+CHAT_EXAMPLES = [
+    "How are you?",
+    "hey, how's it going",
+    "I had a really rough day",
+    "I'm feeling anxious about tomorrow",
+    "can you help me think through something",
+    "what do you think about this idea",
+    "tell me about yourself",
+    "thanks, that helps a lot",
+    "I don't know what to do about my relationship",
+    "write me a short poem about the ocean",
+    "explain how you'd approach this problem",
+    "let's talk about my goals for this week",
+]
+
+# Free-text intents: the whole message is passed as the query argument
+QUERY_INTENTS = {
+    "search", "news", "research", "fact_check",
+    "calculate", "compute", "solve", "convert", "lookup",
+    "search_notion",
+}
+
+
+def _intent_examples(intent: str, description: str, power: Any, phrases: Iterable[str]) -> List[str]:
+    custom = (getattr(power, "intent_examples", None) or {}).get(intent)
+    if custom:
+        return list(custom)
+    examples = [intent.replace("_", " "), description]
+    examples.extend(phrases)
+    return [e for e in dict.fromkeys(examples) if e]
+
+
+class SemanticRouter:
+    """Nearest-centroid intent classifier over local embeddings."""
+
+    def __init__(
+        self,
+        min_similarity: float = SEMANTIC_ROUTER_MIN_SIMILARITY,
+        margin: float = SEMANTIC_ROUTER_MARGIN,
+    ):
+        self.min_similarity = min_similarity
+        self.margin = margin
+        self.routable: set = set()
+        self._superpowers: Dict[str, Any] = {}
+        self._phrases: Dict[str, List[str]] = {}
+        self._intents: List[str] = []
+        self._centroids: Optional[np.ndarray] = None
+        self._version = 0
+        self._built_version = -1
+        self._task: Optional[asyncio.Task] = None
+        self.stats = {"classified": 0, "confident": 0, "ambiguous": 0, "deferred": 0, "build_ms": 0.0, "last_error": None}
+
+    @property
+    def ready(self) -> bool:
+        return self._centroids is not None
+
+    def configure(self, superpowers: Dict[str, Any], routable: Iterable[str], phrases: Dict[str, List[str]]):
+        """Record the superpower set; centroids are (re)built by start()/build()."""
+        self._superpowers = dict(superpowers or {})
+        self.routable = set(routable)
+        self._phrases = phrases
+        self._version += 1
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return  # not started yet; start() builds at app startup
+        if self._task is not None:
+            self._task = loop.create_task(self._run())
+
+    async def build(self):
+        """Embed every intent's examples and swap in the new centroid matrix."""
+        from services.embeddings import embed_texts
+
+        version = self._version
+        started = time.perf_counter()
+        examples: Dict[str, List[str]] = {CHAT_INTENT: CHAT_EXAMPLES}
+        for power in self._superpowers.values():
+            for intent, description in (getattr(power, "intent_map", None) or {}).items():
+                if intent in examples:
+                    continue  # first superpower wins, same as the router's tool cache
+                examples[intent] = _intent_examples(intent, description, power, self._phrases.get(intent, []))
+
+        flat = [(intent, text) for intent, texts in examples.items() for text in texts]
+        vectors = await embed_texts([text for _, text in flat])
+
+        sums: Dict[str, np.ndarray] = {}
+        for (intent, _), vector in zip(flat, vectors):
+            if vector is None:
+                continue
+            vec = np.asarray(vector, dtype=np.float32)
+            norm = float(np.linalg.norm(vec))
+            if norm == 0:
+                continue
+            sums[intent] = sums.get(intent, 0) + vec / norm
+
+        if CHAT_INTENT not in sums or len(sums) < 2:
+            raise RuntimeError("not enough example embeddings to build intent centroids")
+        intents = list(sums)
+        centroids = np.stack([sums[i] for i in intents])
+        centroids /= np.maximum(np.linalg.norm(centroids, axis=1, keepdims=True), 1e-12)
+
+        if version != self._version:
+            return  # superpowers changed mid-build; the newer build wins
+        self._intents, self._centroids = intents, centroids
+        self._built_version = version
+        self.stats["build_ms"] = round((time.perf_counter() - started) * 1000, 1)
+        print(f"🧲 Semantic router ready: {len(intents)} intents from {len(flat)} examples in {self.stats['build_ms']}ms")
+
+    async def _run(self):
+        try:
+            await self.build()
+        except Exception as e:
+            self.stats["last_error"] = str(e)
+            print(f"⚠️ Semantic router build failed (LLM fallback stays active): {e}")
+
+    def start(self):
+        """Build centroids in the background (call from app startup)."""
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    def classify(self, embedding: Optional[List[float]]) -> Optional[Dict[str, Any]]:
+        """
+        → {"intent", "similarity", "margin", "confident"} for the nearest centroid, or None if not ready.
+        intent is None for chat.
+        """
+        centroids = self._centroids
+        if centroids is None or embedding is None:
+            return None
+        query = np.asarray(embedding, dtype=np.float32)
+        if query.shape[0] != centroids.shape[1]:
+            return None
+        norm = float(np.linalg.norm(query))
+        if norm == 0:
+            return None
+        scores = centroids @ (query / norm)
+        order = np.argsort(-scores)
+        best = float(scores[order[0]])
+        runner_up = float(scores[order[1]]) if len(order) > 1 else -1.0
+        intent = self._intents[order[0]]
+
+        confident = (
+            best >= self.min_similarity
+            and best - runner_up >= self.margin
+            and (intent == CHAT_INTENT or intent in self.routable)
+        )
+        self.stats["classified"] += 1
+        self.stats["confident" if confident else "ambiguous"] += 1
+        return {
+            "intent": None if intent == CHAT_INTENT else intent,
+            "similarity": round(best, 4),
+            "margin": round(best - runner_up, 4),
+            "confident": confident,
+        }
+
+    def decision(self, message: str, embedding: Optional[List[float]]) -> Optional[Dict[str, Any]]:
+        """Router output for a confident classification, else None (→ LLM tier)."""
+        from services.router_matcher import extract_file_query, extract_url
+
+        result = self.classify(embedding)
+        if not result or not result["confident"]:
+            return None
+        intent = result["intent"]
+        if intent is None:
+            return {"mode": "chat", "tool_name": None, "arguments": {}, "similarity": result["similarity"]}
+
+        if intent.startswith("download"):
+            arguments = extract_url(message, message.lower(), [])  # a download needs a URL
+        elif intent == "search_files":
+            arguments = extract_file_query(message, message.lower(), self._phrases.get(intent, []))
+        elif intent in QUERY_INTENTS:
+            arguments = {"query": message}
+        else:
+            # Needs arguments we can't fill here, or acts on similarity alone (rip_disc, file_ops, ...)
+            arguments = None
+        if arguments is None:
+            self.stats["deferred"] += 1
+            return None  # let the LLM decide
+        return {"mode": "tool", "tool_name": intent, "arguments": arguments, "similarity": result["similarity"]}
+
+    def get_stats(self) -> dict:
+        return {
+            "ready": self.ready,
+            "intents": len(self._intents),
+            "routable": sorted(self.routable),
+            "stale": self._built_version != self._version,
+            "min_similarity": self.min_similarity,
+            "margin": self.margin,
+            **self.stats,
+        }
+
+
+# Global instance
+semantic_router = SemanticRouter()
+
+__all__ = ["SemanticRouter", "semantic_router", "CHAT_INTENT", "QUERY_INTENTS"]
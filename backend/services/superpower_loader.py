@@ -8,6 +8,18 @@ import pkgutil
 from typing import Dict, Any
 import superpowers
 
+# Registry: the most recently loaded superpowers (kept in sync with GlowState.runtime)
+SUPERPOWERS: Dict[str, Any] = {}
+
+
+def register_superpowers(powers: Dict[str, Any]):
+    """Make `powers` the loaded set and publish their names to GlowState."""
+    from glowos.glow_state import glow_state_store
+
+    SUPERPOWERS.clear()
+    SUPERPOWERS.update(powers)
+    glow_state_store.update(runtime={"superpowers_loaded": list(powers.keys())})
+
 
 def load_superpowers() -> Dict[str, Any]:
     """
@@ -39,6 +51,7 @@ def load_superpowers() -> Dict[str, Any]:
             print(f"❌ Failed loading {module_name}: {e}")
 
     print(f"🦸 Total superpowers loaded: {len(powers)}")
+    register_superpowers(powers)
     return powers
 
 
@@ -0,0 +1,230 @@
+"""
+💬 Thread Cache - Per-Thread Conversation Ring Buffers
+Every chat turn used to re-query `chat_messages` for the thread history even
+though this process had just written those messages via log_message_to_db.
+Each thread now gets a bounded ring buffer of its most recent messages:
+filled from Supabase (plus anything still queued on the write-behind log) on
+first access, then appended to locally on every logged message.
+
+- Threads are kept in LRU order and evicted past THREAD_CACHE_MAX_THREADS or
+  THREAD_CACHE_MAX_BYTES (approximate UTF-8 size of the cached messages)
+- Concurrent first accesses for a thread share one DB load; messages logged
+  while that load is in flight are merged in by id
+- Threads idle longer than THREAD_CACHE_TTL are reloaded, so edits made
+  outside this process (e.g. deletes from the frontend) show up eventually
+"""
+import asyncio
+import json
+import os
+import time
+from collections import OrderedDict, deque
+from typing import Any, Deque, Dict, List, Optional
+
+THREAD_CACHE_MESSAGES = int(os.getenv("THREAD_CACHE_MESSAGES", "50"))  # ring size per thread
+THREAD_CACHE_MAX_THREADS = int(os.getenv("THREAD_CACHE_MAX_THREADS", "500"))
+THREAD_CACHE_MAX_BYTES = int(os.getenv("THREAD_CACHE_MAX_BYTES", str(32 * 1024 * 1024)))
+THREAD_CACHE_TTL = float(os.getenv("THREAD_CACHE_TTL", "900"))  # seconds idle before a reload
+
+MESSAGE_FIELDS = ("id", "thread_id", "role", "content", "metadata", "created_at")
+_MESSAGE_OVERHEAD = 200  # dict + field bookkeeping per cached message, roughly
+
+
+def message_size(message: Dict[str, Any]) -> int:
+    """Approximate bytes a cached message holds (content + metadata + fixed overhead)."""
+    size = _MESSAGE_OVERHEAD + len((message.get("content") or "").encode("utf-8"))
+    metadata = message.get("metadata")
+    if metadata:
+        size += len(json.dumps(metadata, default=str))
+    return size
+
+
+class _ThreadBuffer:
+    __slots__ = ("messages", "ids", "bytes", "complete", "touched")
+
+    def __init__(self, capacity: int):
+        self.messages: Deque[Dict[str, Any]] = deque()
+        self.ids: set = set()
+        self.bytes = 0
+        self.complete = False  # True when the buffer holds the thread's entire history
+        self.touched = time.monotonic()
+
+    def append(self, message: Dict[str, Any], capacity: int) -> int:
+        """Add a message (ignoring duplicates). Returns the change in cached bytes."""
+        if message["id"] in self.ids:
+            return 0
+        size = message_size(message)
+        self.messages.append(message)
+        self.ids.add(message["id"])
+        self.bytes += size
+        delta = size
+        while len(self.messages) > capacity:
+            dropped = self.messages.popleft()
+            self.ids.discard(dropped["id"])
+            dropped_size = message_size(dropped)
+            self.bytes -= dropped_size
+            delta -= dropped_size
+            self.complete = False
+        return delta
+
+
+class ThreadCache:
+    """
+    LRU of per-thread ring buffers.
+
+    - get(thread_id, limit): most recent `limit` messages, oldest first
+    - append(message): record a message this process just logged
+    - invalidate(thread_id): drop a thread so the next read reloads it
+    """
+
+    def __init__(
+        self,
+        capacity: int = THREAD_CACHE_MESSAGES,
+        max_threads: int = THREAD_CACHE_MAX_THREADS,
+        max_bytes: int = THREAD_CACHE_MAX_BYTES,
+        ttl: float = THREAD_CACHE_TTL,
+    ):
+        self.capacity = max(1, capacity)
+        self.max_threads = max(1, max_threads)
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+
+        self._threads: "OrderedDict[str, _ThreadBuffer]" = OrderedDict()
+        self._loading: Dict[str, asyncio.Future] = {}
+        self._arrived: Dict[str, List[Dict[str, Any]]] = {}  # appends seen while a load is in flight
+        self._bytes = 0
+        self.stats = {"hits": 0, "misses": 0, "loads": 0, "load_errors": 0, "appends": 0, "evictions": 0}
+
+    # ---------------------------
+    # Bookkeeping
+    # ---------------------------
+    def _drop(self, thread_id: str) -> Optional[_ThreadBuffer]:
+        buffer = self._threads.pop(thread_id, None)
+        if buffer is not None:
+            self._bytes -= buffer.bytes
+        return buffer
+
+    def _evict(self):
+        while self._threads and (len(self._threads) > self.max_threads or self._bytes > self.max_bytes):
+            _, buffer = self._threads.popitem(last=False)
+            self._bytes -= buffer.bytes
+            self.stats["evictions"] += 1
+
+    def _fresh(self, thread_id: str) -> Optional[_ThreadBuffer]:
+        buffer = self._threads.get(thread_id)
+        if buffer is None:
+            return None
+        if self.ttl and time.monotonic() - buffer.touched > self.ttl:
+            self._drop(thread_id)
+            return None
+        self._threads.move_to_end(thread_id)
+        buffer.touched = time.monotonic()
+        return buffer
+
+    # ---------------------------
+    # Loading
+    # ---------------------------
+    async def _load(self, thread_id: str) -> _ThreadBuffer:
+        from services.db import db
+        from services.message_log import message_log
+
+        self._arrived[thread_id] = []
+        try:
+            rows = await db.fetch_recent_thread_messages(thread_id, self.capacity)
+            buffer = _ThreadBuffer(self.capacity)
+            buffer.complete = len(rows) < self.capacity
+            # Rows still on the write-behind queue aren't in Supabase yet
+            extra = message_log.pending_for_thread(thread_id) + self._arrived.get(thread_id, [])
+            extra.sort(key=lambda m: m.get("created_at") or "")
+            for message in list(rows) + extra:
+                buffer.append({field: message.get(field) for field in MESSAGE_FIELDS}, self.capacity)
+        finally:
+            self._arrived.pop(thread_id, None)
+
+        self._drop(thread_id)
+        self._threads[thread_id] = buffer
+        self._bytes += buffer.bytes
+        self.stats["loads"] += 1
+        self._evict()
+        return buffer
+
+    async def _buffer(self, thread_id: str) -> _ThreadBuffer:
+        buffer = self._fresh(thread_id)
+        if buffer is not None:
+            self.stats["hits"] += 1
+            return buffer
+
+        self.stats["misses"] += 1
+        future = self._loading.get(thread_id)
+        if future is None:
+            future = asyncio.ensure_future(self._load(thread_id))
+            self._loading[thread_id] = future
+            future.add_done_callback(lambda _: self._loading.pop(thread_id, None))
+        try:
+            return await asyncio.shield(future)
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            self.stats["load_errors"] += 1
+            raise
+
+    # ---------------------------
+    # Public API
+    # ---------------------------
+    def covers(self, thread_id: str, limit: Optional[int]) -> bool:
+        """True if a read of `limit` messages (None = whole thread) can be served from memory."""
+        if limit is not None and limit <= self.capacity:
+            return True
+        buffer = self._threads.get(thread_id)
+        return buffer is not None and buffer.complete
+
+    async def get(self, thread_id: str, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Most recent `limit` messages for a thread (default: the whole ring), oldest first."""
+        buffer = await self._buffer(thread_id)
+        messages = list(buffer.messages)
+        if limit is not None:
+            messages = messages[-limit:] if limit > 0 else []
+        return [dict(m) for m in messages]
+
+    def append(self, message: Dict[str, Any]):
+        """Record a just-logged message. Threads that aren't cached are left for their first read to load."""
+        thread_id = message.get("thread_id")
+        if not thread_id:
+            return
+        message = {field: message.get(field) for field in MESSAGE_FIELDS}
+        if thread_id in self._arrived:
+            self._arrived[thread_id].append(message)
+        buffer = self._threads.get(thread_id)
+        if buffer is None:
+            return
+        self._bytes += buffer.append(message, self.capacity)
+        self._threads.move_to_end(thread_id)
+        buffer.touched = time.monotonic()
+        self.stats["appends"] += 1
+        self._evict()
+
+    def invalidate(self, thread_id: str):
+        self._drop(thread_id)
+
+    def clear(self):
+        self._threads.clear()
+        self._bytes = 0
+
+    def get_stats(self) -> dict:
+        lookups = self.stats["hits"] + self.stats["misses"]
+        return {
+            "threads": len(self._threads),
+            "messages": sum(len(b.messages) for b in self._threads.values()),
+            "bytes": self._bytes,
+            "max_bytes": self.max_bytes,
+            "max_threads": self.max_threads,
+            "messages_per_thread": self.capacity,
+            "ttl_seconds": self.ttl,
+            "hit_rate": round(self.stats["hits"] / lookups, 3) if lookups else 0.0,
+            **self.stats,
+        }
+
+
+# Global instance
+thread_cache = ThreadCache()
+
+__all__ = ["ThreadCache", "thread_cache", "message_size", "THREAD_CACHE_MESSAGES"]
@@ -4,7 +4,7 @@
 # Manages WebSocket connections for real-time progress updates
 
 from fastapi import WebSocket
-from typing import Dict
+from typing import Dict, List, Optional, Set
 import json
 
 
@@ -17,6 +17,7 @@ class WebSocketManager:
     - Register download sessions
     - Send progress updates to specific clients
     - Broadcast messages
+    - Channel subscriptions (e.g. the "glow_state" change feed)
     """
     
     def __init__(self):
@@ -24,6 +25,7 @@ class WebSocketManager:
         self.download_sessions: Dict[str, str] = {}  # session_id -> websocket_id
         self.active_chat_tasks: Dict[str, any] = {}  # client_id -> asyncio task
         self.cancelled_chats: set = set()  # Track cancelled chats
+        self.subscriptions: Dict[str, Set[str]] = {}  # channel -> client_ids
     
     async def connect(self, websocket: WebSocket, client_id: str):
         """Accept and register a new WebSocket connection"""
@@ -35,6 +37,7 @@ class WebSocketManager:
         """Remove a WebSocket connection"""
         if client_id in self.active_connections:
             del self.active_connections[client_id]
+        self.unsubscribe(client_id)
         print(f"🔌 WebSocket client {client_id} disconnected")
     
     async def send_progress(self, session_id: str, progress_data: dict):
@@ -146,6 +149,48 @@ class WebSocketManager:
         for client_id in disconnected:
             self.disconnect(client_id)
     
+    def subscribe(self, client_id: str, channel: str):
+        """Add a client to a channel's subscribers"""
+        self.subscriptions.setdefault(channel, set()).add(client_id)
+        print(f"📡 Client {client_id} subscribed to {channel}")
+    
+    def unsubscribe(self, client_id: str, channel: Optional[str] = None):
+        """Remove a client from one channel (or from all channels if none given)"""
+        channels = [channel] if channel else list(self.subscriptions)
+        for name in channels:
+            subscribers = self.subscriptions.get(name)
+            if subscribers is not None:
+                subscribers.discard(client_id)
+                if not subscribers:
+                    del self.subscriptions[name]
+    
+    def get_subscribers(self, channel: str) -> List[str]:
+        """Connected clients subscribed to a channel"""
+        return [c for c in self.subscriptions.get(channel, ()) if c in self.active_connections]
+    
+    async def publish(self, channel: str, message: dict) -> int:
+        """
+        Send a message to every subscriber of a channel.
+        The message is serialized once; returns how many clients it reached.
+        """
+        subscribers = self.get_subscribers(channel)
+        if not subscribers:
+            return 0
+        payload = json.dumps(message)
+        sent = 0
+        disconnected = []
+        for client_id in subscribers:
+            try:
+                await self.active_connections[client_id].send_text(payload)
+                sent += 1
+            except Exception as e:
+                print(f"❌ Failed to publish {channel} to {client_id}: {e}")
+                disconnected.append(client_id)
+        
+        for client_id in disconnected:
+            self.disconnect(client_id)
+        return sent
+    
     def get_active_connections_count(self) -> int:
         """Get the number of active WebSocket connections"""
         return len(self.active_connections)
@@ -9,6 +9,27 @@ import base64
 import mimetypes
 
 
+def _touch_index(*paths):
+    """Let the filename index re-list the directories we just changed"""
+    from services.file_index import file_index
+    file_index.touch(*paths)
+
+
+async def _transfer(op: str, pairs, **kwargs) -> dict:
+    """Copy/move through the transfer engine (worker pool, progress on the file_transfers channel)"""
+    from services.file_transfer import file_transfers
+    return await file_transfers.run(op, pairs, verify=kwargs.get("verify"), task_id=kwargs.get("task_id"))
+
+
+async def _run_plan(pairs, dry_run: bool = False, on_conflict: str = "skip", create_dirs: bool = True, **kwargs) -> dict:
+    """Plan a batch of renames/moves as a whole, then preview it (dry_run) or execute it"""
+    from services.file_plan import plan_operations, execute_plan
+    plan = await asyncio.to_thread(plan_operations, pairs, on_conflict, create_dirs)
+    if dry_run:
+        return plan.preview()
+    return await execute_plan(plan, task_id=kwargs.get("task_id"))
+
+
 class Superpower:
     name = "file_ops"
     
@@ -18,6 +39,7 @@ class Superpower:
         "copy_file": "Copy a file to a new location",
         "rename_file": "Rename a file or directory",
         "bulk_rename": "Rename multiple files with a pattern",
+        "batch_move": "Move or rename many files at once from a list of source/destination pairs, with optional dry run",
         "delete_file": "Delete a file or directory",
         "create_directory": "Create a new directory",
         "list_files": "List files in a directory",
@@ -44,6 +66,8 @@ class Superpower:
                 return await self.rename_file(**kwargs)
             elif intent == "bulk_rename":
                 return await self.bulk_rename(**kwargs)
+            elif intent == "batch_move":
+                return await self.batch_move(**kwargs)
             elif intent == "delete_file":
                 return await self.delete_file(**kwargs)
             elif intent == "create_directory":
@@ -175,6 +199,7 @@ class Superpower:
             # Write the file
             with open(file_path, 'wb') as f:
                 f.write(file_data)
+            _touch_index(file_path)
             
             # Get file info
             stat = os.stat(file_path)
@@ -213,7 +238,10 @@ class Superpower:
                 counter += 1
             
             # Copy the file
-            shutil.copy2(file_path, destination_path)
+            transfer = await _transfer("copy", [(file_path, destination_path)], **kwargs)
+            _touch_index(destination_path)
+            if not transfer["success"]:
+                return {"error": f"Failed to upload file: {'; '.join(transfer['errors']) or transfer['status']}"}
             
             # Get file info
             stat = os.stat(destination_path)
@@ -236,17 +264,17 @@ class Superpower:
             if not os.path.exists(source):
                 return {"error": f"Source path does not exist: {source}"}
             
-            # Ensure destination directory exists
-            dest_dir = os.path.dirname(destination)
-            if dest_dir and not os.path.exists(dest_dir):
-                os.makedirs(dest_dir, exist_ok=True)
-            
-            shutil.move(source, destination)
+            transfer = await _transfer("move", [(source, destination)], **kwargs)
+            _touch_index(source, destination)
+            if not transfer["success"]:
+                return {"error": f"Failed to move file: {'; '.join(transfer['errors']) or transfer['status']}"}
             return {
                 "success": True,
                 "message": f"📂 Moved '{source}' to '{destination}'",
                 "source": source,
-                "destination": destination
+                "destination": destination,
+                "transfer_id": transfer["transfer_id"],
+                "bytes": transfer["bytes_done"],
             }
         except Exception as e:
             return {"error": f"Failed to move file: {str(e)}"}
@@ -257,21 +285,18 @@ class Superpower:
             if not os.path.exists(source):
                 return {"error": f"Source path does not exist: {source}"}
             
-            # Ensure destination directory exists
-            dest_dir = os.path.dirname(destination)
-            if dest_dir and not os.path.exists(dest_dir):
-                os.makedirs(dest_dir, exist_ok=True)
-            
-            if os.path.isdir(source):
-                shutil.copytree(source, destination)
-            else:
-                shutil.copy2(source, destination)
+            transfer = await _transfer("copy", [(source, destination)], **kwargs)
+            _touch_index(destination)
+            if not transfer["success"]:
+                return {"error": f"Failed to copy file: {'; '.join(transfer['errors']) or transfer['status']}"}
             
             return {
                 "success": True,
                 "message": f"📋 Copied '{source}' to '{destination}'",
                 "source": source,
-                "destination": destination
+                "destination": destination,
+                "transfer_id": transfer["transfer_id"],
+                "bytes": transfer["bytes_done"],
             }
         except Exception as e:
             return {"error": f"Failed to copy file: {str(e)}"}
@@ -288,6 +313,7 @@ class Superpower:
                 new_name = os.path.join(directory, new_name)
             
             os.rename(old_name, new_name)
+            _touch_index(old_name, new_name)
             return {
                 "success": True,
                 "message": f"🔄 Renamed '{old_name}' to '{new_name}'",
@@ -368,48 +394,79 @@ class Superpower:
             
             results = {"success": 0, "failed": 0, "renames": []}
             
+            pairs = []
             for idx, old_path in enumerate(file_paths):
-                try:
-                    if not os.path.exists(old_path):
-                        results["failed"] += 1
-                        results["renames"].append({"old": old_path, "new": None, "error": "File not found"})
-                        continue
-                    
-                    # Generate new filename
-                    new_num = start_num + idx
-                    
-                    # Preserve file extension
-                    ext = os.path.splitext(old_path)[1]
-                    
-                    # Build new name
-                    if base_pattern:
-                        new_name = f"{base_pattern}{new_num}{ext}"
-                    else:
-                        new_name = f"file_{new_num}{ext}"
-                    
-                    # Get directory of old file
-                    file_dir = os.path.dirname(old_path)
-                    new_path = os.path.join(file_dir, new_name)
-                    
-                    # Rename
-                    os.rename(old_path, new_path)
+                # Generate new filename
+                new_num = start_num + idx
+                
+                # Preserve file extension
+                ext = os.path.splitext(old_path)[1]
+                
+                # Build new name
+                if base_pattern:
+                    new_name = f"{base_pattern}{new_num}{ext}"
+                else:
+                    new_name = f"file_{new_num}{ext}"
+                
+                # Same directory as the old file
+                pairs.append((old_path, os.path.join(os.path.dirname(old_path), new_name)))
+            
+            # Plan every rename at once so names the batch frees up (S02E25 -> S02E26 -> ...) can be reused
+            summary = await _run_plan(pairs, **kwargs)
+            if summary["dry_run"]:
+                return {
+                    "success": True,
+                    "dry_run": True,
+                    "message": f"📋 Would rename {summary['planned']} file(s)",
+                    "plan": summary
+                }
+            
+            order = {os.path.abspath(old_path): idx for idx, (old_path, _) in enumerate(pairs)}
+            for op in sorted(summary["operations"] + summary["skipped"], key=lambda op: order.get(op["source"], 0)):
+                if op["status"] == "done":
                     results["success"] += 1
-                    results["renames"].append({"old": os.path.basename(old_path), "new": new_name, "success": True})
-                    
-                except Exception as e:
+                    results["renames"].append({"old": os.path.basename(op["source"]), "new": os.path.basename(op["destination"]), "success": True})
+                else:
                     results["failed"] += 1
-                    results["renames"].append({"old": old_path, "new": None, "error": str(e)})
+                    results["renames"].append({"old": op["source"], "new": None, "error": op.get("reason") or op["status"]})
+            _touch_index(*file_paths)
             
             return {
                 "success": True,
                 "message": f"🔄 Renamed {results['success']} file(s)",
                 "renamed": results["success"],
                 "failed": results["failed"],
-                "details": results["renames"]
+                "details": results["renames"],
+                "conflicts": summary["conflicts"],
+                "cycles": summary["cycles"]
             }
         except Exception as e:
             return {"error": f"Failed to bulk rename files: {str(e)}"}
 
+    async def batch_move(self, operations: Optional[List[Dict[str, str]]] = None, dry_run: bool = False,
+                         on_conflict: str = "skip", **kwargs):
+        """Move/rename many files as one planned batch
+        
+        Args:
+            operations: [{"source": ..., "destination": ...}, ...] (destinations are full paths)
+            dry_run: Return the plan (collisions, cycles, directories to create) without touching anything
+            on_conflict: "skip", "rename" (name_1.ext) or "overwrite" when a destination is taken
+        """
+        try:
+            if not operations:
+                return {"error": "No operations provided for batch move"}
+            pairs = [(op["source"], op["destination"]) for op in operations]
+            summary = await _run_plan(pairs, dry_run=dry_run, on_conflict=on_conflict, **kwargs)
+            if summary["dry_run"]:
+                return {"success": True, "message": f"📋 Would move {summary['planned']} item(s)", **summary}
+            _touch_index(*(path for pair in pairs for path in pair))
+            return {
+                "message": f"📦 Moved {summary['done']} of {summary['planned']} item(s)",
+                **summary
+            }
+        except Exception as e:
+            return {"error": f"Failed to batch move files: {str(e)}"}
+
     async def delete_file(self, path: str, force: bool = False, **kwargs):
         """Delete a file or directory"""
         try:
@@ -423,6 +480,7 @@ class Superpower:
             
             if os.path.isdir(path):
                 shutil.rmtree(path)
+                _touch_index(path)
                 return {
                     "success": True,
                     "message": f"🗑️ Deleted directory '{path}'",
@@ -431,6 +489,7 @@ class Superpower:
                 }
             else:
                 os.remove(path)
+                _touch_index(path)
                 return {
                     "success": True,
                     "message": f"🗑️ Deleted file '{path}'",
@@ -447,6 +506,7 @@ class Superpower:
                 return {"warning": f"Directory already exists: {path}"}
             
             os.makedirs(path, exist_ok=parents)
+            _touch_index(path)
             return {
                 "success": True,
                 "message": f"📁 Created directory '{path}'",
@@ -540,6 +600,13 @@ class Superpower:
             
             # Normalize query - remove common words like "folder", "file", "on", "the"
             normalized_query = re.sub(r'\b(folder|file|on|the|my|a|an)\b', '', query, flags=re.IGNORECASE).strip()
+            # ...but keep "folder"/"file" as a ranking preference
+            if re.search(r'\bfolders?\b', query, flags=re.IGNORECASE):
+                prefer = "directory"
+            elif re.search(r'\bfiles?\b', query, flags=re.IGNORECASE):
+                prefer = "file"
+            else:
+                prefer = None
             
             # Determine search directories based on location hint
             search_directories = []
@@ -572,89 +639,43 @@ class Superpower:
                                 if os.path.isdir(item_path) and location_hint.lower() in item.lower():
                                     search_directories.append(item_path)
             
-            # If no location hint or no matches, search common locations
-            if not search_directories:
-                search_directories = [
-                    "/",
-                    "/Users",
-                    "/Volumes",
-                    os.path.expanduser("~/Desktop"),
-                    os.path.expanduser("~/Downloads"),
-                ]
-                # Filter to only existing directories
-                search_directories = [d for d in search_directories if os.path.exists(d)]
-            
-            matches = []
-            query_lower = normalized_query.lower()
-            
-            # Search recursively in each directory
-            for search_dir in search_directories:
-                try:
-                    for root, dirs, files in os.walk(search_dir):
-                        # Limit depth to avoid searching entire system (max 10 levels)
-                        depth = root[len(search_dir):].count(os.sep)
-                        if depth > 10:
-                            dirs[:] = []  # Don't recurse deeper
-                            continue
-                        
-                        # Search in directories
-                        for dir_name in dirs:
-                            if query_lower in dir_name.lower():
-                                dir_path = os.path.join(root, dir_name)
-                                try:
-                                    stat = os.stat(dir_path)
-                                    matches.append({
-                                        "name": dir_name,
-                                        "path": dir_path,
-                                        "type": "directory",
-                                        "size": None,
-                                        "modified": stat.st_mtime
-                                    })
-                                except (OSError, PermissionError):
-                                    pass
-                        
-                        # Search in files
-                        for file_name in files:
-                            if query_lower in file_name.lower():
-                                file_path = os.path.join(root, file_name)
-                                try:
-                                    stat = os.stat(file_path)
-                                    matches.append({
-                                        "name": file_name,
-                                        "path": file_path,
-                                        "type": "file",
-                                        "size": stat.st_size,
-                                        "modified": stat.st_mtime
-                                    })
-                                except (OSError, PermissionError):
-                                    pass
-                        
-                        # Limit results to avoid too many matches
-                        if len(matches) >= 50:
-                            break
-                    
-                    if len(matches) >= 50:
-                        break
-                except (OSError, PermissionError) as e:
-                    # Skip directories we can't access
-                    continue
-            
-            # Sort by relevance (exact matches first, then by name similarity)
-            def relevance_score(match):
-                name_lower = match["name"].lower()
-                score = 0
-                if query_lower in name_lower:
-                    # Exact substring match
-                    if name_lower.startswith(query_lower):
-                        score += 100  # Starts with query
-                    elif name_lower == query_lower:
-                        score += 200  # Exact match
-                    else:
-                        score += 50  # Contains query
-                return -score  # Negative for descending sort
-            
-            matches.sort(key=relevance_score)
-            
+            from services.file_index import file_index
+
+            # Answer from the filename index when it covers every directory we'd search
+            hinted = bool(search_directories)
+            if file_index.ready and (not hinted or all(file_index.covers(d) for d in search_directories)):
+                source = "index"
+                matches = await asyncio.to_thread(
+                    file_index.search, normalized_query, 40, search_directories if hinted else None, True, prefer
+                )
+                # The index can lag the disk by one rescan: refresh what we return
+                fresh = []
+                for match in matches:
+                    try:
+                        stat = os.stat(match["path"])
+                    except OSError:
+                        continue
+                    match["modified"] = stat.st_mtime
+                    if match["type"] == "file":
+                        match["size"] = stat.st_size
+                    fresh.append(match)
+                matches = fresh
+            else:
+                # Index still building (or hint outside the indexed roots): crawl the disk
+                source = "crawl"
+                if not search_directories:
+                    # If no location hint or no matches, search common locations
+                    search_directories = [
+                        "/",
+                        "/Users",
+                        "/Volumes",
+                        os.path.expanduser("~/Desktop"),
+                        os.path.expanduser("~/Downloads"),
+                    ]
+                    # Filter to only existing directories
+                    search_directories = [d for d in search_directories if os.path.exists(d)]
+                matches = await asyncio.to_thread(self._crawl_search, normalized_query, search_directories, prefer)
+
             # Limit to top 20 results
             matches = matches[:20]
             
@@ -665,11 +686,20 @@ class Superpower:
                 "location_hint": location_hint,
                 "matches": matches,
                 "count": len(matches),
+                "source": source,
                 "type": "file_search"
             }
         except Exception as e:
             return {"error": f"Failed to search files: {str(e)}"}
 
+    def _crawl_search(self, normalized_query: str, search_directories: List[str], prefer: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Crawl search_directories (max 10 levels, 10s budget) for names containing the query, best matches first"""
+        from services.file_rank import file_ranker
+        from services.file_search_stream import crawl_search
+
+        matches = crawl_search(normalized_query, search_directories, limit=200, time_budget=10)
+        return file_ranker.rank_matches(normalized_query, matches, k=20, prefer=prefer)
+
     async def get_file_info(self, path: str, **kwargs):
         """Get detailed information about a file or directory"""
         try:
@@ -715,55 +745,67 @@ class Superpower:
             if not os.path.isdir(directory):
                 return {"error": f"Path is not a directory: {directory}"}
             
+            if method not in ("type", "date"):
+                return {"error": f"Unknown organization method: {method}"}
+            
             organized = {"moved": [], "created_dirs": [], "errors": []}
+            categories = {}
+            pairs = []
             
             # Get all files in directory (not subdirectories)
-            files = [f for f in os.listdir(directory) if os.path.isfile(os.path.join(directory, f))]
+            with os.scandir(directory) as it:
+                files = [entry for entry in it if entry.is_file()]
             
-            for filename in files:
-                file_path = os.path.join(directory, filename)
-                
+            for entry in files:
                 try:
                     if method == "type":
                         # Organize by file extension
-                        ext = os.path.splitext(filename)[1].lower()
+                        ext = os.path.splitext(entry.name)[1].lower()
                         if ext:
                             subdir = ext[1:]  # Remove the dot
                         else:
                             subdir = "no_extension"
-                    
-                    elif method == "date":
+                    else:
                         # Organize by modification date (YYYY-MM format)
                         import datetime
-                        mtime = os.path.getmtime(file_path)
-                        date = datetime.datetime.fromtimestamp(mtime)
+                        date = datetime.datetime.fromtimestamp(entry.stat().st_mtime)
                         subdir = date.strftime("%Y-%m")
                     
-                    else:
-                        organized["errors"].append(f"Unknown organization method: {method}")
-                        continue
-                    
-                    # Create subdirectory if it doesn't exist
-                    subdir_path = os.path.join(directory, subdir)
-                    if not os.path.exists(subdir_path) and create_subdirs:
-                        os.makedirs(subdir_path)
-                        organized["created_dirs"].append(subdir)
-                    
-                    # Move file
-                    new_path = os.path.join(subdir_path, filename)
-                    if not os.path.exists(new_path):
-                        shutil.move(file_path, new_path)
-                        organized["moved"].append({
-                            "file": filename,
-                            "from": file_path,
-                            "to": new_path,
-                            "category": subdir
-                        })
-                    else:
-                        organized["errors"].append(f"Destination already exists: {new_path}")
-                
+                    categories[os.path.abspath(entry.path)] = subdir
+                    pairs.append((entry.path, os.path.join(directory, subdir, entry.name)))
                 except Exception as e:
-                    organized["errors"].append(f"Error organizing {filename}: {str(e)}")
+                    organized["errors"].append(f"Error organizing {entry.name}: {str(e)}")
+            
+            # One plan for the whole directory: subdirectories, collisions and moves
+            summary = await _run_plan(pairs, create_dirs=create_subdirs, **kwargs)
+            if summary["dry_run"]:
+                return {
+                    "success": True,
+                    "dry_run": True,
+                    "message": f"📋 Would organize {summary['planned']} files by {method}",
+                    "method": method,
+                    "directory": directory,
+                    "plan": summary
+                }
+            
+            for op in summary["operations"]:
+                filename = os.path.basename(op["source"])
+                if op["status"] == "done":
+                    organized["moved"].append({
+                        "file": filename,
+                        "from": op["source"],
+                        "to": op["destination"],
+                        "category": categories.get(op["source"])
+                    })
+                else:
+                    organized["errors"].append(f"Error organizing {filename}: {op.get('reason')}")
+            for op in summary["skipped"]:
+                if op.get("reason") == "conflict":
+                    organized["errors"].append(f"Destination already exists: {op['destination']}")
+                else:
+                    organized["errors"].append(f"Skipped {os.path.basename(op['source'])}: {op.get('reason')}")
+            organized["created_dirs"] = [os.path.relpath(d, directory) for d in summary["created_dirs"]]
+            _touch_index(directory, *(move["to"] for move in organized["moved"]))
             
             return {
                 "success": True,
@@ -258,21 +258,19 @@ async def send_progress_update(websocket_callback: Optional[Callable], session_i
     # Update GlowState task if session_id is a task ID
     try:
         from glowos.glow_state import glow_state_store
-        state = glow_state_store.get_state()
-        
-        # Find task by session_id (which should be task_id)
-        for task in state.tasks.active:
-            if task.id == session_id:
-                task.progress = progress_data.get("progress", 0) / 100.0 if progress_data.get("progress", 0) > 1 else progress_data.get("progress", 0)
-                task.message = progress_data.get("message", "")
-                if progress_data.get("status") == "error":
-                    task.status = "error"
-                elif progress_data.get("status") in ["done", "complete"]:
-                    task.status = "done"
-                    task.progress = 1.0
-                break
+        progress = progress_data.get("progress", 0)
+        changes = {
+            "progress": progress / 100.0 if progress > 1 else progress,
+            "message": progress_data.get("message", ""),
+        }
+        if progress_data.get("status") == "error":
+            changes["status"] = "error"
+        elif progress_data.get("status") in ["done", "complete"]:
+            changes["status"] = "done"
+            changes["progress"] = 1.0
         
-        glow_state_store.replace(state)
+        # session_id should be the task_id
+        glow_state_store.update_task(session_id, **changes)
     except Exception as e:
         print(f"⚠️ Failed to update GlowState task: {e}")
     
@@ -288,6 +286,25 @@ async def send_progress_update(websocket_callback: Optional[Callable], session_i
             print(f"❌ Failed to send progress update: {e}")
 
 
+async def move_with_progress(file_path, target, websocket_callback: Optional[Callable] = None,
+                             session_id: Optional[str] = None, start: int = 0, end: int = 0):
+    """Move a file into the Plex library off the event loop, reporting copy progress between start and end %"""
+    from services.file_transfer import file_transfers
+
+    async def on_progress(transfer: Dict):
+        if session_id and end > start and transfer["status"] == "running":
+            await send_progress_update(websocket_callback, session_id, {
+                "progress": start + (end - start) * transfer["progress"],
+                "status": "moving",
+                "message": f"Moving file to Plex library... {transfer['progress'] * 100:.0f}% ({transfer['rate_mb_per_sec']} MB/s)"
+            })
+
+    result = await file_transfers.move(str(file_path), str(target), label=f"Plex: {Path(target).name}", on_progress=on_progress)
+    if not result["success"]:
+        raise OSError("; ".join(result["errors"]) or result["status"])
+    return result
+
+
 async def process_rip_with_progress(full_rip: bool = True, websocket_callback: Optional[Callable] = None, 
                                   session_id: str = "default", **kwargs):
     """
@@ -472,7 +489,7 @@ async def process_rip_with_progress(full_rip: bool = True, websocket_callback: O
                     counter += 1
                 
                 try:
-                    shutil.move(str(file_path), target)
+                    await move_with_progress(file_path, target)
                     print(f"✅ Moved {file_path.name} to {target}")
                     processed_count += 1
                 except Exception as e:
@@ -612,7 +629,7 @@ async def resume_processing_with_episodes(session_id: str, episode_mappings: Dic
                 counter += 1
             
             try:
-                shutil.move(str(file_path), target)
+                await move_with_progress(file_path, target)
                 print(f"✅ Moved {filename} to {target}")
                 processed_count += 1
             except Exception as e:
@@ -802,7 +819,7 @@ async def process_manual_metadata_with_progress(filename: str, manual_title: str
         print(f"🚚 Moving file to: {target}")
 
         try:
-            shutil.move(str(file_path), target)
+            await move_with_progress(file_path, target, websocket_callback, session_id, 60, 80)
             print(f"✅ File moved to {target}")
         except Exception as e:
             error_msg = f"❌ Failed to move file: {str(e)}"
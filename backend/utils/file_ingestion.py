@@ -4,6 +4,7 @@ Extracts text from various file types and creates memory embeddings
 """
 import os
 import json
+import asyncio
 from typing import Optional
 from bs4 import BeautifulSoup
 from PyPDF2 import PdfReader
@@ -11,6 +12,9 @@ import docx
 import pytesseract
 from PIL import Image
 
+from services.memory_index import memory_index
+from services.db import db
+
 # Note: whisper_model and supabase will be passed as parameters
 
 
@@ -134,7 +138,7 @@ async def ingest_file_to_memories(memory_meta: dict, supabase, embed_text_ollama
     if not file_path.startswith('/'):
         try:
             print(f"🔽 Downloading file from Supabase storage: {file_path}")
-            response = supabase.storage.from_("file-stores").download(file_path)
+            response = await db.call(supabase.storage.from_("file-stores").download, file_path, name="storage_download")
             temp_file_path = f"/tmp/{file_name}"
             with open(temp_file_path, "wb") as f:
                 f.write(response)
@@ -160,11 +164,13 @@ async def ingest_file_to_memories(memory_meta: dict, supabase, embed_text_ollama
     # Use custom name if provided, otherwise use filename without extension
     display_name = custom_name if custom_name else file_name.rsplit('.', 1)[0]
 
-    for i, chunk in enumerate(chunks):
+    # Queue every chunk at once so the embedding service can batch them
+    print(f"🧠 Creating embeddings for {total_chunks} chunk(s)")
+    embeddings = await asyncio.gather(*(embed_text_ollama(chunk) for chunk in chunks))
+
+    for i, (chunk, embedding) in enumerate(zip(chunks, embeddings)):
         # For the name field, use a consistent pattern that the frontend can group by
         name = f"{display_name} - Part {i+1}"
-        print(f"🧠 Creating embedding for chunk {i+1}/{len(chunks)}")
-        embedding = await embed_text_ollama(chunk)
         chunk_metadata = _tag_multi_part_metadata(
             memory_meta.get("metadata"),
             is_multi_part=is_multi_part,
@@ -180,7 +186,8 @@ async def ingest_file_to_memories(memory_meta: dict, supabase, embed_text_ollama
             "importance": int(memory_meta.get("importance", 5)),
             "metadata": chunk_metadata,
         }
-        res = supabase.table("memories").insert(memory_to_insert).execute()
+        res = await db.insert_memory(memory_to_insert)
+        memory_index.add_rows(getattr(res, "data", None) or [], [embedding])
         results.append(res)
 
     # Clean up temporary file if we created one
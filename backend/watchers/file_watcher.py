@@ -0,0 +1,319 @@
+# file_watcher.py
+"""
+📂 Recent Files Watcher - Incremental Downloads/Documents/Desktop Tracking
+device_watcher used to re-list ~/Downloads every 7s and stat + sort every
+entry to get the newest 10, then re-list three directories for recent_files.
+With tens of thousands of files that's a full scan plus N stats per tick.
+
+Each directory is now scanned once, then kept up to date from filesystem events:
+- Linux: inotify (via libc) on the event loop's reader, so idle cost is zero and
+  GlowState updates land within RECENT_FILES_DEBOUNCE of a change
+- Elsewhere: polling fallback that only rescans a directory when its mtime moves
+  (plus a slow full rescan for in-place edits, which don't touch the dir mtime)
+- Per directory, a max-heap of (mtime, name) with lazy invalidation answers
+  "newest N"; stale heap entries are dropped as they surface and the heap is
+  compacted when it grows past twice the live entry count
+- Top-level entries only, dotfiles skipped (same scope as before, minus .DS_Store)
+"""
+import asyncio
+import ctypes
+import ctypes.util
+import heapq
+import os
+import struct
+import sys
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from glowos.glow_state import glow_state_store, ProbeInfo
+
+RECENT_FILES_DEBOUNCE = float(os.getenv("RECENT_FILES_DEBOUNCE", "0.05"))  # coalesce event bursts
+RECENT_FILES_POLL_INTERVAL = float(os.getenv("RECENT_FILES_POLL_INTERVAL", "5"))
+RECENT_FILES_FULL_RESCAN = float(os.getenv("RECENT_FILES_FULL_RESCAN", "60"))
+
+DOWNLOADS_DIR = os.path.expanduser("~/Downloads")
+RECENT_FILE_DIRS = [
+    os.path.expanduser("~/Downloads"),
+    os.path.expanduser("~/Documents"),
+    os.path.expanduser("~/Desktop"),
+]
+DOWNLOADS_RECENT_COUNT = 10
+RECENT_FILES_COUNT = 5
+
+# inotify(7) event bits
+IN_ATTRIB = 0x00000004
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF = 0x00000800
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ONLYDIR = 0x01000000
+WATCH_MASK = (
+    IN_ATTRIB | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE
+    | IN_DELETE | IN_DELETE_SELF | IN_MOVE_SELF | IN_ONLYDIR
+)
+_EVENT_HEADER = struct.Struct("iIII")  # wd, mask, cookie, len
+
+
+class DirectoryIndex:
+    """Top-level entries of one directory: name → (mtime, is_file), plus a lazy newest-first heap."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.entries: Dict[str, Tuple[float, bool]] = {}
+        self._heap: List[Tuple[float, str]] = []  # (-mtime, name); may hold stale entries
+        self.dir_mtime_ns = 0
+
+    def _push(self, name: str, mtime: float):
+        heapq.heappush(self._heap, (-mtime, name))
+        if len(self._heap) > 2 * len(self.entries) + 64:
+            self._heap = [(-m, n) for n, (m, _) in self.entries.items()]
+            heapq.heapify(self._heap)
+
+    def scan(self) -> Tuple[int, Dict[str, Tuple[float, bool]]]:
+        """Full listing (startup, overflow, polling fallback). Blocking; run in a thread, then load()."""
+        entries: Dict[str, Tuple[float, bool]] = {}
+        dir_mtime_ns = 0
+        try:
+            dir_mtime_ns = os.stat(self.path).st_mtime_ns
+            with os.scandir(self.path) as it:
+                for entry in it:
+                    if entry.name.startswith("."):
+                        continue
+                    try:
+                        entries[entry.name] = (entry.stat().st_mtime, entry.is_file())
+                    except OSError:
+                        pass
+        except OSError:
+            pass
+        return dir_mtime_ns, entries
+
+    def load(self, scanned: Tuple[int, Dict[str, Tuple[float, bool]]]):
+        self.dir_mtime_ns, entries = scanned
+        self.entries = entries
+        self._heap = [(-mtime, name) for name, (mtime, _) in entries.items()]
+        heapq.heapify(self._heap)
+
+    def refresh(self, name: str) -> bool:
+        """Re-stat one entry after an event. Returns True if the index changed."""
+        if not name or name.startswith("."):
+            return False
+        try:
+            st = os.stat(os.path.join(self.path, name))
+        except OSError:
+            return self.entries.pop(name, None) is not None
+        value = (st.st_mtime, os.path.isfile(os.path.join(self.path, name)))
+        if self.entries.get(name) == value:
+            return False
+        self.entries[name] = value
+        self._push(name, value[0])
+        return True
+
+    def newest(self, count: int, files_only: bool = False) -> List[Tuple[float, str]]:
+        """Newest `count` entries as (mtime, name), newest first."""
+        found: List[Tuple[float, str]] = []
+        popped: List[Tuple[float, str]] = []
+        while self._heap and len(found) < count:
+            item = heapq.heappop(self._heap)
+            neg_mtime, name = item
+            current = self.entries.get(name)
+            if current is None or current[0] != -neg_mtime:
+                continue  # stale: deleted or modified since it was pushed
+            popped.append(item)
+            if files_only and not current[1]:
+                continue
+            found.append((-neg_mtime, name))
+        for item in popped:
+            heapq.heappush(self._heap, item)
+        return found
+
+
+class _Inotify:
+    """Minimal libc inotify binding (non-blocking fd for loop.add_reader)."""
+
+    def __init__(self):
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        self._add_watch = libc.inotify_add_watch
+        self._add_watch.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32]
+        self.fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+
+    def add_watch(self, path: str, mask: int) -> int:
+        wd = self._add_watch(self.fd, os.fsencode(path), mask)
+        if wd < 0:
+            raise OSError(ctypes.get_errno(), f"inotify_add_watch failed for {path}")
+        return wd
+
+    def read_events(self) -> List[Tuple[int, int, str]]:
+        """Drain pending events → [(wd, mask, name)]."""
+        events = []
+        while True:
+            try:
+                data = os.read(self.fd, 65536)
+            except BlockingIOError:
+                return events
+            offset = 0
+            while offset + _EVENT_HEADER.size <= len(data):
+                wd, mask, _, length = _EVENT_HEADER.unpack_from(data, offset)
+                offset += _EVENT_HEADER.size
+                name = data[offset:offset + length].rstrip(b"\0").decode(errors="surrogateescape")
+                offset += length
+                events.append((wd, mask, name))
+
+    def close(self):
+        os.close(self.fd)
+
+
+class RecentFilesWatcher:
+    """Keeps GlowState.device.downloads_recent / recent_files current from filesystem events."""
+
+    def __init__(self, directories: Optional[List[str]] = None, downloads_dir: str = DOWNLOADS_DIR):
+        self.downloads_dir = downloads_dir
+        self.indexes = {path: DirectoryIndex(path) for path in (directories or RECENT_FILE_DIRS)}
+        self.backend = "inotify" if sys.platform.startswith("linux") else "poll"
+        self._inotify: Optional[_Inotify] = None
+        self._watches: Dict[int, DirectoryIndex] = {}
+        self._publish_handle: Optional[asyncio.TimerHandle] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self.stats = {"events": 0, "rescans": 0, "publishes": 0, "publish_ms_total": 0.0}
+
+    # ---------------------------
+    # Publishing
+    # ---------------------------
+    def _snapshot(self) -> Dict[str, Any]:
+        downloads = self.indexes.get(self.downloads_dir)
+        downloads_recent = [name for _, name in downloads.newest(DOWNLOADS_RECENT_COUNT)] if downloads else []
+
+        candidates = []
+        for index in self.indexes.values():
+            for mtime, name in index.newest(RECENT_FILES_COUNT, files_only=True):
+                candidates.append({"name": name, "path": os.path.join(index.path, name), "modified": mtime})
+        candidates.sort(key=lambda f: f["modified"], reverse=True)
+        return {"downloads_recent": downloads_recent, "recent_files": candidates[:RECENT_FILES_COUNT]}
+
+    def _info(self) -> ProbeInfo:
+        publishes = self.stats["publishes"]
+        return ProbeInfo(
+            backend=self.backend,
+            interval_s=0.0 if self.backend == "inotify" else RECENT_FILES_POLL_INTERVAL,
+            avg_ms=round(self.stats["publish_ms_total"] / publishes, 2) if publishes else 0.0,
+            runs=publishes,
+        )
+
+    def publish(self):
+        self._publish_handle = None
+        started = time.perf_counter()
+        device = self._snapshot()
+        self.stats["publishes"] += 1
+        self.stats["publish_ms_total"] += (time.perf_counter() - started) * 1000
+        info = self._info()
+
+        def change(state):
+            current = {"downloads_recent": state.device.downloads_recent, "recent_files": state.device.recent_files}
+            if current == device:
+                return None
+            return state.model_copy(update={
+                "device": state.device.model_copy(update=device),
+                "probes": {**state.probes, "recent_files": info},
+            })
+
+        glow_state_store.apply(change)
+
+    def _schedule_publish(self):
+        if self._publish_handle is None and self._loop is not None:
+            self._publish_handle = self._loop.call_later(RECENT_FILES_DEBOUNCE, self.publish)
+
+    # ---------------------------
+    # inotify backend
+    # ---------------------------
+    def _on_readable(self):
+        changed = False
+        rescan = []
+        for wd, mask, name in self._inotify.read_events():
+            self.stats["events"] += 1
+            if mask & IN_Q_OVERFLOW:
+                rescan = list(self.indexes.values())
+                continue
+            index = self._watches.get(wd)
+            if index is None:
+                continue
+            if mask & (IN_DELETE_SELF | IN_MOVE_SELF | IN_IGNORED):
+                index.entries.clear()
+                self._watches.pop(wd, None)
+                changed = True
+                continue
+            changed = index.refresh(name) or changed
+        if rescan:
+            self._loop.create_task(self._rescan(rescan))
+        if changed:
+            self._schedule_publish()
+
+    async def _rescan(self, indexes: List[DirectoryIndex]):
+        for index in indexes:
+            index.load(await asyncio.to_thread(index.scan))
+            self.stats["rescans"] += 1
+        self._schedule_publish()
+
+    async def _run_inotify(self):
+        self._inotify = _Inotify()
+        # Watch before the initial scan so nothing that happens during it is missed
+        for path, index in self.indexes.items():
+            try:
+                self._watches[self._inotify.add_watch(path, WATCH_MASK)] = index
+            except OSError as e:
+                print(f"⚠️ Not watching {path}: {e}")
+        await self._rescan(list(self.indexes.values()))
+        self._loop.add_reader(self._inotify.fd, self._on_readable)
+        try:
+            await asyncio.Event().wait()  # events arrive via the reader callback
+        finally:
+            self._loop.remove_reader(self._inotify.fd)
+            self._inotify.close()
+
+    # ---------------------------
+    # Polling fallback
+    # ---------------------------
+    async def _run_polling(self):
+        await self._rescan(list(self.indexes.values()))
+        last_full = time.monotonic()
+        while True:
+            await asyncio.sleep(RECENT_FILES_POLL_INTERVAL)
+            full = time.monotonic() - last_full >= RECENT_FILES_FULL_RESCAN
+            stale = []
+            for index in self.indexes.values():
+                try:
+                    moved = os.stat(index.path).st_mtime_ns != index.dir_mtime_ns
+                except OSError:
+                    moved = bool(index.entries)
+                if full or moved:
+                    stale.append(index)
+            if full:
+                last_full = time.monotonic()
+            if stale:
+                await self._rescan(stale)
+
+    async def run(self):
+        self._loop = asyncio.get_running_loop()
+        if self.backend == "inotify":
+            try:
+                await self._run_inotify()
+                return
+            except OSError as e:
+                print(f"⚠️ inotify unavailable ({e}), polling instead")
+                self.backend = "poll"
+        await self._run_polling()
+
+    def get_stats(self) -> dict:
+        return {
+            "backend": self.backend,
+            "directories": {path: len(index.entries) for path, index in self.indexes.items()},
+            **self.stats,
+        }
+
+
+__all__ = ["RecentFilesWatcher", "DirectoryIndex"]
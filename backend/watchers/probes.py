@@ -0,0 +1,764 @@
+# probes.py
+"""
+🔎 Watcher Probes - Pluggable, Non-Blocking System/Device Readers
+system_watcher and device_watcher used to call subprocess.run from the event
+loop every 5–7s (ping, osascript, system_profiler, makemkvcon). Each call
+blocked the loop up to its timeout, and on Linux most of those binaries don't
+exist, so every tick paid a fork/exec plus an exception.
+
+Each reading is now a Probe:
+- Capability-detected once at startup (available()); unavailable probes never run
+- Linux reads /proc and /sys (directly or through psutil), network status is an
+  async socket connect, macOS tools run as async subprocesses
+- Blocking reads (process table, connection table) run in a thread
+- Every probe has its own interval and backs off (×PROBE_BACKOFF up to its
+  max_interval) while its values stay stable; any change resets it
+- Per-probe cost (last/avg ms, runs, errors, current interval) is published to
+  GlowState.probes every PROBE_REPORT_INTERVAL seconds
+"""
+import asyncio
+import glob
+import os
+import shutil
+import socket
+import sys
+import time
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+import psutil
+
+from glowos.glow_state import glow_state_store, ProbeInfo
+
+PROBE_BACKOFF = float(os.getenv("PROBE_BACKOFF", "1.5"))
+PROBE_REPORT_INTERVAL = float(os.getenv("PROBE_REPORT_INTERVAL", "30"))
+NETWORK_PROBE_HOST = os.getenv("NETWORK_PROBE_HOST", "8.8.8.8")
+NETWORK_PROBE_PORT = int(os.getenv("NETWORK_PROBE_PORT", "53"))
+
+IS_LINUX = sys.platform.startswith("linux")
+IS_MACOS = sys.platform == "darwin"
+
+
+# ============================================
+# Helpers
+# ============================================
+
+async def run_command(*args: str, timeout: float = 2.0) -> Optional[str]:
+    """Run a command without blocking the loop. stdout on success, None on failure/timeout."""
+    try:
+        proc = await asyncio.create_subprocess_exec(
+            *args, stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.DEVNULL
+        )
+    except (FileNotFoundError, PermissionError):
+        return None
+    try:
+        stdout, _ = await asyncio.wait_for(proc.communicate(), timeout)
+    except asyncio.TimeoutError:
+        proc.kill()
+        await proc.wait()
+        return None
+    if proc.returncode != 0:
+        return None
+    return stdout.decode(errors="replace").strip()
+
+
+async def osascript(script: str, timeout: float = 2.0) -> Optional[str]:
+    return await run_command("osascript", "-e", script, timeout=timeout)
+
+
+def _read_text(path: str) -> Optional[str]:
+    try:
+        with open(path) as f:
+            return f.read().strip()
+    except OSError:
+        return None
+
+
+def _close(old: Dict[str, Any], new: Dict[str, Any], tolerances: Dict[str, float]) -> bool:
+    """Same keys, numbers within their tolerance, everything else equal."""
+    if old.keys() != new.keys():
+        return False
+    for key, value in new.items():
+        previous = old[key]
+        tolerance = tolerances.get(key)
+        if tolerance is not None and isinstance(value, (int, float)) and isinstance(previous, (int, float)):
+            if abs(value - previous) > tolerance:
+                return False
+        elif value != previous:
+            return False
+    return True
+
+
+# ============================================
+# Probe base
+# ============================================
+
+class Probe:
+    """
+    One reading published into a GlowState section.
+
+    Subclasses set name/section/backend/interval/max_interval and implement read();
+    available() is called once at startup.
+    """
+
+    name = "probe"
+    section = "system"
+    backend = "psutil"
+    interval = 5.0       # seconds between reads while values change
+    max_interval = 30.0  # backoff ceiling while values are stable
+    tolerances: Dict[str, float] = {}  # numeric jitter that still counts as stable
+
+    def available(self) -> bool:
+        return True
+
+    async def read(self) -> Dict[str, Any]:
+        raise NotImplementedError
+
+    def stable(self, old: Dict[str, Any], new: Dict[str, Any]) -> bool:
+        return _close(old, new, self.tolerances)
+
+    def publish(self, values: Dict[str, Any]):
+        glow_state_store.update(**{self.section: values})
+
+
+# ============================================
+# System probes
+# ============================================
+
+class CpuMemoryProbe(Probe):
+    name = "cpu_memory"
+    backend = "proc" if IS_LINUX else "psutil"
+    interval = 5.0
+    max_interval = 20.0
+    tolerances = {"cpu_usage": 0.03, "ram_usage": 0.01}
+
+    def available(self) -> bool:
+        psutil.cpu_percent()  # prime the delta; first reading is otherwise 0
+        return True
+
+    async def read(self) -> Dict[str, Any]:
+        return {
+            "cpu_usage": psutil.cpu_percent() / 100.0,
+            "ram_usage": psutil.virtual_memory().percent / 100.0,
+        }
+
+
+class DiskUsageProbe(Probe):
+    name = "disk_usage"
+    interval = 30.0
+    max_interval = 300.0
+    tolerances = {"disk_free_gb": 0.1, "disk_used_gb": 0.1}
+
+    async def read(self) -> Dict[str, Any]:
+        disk = psutil.disk_usage("/")
+        return {
+            "disk_free_gb": round(disk.free / (1024**3), 1),
+            "disk_used_gb": round(disk.used / (1024**3), 1),
+            "disk_total_gb": round(disk.total / (1024**3), 1),
+        }
+
+
+class _RateProbe(Probe):
+    """Turns monotonically increasing byte counters into MB/s over the real elapsed time."""
+
+    interval = 5.0
+    max_interval = 30.0
+
+    def __init__(self):
+        self._last = None
+        self._last_at = 0.0
+
+    def counters(self) -> Dict[str, int]:
+        raise NotImplementedError
+
+    def values(self, counters: Dict[str, int], rates: Dict[str, float]) -> Dict[str, Any]:
+        raise NotImplementedError
+
+    async def read(self) -> Dict[str, Any]:
+        counters = self.counters()
+        now = time.monotonic()
+        rates = {key: 0.0 for key in counters}
+        if self._last is not None and now > self._last_at:
+            elapsed = now - self._last_at
+            rates = {
+                key: max(0, value - self._last.get(key, value)) / (1024**2) / elapsed
+                for key, value in counters.items()
+            }
+        self._last, self._last_at = counters, now
+        return self.values(counters, rates)
+
+
+class DiskIOProbe(_RateProbe):
+    name = "disk_io"
+    backend = "proc" if IS_LINUX else "psutil"
+    tolerances = {"disk_read_mb_per_sec": 0.05, "disk_write_mb_per_sec": 0.05}
+
+    def available(self) -> bool:
+        return psutil.disk_io_counters() is not None
+
+    def counters(self) -> Dict[str, int]:
+        io = psutil.disk_io_counters()
+        return {"read": io.read_bytes, "write": io.write_bytes}
+
+    def values(self, counters, rates):
+        return {
+            "disk_read_mb_per_sec": round(rates["read"], 2),
+            "disk_write_mb_per_sec": round(rates["write"], 2),
+        }
+
+
+class NetIOProbe(_RateProbe):
+    name = "net_io"
+    backend = "proc" if IS_LINUX else "psutil"
+    tolerances = {
+        "network_sent_mb": 1.0,
+        "network_recv_mb": 1.0,
+        "network_sent_mb_per_sec": 0.05,
+        "network_recv_mb_per_sec": 0.05,
+    }
+
+    def available(self) -> bool:
+        return psutil.net_io_counters() is not None
+
+    def counters(self) -> Dict[str, int]:
+        io = psutil.net_io_counters()
+        return {"sent": io.bytes_sent, "recv": io.bytes_recv}
+
+    def values(self, counters, rates):
+        return {
+            "network_sent_mb": round(counters["sent"] / (1024**2), 1),
+            "network_recv_mb": round(counters["recv"] / (1024**2), 1),
+            "network_sent_mb_per_sec": round(rates["sent"], 2),
+            "network_recv_mb_per_sec": round(rates["recv"], 2),
+        }
+
+
+class NetworkStatusProbe(Probe):
+    """TCP connect to a public resolver instead of forking ping."""
+
+    name = "network_status"
+    backend = "socket"
+    interval = 10.0
+    max_interval = 60.0
+
+    async def read(self) -> Dict[str, Any]:
+        try:
+            _, writer = await asyncio.wait_for(
+                asyncio.open_connection(NETWORK_PROBE_HOST, NETWORK_PROBE_PORT), timeout=1.5
+            )
+            writer.close()
+            return {"network_status": "connected"}
+        except (asyncio.TimeoutError, OSError, socket.gaierror):
+            return {"network_status": "offline"}
+
+
+class ClockProbe(Probe):
+    """Uptime + environment.now; always changes, so it never backs off."""
+
+    name = "clock"
+    backend = "proc" if IS_LINUX else "psutil"
+    interval = 10.0
+    max_interval = 10.0
+
+    def __init__(self):
+        self._boot_time = psutil.boot_time()
+
+    async def read(self) -> Dict[str, Any]:
+        return {"uptime_seconds": int(time.time() - self._boot_time)}
+
+    def publish(self, values: Dict[str, Any]):
+        glow_state_store.update(system=values, environment={"now": datetime.utcnow()})
+
+
+class BatteryProbe(Probe):
+    name = "battery"
+    backend = "sysfs" if IS_LINUX else "psutil"
+    interval = 30.0
+    max_interval = 120.0
+    tolerances = {"battery_percent": 0.5}
+
+    def available(self) -> bool:
+        try:
+            return psutil.sensors_battery() is not None
+        except Exception:
+            return False
+
+    async def read(self) -> Dict[str, Any]:
+        battery = psutil.sensors_battery()
+        if not battery:
+            return {"battery_percent": None, "battery_plugged": None}
+        return {"battery_percent": battery.percent, "battery_plugged": battery.power_plugged}
+
+
+class LinuxCpuTempProbe(Probe):
+    name = "cpu_temp"
+    backend = "sysfs"
+    interval = 10.0
+    max_interval = 60.0
+    tolerances = {"cpu_temp_c": 1.0}
+    PREFERRED = ("coretemp", "k10temp", "zenpower", "cpu_thermal", "acpitz")
+
+    def available(self) -> bool:
+        return IS_LINUX and hasattr(psutil, "sensors_temperatures") and bool(self._read_temp() is not None)
+
+    def _read_temp(self) -> Optional[float]:
+        try:
+            sensors = psutil.sensors_temperatures()
+        except Exception:
+            return None
+        for name in self.PREFERRED + tuple(sensors):
+            entries = sensors.get(name)
+            if entries:
+                return round(entries[0].current, 1)
+        return None
+
+    async def read(self) -> Dict[str, Any]:
+        return {"cpu_temp_c": self._read_temp()}
+
+
+class MacCpuTempProbe(Probe):
+    name = "cpu_temp"
+    backend = "osascript"
+    interval = 15.0
+    max_interval = 120.0
+    tolerances = {"cpu_temp_c": 1.0}
+
+    def available(self) -> bool:
+        return IS_MACOS and shutil.which("osascript") is not None
+
+    async def read(self) -> Dict[str, Any]:
+        output = await osascript(
+            'do shell script "sudo powermetrics --samplers smc -n 1 -i 1000 | grep \\"CPU die temperature\\" | awk \'{print $4}\'"',
+            timeout=3,
+        )
+        try:
+            return {"cpu_temp_c": float(output.replace("C", "")) if output else None}
+        except ValueError:
+            return {"cpu_temp_c": None}
+
+
+class MacRunningAppsProbe(Probe):
+    name = "running_apps"
+    backend = "osascript"
+    interval = 10.0
+    max_interval = 60.0
+
+    def available(self) -> bool:
+        return IS_MACOS and shutil.which("osascript") is not None
+
+    async def read(self) -> Dict[str, Any]:
+        output = await osascript('tell application "System Events" to get name of every application process')
+        if output is None:
+            return {"running_apps": []}
+        return {"running_apps": [a.strip() for a in output.split(", ") if a.strip()][:20]}
+
+
+class LinuxRunningAppsProbe(Probe):
+    """Distinct process names of the current user, largest resident set first."""
+
+    name = "running_apps"
+    backend = "proc"
+    interval = 15.0
+    max_interval = 120.0
+
+    def available(self) -> bool:
+        return IS_LINUX
+
+    @staticmethod
+    def _scan() -> List[str]:
+        uid = os.getuid()
+        sizes: Dict[str, int] = {}
+        for proc in psutil.process_iter(attrs=["name", "ppid", "uids", "memory_info"]):
+            info = proc.info
+            if not info["name"] or not info["uids"] or info["uids"].real != uid or not info["memory_info"]:
+                continue
+            if proc.pid == 2 or info["ppid"] == 2:
+                continue  # kernel threads (children of kthreadd)
+            sizes[info["name"]] = sizes.get(info["name"], 0) + info["memory_info"].rss
+        return [name for name, _ in sorted(sizes.items(), key=lambda item: -item[1])][:20]
+
+    async def read(self) -> Dict[str, Any]:
+        return {"running_apps": await asyncio.to_thread(self._scan)}
+
+
+class ActivePortsProbe(Probe):
+    name = "active_ports"
+    backend = "proc" if IS_LINUX else "psutil"
+    interval = 15.0
+    max_interval = 120.0
+
+    @staticmethod
+    def _scan() -> List[Dict[str, Any]]:
+        ports: Dict[int, Dict[str, Any]] = {}
+        for conn in psutil.net_connections(kind="inet"):
+            if conn.status == psutil.CONN_LISTEN and conn.laddr and conn.laddr.port not in ports:
+                ports[conn.laddr.port] = {"port": conn.laddr.port, "protocol": "tcp", "pid": conn.pid}
+        return sorted(ports.values(), key=lambda p: p["port"])[:10]
+
+    def available(self) -> bool:
+        try:
+            self._scan()
+            return True
+        except (psutil.AccessDenied, PermissionError, OSError):
+            return False
+
+    async def read(self) -> Dict[str, Any]:
+        return {"active_ports": await asyncio.to_thread(self._scan)}
+
+
+# ============================================
+# Runtime probes
+# ============================================
+
+# GlowState.runtime field → process name substring
+RUNTIME_PROCESSES = {
+    "ollama_running": "ollama",
+    "plex_running": "Plex Media Server",
+}
+
+
+class ProcessPresenceProbe(Probe):
+    """One process-table scan answers every presence check in RUNTIME_PROCESSES."""
+
+    name = "processes"
+    section = "runtime"
+    backend = "proc" if IS_LINUX else "psutil"
+    interval = 10.0
+    max_interval = 60.0
+
+    def __init__(self, processes: Optional[Dict[str, str]] = None):
+        # Linux truncates process names (comm) to 15 characters
+        limit = 15 if IS_LINUX else None
+        self.needles = {field: name.lower()[:limit] for field, name in (processes or RUNTIME_PROCESSES).items()}
+
+    def _scan(self) -> Dict[str, bool]:
+        found = dict.fromkeys(self.needles, False)
+        remaining = dict(self.needles)
+        for proc in psutil.process_iter(attrs=["name"]):
+            name = (proc.info["name"] or "").lower()
+            for field, needle in list(remaining.items()):
+                if needle in name:
+                    found[field] = True
+                    del remaining[field]
+            if not remaining:
+                break
+        return found
+
+    async def read(self) -> Dict[str, Any]:
+        return await asyncio.to_thread(self._scan)
+
+
+# ============================================
+# Device probes
+# ============================================
+
+def _is_video_disc(path: str) -> bool:
+    return os.path.exists(os.path.join(path, "BDMV")) or os.path.exists(os.path.join(path, "VIDEO_TS"))
+
+
+class _DiscProbe(Probe):
+    name = "disc"
+    section = "device"
+    interval = 7.0
+    max_interval = 30.0
+
+    def publish(self, values: Dict[str, Any]):
+        prev_disc_mounted = glow_state_store.get_state().device.disc_mounted
+        glow_state_store.update(device=values)
+
+        # Detect disc insertion (wasn't mounted before, now is)
+        if values["disc_mounted"] and not prev_disc_mounted and values["disc_path"]:
+            print(f"💿 Disc inserted: {values['disc_path']}")
+            # Store notification flag for frontend to check
+            glow_state_store.update(
+                notifications={
+                    "disc_inserted": True,
+                    "disc_path": values["disc_path"],
+                    "timestamp": datetime.now().isoformat()
+                }
+            )
+
+
+class LinuxDiscProbe(_DiscProbe):
+    """Optical drives show up as /sys/block/sr*; a mounted video disc is an iso9660/udf mount."""
+
+    backend = "sysfs"
+
+    def available(self) -> bool:
+        return IS_LINUX and bool(glob.glob("/sys/block/sr*"))
+
+    async def read(self) -> Dict[str, Any]:
+        for line in (_read_text("/proc/mounts") or "").splitlines():
+            fields = line.split()
+            if len(fields) >= 3 and fields[2] in ("iso9660", "udf"):
+                mount_point = fields[1].replace("\\040", " ")
+                if _is_video_disc(mount_point):
+                    return {"disc_mounted": True, "disc_path": mount_point}
+        return {"disc_mounted": False, "disc_path": None}
+
+
+class MacDiscProbe(_DiscProbe):
+    backend = "system_profiler"
+    MAKEMKVCON = "/Applications/MakeMKV.app/Contents/MacOS/makemkvcon"
+    EXCLUDED_VOLUMES = ("Macintosh HD", "PlexServer", "Time Machine", "Backups")
+
+    def available(self) -> bool:
+        return IS_MACOS and shutil.which("system_profiler") is not None
+
+    @staticmethod
+    def _find_mounted_disc(excluded=()) -> Optional[str]:
+        for vol in os.listdir("/Volumes"):
+            if vol in excluded or vol.startswith("."):
+                continue
+            vol_path = f"/Volumes/{vol}"
+            # Check for disc structures (BDMV for Blu-ray, VIDEO_TS for DVD)
+            if _is_video_disc(vol_path):
+                return vol_path
+        return None
+
+    async def read(self) -> Dict[str, Any]:
+        import json
+
+        output = await run_command("system_profiler", "SPDiscBurningDataType", "-json", timeout=5)
+        try:
+            optical_drives = json.loads(output).get("SPDiscBurningDataType", []) if output else []
+        except json.JSONDecodeError:
+            optical_drives = []
+
+        # Look for Pioneer drives specifically
+        if any("pioneer" in drive.get("_name", "").lower() for drive in optical_drives):
+            disc_path = await asyncio.to_thread(self._find_mounted_disc)
+            # Also try MakeMKV to confirm disc presence
+            if not disc_path and await run_command(self.MAKEMKVCON, "info", "disc:0", timeout=5):
+                disc_path = await asyncio.to_thread(self._find_mounted_disc, self.EXCLUDED_VOLUMES)
+            if disc_path:
+                return {"disc_mounted": True, "disc_path": disc_path}
+        return {"disc_mounted": False, "disc_path": None}
+
+
+class MacFrontmostProbe(Probe):
+    name = "frontmost"
+    section = "device"
+    backend = "osascript"
+    interval = 7.0
+    max_interval = 30.0
+
+    def available(self) -> bool:
+        return IS_MACOS and shutil.which("osascript") is not None
+
+    async def read(self) -> Dict[str, Any]:
+        app = await osascript('tell application "System Events" to get name of first application process whose frontmost is true')
+        window = await osascript(f'tell application "{app}" to get name of window 1') if app else None
+        return {"frontmost_app": app or None, "frontmost_window": window or None}
+
+
+class LinuxFrontmostProbe(Probe):
+    """X11 only: xdotool for the active window, /proc for its process name."""
+
+    name = "frontmost"
+    section = "device"
+    backend = "xdotool"
+    interval = 7.0
+    max_interval = 30.0
+
+    def available(self) -> bool:
+        return IS_LINUX and bool(os.getenv("DISPLAY")) and shutil.which("xdotool") is not None
+
+    async def read(self) -> Dict[str, Any]:
+        window = await run_command("xdotool", "getactivewindow", "getwindowname")
+        pid = await run_command("xdotool", "getactivewindow", "getwindowpid")
+        app = _read_text(f"/proc/{pid}/comm") if pid and pid.isdigit() else None
+        return {"frontmost_app": app, "frontmost_window": window or None}
+
+
+class MacBrightnessProbe(Probe):
+    name = "brightness"
+    section = "device"
+    backend = "osascript"
+    interval = 15.0
+    max_interval = 120.0
+
+    def available(self) -> bool:
+        return IS_MACOS and shutil.which("osascript") is not None
+
+    async def read(self) -> Dict[str, Any]:
+        output = await osascript(
+            'tell application "System Events" to tell application process "SystemUIServer" to get value of slider 1 of group 1 of window 1'
+        )
+        try:
+            return {"screen_brightness": int(float(output) * 100) if output else None}
+        except ValueError:
+            return {"screen_brightness": None}
+
+
+class LinuxBrightnessProbe(Probe):
+    name = "brightness"
+    section = "device"
+    backend = "sysfs"
+    interval = 15.0
+    max_interval = 120.0
+
+    def __init__(self):
+        devices = sorted(glob.glob("/sys/class/backlight/*"))
+        self._device = devices[0] if devices else None
+
+    def available(self) -> bool:
+        return IS_LINUX and self._device is not None
+
+    async def read(self) -> Dict[str, Any]:
+        current = _read_text(os.path.join(self._device, "brightness"))
+        maximum = _read_text(os.path.join(self._device, "max_brightness"))
+        if not current or not maximum or not maximum.isdigit() or int(maximum) == 0:
+            return {"screen_brightness": None}
+        return {"screen_brightness": int(int(current) * 100 / int(maximum))}
+
+
+class MacVolumeProbe(Probe):
+    name = "volume"
+    section = "device"
+    backend = "osascript"
+    interval = 15.0
+    max_interval = 120.0
+
+    def available(self) -> bool:
+        return IS_MACOS and shutil.which("osascript") is not None
+
+    async def read(self) -> Dict[str, Any]:
+        output = await osascript("output volume of (get volume settings)")
+        try:
+            return {"audio_output_volume": float(output) / 100.0 if output else None}
+        except ValueError:
+            return {"audio_output_volume": None}
+
+
+class LinuxVolumeProbe(Probe):
+    name = "volume"
+    section = "device"
+    backend = "pactl"
+    interval = 15.0
+    max_interval = 120.0
+
+    def available(self) -> bool:
+        return IS_LINUX and shutil.which("pactl") is not None
+
+    async def read(self) -> Dict[str, Any]:
+        import re
+
+        output = await run_command("pactl", "get-sink-volume", "@DEFAULT_SINK@")
+        match = re.search(r"(\d+)%", output or "")
+        return {"audio_output_volume": int(match.group(1)) / 100.0 if match else None}
+
+
+SYSTEM_PROBES = [
+    CpuMemoryProbe, DiskUsageProbe, DiskIOProbe, NetIOProbe, NetworkStatusProbe, ClockProbe,
+    BatteryProbe, LinuxCpuTempProbe, MacCpuTempProbe, LinuxRunningAppsProbe, MacRunningAppsProbe,
+    ActivePortsProbe,
+]
+RUNTIME_PROBES = [ProcessPresenceProbe]
+DEVICE_PROBES = [
+    LinuxDiscProbe, MacDiscProbe, LinuxFrontmostProbe, MacFrontmostProbe,
+    LinuxBrightnessProbe, MacBrightnessProbe, LinuxVolumeProbe, MacVolumeProbe,
+]
+
+
+# ============================================
+# Runner
+# ============================================
+
+class _ProbeStats:
+    __slots__ = ("backend", "interval", "last_ms", "total_ms", "runs", "errors")
+
+    def __init__(self, probe: Probe):
+        self.backend = probe.backend
+        self.interval = probe.interval
+        self.last_ms = 0.0
+        self.total_ms = 0.0
+        self.runs = 0
+        self.errors = 0
+
+    def info(self) -> ProbeInfo:
+        return ProbeInfo(
+            backend=self.backend,
+            interval_s=round(self.interval, 1),
+            last_ms=round(self.last_ms, 2),
+            avg_ms=round(self.total_ms / self.runs, 2) if self.runs else 0.0,
+            runs=self.runs,
+            errors=self.errors,
+        )
+
+
+def detect_probes(candidates) -> List[Probe]:
+    """Instantiate each probe class and keep the ones this host supports (first per name wins)."""
+    probes, names, skipped = [], set(), []
+    for probe_class in candidates:
+        try:
+            probe = probe_class()
+            ok = probe.name not in names and probe.available()
+        except Exception:
+            ok = False
+        if ok:
+            probes.append(probe)
+            names.add(probe.name)
+        else:
+            skipped.append(probe_class.__name__)
+    print(f"🔎 Probes enabled: {', '.join(f'{p.name}({p.backend})' for p in probes)}")
+    if skipped:
+        print(f"🔎 Probes unavailable on this host: {', '.join(skipped)}")
+    return probes
+
+
+class ProbeRunner:
+    """Runs each probe on its own adaptive schedule and reports their cost into GlowState.probes."""
+
+    def __init__(self, probes: List[Probe]):
+        self.probes = probes
+        self.stats = {probe.name: _ProbeStats(probe) for probe in probes}
+
+    async def _run_probe(self, probe: Probe):
+        stats = self.stats[probe.name]
+        last: Optional[Dict[str, Any]] = None
+        while True:
+            started = time.perf_counter()
+            try:
+                values = await probe.read()
+            except Exception as e:
+                values = None
+                stats.errors += 1
+                print(f"⚠️ Probe {probe.name} failed: {e}")
+            stats.last_ms = (time.perf_counter() - started) * 1000
+            stats.total_ms += stats.last_ms
+            stats.runs += 1
+
+            if values is not None:
+                if last is not None and probe.stable(last, values):
+                    stats.interval = min(stats.interval * PROBE_BACKOFF, probe.max_interval)
+                else:
+                    stats.interval = probe.interval
+                    probe.publish(values)
+                    last = values
+            await asyncio.sleep(stats.interval)
+
+    def _report(self):
+        report = {name: stats.info() for name, stats in self.stats.items()}
+        glow_state_store.apply(lambda state: state.model_copy(update={"probes": {**state.probes, **report}}))
+
+    async def run(self):
+        tasks = [asyncio.create_task(self._run_probe(probe)) for probe in self.probes]
+        try:
+            while True:
+                await asyncio.sleep(PROBE_REPORT_INTERVAL)
+                self._report()
+        finally:
+            for task in tasks:
+                task.cancel()
+
+
+__all__ = [
+    "Probe",
+    "ProbeRunner",
+    "detect_probes",
+    "run_command",
+    "SYSTEM_PROBES",
+    "RUNTIME_PROBES",
+    "DEVICE_PROBES",
+]
@@ -0,0 +1,27 @@
+-- Bulk chat message insert used by the backend's write-behind message log
+-- Run this in your Supabase SQL editor to create the function
+
+-- p_messages: JSON array of
+--   {"id", "thread_id", "role", "content", "metadata", "created_at", "embedding"}
+-- "id" is generated by the backend, so retries are idempotent (existing ids are skipped).
+-- "embedding" uses the pgvector text format: "[0.1,0.2,...]"
+CREATE OR REPLACE FUNCTION insert_chat_messages_with_vectors(p_messages JSONB)
+RETURNS SETOF UUID
+LANGUAGE plpgsql
+AS $$
+BEGIN
+  RETURN QUERY
+  INSERT INTO chat_messages (id, thread_id, role, content, metadata, created_at, embedding)
+  SELECT
+    (m->>'id')::UUID,
+    (m->>'thread_id')::UUID,
+    m->>'role',
+    m->>'content',
+    COALESCE(m->'metadata', '{}'::jsonb),
+    COALESCE((m->>'created_at')::TIMESTAMPTZ, NOW()),
+    (m->>'embedding')::vector
+  FROM jsonb_array_elements(p_messages) AS m
+  ON CONFLICT (id) DO NOTHING
+  RETURNING chat_messages.id;
+END;
+$$;
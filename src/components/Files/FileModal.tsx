@@ -30,6 +30,7 @@ import {
   ChevronRight,
   MoreHorizontal,
 } from "lucide-react";
+import { useWebSocketContext } from "@/context/WebSocketContext";
 
 interface FileModalProps {
   isOpen: boolean;
@@ -215,72 +216,68 @@ export const FileModal: React.FC<FileModalProps> = ({
     [sortBy, sortOrder]
   );
 
-  const [allFiles, setAllFiles] = useState<FileItem[]>([]);
+  // Global search streams over the WebSocket: the backend crawls (or queries the
+  // filename index) and pushes file_search_batch messages as matches are found
+  const { sendMessage, registerMessageHandler } = useWebSocketContext();
+  const activeSearchId = useRef<string | null>(null);
+  const searchDebounce = useRef<ReturnType<typeof setTimeout> | null>(null);
 
-  const collectAllFiles = useCallback(
-    async (directory = "/", collected: FileItem[] = []) => {
-      try {
-        const response = await fetch(
-          `${API_BASE}/api/superpowers/file_ops/execute`,
-          {
-            method: "POST",
-            headers: { "Content-Type": "application/json" },
-            body: JSON.stringify({
-              intent: "list_files",
-              kwargs: { directory, show_hidden: false },
-            }),
-          }
-        );
+  const cancelGlobalSearch = useCallback(() => {
+    if (searchDebounce.current) {
+      clearTimeout(searchDebounce.current);
+      searchDebounce.current = null;
+    }
+    if (activeSearchId.current) {
+      sendMessage({ type: "file_search_cancel", search_id: activeSearchId.current });
+      activeSearchId.current = null;
+    }
+    setIsSearching(false);
+  }, [sendMessage]);
 
-        const data = await response.json();
-        if (data.result?.success) {
-          for (const file of data.result.files) {
-            collected.push(file);
-            if (file.type === "directory") {
-              await collectAllFiles(file.path, collected);
-            }
-          }
-        }
-      } catch (err) {
-        console.error("Failed to collect files from", directory, err);
+  useEffect(() => {
+    return registerMessageHandler((message: any) => {
+      if (!message.search_id || message.search_id !== activeSearchId.current) return;
+      if (message.type === "file_search_batch") {
+        const batch: FileItem[] = message.matches.map((file: any) => ({
+          ...file,
+          extension:
+            file.type === "file" ? file.name.split(".").pop() : undefined,
+        }));
+        setSearchResults((prev) => [...prev, ...batch]);
+      } else if (message.type === "file_search_done") {
+        activeSearchId.current = null;
+        setIsSearching(false);
       }
-      return collected;
-    },
-    []
-  );
+    });
+  }, [registerMessageHandler]);
 
   const performGlobalSearch = useCallback(
-    async (query: string) => {
-      if (!query.trim()) {
-        setSearchResults([]);
-        setIsSearching(false);
-        return;
-      }
+    (query: string) => {
+      cancelGlobalSearch();
+      setSearchResults([]);
+      if (!query.trim()) return;
 
       setIsSearching(true);
-      try {
-        // Use cached files if available, otherwise collect them
-        let filesToSearch = allFiles;
-        if (allFiles.length === 0) {
-          filesToSearch = await collectAllFiles();
-          setAllFiles(filesToSearch);
-        }
-
-        // Filter files by name containing search term
-        const results = filesToSearch.filter((file) =>
-          file.name.toLowerCase().includes(query.toLowerCase())
-        );
-
-        setSearchResults(results);
-      } catch (err) {
-        console.error("Search failed:", err);
-      } finally {
-        setIsSearching(false);
-      }
+      searchDebounce.current = setTimeout(() => {
+        const searchId = `fs-${Date.now()}-${Math.random().toString(36).substr(2, 6)}`;
+        activeSearchId.current = searchId;
+        sendMessage({
+          type: "file_search",
+          search_id: searchId,
+          query,
+          directories: ["/"],
+        });
+      }, 250);
     },
-    [allFiles, collectAllFiles]
+    [cancelGlobalSearch, sendMessage]
   );
 
+  // Stop any running crawl when the modal closes or unmounts
+  useEffect(() => {
+    if (!isOpen) cancelGlobalSearch();
+  }, [isOpen, cancelGlobalSearch]);
+  useEffect(() => cancelGlobalSearch, [cancelGlobalSearch]);
+
   const navigateTo = useCallback(
     (path: string) => {
       setCurrentPath(path);